@@ -1,6 +1,7 @@
 import sys, os
 sys.path.append(os.path.dirname(__file__))
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -8,12 +9,33 @@ from routes import runs
 from routes import datasets
 from routes import models
 from routes import system
+from routes import sweeps
+from routes import inference
+from core.scheduler import get_scheduler
+from core.telemetry import get_telemetry
+from core.sweeps import get_sweeps
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # lanjutkan job yang masih di antrian sebelum server restart
+    scheduler = get_scheduler()
+    scheduler.start()
+    sweep_manager = get_sweeps()
+    sweep_manager.start()
+    telemetry = get_telemetry()
+    telemetry.start()
+    yield
+    telemetry.stop()
+    sweep_manager.stop()
+    scheduler.stop()
 
 
 app = FastAPI(
     title="SFCore FineTuner Engine",
     description="Python backend engine for SFCore.FineTunerX.ChatGPT",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS agar bisa diakses dari ASP.NET MVC
@@ -29,6 +51,8 @@ app.include_router(runs.router, prefix="/runs", tags=["Runs"])
 app.include_router(datasets.router, prefix="/datasets", tags=["Datasets"])
 app.include_router(models.router, prefix="/models", tags=["Models"])
 app.include_router(system.router, prefix="/system", tags=["System"])
+app.include_router(sweeps.router, prefix="/sweeps", tags=["Sweeps"])
+app.include_router(inference.router, prefix="/inference", tags=["Inference"])
 
 @app.get("/")
 def root():
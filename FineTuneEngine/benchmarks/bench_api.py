@@ -0,0 +1,208 @@
+"""Latency & throughput endpoint API di bawah beban concurrent.
+
+    python benchmarks/bench_api.py --requests 500 --concurrency 8
+    python benchmarks/bench_api.py --endpoints "GET /runs/" --seed-runs 2000
+
+Server dijalankan sebagai subprocess uvicorn (satu worker, sama dengan produksi)
+dengan working directory sementara, jadi ``storage/``, ``logs/`` dan
+``checkpoints/`` tidak menyentuh repo. Sebelum server start, database diisi
+``--seed-runs`` run selesai (dengan metric) supaya ``GET /runs/`` mengukur query
+yang realistis. ``POST /runs/start`` dijalankan terakhir karena setiap request
+membuat run mock yang ikut jalan di scheduler.
+
+Client memakai ``http.client`` (keep-alive, satu koneksi per thread) supaya
+overhead client kecil dan tidak butuh dependency tambahan.
+"""
+import sys, os, json, time, socket, argparse, tempfile, threading, subprocess, http.client
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+ENGINE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MOCK_RUN = {
+    "run_name": "bench-api",
+    "base_model": "mock",
+    "backend": "mock",
+    "dataset": {"path": "data/sample.jsonl"},
+    "training": {"backend": "mock", "strategy": "lora"},
+}
+
+DEFAULT_ENDPOINTS = ["GET /runs/", "GET /datasets/", "GET /models/", "POST /runs/start"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed_runs(workdir: str, runs: int, steps: int = 20):
+    """Isi ``<workdir>/storage/ai_tuner.db`` dengan run Completed + metric."""
+    from core.storage.sqlite_storage import SQLiteStorage
+
+    storage = SQLiteStorage(os.path.join(workdir, "storage", "ai_tuner.db"))
+    for i in range(runs):
+        run_id = storage.create_run({**MOCK_RUN, "run_name": f"seed-{i}"})
+        for step in range(1, steps + 1):
+            storage.append_metric(run_id, step, {"step": step, "loss": 1.0 / step, "lr": 2e-4})
+        storage.update_run_state(run_id, "Completed")
+    storage.flush()
+    storage.close()
+
+
+class Server:
+    """uvicorn ``app:app`` di subprocess; ``with Server(workdir) as base_url: ...``."""
+
+    def __init__(self, workdir: str, port: int = None, env: dict = None):
+        self.workdir = workdir
+        self.port = port or free_port()
+        self.env = env
+        self.proc = None
+        self.startup_sec = None
+
+    def __enter__(self) -> "Server":
+        os.makedirs(self.workdir, exist_ok=True)
+        self._log = open(os.path.join(self.workdir, "server.log"), "wb")
+        started = time.perf_counter()
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", ENGINE_DIR,
+             "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"],
+            cwd=self.workdir, stdout=self._log, stderr=subprocess.STDOUT,
+            env={**os.environ, **(self.env or {})},
+        )
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"server exited with {self.proc.returncode}, see {self._log.name}")
+            try:
+                self.request("GET", "/", timeout=1)
+                self.startup_sec = round(time.perf_counter() - started, 3)
+                return self
+            except OSError:
+                time.sleep(0.05)
+        self.__exit__(None, None, None)
+        raise RuntimeError("server did not start within 120s")
+
+    def __exit__(self, *exc):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        self._log.close()
+
+    def connection(self, timeout: float = 30) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+
+    def request(self, method: str, path: str, body=None, timeout: float = 30):
+        """Satu request tanpa keep-alive; return (status, JSON body)."""
+        conn = self.connection(timeout)
+        try:
+            return _send(conn, method, path, body)
+        finally:
+            conn.close()
+
+
+def _send(conn: http.client.HTTPConnection, method: str, path: str, body=None):
+    payload = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if payload is not None else {}
+    conn.request(method, path, body=payload, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    return resp.status, json.loads(data) if data else None
+
+
+def percentiles(samples, points=(50, 95, 99)) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{p}_ms": None for p in points}
+    return {f"p{p}_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 2)
+            for p in points}
+
+
+def load_test(server: Server, method: str, path: str, requests: int, concurrency: int,
+              body=None, warmup: int = 5) -> dict:
+    """``requests`` request dibagi ke ``concurrency`` thread; latency per request + throughput."""
+    for _ in range(warmup):
+        server.request(method, path, body)
+
+    latencies, errors, lock = [], [], threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        conn = server.connection()
+        local, local_errors = [], []
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            started = time.perf_counter()
+            try:
+                status, data = _send(conn, method, path, body)
+                if status >= 400 or (isinstance(data, dict) and "error" in data):
+                    local_errors.append(f"{status}: {str(data)[:200]}")
+            except (OSError, http.client.HTTPException, ValueError) as ex:
+                local_errors.append(repr(ex))
+                conn.close()
+                conn = server.connection()
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors.extend(local_errors)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "endpoint": f"{method} {path}",
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "elapsed_sec": round(elapsed, 3),
+        "requests_per_sec": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        **percentiles(latencies),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else None,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def run(requests: int = 500, concurrency: int = 8, endpoints=None, seed: int = 500) -> dict:
+    endpoints = endpoints or DEFAULT_ENDPOINTS
+    with tempfile.TemporaryDirectory() as workdir:
+        seed_runs(workdir, seed)
+        with Server(workdir) as server:
+            results = []
+            for endpoint in endpoints:
+                method, path = endpoint.split(" ", 1)
+                body = MOCK_RUN if (method, path) == ("POST", "/runs/start") else None
+                results.append(load_test(server, method, path, requests, concurrency, body))
+            startup_sec = server.startup_sec
+    return {
+        "benchmark": "api",
+        "seed_runs": seed,
+        "server_startup_sec": startup_sec,
+        "endpoints": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500, help="request per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed-runs", type=int, default=500)
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS,
+                        help='mis. "GET /runs/" "POST /runs/start"')
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.concurrency, args.endpoints, args.seed_runs), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Dedup stage pada file sintetis: waktu & peak RSS per ukuran (harus ~linear), precision/recall.
+
+    python benchmarks/bench_dedup.py                       # 250k, 500k, 1M baris
+    python benchmarks/bench_dedup.py --lines 200000 --num-proc 4   # default: semua CPU
+
+Dataset berisi record unik + duplikat exact + near-duplicate (beberapa kata
+diganti) yang disisipkan dengan ground truth, jadi precision/recall bisa dihitung.
+Setiap ukuran dijalankan di subprocess terpisah supaya peak RSS tidak tercampur.
+Peak RSS sudah termasuk page memmap signature yang disentuh saat verifikasi
+kandidat (file-backed, bisa di-reclaim); memori anonim ~puluhan byte per record.
+"""
+import sys, os, json, time, random, argparse, resource, subprocess, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def make_vocab(size: int = 5000, seed: int = 0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))) for _ in range(size)]
+
+
+def make_dataset(path: str, lines: int, dup_rate: float = 0.05, near_rate: float = 0.05, seed: int = 0):
+    """Tulis JSONL sintetis; return jumlah duplikat exact & near yang disisipkan."""
+    rng = random.Random(seed)
+    words_list = make_vocab(seed=seed)
+    recent = []
+    injected = {"exact": 0, "near": 0}
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            roll = rng.random()
+            if recent and roll < dup_rate:
+                text, kind = rng.choice(recent), "exact"
+            elif recent and roll < dup_rate + near_rate:
+                words = rng.choice(recent).split()
+                words[rng.randrange(len(words))] = rng.choice(words_list)
+                text, kind = " ".join(words), "near"
+            else:
+                text, kind = " ".join(rng.choice(words_list) for _ in range(rng.randint(20, 60))), "unique"
+                recent.append(text)
+                if len(recent) > 1000:
+                    recent.pop(rng.randrange(len(recent)))
+            if kind != "unique":
+                injected[kind] += 1
+            f.write(json.dumps({"id": i, "kind": kind, "text": text}) + "\n")
+    return injected
+
+
+def run_single(lines: int, num_proc, threshold: float) -> dict:
+    from core.data.dedup import dedup_dataset
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.jsonl")
+        injected = make_dataset(path, lines)
+        start = time.perf_counter()
+        report = dedup_dataset({"path": path}, threshold, num_proc=num_proc, log=lambda m: None)
+        elapsed = time.perf_counter() - start
+
+        # precision/recall terhadap record yang disisipkan sebagai duplikat
+        removed_injected = kept = 0
+        with open(report["output"], encoding="utf-8") as f:
+            for line in f:
+                kept += 1
+                if json.loads(line)["kind"] != "unique":
+                    removed_injected -= 1
+        total_injected = injected["exact"] + injected["near"]
+        removed_injected += total_injected
+        removed = lines - kept
+
+    rss_mb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                 resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+    return {
+        "lines": lines,
+        "elapsed_sec": round(elapsed, 2),
+        "lines_per_sec": round(lines / elapsed),
+        "peak_rss_mb": round(rss_mb, 1),
+        "removed": removed,
+        "exact_duplicates": report["exact_duplicates"],
+        "near_duplicates": report["near_duplicates"],
+        "injected": injected,
+        # near-duplicate sintetis yang kebetulan di bawah threshold ikut menurunkan recall
+        "recall": round(removed_injected / total_injected, 4) if total_injected else None,
+        "precision": round(removed_injected / removed, 4) if removed else None,
+        "num_proc": report["num_proc"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--num-proc", type=int, default=os.cpu_count())
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.lines, args.num_proc, args.threshold)))
+        return
+
+    results = []
+    for lines in (args.lines // 4, args.lines // 2, args.lines):
+        cmd = [sys.executable, __file__, "--single", "--lines", str(lines), "--threshold", str(args.threshold)]
+        if args.num_proc:
+            cmd += ["--num-proc", str(args.num_proc)]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    base = results[0]
+    for r in results:
+        # 1.0 = linear sempurna relatif ke ukuran terkecil
+        r["time_scaling"] = round((r["elapsed_sec"] / base["elapsed_sec"]) / (r["lines"] / base["lines"]), 2)
+    print(json.dumps({"benchmark": "data.dedup", "threshold": args.threshold, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Download model dari fake hub lokal: sequential vs paralel, resume setelah putus, checksum.
+
+    python benchmarks/bench_download.py --shards 4 --shard-mb 16 --throttle-mb 20
+
+Server membatasi byte/detik per koneksi (seperti CDN per-stream), jadi fetch shard
+paralel seharusnya mendekati ``parallel x`` lebih cepat.
+"""
+import sys, os, json, time, argparse, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def wait(manager, job, timeout=600):
+    deadline = time.time() + timeout
+    while job.status in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.05)
+    return job.to_dict(include_files=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--shard-mb", type=int, default=16)
+    parser.add_argument("--throttle-mb", type=float, default=20)
+    parser.add_argument("--parallel", type=int, default=4)
+    args = parser.parse_args()
+
+    from benchmarks.fake_hub import make_fake_repo, serve
+    from core.downloads import DownloadManager
+
+    throttle = int(args.throttle_mb * 1024 * 1024)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        hub = os.path.join(tmp, "hub")
+        make_fake_repo(hub, "fake-org/tiny-model", args.shards, args.shard_mb)
+        server, url = serve(hub, throttle=throttle)
+
+        for name, parallel in (("sequential", 1), ("parallel", args.parallel)):
+            manager = DownloadManager(endpoint=url, max_parallel_files=parallel)
+            job = manager.submit("fake-org/tiny-model", os.path.join(tmp, f"models_{name}"))
+            status = wait(manager, job)
+            results[name] = {k: status[k] for k in ("status", "total_bytes", "bytes_per_sec", "files_total")}
+            results[name]["elapsed_sec"] = round(status["total_bytes"] / status["bytes_per_sec"], 2)
+        server.shutdown()
+
+        # koneksi pertama diputus di tengah shard; retry melanjutkan dari offset parsial
+        server, url = serve(hub, throttle=throttle, drop_after=args.shard_mb * 1024 * 1024 // 2)
+        manager = DownloadManager(endpoint=url, max_parallel_files=args.parallel)
+        status = wait(manager, manager.submit("fake-org/tiny-model", os.path.join(tmp, "models_resume")))
+        results["resume_after_drop"] = {
+            "status": status["status"],
+            "resumed_files": {f["path"]: f.get("resumed") for f in status["files"] if f.get("resumed")},
+            "attempts": {f["path"]: f["attempts"] for f in status["files"] if f["attempts"] > 1},
+        }
+
+        # job kedua ke folder yang sama: semua file sudah terverifikasi, tidak ada yang di-download ulang
+        start = time.perf_counter()
+        status = wait(manager, manager.submit("fake-org/tiny-model", os.path.join(tmp, "models_resume")))
+        results["rerun_complete"] = {"status": status["status"], "elapsed_sec": round(time.perf_counter() - start, 2)}
+
+        # isi shard di server diubah setelah listing -> checksum harus gagal
+        shard = os.path.join(hub, "fake-org/tiny-model", f"model-00001-of-{args.shards:05d}.safetensors")
+        from core import downloads
+        original = downloads.HubClient.list_files
+
+        def stale_listing(self, repo_id, revision="main"):
+            files = original(self, repo_id, revision)
+            with open(shard, "r+b") as f:
+                f.write(b"corrupt")
+            return files
+
+        downloads.HubClient.list_files = stale_listing
+        status = wait(manager, manager.submit("fake-org/tiny-model", os.path.join(tmp, "models_corrupt")))
+        downloads.HubClient.list_files = original
+        results["checksum_mismatch"] = {"status": status["status"], "error": status["error"]}
+        server.shutdown()
+
+    results["speedup"] = round(results["sequential"]["elapsed_sec"] / results["parallel"]["elapsed_sec"], 2)
+    print(json.dumps({"benchmark": "models.download", "shards": args.shards, "shard_mb": args.shard_mb,
+                      "throttle_mb_per_conn": args.throttle_mb, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
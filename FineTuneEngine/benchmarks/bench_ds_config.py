@@ -0,0 +1,128 @@
+"""Config DeepSpeed yang dihasilkan untuk profil model x hardware umum, plus reuse file config.
+
+    python benchmarks/bench_ds_config.py
+    python benchmarks/bench_ds_config.py --runs 200
+
+Murni CPU: mencetak ZeRO stage / offload / bucket / precision per profil
+(model dari bench_planner.MODELS), lalu menulis config untuk ``--runs`` run
+dengan beberapa variasi ke direktori sementara untuk membandingkan jumlah file
+content-addressed dengan cara lama (satu file per run).
+
+``checks()`` membandingkan config profil representatif dengan hasil yang
+diharapkan (``EXPECTED``, termasuk ``fits``; QLoRA tidak pernah ZeRO-3, precision fp16/bf16);
+selisih dicatat di ``failures`` dan exit code jadi 1.
+"""
+import sys, os, json, time, argparse, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.bench_planner import MODELS
+
+HARDWARE = {
+    "24GB+64GB": {"ram_gb": 64, "gpu_list": [{"index": 0, "name": "24GB", "vram_gb": 24}]},
+    "24GB+256GB": {"ram_gb": 256, "gpu_list": [{"index": 0, "name": "24GB", "vram_gb": 24}]},
+    "80GB+256GB": {"ram_gb": 256, "gpu_list": [{"index": 0, "name": "80GB", "vram_gb": 80}]},
+}
+
+# profil -> (stage, offload_optimizer, offload_param, fits)
+EXPECTED = {
+    "llama-7b/lora/24GB+64GB": (2, False, False, True),
+    "llama-7b/full/24GB+256GB": (2, True, False, True),
+    # RAM host tidak cukup untuk offload optimizer: offload parameter saja, tetap tidak muat
+    "llama-7b/full/24GB+64GB": (3, False, True, False),
+    "llama-13b/lora/24GB+64GB": (3, True, True, True),
+    "llama-13b/lora/80GB+256GB": (2, False, False, True),
+    "llama-13b/qlora/24GB+64GB": (2, False, False, True),
+    "llama-13b/full/24GB+256GB": (2, True, False, False),
+}
+
+
+def profiles() -> list:
+    from core.ds_config import build_ds_config, plan_zero
+
+    out = []
+    batch = {"per_device_train_batch_size": 1, "gradient_accumulation_steps": 8}
+    for model, config in MODELS.items():
+        for strategy in ("lora", "qlora", "full"):
+            for hw_name, hardware in HARDWARE.items():
+                cfg = {"strategy": strategy, "training": {"max_seq_length": 512}}
+                zero = plan_zero(config, cfg, hardware)
+                ds = build_ds_config(zero, cfg, batch)
+                out.append({
+                    "mode": f"{model}/{strategy}/{hw_name}",
+                    "stage": zero["stage"],
+                    "offload_optimizer": zero["offload_optimizer"],
+                    "offload_param": zero["offload_param"],
+                    "fits": zero["fits"],
+                    "reduce_bucket_size": ds["zero_optimization"]["reduce_bucket_size"],
+                    "bf16": ds["bf16"]["enabled"],
+                    "reason": zero["reason"],
+                })
+    return out
+
+
+def reuse(runs: int) -> dict:
+    from core.ds_config import build_ds_config, plan_zero, write_config
+
+    hardware = HARDWARE["24GB+64GB"]
+    zero = plan_zero(MODELS["llama-7b"], {"strategy": "lora"}, hardware)
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        for i in range(runs):
+            # variasi yang realistis: beberapa learning rate (tidak masuk ds_config) dan 3 ukuran batch
+            cfg = {"strategy": "lora", "training": {"learning_rate": 1e-4 * (1 + i % 5)}}
+            batch = {"per_device_train_batch_size": 1 + i % 3, "gradient_accumulation_steps": 8}
+            write_config(build_ds_config(zero, cfg, batch), os.path.join(root, "deepspeed"))
+        elapsed = time.perf_counter() - started
+        files = len(os.listdir(os.path.join(root, "deepspeed")))
+    return {"runs": runs, "files_written": files, "files_per_run_before": runs,
+            "write_ms": round(elapsed / runs * 1000, 4)}
+
+
+def checks(rows: list) -> list:
+    from core.ds_config import build_ds_config, plan_zero
+
+    failures = []
+    by_mode = {r["mode"]: r for r in rows}
+    for mode, expected in EXPECTED.items():
+        row = by_mode[mode]
+        got = (row["stage"], row["offload_optimizer"], row["offload_param"], row["fits"])
+        if got != expected:
+            failures.append(f"{mode}: expected stage/offload_optimizer/offload_param/fits {expected}, got {got}")
+    failures += [f"{r['mode']}: QLoRA planned ZeRO-3" for r in rows if "/qlora/" in r["mode"] and r["stage"] == 3]
+
+    hardware = HARDWARE["24GB+64GB"]
+    batch = {"per_device_train_batch_size": 1, "gradient_accumulation_steps": 8}
+    for training, fp16, bf16 in (({}, False, True), ({"fp16": True}, True, False),
+                                 ({"bf16": False}, False, False)):
+        cfg = {"strategy": "lora", "training": training}
+        ds = build_ds_config(plan_zero(MODELS["llama-7b"], cfg, hardware), cfg, batch)
+        if (ds["fp16"]["enabled"], ds["bf16"]["enabled"]) != (fp16, bf16):
+            failures.append(f"training={training}: expected fp16={fp16} bf16={bf16}, "
+                            f"got fp16={ds['fp16']['enabled']} bf16={ds['bf16']['enabled']}")
+
+    cfg = {"strategy": "lora", "deepspeed": {"zero_stage": 3}}
+    zero = plan_zero(MODELS["llama-7b"], cfg, hardware)
+    ds = build_ds_config(zero, cfg, batch)["zero_optimization"]
+    if ds["stage"] != 3 or not ds.get("stage3_gather_16bit_weights_on_model_save"):
+        failures.append("deepspeed.zero_stage=3 override not applied")
+    return failures
+
+
+def run(runs: int = 200) -> dict:
+    rows = profiles()
+    return {"benchmark": "ds_config", "reuse": reuse(runs), "profiles": rows, "failures": checks(rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    result = run(args.runs)
+    print(json.dumps(result, indent=2))
+    if result["failures"]:
+        print("FAIL:\n" + "\n".join(result["failures"]), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Time-to-first-step end-to-end: ``POST /runs/start`` sampai step training pertama selesai.
+
+    python benchmarks/bench_first_step.py                     # mock + model mini
+    python benchmarks/bench_first_step.py --backends mock --repeat 3
+    python benchmarks/bench_first_step.py --model models/TinyLlama-1.1B
+
+Lewat server uvicorn sungguhan (bench_api.Server) dengan ``profile.interval=1``:
+step pertama selesai = row pertama muncul di ``GET /runs/{id}/profile``. Angka
+mencakup scheduler, spawn ModelHost (backend HF, hanya attempt pertama), import,
+load tokenizer + model (attempt berikutnya: cache hit di host), tokenisasi dan step
+itu sendiri; ``overhead_sec`` = total dikurangi wall time step pertama. Backend ``accelerate`` memakai model mini tiny_model.py dan
+dataset sintetis di CPU (``bf16`` dimatikan).
+"""
+import sys, os, json, time, argparse, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.bench_api import MOCK_RUN, Server
+
+
+def run_config(backend: str, workdir: str, model: str = None, records: int = 200) -> dict:
+    if backend == "mock":
+        return {**MOCK_RUN, "run_name": "bench-first-step", "profile": {"interval": 1}}
+    from benchmarks.bench_padding import make_dataset
+    from benchmarks.tiny_model import make_tiny_model
+
+    data_path = os.path.join(workdir, "first_step.jsonl")
+    make_dataset(data_path, records)
+    return {
+        "run_name": "bench-first-step",
+        "base_model": model or make_tiny_model(os.path.join(workdir, "tiny")),
+        "backend": backend,
+        "strategy": "lora",
+        "dataset": {"path": data_path, "num_proc": 1},
+        "training": {"epochs": 1, "per_device_train_batch_size": 2, "max_seq_length": 128,
+                     "bf16": False, "group_by_length": False},
+        "profile": {"interval": 1},
+        "checkpoint": {"every_steps": 1000},
+    }
+
+
+def measure(server: Server, cfg: dict, timeout: float = 600) -> dict:
+    started = time.perf_counter()
+    status, resp = server.request("POST", "/runs/start", cfg)
+    if status >= 400 or "run_id" not in resp:
+        return {"error": f"{status}: {resp}"}
+    run_id = resp["run_id"]
+    if resp["job"]["state"] == "failed":
+        return {"run_id": run_id, "error": resp["job"]["error"]}
+    submit_sec = time.perf_counter() - started
+
+    running_sec = None
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        _, run = server.request("GET", f"/runs/{run_id}")
+        if running_sec is None and run.get("state") == "Running":
+            running_sec = time.perf_counter() - started
+        if run.get("state") == "Failed":
+            return {"run_id": run_id, "error": _last_error(server.workdir, run_id)}
+        _, profile = server.request("GET", f"/runs/{run_id}/profile")
+        if profile["points"]:
+            first = time.perf_counter() - started
+            step_wall = profile["points"][0]["wall_ms"] / 1000
+            server.request("POST", f"/runs/{run_id}/cancel?force=true")
+            return {
+                "run_id": run_id,
+                "submit_ms": round(submit_sec * 1000, 2),
+                "time_to_running_sec": round(running_sec, 3) if running_sec is not None else None,
+                "time_to_first_step_sec": round(first, 3),
+                "first_step_wall_sec": round(step_wall, 3),
+                "overhead_sec": round(first - step_wall, 3),
+            }
+        time.sleep(0.02)
+    return {"run_id": run_id, "error": f"no step within {timeout}s"}
+
+
+def _last_error(workdir: str, run_id: str) -> str:
+    """Baris error terakhir dari train.log run (cwd server = workdir)."""
+    try:
+        with open(os.path.join(workdir, "logs", run_id, "train.log"), encoding="utf-8") as f:
+            lines = [l.strip() for l in f if l.strip()]
+    except OSError:
+        return "run failed"
+    failed = [l for l in lines if "failed" in l.lower() or "error" in l.lower()]
+    return (failed or lines or ["run failed"])[-1][:500]
+
+
+def run(backends=("mock", "accelerate"), repeat: int = 1, model: str = None) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        with Server(workdir) as server:
+            for backend in backends:
+                try:
+                    cfg = run_config(backend, workdir, model)
+                except Exception as ex:
+                    results.append({"backend": backend, "error": repr(ex)})
+                    continue
+                for attempt in range(repeat):
+                    results.append({"backend": backend, "attempt": attempt, **measure(server, cfg)})
+    return {"benchmark": "first_step", "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["mock", "accelerate"])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+    print(json.dumps(run(args.backends, args.repeat, args.model), indent=2))
+
+
+if __name__ == "__main__":
+    main()
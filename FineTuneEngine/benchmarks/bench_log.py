@@ -0,0 +1,139 @@
+"""Log training: open/append per pesan (cara lama) vs RunLogWriter ter-buffer, plus baca tail/offset.
+
+    python benchmarks/bench_log.py
+    python benchmarks/bench_log.py --runs 16 --messages 20000
+
+``--runs`` thread masing-masing menulis ``--messages`` pesan ke
+``logs/<run>/train.log`` di direktori sementara (echo stdout dimatikan di kedua
+mode supaya yang diukur hanya file). Dilaporkan pesan/detik, jumlah ``open()``
+file dan write syscall (``syscw`` dari /proc/self/io, Linux) per pesan. Lalu
+diukur latency ``read_log`` tail dan polling offset pada log yang sudah dirotasi.
+"""
+import sys, os, json, time, argparse, tempfile, threading, builtins, datetime
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _syscw() -> int:
+    try:
+        with open("/proc/self/io") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("syscw"))
+    except (OSError, StopIteration):
+        return -1
+
+
+def legacy_log(log_dir: str, message: str):
+    """BaseTrainer.log sebelum RunLogWriter (tanpa print)."""
+    ts = datetime.datetime.now().strftime("%H:%M:%S")
+    with open(os.path.join(log_dir, "train.log"), "a") as f:
+        f.write(f"[{ts}] {message}\n")
+
+
+def buffered_writer(log_dir: str):
+    from core import run_log
+    writer = run_log.RunLogWriter(log_dir)
+    return lambda message, step: writer.write(run_log.make_record(message, step=step)), writer.close
+
+
+def measure(mode: str, root: str, runs: int, messages: int) -> dict:
+    opens = [0]
+    real_open = builtins.open
+
+    def counting_open(file, *args, **kwargs):
+        if isinstance(file, str) and file.endswith("train.log"):
+            opens[0] += 1
+        return real_open(file, *args, **kwargs)
+
+    def worker(r):
+        log_dir = os.path.join(root, mode, f"run{r}")
+        os.makedirs(log_dir, exist_ok=True)
+        if mode == "legacy":
+            for step in range(messages):
+                legacy_log(log_dir, f"Step {step}/{messages} | loss=0.1234 | lr=0.0002")
+        else:
+            write, close = buffered_writer(log_dir)
+            for step in range(messages):
+                write(f"Step {step}/{messages} | loss=0.1234 | lr=0.0002", step)
+            close()
+
+    builtins.open = counting_open
+    try:
+        syscw = _syscw()
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(r,)) for r in range(runs)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        writes = _syscw() - syscw if syscw >= 0 else None
+    finally:
+        builtins.open = real_open
+    total = runs * messages
+    return {
+        "mode": mode,
+        "messages": total,
+        "wall_sec": round(elapsed, 3),
+        "messages_per_sec": round(total / elapsed),
+        "file_opens": opens[0],
+        "write_syscalls": writes,
+        "syscalls_per_message": round((opens[0] * 2 + (writes or 0)) / total, 4),
+    }
+
+
+def read_latency(root: str, messages: int, polls: int = 200) -> dict:
+    """Tail & polling offset pada log yang dirotasi ke beberapa segmen gzip."""
+    from core import run_log
+
+    log_dir = os.path.join(root, "read", "run0")
+    writer = run_log.RunLogWriter(log_dir, max_bytes=1024 ** 2, backups=3)
+    for step in range(messages):
+        writer.write(run_log.make_record(f"Step {step} | loss=0.1234 | lr=0.0002", step=step))
+    writer.close()
+
+    started = time.perf_counter()
+    for _ in range(polls):
+        tail = run_log.read_log(log_dir, None, tail=200)
+    tail_ms = (time.perf_counter() - started) / polls * 1000
+
+    started = time.perf_counter()
+    offset, lines = 0, 0
+    while True:
+        page = run_log.read_log(log_dir, offset)
+        lines += len(page["lines"])
+        if page["next_offset"] == page["offset"]:
+            break
+        offset = page["next_offset"]
+    scan_sec = time.perf_counter() - started
+    return {
+        "size_bytes": tail["size"],
+        "segments": len([f for f in os.listdir(log_dir) if f.endswith(".gz")]),
+        "tail_200_ms": round(tail_ms, 3),
+        "offset_scan_lines": lines,
+        "offset_scan_lines_per_sec": round(lines / scan_sec) if scan_sec else None,
+    }
+
+
+def run(runs: int = 8, messages: int = 5000) -> dict:
+    with tempfile.TemporaryDirectory() as root:
+        results = [measure(mode, root, runs, messages) for mode in ("legacy", "buffered")]
+        read = read_latency(root, messages * 10)
+    legacy, buffered = results
+    return {
+        "benchmark": "log",
+        "runs": runs,
+        "results": results,
+        "speedup": round(buffered["messages_per_sec"] / legacy["messages_per_sec"], 2),
+        "read": read,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.runs, args.messages), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Load base model: load ulang per run vs BaseModelCache, waktu load & peak RSS.
+
+    python benchmarks/bench_model_cache.py --runs 4
+    python benchmarks/bench_model_cache.py --model models/TinyLlama-1.1B
+
+Skenario (masing-masing di subprocess supaya peak RSS terpisah):
+  double_load   jalur QLoRA lama: load full precision, lalu load kedua yang
+                menggantikannya (di CPU tanpa bitsandbytes load kedua memakai dtype sama)
+  single_load   jalur baru: strategy menentukan cara load, satu kali
+  sweep_reload  N run LoRA, masing-masing from_pretrained sendiri
+  sweep_cached  N run LoRA lewat BaseModelCache (load sekali, adapter dilepas per run)
+"""
+import sys, os, json, time, argparse, resource, subprocess, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _lora_run(model):
+    """Satu 'run' minimal: pasang LoRA, satu forward+backward."""
+    import torch
+    from core.strategies.lora import LoRAStrategy
+    peft_model = LoRAStrategy(model, {"r": 8}).apply()
+    ids = torch.randint(4, 90, (2, 64))
+    peft_model(input_ids=ids, labels=ids).loss.backward()
+    return peft_model
+
+
+def run_scenario(name: str, model_path: str, runs: int) -> dict:
+    import torch
+    from transformers import AutoModelForCausalLM
+    from core.model_loader import BaseModelCache
+
+    baseline_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    load_sec = 0.0
+    started = time.perf_counter()
+    if name == "double_load":
+        t = time.perf_counter()
+        model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.bfloat16)
+        model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.bfloat16)
+        load_sec += time.perf_counter() - t
+        _lora_run(model)
+    elif name == "single_load":
+        lease = BaseModelCache().acquire(model_path, torch_dtype="bfloat16", device_map=None)
+        load_sec += time.perf_counter() - started
+        lease.release(_lora_run(lease.model))
+    elif name == "sweep_reload":
+        for _ in range(runs):
+            t = time.perf_counter()
+            model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.bfloat16)
+            load_sec += time.perf_counter() - t
+            _lora_run(model)
+            del model
+    elif name == "sweep_cached":
+        cache = BaseModelCache()
+        for _ in range(runs):
+            t = time.perf_counter()
+            lease = cache.acquire(model_path, torch_dtype="bfloat16", device_map=None)
+            load_sec += time.perf_counter() - t
+            base = lease.model
+            lease.release(_lora_run(base))
+            # base model harus bersih lagi setelah release
+            assert not any("lora_" in n for n, _ in base.named_modules())
+        stats = cache.stats()
+    result = {
+        "scenario": name,
+        "runs": runs if name.startswith("sweep") else 1,
+        "load_sec": round(load_sec, 3),
+        "total_sec": round(time.perf_counter() - started, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        # RSS setelah import torch/transformers; selisihnya = bobot + aktivasi
+        "baseline_rss_mb": round(baseline_mb, 1),
+    }
+    if name == "sweep_cached":
+        result["cache"] = {k: stats[k] for k in ("hits", "misses", "size_bytes")}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None, help="folder model lokal; default model Llama mini")
+    parser.add_argument("--runs", type=int, default=4)
+    parser.add_argument("--hidden-size", type=int, default=768)
+    parser.add_argument("--layers", type=int, default=12)
+    parser.add_argument("--single", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_scenario(args.single, args.model, args.runs)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = args.model
+        if model_path is None:
+            from benchmarks.tiny_model import make_tiny_model
+            model_path = make_tiny_model(os.path.join(tmp, "tiny"), hidden_size=args.hidden_size,
+                                         num_layers=args.layers)
+        size_mb = sum(os.path.getsize(os.path.join(model_path, f)) for f in os.listdir(model_path)) / 1024**2
+        results = []
+        for name in ("double_load", "single_load", "sweep_reload", "sweep_cached"):
+            cmd = [sys.executable, __file__, "--single", name, "--model", model_path, "--runs", str(args.runs)]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+    print(json.dumps({"benchmark": "models.base_cache", "model_size_mb": round(size_mb, 1), "results": results},
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
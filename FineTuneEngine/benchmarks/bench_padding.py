@@ -0,0 +1,117 @@
+"""Throughput & padding ratio: padding max_length vs dynamic (+group_by_length) vs packing.
+
+    python benchmarks/bench_padding.py --records 2000 --max-length 512
+    python benchmarks/bench_padding.py --model models/TinyLlama-1.1B  # model lokal lain
+
+Menjalankan forward+backward pada model mini di CPU (dibuat oleh tiny_model.py
+kalau --model tidak diisi) dan mencetak JSON per mode. Juga memeriksa sampler
+``trainer_class``: panjang dari token cache sama dengan panjang record asli.
+"""
+import sys, os, json, time, random, argparse, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def make_dataset(path: str, records: int, seed: int = 0):
+    """Chat line pendek dengan panjang bervariasi seperti data/sample.jsonl."""
+    rng = random.Random(seed)
+    words = "halo dunia ini contoh data untuk fine tuning engine ai open source yang keren".split()
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(records):
+            n = int(rng.lognormvariate(2.5, 0.8)) + 1
+            f.write(json.dumps({"text": " ".join(rng.choice(words) for _ in range(n))}) + "\n")
+
+
+def run_mode(name, training_cfg, tokenized, tokenizer, model, batch_size, max_steps):
+    import torch
+    from torch.utils.data import DataLoader
+    from transformers.trainer_pt_utils import LengthGroupedSampler
+    from core.data.packing import build_data_pipeline
+
+    dataset, collator, lengths = build_data_pipeline(tokenized, tokenizer, training_cfg, dtype=torch.float32)
+    sampler = None
+    if lengths is not None:
+        sampler = LengthGroupedSampler(batch_size, lengths=lengths)
+    loader = DataLoader(dataset, batch_size=batch_size, sampler=sampler,
+                        shuffle=sampler is None, collate_fn=collator)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+
+    model.train()
+    start = time.perf_counter()
+    for step, batch in enumerate(loader):
+        if step >= max_steps:
+            break
+        loss = model(**batch).loss
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad()
+    elapsed = time.perf_counter() - start
+    return {"mode": name, "steps": min(max_steps, len(loader)), **collator.report(elapsed)}
+
+
+def check_sampler(tokenized, tokenizer, model, batch_size, output_dir) -> list:
+    """Trainer dari ``trainer_class`` memakai LengthGroupedSampler dengan panjang dari cache."""
+    from transformers import TrainingArguments
+    from transformers.trainer_pt_utils import LengthGroupedSampler
+    from core.data.packing import build_data_pipeline, trainer_class
+
+    dataset, collator, lengths = build_data_pipeline(tokenized, tokenizer, {"group_by_length": True})
+    args = TrainingArguments(output_dir=output_dir, per_device_train_batch_size=batch_size, report_to="none")
+    trainer = trainer_class(lengths)(model=model, args=args, train_dataset=dataset, data_collator=collator)
+    sampler = trainer._get_train_sampler()
+    failures = []
+    if not isinstance(sampler, LengthGroupedSampler):
+        failures.append(f"group_by_length sampler is {type(sampler).__name__}")
+    elif sampler.lengths != [len(dataset[i]["input_ids"]) for i in range(len(dataset))]:
+        failures.append("group_by_length sampler lengths differ from record lengths")
+    elif sorted(sampler) != list(range(len(dataset))):
+        failures.append("group_by_length sampler does not yield every record once")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-steps", type=int, default=20)
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    from core.data.token_cache import TokenCache
+    from benchmarks.tiny_model import make_tiny_model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = args.model or make_tiny_model(os.path.join(tmp, "tiny"))
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        data_path = os.path.join(tmp, "chat.jsonl")
+        make_dataset(data_path, args.records)
+        tokenized = TokenCache(os.path.join(tmp, "cache")).get_or_build(
+            {"path": data_path}, tokenizer, max_length=args.max_length, log=lambda m: None
+        )
+
+        modes = [
+            ("max_length", {"padding": "max_length"}),
+            ("dynamic", {"padding": "dynamic", "group_by_length": False}),
+            ("dynamic+group_by_length", {"padding": "dynamic", "group_by_length": True}),
+            ("packing", {"packing": True}),
+        ]
+        results = []
+        for name, overrides in modes:
+            model = AutoModelForCausalLM.from_pretrained(model_path)
+            cfg = {"max_seq_length": args.max_length, **overrides}
+            results.append(run_mode(name, cfg, tokenized, tokenizer, model, args.batch_size, args.max_steps))
+        failures = check_sampler(tokenized, tokenizer, model, args.batch_size, os.path.join(tmp, "out"))
+
+    print(json.dumps({"benchmark": "data.padding", "records": args.records,
+                      "max_length": args.max_length, "results": results, "failures": failures}, indent=2))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Rencana batch planner untuk model & GPU umum (murni aritmetika, jalan di CPU).
+
+    python benchmarks/bench_planner.py
+    python benchmarks/bench_planner.py --model-config path/to/config.json --vram 24 --seq 1024
+
+Mencetak micro-batch / accumulation / estimasi peak per kombinasi model x
+strategy x VRAM, plus waktu satu ``plan()``. Angka estimasi bisa dicocokkan
+dengan ``torch.cuda.max_memory_allocated`` di mesin GPU lewat
+``POST /runs/plan?probe=true``.
+"""
+import sys, os, json, time, argparse
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+MODELS = {
+    "llama-7b": {"model_type": "llama", "hidden_size": 4096, "intermediate_size": 11008, "num_hidden_layers": 32,
+                 "num_attention_heads": 32, "num_key_value_heads": 32, "vocab_size": 32000},
+    "llama-13b": {"model_type": "llama", "hidden_size": 5120, "intermediate_size": 13824, "num_hidden_layers": 40,
+                  "num_attention_heads": 40, "num_key_value_heads": 40, "vocab_size": 32000},
+    "mistral-7b": {"model_type": "mistral", "hidden_size": 4096, "intermediate_size": 14336, "num_hidden_layers": 32,
+                   "num_attention_heads": 32, "num_key_value_heads": 8, "vocab_size": 32000},
+}
+
+
+def run(vram: list = (24, 80), seq_len: int = 512, target: int = 32, model_config: dict = None) -> dict:
+    from core import planner
+
+    models = {"custom": model_config} if model_config else MODELS
+    training = {"per_device_train_batch_size": "auto", "gradient_accumulation_steps": "auto",
+                "max_seq_length": seq_len, "target_global_batch_size": target}
+    plans = []
+    for name, config in models.items():
+        for strategy in ("lora", "qlora", "full"):
+            for gb in vram:
+                hardware = {"ram_gb": 64, "gpu_list": [{"index": 0, "name": f"{gb}GB", "vram_gb": gb}]}
+                result = planner.plan(config, training, hardware, strategy)
+                plans.append({
+                    "mode": f"{name}/{strategy}/{gb}GB",
+                    "parameters_b": round(result["memory"]["parameters"] / 1e9, 2),
+                    "max_micro_batch": result["max_micro_batch"],
+                    "micro_batch": result["per_device_train_batch_size"],
+                    "accumulation": result["gradient_accumulation_steps"],
+                    "peak_gb": result["memory"]["peak_gb"],
+                    "fits": result["fits"],
+                })
+
+    config = model_config or MODELS["llama-7b"]
+    hardware = {"ram_gb": 64, "gpu_list": [{"index": 0, "name": "gpu", "vram_gb": vram[0]}]}
+    n = 1000
+    started = time.perf_counter()
+    for _ in range(n):
+        planner.plan(config, training, hardware, "lora")
+    return {
+        "benchmark": "planner",
+        "max_seq_length": seq_len,
+        "target_global_batch_size": target,
+        "plan_ms": round((time.perf_counter() - started) / n * 1000, 4),
+        "plans": plans,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vram", type=float, nargs="+", default=[24, 80])
+    parser.add_argument("--seq", type=int, default=512)
+    parser.add_argument("--target", type=int, default=32)
+    parser.add_argument("--model-config", default=None, help="config.json model lain")
+    args = parser.parse_args()
+    model_config = None
+    if args.model_config:
+        with open(args.model_config, encoding="utf-8") as f:
+            model_config = json.load(f)
+    print(json.dumps(run(args.vram, args.seq, args.target, model_config), indent=2))
+
+
+if __name__ == "__main__":
+    main()
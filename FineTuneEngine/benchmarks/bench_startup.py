@@ -0,0 +1,116 @@
+"""Waktu boot & memori proses API, plus cek tidak ada library berat yang ter-import.
+
+    python benchmarks/bench_startup.py            # exit 1 kalau torch dkk ter-import
+    python benchmarks/bench_startup.py --repeat 3
+
+Setiap percobaan di subprocess baru (cwd sementara): import ``app``, jalankan
+uvicorn di thread (lifespan + scheduler ikut start), lalu panggil endpoint
+ringan dan satu run mock sampai metric pertama. Setelah tiap tahap dicatat
+modul berat mana yang sudah ada di ``sys.modules``; semuanya harus kosong,
+karena torch / transformers / peft hanya boleh di-load oleh job training
+sungguhan (di ModelHost / worker process untuk backend HF).
+"""
+import sys, os, json, time, argparse, resource, subprocess, tempfile, threading
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+ENGINE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY_MODULES = ("torch", "transformers", "peft", "datasets", "accelerate", "deepspeed", "bitsandbytes")
+ENDPOINTS = ["/system/health", "/system/hardware", "/system/backends", "/runs/", "/datasets/", "/models/"]
+
+
+def _heavy() -> list:
+    return [m for m in HEAVY_MODULES if m in sys.modules]
+
+
+def _rss_mb() -> float:
+    import psutil
+    return round(psutil.Process().memory_info().rss / 1024 ** 2, 1)
+
+
+def run_child() -> dict:
+    """Dijalankan di subprocess dengan cwd sementara."""
+    import uvicorn
+    from benchmarks.bench_api import MOCK_RUN, Server, free_port
+
+    started = time.perf_counter()
+    sys.path.insert(0, ENGINE_DIR)
+    import app
+    import_sec = time.perf_counter() - started
+    stages = {"import": {"sec": round(import_sec, 3), "rss_mb": _rss_mb(), "heavy_modules": _heavy()}}
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    client = Server(os.getcwd(), port=port)
+    while not server.started:
+        time.sleep(0.005)
+    stages["serving"] = {"sec": round(time.perf_counter() - started, 3), "rss_mb": _rss_mb(),
+                         "heavy_modules": _heavy()}
+
+    latencies = {}
+    for path in ENDPOINTS:
+        t = time.perf_counter()
+        status, _ = client.request("GET", path)
+        latencies[path] = {"status": status, "first_ms": round((time.perf_counter() - t) * 1000, 2)}
+    stages["endpoints"] = {"rss_mb": _rss_mb(), "heavy_modules": _heavy(), "requests": latencies}
+
+    t = time.perf_counter()
+    _, resp = client.request("POST", "/runs/start", MOCK_RUN)
+    run_id = resp["run_id"]
+    while client.request("GET", f"/runs/{run_id}")[1].get("num_metrics", 0) < 1:
+        time.sleep(0.02)
+    stages["mock_run"] = {"first_metric_sec": round(time.perf_counter() - t, 3), "rss_mb": _rss_mb(),
+                          "heavy_modules": _heavy()}
+    client.request("POST", f"/runs/{run_id}/cancel")
+
+    server.should_exit = True
+    thread.join(timeout=30)
+    return {
+        "boot_sec": stages["serving"]["sec"],
+        "import_sec": stages["import"]["sec"],
+        "rss_mb": stages["endpoints"]["rss_mb"],
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "heavy_modules": sorted({m for s in stages.values() for m in s["heavy_modules"]}),
+        "stages": stages,
+    }
+
+
+def run(repeat: int = 1) -> dict:
+    attempts = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as workdir:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=workdir,
+                                  capture_output=True, text=True, timeout=300)
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode != 0 or not lines:
+            raise RuntimeError((proc.stderr or proc.stdout).strip()[-2000:])
+        attempts.append(json.loads(lines[-1]))
+    heavy = sorted({m for a in attempts for m in a["heavy_modules"]})
+    return {
+        "benchmark": "startup",
+        "boot_sec": min(a["boot_sec"] for a in attempts),
+        "import_sec": min(a["import_sec"] for a in attempts),
+        "rss_mb": min(a["rss_mb"] for a in attempts),
+        "heavy_modules": heavy,
+        "attempts": attempts,
+        "failures": [f"API imported {', '.join(heavy)} without a training job"] if heavy else [],
+    }
+
+
+def main():
+    if sys.argv[1:] == ["--child"]:
+        print(json.dumps(run_child()))
+        return
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    result = run(args.repeat)
+    print(json.dumps(result, indent=2))
+    if result["failures"]:
+        print("FAIL: " + "; ".join(result["failures"]), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Micro-benchmark: metric write throughput SQLiteStorage vs implementasi lama.
+
+    python benchmarks/bench_storage.py --rows 5000 --threads 4
+"""
+import sys, os, time, json, argparse, tempfile, threading, sqlite3, datetime
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from core.storage.sqlite_storage import SQLiteStorage
+
+
+def legacy_append_metric(path, run_id, step, metrics):
+    """Salinan append_metric sebelum pooling: connect + DDL + commit per row."""
+    con = sqlite3.connect(path)
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS metrics (
+        run_id TEXT,
+        step INTEGER,
+        loss REAL,
+        lr REAL,
+        created_at TEXT
+    );
+    """)
+    con.execute(
+        "INSERT INTO metrics VALUES (?, ?, ?, ?, ?)",
+        (run_id, step, metrics.get("loss"), metrics.get("lr"), datetime.datetime.now().isoformat())
+    )
+    con.commit()
+    con.close()
+
+
+def _run_threads(n_threads, rows, fn):
+    per_thread = rows // n_threads
+
+    def worker(t):
+        for step in range(per_thread):
+            fn(f"run-{t}", step, {"loss": 1.0 / (step + 1), "lr": 2e-4})
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(n_threads)]
+    start = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return per_thread * n_threads, start
+
+
+def bench_legacy(path, rows, n_threads):
+    written, start = _run_threads(n_threads, rows, lambda r, s, m: legacy_append_metric(path, r, s, m))
+    return written / (time.perf_counter() - start)
+
+
+def bench_pooled(path, rows, n_threads):
+    storage = SQLiteStorage(path)
+    written, start = _run_threads(n_threads, rows, storage.append_metric)
+    storage.flush()
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return written / elapsed
+
+
+def run(rows: int = 5000, threads: int = 4) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = bench_legacy(os.path.join(tmp, "legacy.db"), rows, threads)
+        pooled = bench_pooled(os.path.join(tmp, "pooled.db"), rows, threads)
+    return {
+        "benchmark": "storage.append_metric",
+        "rows": rows,
+        "threads": threads,
+        "legacy_rows_per_sec": round(legacy, 1),
+        "pooled_rows_per_sec": round(pooled, 1),
+        "speedup": round(pooled / legacy, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.threads), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Benchmark suite engine (CPU-only): boot, API, storage, tokenisasi, time-to-first-step, planner, sweep,
+inference, log.
+
+    python benchmarks/bench_suite.py --output bench-results.json
+    python benchmarks/bench_suite.py --quick --sections api storage
+    python benchmarks/bench_suite.py --output new.json --compare bench-results.json
+
+Setiap section dijalankan di subprocess sendiri (import torch, peak RSS dan
+server uvicorn tidak saling mempengaruhi); section yang gagal dicatat sebagai
+``{"error": ...}`` tanpa menghentikan section lain. Hasil berupa satu JSON
+dengan commit git, waktu dan info host supaya bisa dibandingkan antar commit.
+
+``--compare`` membandingkan metric numerik dengan file hasil sebelumnya:
+``*_per_sec`` / ``speedup`` makin besar makin baik, ``*_ms`` / ``*_sec`` makin
+kecil makin baik. Perubahan lebih buruk dari ``--threshold`` ditandai
+regression dan exit code jadi 1. Section yang melaporkan ``failures`` (cek
+kebenaran, mis. startup tanpa torch, config DeepSpeed) juga membuat exit code 1.
+"""
+import sys, os, json, time, argparse, platform, subprocess
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+ENGINE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SECTIONS = {
+    "startup": ("benchmarks.bench_startup", {"repeat": 3}),
+    "api": ("benchmarks.bench_api", {"requests": 500, "concurrency": 8, "seed": 500}),
+    "storage": ("benchmarks.bench_storage", {"rows": 5000, "threads": 4}),
+    "tokenize": ("benchmarks.bench_tokenize", {"records": 20000, "num_procs": [1]}),
+    "first_step": ("benchmarks.bench_first_step", {"backends": ["mock", "accelerate"], "repeat": 3}),
+    "planner": ("benchmarks.bench_planner", {}),
+    "sweep": ("benchmarks.bench_sweep", {"trials": 9, "steps": 27}),
+    "ds_config": ("benchmarks.bench_ds_config", {"runs": 200}),
+    "inference": ("benchmarks.bench_inference", {"clients": 8, "requests": 6}),
+    "log": ("benchmarks.bench_log", {"runs": 8, "messages": 5000}),
+}
+QUICK = {
+    "startup": {"repeat": 1},
+    "api": {"requests": 100, "concurrency": 4, "seed": 100},
+    "storage": {"rows": 1000},
+    "tokenize": {"records": 2000},
+    "first_step": {"repeat": 1},
+    "planner": {},
+    "sweep": {"trials": 6, "steps": 9},
+    "ds_config": {"runs": 50},
+    "inference": {"clients": 4, "requests": 3, "records": 64},
+    "log": {"messages": 1000},
+}
+# field yang dipakai sebagai nama item list saat metric diratakan untuk --compare
+_ITEM_KEYS = ("endpoint", "backend", "num_proc", "mode")
+
+
+def run_section(name: str, params: dict, timeout: float) -> dict:
+    """Jalankan ``<module>.run(**params)`` di subprocess; JSON hasil di baris terakhir stdout."""
+    module, _ = SECTIONS[name]
+    started = time.perf_counter()
+    try:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--single", name, json.dumps(params)],
+            capture_output=True, text=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": f"timeout after {timeout}s", "params": params}
+    elapsed = round(time.perf_counter() - started, 2)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        tail = (proc.stderr or proc.stdout).strip().splitlines()[-1:] or [f"exit code {proc.returncode}"]
+        return {"error": tail[0][:500], "params": params, "section_sec": elapsed}
+    return {**json.loads(lines[-1]), "params": params, "section_sec": elapsed}
+
+
+def _single(name: str, params: str):
+    import importlib
+    module, _ = SECTIONS[name]
+    result = importlib.import_module(module).run(**json.loads(params))
+    print(json.dumps(result))
+
+
+def environment() -> dict:
+    import psutil
+
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ENGINE_DIR, capture_output=True, text=True,
+                                  timeout=30).stdout.strip() or None
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+
+    versions = {}
+    for pkg in ("torch", "transformers", "peft", "fastapi", "uvicorn"):
+        try:
+            from importlib.metadata import version
+            versions[pkg] = version(pkg)
+        except Exception:
+            versions[pkg] = None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "ram_gb": round(psutil.virtual_memory().total / 1024 ** 3, 1),
+        "packages": versions,
+    }
+
+
+def flatten(data, prefix: str = "") -> dict:
+    """Metric numerik sebagai {"section.path": value}; item list dinamai lewat _ITEM_KEYS."""
+    out = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in ("params", "section_sec", "run_id", "attempt") or key in _ITEM_KEYS:
+                continue
+            out.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(data, list):
+        for i, item in enumerate(data):
+            name = next((str(item[k]) for k in _ITEM_KEYS if isinstance(item, dict) and k in item), str(i))
+            if isinstance(item, dict) and "attempt" in item:
+                name += f"#{item['attempt']}"
+            out.update(flatten(item, f"{prefix}[{name}]"))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        out[prefix] = data
+    return out
+
+
+def _direction(key: str) -> int:
+    """+1 = makin besar makin baik, -1 = makin kecil makin baik, 0 = informasi saja."""
+    leaf = key.rsplit(".", 1)[-1]
+    if leaf.endswith("_per_sec") or leaf == "speedup":
+        return 1
+    if leaf.endswith(("_ms", "_sec")):
+        return -1
+    return 0
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> dict:
+    old = flatten(baseline.get("results", {}))
+    new = flatten(current.get("results", {}))
+    rows, regressions = [], []
+    for key in sorted(old.keys() & new.keys()):
+        direction = _direction(key)
+        if not direction or not old[key]:
+            continue
+        ratio = new[key] / old[key]
+        change = (ratio - 1) * direction  # positif = lebih baik
+        row = {"metric": key, "baseline": old[key], "current": new[key], "ratio": round(ratio, 3),
+               "regression": change < -threshold}
+        rows.append(row)
+        if row["regression"]:
+            regressions.append(key)
+    return {
+        "baseline_commit": baseline.get("environment", {}).get("commit"),
+        "threshold": threshold,
+        "metrics": rows,
+        "regressions": regressions,
+    }
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--single":
+        _single(sys.argv[2], sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", nargs="+", choices=list(SECTIONS), default=list(SECTIONS))
+    parser.add_argument("--quick", action="store_true", help="ukuran kecil untuk smoke test / CI")
+    parser.add_argument("--output", default=None, help="tulis hasil JSON ke file (default: stdout saja)")
+    parser.add_argument("--compare", default=None, help="file hasil sebelumnya untuk dibandingkan")
+    parser.add_argument("--threshold", type=float, default=0.1, help="batas regression relatif (0.1 = 10%%)")
+    parser.add_argument("--timeout", type=float, default=1800, help="timeout per section (detik)")
+    args = parser.parse_args()
+
+    report = {"suite": "finetune-engine", "quick": args.quick, "environment": environment(), "results": {}}
+    for name in args.sections:
+        params = {**SECTIONS[name][1], **(QUICK[name] if args.quick else {})}
+        print(f"running {name} {json.dumps(params)} ...", file=sys.stderr)
+        report["results"][name] = run_section(name, params, args.timeout)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["comparison"] = compare(json.load(f), report, args.threshold)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    failed = {name: r["failures"] for name, r in report["results"].items() if r.get("failures")}
+    for name, failures in failed.items():
+        print(f"FAIL {name}: " + "; ".join(failures), file=sys.stderr)
+    if failed or report.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Sweep end-to-end dengan MockTrainer (kurva loss sintetis): ASHA vs semua trial sampai selesai.
+
+    python benchmarks/bench_sweep.py --trials 9 --steps 27
+
+Menjalankan server di direktori sementara, ``POST /sweeps/start`` dengan search
+space learning rate x rank LoRA, lalu menunggu sweep selesai. Dilaporkan jumlah
+trial yang di-prune, total step yang dijalankan vs tanpa pruning, wall time, dan
+apakah trial terbaik sama dengan sweep tanpa pruning.
+"""
+import sys, os, json, time, argparse, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.bench_api import MOCK_RUN, Server
+
+
+def sweep_config(trials: int, steps: int, step_sec: float, pruning: str, seed: int = 0) -> dict:
+    return {
+        "name": f"bench-{pruning}",
+        "base": {**MOCK_RUN, "mock": {"steps": steps, "step_sec": step_sec, "seed": seed},
+                 "profile": {"enabled": False}, "checkpoint": {"every_steps": 10 ** 6}},
+        "space": {"training.learning_rate": {"min": 1e-6, "max": 1e-2, "log": True}, "lora.r": [4, 8, 16, 32]},
+        "num_trials": trials,
+        "seed": seed,
+        "max_concurrent": 3,
+        "pruning": {"type": pruning, "min_steps": max(1, steps // 9), "reduction_factor": 3},
+    }
+
+
+def measure(server: Server, cfg: dict, timeout: float = 600) -> dict:
+    started = time.perf_counter()
+    _, resp = server.request("POST", "/sweeps/start", cfg)
+    if "sweep_id" not in resp:
+        return {"error": resp.get("error")}
+    sweep_id = resp["sweep_id"]
+    while time.perf_counter() - started < timeout:
+        _, sweep = server.request("GET", f"/sweeps/{sweep_id}")
+        if sweep["state"] != "running":
+            break
+        time.sleep(0.5)
+    else:
+        return {"sweep_id": sweep_id, "error": f"timeout after {timeout}s"}
+    best = sweep["best"] or {}
+    return {
+        "mode": cfg["pruning"]["type"],
+        "wall_sec": round(time.perf_counter() - started, 2),
+        "trials": len(sweep["trials"]),
+        "pruned": sweep["counts"].get("pruned", 0),
+        "steps_run": sum(t["last_step"] or 0 for t in sweep["trials"]),
+        "best_trial": best.get("trial"),
+        "best_value": best.get("best_value"),
+    }
+
+
+def run(trials: int = 9, steps: int = 27, step_sec: float = 0.05) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        with Server(workdir) as server:
+            for pruning in ("none", "asha"):
+                results.append(measure(server, sweep_config(trials, steps, step_sec, pruning)))
+    full, asha = results
+    out = {"benchmark": "sweep", "trials": trials, "steps": steps, "results": results}
+    if "error" not in full and "error" not in asha:
+        out["steps_saved_pct"] = round((1 - asha["steps_run"] / full["steps_run"]) * 100, 1)
+        out["speedup"] = round(full["wall_sec"] / asha["wall_sec"], 2)
+        out["same_best"] = full["best_trial"] == asha["best_trial"]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=9)
+    parser.add_argument("--steps", type=int, default=27)
+    parser.add_argument("--step-sec", type=float, default=0.05)
+    args = parser.parse_args()
+    print(json.dumps(run(args.trials, args.steps, args.step_sec), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Biaya sampler telemetry dan latency snapshot hardware (jalan di host tanpa GPU).
+
+    python benchmarks/bench_telemetry.py --samples 200
+
+Mengukur: waktu satu ``collect()`` (CPU/RAM/disk/NVML), CPU time thread sampler
+per detik pada interval default, dan ``GET /system/hardware``-style snapshot
+dari cache vs query hardware penuh per request (jalur lama, termasuk torch
+kalau ``--with-torch``).
+"""
+import sys, os, json, time, argparse
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def run(samples: int = 200, with_torch: bool = False) -> dict:
+    from core.hardware import _host_info, get_hardware_info
+    from core.telemetry import TelemetrySampler, DEFAULT_INTERVAL
+
+    sampler = TelemetrySampler()
+    sampler.collect()  # buka NVML / baseline io counter
+    started = time.perf_counter()
+    for _ in range(samples):
+        sample = sampler.sample_now()
+    collect_ms = (time.perf_counter() - started) / samples * 1000
+
+    started = time.perf_counter()
+    for _ in range(samples):
+        {**get_hardware_info(), "telemetry": sampler.latest()}
+    cached_ms = (time.perf_counter() - started) / samples * 1000
+
+    uncached_ms = None
+    if with_torch:
+        import torch
+        started = time.perf_counter()
+        for _ in range(samples):
+            # jalur lama: device query torch + psutil + disk setiap request
+            torch.cuda.is_available(), torch.cuda.device_count()
+            _host_info.cache_clear()
+            get_hardware_info()
+        uncached_ms = round((time.perf_counter() - started) / samples * 1000, 4)
+
+    return {
+        "benchmark": "telemetry",
+        "gpus": len(sample["gpus"]),
+        "collect_ms": round(collect_ms, 4),
+        "sampler_cpu_pct": round(collect_ms / 1000 / DEFAULT_INTERVAL * 100, 4),
+        "snapshot_ms": round(cached_ms, 4),
+        "uncached_snapshot_ms": uncached_ms,
+        "interval_sec": DEFAULT_INTERVAL,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--with-torch", action="store_true")
+    args = parser.parse_args()
+    print(json.dumps(run(args.samples, args.with_torch), indent=2))
+
+
+if __name__ == "__main__":
+    main()
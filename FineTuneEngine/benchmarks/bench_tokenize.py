@@ -0,0 +1,147 @@
+"""Throughput pipeline data trainer: tokenisasi ke TokenCache (cold / warm) + collator.
+
+    python benchmarks/bench_tokenize.py --records 20000
+    python benchmarks/bench_tokenize.py --num-proc 1 2 4 --model models/TinyLlama-1.1B
+
+Jalur yang sama dengan ``AccelerateTrainer``: ``TokenCache.get_or_build`` (cold =
+cache kosong, per ``--num-proc``; warm = cache hit) lalu batch dari
+``build_data_pipeline`` (padding dinamis) tanpa forward model. Tokenizer dari
+model mini tiny_model.py kalau --model tidak diisi.
+
+``failures`` (exit code 1): file yang sama dengan kolom teks berbeda
+(``input_columns.text``) harus jadi entry cache berbeda dengan isi kolom masing-masing,
+dan index dataset CSV dengan newline di dalam field berquote tetap satu offset per record.
+"""
+import sys, os, json, time, argparse, tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def check_text_columns(tmp: str, tokenizer, max_length: int) -> list:
+    from core.data.token_cache import TokenCache
+
+    path = os.path.join(tmp, "two_columns.jsonl")
+    rows = [{"prompt": f"halo {i}", "response": f"jawaban panjang nomor {i} untuk dunia"} for i in range(50)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(row) + "\n" for row in rows)
+    cache = TokenCache(os.path.join(tmp, "cache-columns"))
+    failures, built = [], {}
+    for column in ("prompt", "response"):
+        dataset = cache.get_or_build({"path": path, "input_columns": {"text": column}}, tokenizer,
+                                     max_length=max_length, log=lambda m: None)
+        expected = tokenizer(rows[0][column], truncation=True, max_length=max_length)["input_ids"]
+        if dataset[0]["input_ids"] != expected:
+            failures.append(f"input_columns.text={column}: cache entry holds another column's tokens")
+        built[column] = dataset.entry_dir
+    if built["prompt"] == built["response"]:
+        failures.append("input_columns.text=prompt/response share one token cache entry")
+    return failures
+
+
+def check_csv_index(tmp: str) -> list:
+    import csv
+    from core.data.dataset_index import get_index
+
+    rows = [{"text": "baris satu", "label": "a"},
+            {"text": "paragraf pertama\n\nparagraf kedua, dengan \"quote\"", "label": "b"},
+            {"text": "baris\r\ntiga", "label": "c"},
+            {"text": "terakhir", "label": "d"}]
+    data_dir = os.path.join(tmp, "csv-index")
+    os.makedirs(data_dir)
+    with open(os.path.join(data_dir, "multiline.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["text", "label"])
+        writer.writeheader()
+        writer.writerows(rows)
+    index = get_index(data_dir, "multiline.csv")
+    failures = []
+    if len(index) != len(rows) or index.meta["invalid_records"]:
+        failures.append(f"csv index: {len(index)} records ({index.meta['invalid_records']} invalid), "
+                        f"expected {len(rows)}")
+    elif index.read(range(len(rows))) != rows:
+        failures.append("csv index: records read back by offset differ from the file")
+    elif index.lengths().tolist() != [len(row["text"]) for row in rows]:
+        failures.append("csv index: text lengths differ from the records")
+    return failures
+
+
+def run(records: int = 20000, max_length: int = 512, num_procs=(1,), batch_size: int = 8,
+        model: str = None) -> dict:
+    from transformers import AutoTokenizer
+    from core.data.token_cache import TokenCache
+    from core.data.packing import build_data_pipeline
+    from benchmarks.bench_padding import make_dataset
+    from benchmarks.tiny_model import make_tiny_model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = model or make_tiny_model(os.path.join(tmp, "tiny"))
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        data_path = os.path.join(tmp, "chat.jsonl")
+        make_dataset(data_path, records)
+        size_mb = os.path.getsize(data_path) / 1024 ** 2
+
+        cold = []
+        for num_proc in num_procs:
+            cache = TokenCache(os.path.join(tmp, f"cache-{num_proc}"))
+            started = time.perf_counter()
+            tokenized = cache.get_or_build({"path": data_path}, tokenizer, max_length=max_length,
+                                           log=lambda m: None, num_proc=num_proc)
+            elapsed = time.perf_counter() - started
+            tokens = int(sum(tokenized.lengths()))
+            cold.append({
+                "num_proc": num_proc,
+                "elapsed_sec": round(elapsed, 3),
+                "records_per_sec": round(records / elapsed, 1),
+                "tokens_per_sec": round(tokens / elapsed, 1),
+                "mb_per_sec": round(size_mb / elapsed, 2),
+            })
+
+        started = time.perf_counter()
+        tokenized = cache.get_or_build({"path": data_path}, tokenizer, max_length=max_length, log=lambda m: None)
+        warm_sec = time.perf_counter() - started
+
+        dataset, collator, _ = build_data_pipeline(tokenized, tokenizer, {"max_seq_length": max_length,
+                                                                           "group_by_length": False})
+        started = time.perf_counter()
+        for i in range(0, len(dataset), batch_size):
+            collator([dataset[j] for j in range(i, min(i + batch_size, len(dataset)))])
+        collate_sec = time.perf_counter() - started
+        report = collator.report(collate_sec)
+        failures = check_text_columns(tmp, tokenizer, max_length) + check_csv_index(tmp)
+
+    return {
+        "benchmark": "data.tokenize",
+        "records": records,
+        "tokens": tokens,
+        "dataset_mb": round(size_mb, 2),
+        "max_length": max_length,
+        "cold": cold,
+        "warm_sec": round(warm_sec, 4),
+        "collate": {
+            "batch_size": batch_size,
+            "elapsed_sec": round(collate_sec, 3),
+            "records_per_sec": round(records / collate_sec, 1),
+            "tokens_per_sec": report["tokens_per_sec"],
+            "padding_ratio": report["padding_ratio"],
+        },
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--num-proc", type=int, nargs="+", default=[1])
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+    result = run(args.records, args.max_length, args.num_proc, args.batch_size, args.model)
+    print(json.dumps(result, indent=2))
+    if result["failures"]:
+        print("FAIL:\n" + "\n".join(result["failures"]), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Stand-in Hugging Face Hub lokal untuk menguji download model secara offline.
+
+    python benchmarks/fake_hub.py --root /tmp/hub --port 8765
+    HF_ENDPOINT=http://127.0.0.1:8765 python app.py
+
+Setiap folder ``<root>/<org>/<repo>/`` disajikan sebagai repo model lewat endpoint
+yang sama dengan Hub: ``/api/models/<repo>/tree/<rev>`` dan
+``/<repo>/resolve/<rev>/<path>`` (mendukung header Range). File ``.safetensors``
+/ ``.bin`` dilaporkan sebagai LFS (sha256), file lain dengan git blob sha1.
+``throttle`` membatasi byte/detik per koneksi dan ``drop_after`` memutus koneksi
+setelah sekian byte, untuk menguji paralelisme dan resume.
+"""
+import hashlib, json, os, random, re, sys, threading, time, argparse, urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LFS_SUFFIXES = (".safetensors", ".bin", ".gguf", ".pt")
+
+
+def _file_entry(path: str, rel: str):
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    if rel.endswith(LFS_SUFFIXES):
+        return {"type": "file", "path": rel, "size": size, "oid": hashlib.sha1(data).hexdigest(),
+                "lfs": {"oid": hashlib.sha256(data).hexdigest(), "size": size}}
+    blob = hashlib.sha1(f"blob {size}\0".encode() + data).hexdigest()
+    return {"type": "file", "path": rel, "size": size, "oid": blob}
+
+
+def make_handler(root: str, throttle: int = 0, drop_after: int = 0):
+    drops = {"remaining": 1 if drop_after else 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, data, status=200):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urllib.parse.unquote(urllib.parse.urlparse(self.path).path)
+            m = re.match(r"^/api/models/(.+?)/tree/([^/]+)$", path)
+            if m:
+                repo_dir = os.path.join(root, m.group(1))
+                if not os.path.isdir(repo_dir):
+                    return self._json({"error": "Repository not found"}, 404)
+                entries = []
+                for dirpath, _, names in os.walk(repo_dir):
+                    for name in sorted(names):
+                        full = os.path.join(dirpath, name)
+                        entries.append(_file_entry(full, os.path.relpath(full, repo_dir)))
+                return self._json(entries)
+            m = re.match(r"^/(.+?)/resolve/([^/]+)/(.+)$", path)
+            if not m:
+                return self._json({"error": "Not found"}, 404)
+            full = os.path.join(root, m.group(1), m.group(3))
+            if not os.path.isfile(full):
+                return self._json({"error": "Entry not found"}, 404)
+            self._send_file(full)
+
+        def _send_file(self, full: str):
+            size = os.path.getsize(full)
+            start = 0
+            rng = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+            if rng:
+                start = int(rng.group(1))
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(size - start))
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+
+            sent, began = 0, time.monotonic()
+            with open(full, "rb") as f:
+                f.seek(start)
+                while True:
+                    chunk = f.read(64 * 1024)
+                    if not chunk:
+                        break
+                    if drop_after and sent >= drop_after and drops["remaining"]:
+                        drops["remaining"] -= 1
+                        self.close_connection = True
+                        return
+                    try:
+                        self.wfile.write(chunk)
+                    except (BrokenPipeError, ConnectionResetError):
+                        return  # client membatalkan download
+                    sent += len(chunk)
+                    if throttle:
+                        ahead = sent / throttle - (time.monotonic() - began)
+                        if ahead > 0:
+                            time.sleep(ahead)
+
+    return Handler
+
+
+def serve(root: str, port: int = 0, throttle: int = 0, drop_after: int = 0):
+    """Jalankan server di background thread; return (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(root, throttle, drop_after))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_fake_repo(root: str, repo_id: str = "fake-org/tiny-model", shards: int = 4, shard_mb: int = 16,
+                   seed: int = 0) -> str:
+    repo = os.path.join(root, repo_id)
+    os.makedirs(repo, exist_ok=True)
+    with open(os.path.join(repo, "config.json"), "w") as f:
+        json.dump({"model_type": "llama", "architectures": ["LlamaForCausalLM"], "hidden_size": 64}, f)
+    rnd = random.Random(seed)
+    for i in range(shards):
+        with open(os.path.join(repo, f"model-{i + 1:05d}-of-{shards:05d}.safetensors"), "wb") as f:
+            f.write(rnd.randbytes(shard_mb * 1024 * 1024))
+    return repo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", required=True)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--throttle", type=int, default=0, help="byte/detik per koneksi")
+    parser.add_argument("--make-repo", action="store_true")
+    args = parser.parse_args()
+    if args.make_repo:
+        make_fake_repo(args.root)
+    server, url = serve(args.root, args.port, args.throttle)
+    print(f"Fake hub at {url} (root={args.root})", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,237 @@
+"""Checkpoint adapter-only yang ditulis di background thread.
+
+Loop training hanya membayar snapshot: tensor adapter (dan state optimizer)
+di-copy ke CPU, lalu ``CheckpointWriter`` menulisnya ke
+``checkpoints/<run_id>/checkpoint-<step>/`` di thread terpisah. Layout folder
+sama dengan checkpoint HF Trainer (``adapter_model.safetensors``,
+``optimizer.pt``, ``scheduler.pt``, ``trainer_state.json``, ``rng_state.pth``),
+jadi ``Trainer.train(resume_from_checkpoint=...)`` bisa langsung melanjutkan.
+Di bawah DeepSpeed state optimizer ZeRO ikut disimpan sebagai ``global_step<N>/`` +
+``latest`` (layout ``engine.save_checkpoint``) di folder yang sama.
+
+Maksimal satu checkpoint menunggu ditulis: kalau write sebelumnya belum selesai,
+``save()`` menunggu dulu supaya snapshot di RAM tidak menumpuk. Folder ditulis
+ke ``.tmp`` lalu di-rename, baru didaftarkan di tabel ``checkpoints``; folder
+yang ada di tabel selalu lengkap. Retention: simpan ``keep_last`` terakhir +
+``keep_best`` dengan metric terkecil, sisanya dihapus.
+"""
+import dataclasses, json, os, queue, shutil, threading, time, traceback
+from typing import Any, Callable, Dict, List, Optional
+
+CHECKPOINT_ROOT = "checkpoints"
+CHECKPOINT_PREFIX = "checkpoint-"
+STATE_FILE = "trainer_state.json"
+ENGINE_LATEST = "latest"  # tag checkpoint engine DeepSpeed terakhir
+
+
+@dataclasses.dataclass
+class StagedDir:
+    """Folder yang sudah ditulis di luar writer; dipindah ke folder checkpoint saat write."""
+    path: str
+    cleanup: Optional[str] = None  # folder staging yang dihapus setelah write (berhasil atau gagal)
+
+
+def _write_payload(path: str, payload: Dict[str, Any]):
+    for name, obj in payload.items():
+        target = os.path.join(path, name)
+        if isinstance(obj, StagedDir):
+            shutil.move(obj.path, target)
+        elif isinstance(obj, str):
+            with open(target, "w", encoding="utf-8") as f:
+                f.write(obj)
+        elif name.endswith(".safetensors"):
+            from safetensors.torch import save_file
+            save_file(obj, target)
+        elif name.endswith((".pt", ".pth", ".bin")):
+            import torch
+            torch.save(obj, target)
+        else:
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(obj, f, indent=2)
+
+
+class CheckpointWriter:
+    def __init__(self, run_id: str, db, keep_last: Optional[int] = 2, keep_best: int = 1,
+                 metric: str = "loss", root: str = CHECKPOINT_ROOT, log: Callable[[str], None] = print):
+        self.run_id = run_id
+        self.db = db
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.metric = metric
+        self.dir = os.path.join(root, run_id)
+        self.log = log
+        # daftar lokal: di worker process write DB di-relay async, jadi jangan baca balik dari DB
+        self._saved: List[Dict[str, Any]] = [c for c in db.get_checkpoints(run_id) if os.path.isdir(c["path"])]
+        self._queue: "queue.Queue" = queue.Queue(maxsize=1)
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[str] = None
+        self.stats = {"saved": 0, "snapshot_sec": 0.0, "write_sec": 0.0, "wait_sec": 0.0}
+
+    def save(self, step: int, metrics: Dict[str, Any], payload: Dict[str, Any], snapshot_sec: float = 0.0):
+        """Antrikan checkpoint; ``payload`` (nama file -> objek) harus sudah di-snapshot ke CPU."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name=f"ckpt-{self.run_id[:8]}", daemon=True)
+            self._thread.start()
+        started = time.perf_counter()
+        self._queue.put((step, metrics, payload))
+        self.stats["wait_sec"] += time.perf_counter() - started
+        self.stats["snapshot_sec"] += snapshot_sec
+
+    def flush(self):
+        """Tunggu semua checkpoint yang antri selesai ditulis."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        self.flush()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        return max(self._saved, key=lambda c: c["step"], default=None)
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as ex:
+                # checkpoint gagal tidak menghentikan training; dicatat dan dicoba lagi di save berikutnya
+                traceback.print_exc()
+                self.error = str(ex)
+                self.log(f"⚠️ Checkpoint failed: {ex}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, step: int, metrics: Dict[str, Any], payload: Dict[str, Any]):
+        started = time.perf_counter()
+        path = os.path.join(self.dir, f"{CHECKPOINT_PREFIX}{step}")
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        try:
+            _write_payload(tmp, payload)
+        finally:
+            for obj in payload.values():
+                if isinstance(obj, StagedDir) and obj.cleanup:
+                    shutil.rmtree(obj.cleanup, ignore_errors=True)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        elapsed = time.perf_counter() - started
+
+        self.db.register_checkpoint(self.run_id, step, path, metrics)
+        self._saved = [c for c in self._saved if c["path"] != path]
+        self._saved.append({"step": step, "path": path, "metrics": metrics})
+        self.stats["saved"] += 1
+        self.stats["write_sec"] += elapsed
+        self.log(f"Checkpoint saved at step {step} ({elapsed:.2f}s, background)")
+        self._apply_retention()
+
+    def _apply_retention(self):
+        if self.keep_last is None:
+            return
+        by_step = sorted(self._saved, key=lambda c: c["step"])
+        keep = {c["path"] for c in by_step[-self.keep_last:]} if self.keep_last > 0 else set()
+        scored = [c for c in by_step if isinstance(c["metrics"].get(self.metric), (int, float))]
+        keep |= {c["path"] for c in sorted(scored, key=lambda c: c["metrics"][self.metric])[:self.keep_best]}
+        for ckpt in by_step:
+            if ckpt["path"] in keep:
+                continue
+            shutil.rmtree(ckpt["path"], ignore_errors=True)
+            self.db.delete_checkpoint(self.run_id, ckpt["path"])
+            self._saved.remove(ckpt)
+
+
+def latest_checkpoint(db, run_id: str) -> Optional[Dict[str, Any]]:
+    """Checkpoint terbaru yang foldernya masih ada (untuk resume)."""
+    existing = [c for c in db.get_checkpoints(run_id) if os.path.isdir(c["path"])]
+    return max(existing, key=lambda c: c["step"], default=None)
+
+
+def has_engine_state(path: str) -> bool:
+    """Checkpoint berisi state engine DeepSpeed (optimizer ZeRO + scheduler)?"""
+    if not os.path.isfile(os.path.join(path, ENGINE_LATEST)):
+        return False
+    with open(os.path.join(path, ENGINE_LATEST), encoding="utf-8") as f:
+        return os.path.isdir(os.path.join(path, f.read().strip()))
+
+
+def resume_coverage(path: str, backend: str) -> Dict[str, bool]:
+    """State apa saja yang dipulihkan kalau run di-resume dari ``path``.
+
+    DeepSpeed tanpa state engine (checkpoint lama / ``save_optimizer`` false) hanya
+    melanjutkan step + lr schedule: optimizer mulai dari nol dan data mulai lagi dari awal epoch.
+    """
+    engine = has_engine_state(path)
+    hf_resume = backend != "deepspeed" or engine
+    return {
+        "step": True,
+        "lr_schedule": True,
+        "optimizer_state": engine or os.path.isfile(os.path.join(path, "optimizer.pt")),
+        "data_position": hf_resume,
+    }
+
+
+def read_state(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, STATE_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def to_cpu(obj):
+    """Copy rekursif semua tensor ke CPU (snapshot, bukan view ke buffer yang masih di-update)."""
+    import torch
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(to_cpu(v) for v in obj)
+    return obj
+
+
+def snapshot_hf(model, optimizer=None, lr_scheduler=None, state=None) -> Dict[str, Any]:
+    """Payload checkpoint adapter-only dengan layout HF Trainer."""
+    import random
+    import numpy as np
+    import torch
+    from peft import get_peft_model_state_dict
+
+    adapter_cfg = model.peft_config[getattr(model, "active_adapter", "default")].to_dict()
+    payload = {
+        "adapter_model.safetensors": {k: v.contiguous() for k, v in to_cpu(get_peft_model_state_dict(model)).items()},
+        "adapter_config.json": {k: sorted(v) if isinstance(v, set) else v for k, v in adapter_cfg.items()},
+        "rng_state.pth": {
+            "python": random.getstate(), "numpy": np.random.get_state(), "cpu": torch.random.get_rng_state(),
+            **({"cuda": torch.cuda.random.get_rng_state_all()} if torch.cuda.is_available() else {}),
+        },
+    }
+    if optimizer is not None:
+        payload["optimizer.pt"] = to_cpu(optimizer.state_dict())
+    if lr_scheduler is not None:
+        payload["scheduler.pt"] = lr_scheduler.state_dict()
+    if state is not None:
+        payload[STATE_FILE] = json.loads(json.dumps(dataclasses.asdict(state)))  # sama dengan TrainerState.save_to_json
+    return payload
+
+
+def snapshot_deepspeed(engine, model, step: int, staging: str) -> Dict[str, Any]:
+    """Payload state engine DeepSpeed (partisi optimizer ZeRO, master weight fp32).
+
+    ``engine.save_checkpoint`` collective antar rank, jadi ditulis sinkron ke ``staging``;
+    writer memindahkannya ke folder checkpoint sebagai ``global_step<N>/`` + ``latest``,
+    layout yang dibaca ``Trainer.train(resume_from_checkpoint=...)``.
+    """
+    import inspect
+
+    tag = f"global_step{step}"
+    shutil.rmtree(staging, ignore_errors=True)
+    kwargs = {}
+    accepts = inspect.signature(engine.save_checkpoint).parameters
+    if hasattr(model, "peft_config") and "exclude_frozen_parameters" in accepts:
+        kwargs["exclude_frozen_parameters"] = True  # base model beku tidak ikut ditulis
+    engine.save_checkpoint(staging, tag=tag, **kwargs)
+    return {tag: StagedDir(os.path.join(staging, tag), cleanup=staging), ENGINE_LATEST: tag}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union, Literal
 
 class DatasetConfig(BaseModel):
     type: str = "jsonl"
@@ -7,21 +7,45 @@ class DatasetConfig(BaseModel):
     format_standard: str = "INSTRUCTION_CHAT"
     input_columns: Dict[str, Optional[str]] = {}
     shuffle: bool = True
+    num_proc: Optional[int] = None  # tokenization worker; None = auto dari jumlah CPU
+    dedup: bool = False  # exact + near-duplicate removal sebelum tokenisasi
+    dedup_threshold: Optional[float] = 0.8  # estimasi Jaccard MinHash; None = exact saja
 
 class TrainingConfig(BaseModel):
     backend: str = "accelerate"
     strategy: str = "qlora"
     epochs: int = 1
-    per_device_train_batch_size: int = 2
+    # "auto": dipilih core.planner dari config model + memori device saat training mulai
+    per_device_train_batch_size: Union[int, Literal["auto"]] = 2
     learning_rate: float = 2e-4
-    gradient_accumulation_steps: int = 8
+    gradient_accumulation_steps: Union[int, Literal["auto"]] = 8
+    target_global_batch_size: Optional[int] = None  # untuk "auto"; default micro x accumulation / 16
+    gradient_checkpointing: bool = False
+    auto_probe: bool = False  # verifikasi rencana "auto" dengan forward/backward sungguhan
     lr_scheduler_type: str = "cosine"
     fp16: bool = False
     bf16: bool = True
+    max_seq_length: int = 512
+    padding: str = "dynamic"  # dynamic | max_length
+    group_by_length: bool = True
+    packing: bool = False
+
+class CheckpointConfig(BaseModel):
+    every_steps: int = 50
+    keep_last: Optional[int] = 2  # None = simpan semua
+    keep_best: int = 1  # loss terkecil, di luar keep_last
+    save_optimizer: bool = True  # optimizer + scheduler state untuk resume
+
+class ProfileConfig(BaseModel):
+    enabled: bool = True
+    interval: int = 10  # step per row agregat di tabel profile
+    sync_cuda: bool = False  # synchronize di batas fase: pembagian fase GPU akurat, tapi memperlambat step
+    wall_clock_breakdown: bool = False  # breakdown bawaan DeepSpeed (log-nya sendiri)
 
 class ComputeConfig(BaseModel):
     device: str = "auto"
     gpu_index: int = 0
+    isolation: str = "auto"  # auto | host | process | thread (lihat scheduler.auto_isolation)
 
 class FineTuneConfig(BaseModel):
     run_name: str
@@ -29,5 +53,30 @@ class FineTuneConfig(BaseModel):
     dataset: DatasetConfig
     training: TrainingConfig
     compute: ComputeConfig = Field(default_factory=ComputeConfig)
+    checkpoint: CheckpointConfig = Field(default_factory=CheckpointConfig)
+    profile: ProfileConfig = Field(default_factory=ProfileConfig)
     notes: Optional[str] = None
     tags: List[str] = []
+
+class PruningConfig(BaseModel):
+    type: str = "asha"  # asha | none
+    min_steps: int = 10  # milestone rung pertama (step)
+    reduction_factor: int = 3  # per rung hanya 1/reduction_factor trial terbaik yang lanjut
+    max_steps: Optional[int] = None  # tidak ada rung di / setelah step ini
+
+class SweepConfig(BaseModel):
+    name: Optional[str] = None
+    base: Dict[str, Any]  # config run (FineTuneConfig) yang dipakai semua trial
+    # path bertitik -> [nilai], {"values": [...]} atau {"min", "max", "log": bool, "type": "float"|"int"}
+    space: Dict[str, Any]
+    method: str = "random"  # random | grid
+    num_trials: int = 8  # grid: batas jumlah kombinasi
+    seed: Optional[int] = None
+    metric: str = "loss"
+    mode: str = "min"  # min | max
+    max_concurrent: Optional[int] = None  # None = 1 untuk backend yang me-load model, 4 untuk mock
+    # trial adapter di ModelHost (isolation auto -> host) supaya base model dipakai ulang;
+    # False = tiap trial proses sendiri. Isolation eksplisit di base.compute tidak diubah
+    share_model: bool = True
+    priority: int = 0
+    pruning: PruningConfig = Field(default_factory=PruningConfig)
@@ -0,0 +1,307 @@
+"""Sidecar index per dataset untuk statistik dan random access.
+
+Dihitung sekali dalam satu streaming pass (atau langsung saat upload, lihat
+core/data/upload.py) dan disimpan di ``<data>/.index/<nama>/``:
+
+* ``offsets.npy`` - byte offset awal setiap record (int64), untuk seek O(1);
+  record CSV boleh multi-baris (newline di dalam field berquote)
+* ``lengths.npy`` - panjang teks per record (karakter)
+* ``index.json``  - jumlah record, kehadiran field, duplikat, statistik panjang,
+  plus size/mtime/sha256 file sebagai kunci validitas
+* ``tokens_<fingerprint>.json`` - histogram panjang token per tokenizer (on demand)
+
+Index dianggap masih valid kalau size+mtime sama, atau kalau mtime berubah tapi
+sha256 isi file tetap sama.
+"""
+import csv, hashlib, io, json, os, random, threading, time
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.data.token_cache import (TOKENIZE_BATCH, _batched, file_content_hash, iter_texts, source_spec,
+                                   tokenizer_fingerprint)
+
+INDEX_DIR = ".index"
+READ_CHUNK = 1 << 20
+
+# satu lock per file dataset: build index dataset berbeda tetap paralel
+_build_locks: Dict[str, threading.Lock] = {}
+_build_locks_lock = threading.Lock()
+
+
+def length_summary(lengths) -> Dict[str, Any]:
+    """min/max/mean/percentil + histogram bin pangkat dua (0-16, 16-32, ...)."""
+    values = np.asarray(lengths, dtype=np.int64)
+    if values.size == 0:
+        return {"count": 0}
+    edges = [0, 16]
+    while edges[-1] <= values.max():
+        edges.append(edges[-1] * 2)
+    counts, _ = np.histogram(values, bins=edges)
+    return {
+        "count": int(values.size),
+        "min": int(values.min()),
+        "max": int(values.max()),
+        "mean": round(float(values.mean()), 2),
+        "p50": int(np.percentile(values, 50)),
+        "p95": int(np.percentile(values, 95)),
+        "p99": int(np.percentile(values, 99)),
+        "histogram": {"edges": edges, "counts": counts.tolist()},
+    }
+
+
+class IndexBuilder:
+    """Bangun index dari aliran bytes (chunk boleh memotong baris di mana saja).
+
+    CSV: baris fisik disambung selama jumlah ``"`` masih ganjil (field berquote
+    belum ditutup), jadi satu offset = satu record, bukan satu baris.
+    """
+
+    def __init__(self, file_type: str = "jsonl", input_columns: Optional[Dict] = None):
+        self.file_type = file_type
+        self.text_column = (input_columns or {}).get("text") or "text"
+        self.offsets = array("q")
+        self.lengths = array("q")
+        self.fields: Counter = Counter()
+        self.invalid = 0
+        self.duplicates = 0
+        self.header: Optional[List[str]] = None
+        self._seen = set()
+        self._hasher = hashlib.sha256()
+        self._pending = b""
+        self._pos = 0  # offset byte pertama dari _pending
+        self._open: Optional[tuple] = None  # record CSV multi-baris: (offset, baris)
+
+    def feed(self, chunk: bytes):
+        self._hasher.update(chunk)
+        data = self._pending + chunk
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            self._line(data[start:end], self._pos + start)
+            start = end + 1
+        self._pending = data[start:]
+        self._pos += start
+
+    def finish(self):
+        if self._pending:
+            self._line(self._pending, self._pos)
+            self._pos += len(self._pending)
+            self._pending = b""
+        if self._open is not None:
+            # quote tidak pernah ditutup sampai EOF: sisa file jadi satu record (invalid)
+            offset, parts = self._open
+            self._open = None
+            self._record(b"\n".join(parts), offset)
+
+    def _line(self, raw: bytes, offset: int):
+        if self.file_type != "csv":
+            self._record(raw, offset)
+            return
+        quotes = raw.count(b'"')
+        if self._open is None:
+            if quotes % 2 == 0:
+                self._record(raw, offset)
+            else:
+                self._open = (offset, [raw])
+            return
+        self._open[1].append(raw)
+        if quotes % 2:
+            # quote ganjil di baris lanjutan = field ditutup; jumlah total jadi genap
+            start, parts = self._open
+            self._open = None
+            self._record(b"\n".join(parts), start)
+
+    def _record(self, raw: bytes, offset: int):
+        stripped = raw.strip()
+        if not stripped:
+            return
+        if self.file_type == "csv" and self.header is None:
+            self.header = next(csv.reader([stripped.decode("utf-8", "replace")]))
+            return
+
+        self.offsets.append(offset)
+        digest = hashlib.blake2b(stripped, digest_size=8).digest()
+        if digest in self._seen:
+            self.duplicates += 1
+        else:
+            self._seen.add(digest)
+
+        record = _parse(stripped, self.file_type, self.header)
+        if record is None:
+            self.invalid += 1
+            self.lengths.append(len(stripped))
+            return
+        present = [k for k, v in record.items() if v not in (None, "")]
+        self.fields.update(present)
+        text = record.get(self.text_column)
+        if not isinstance(text, str):
+            text = " ".join(v for v in record.values() if isinstance(v, str))
+        self.lengths.append(len(text))
+
+    def save(self, data_dir: str, name: str) -> Dict[str, Any]:
+        self.finish()
+        path = os.path.join(data_dir, name)
+        st = os.stat(path)
+        folder = os.path.join(data_dir, INDEX_DIR, name)
+        os.makedirs(folder, exist_ok=True)
+        np.save(os.path.join(folder, "offsets.npy"), np.frombuffer(self.offsets, dtype=np.int64))
+        np.save(os.path.join(folder, "lengths.npy"), np.frombuffer(self.lengths, dtype=np.int64))
+        num_records = len(self.offsets)
+        meta = {
+            "name": name,
+            "type": self.file_type,
+            "size_bytes": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": self._hasher.hexdigest(),
+            "num_records": num_records,
+            "invalid_records": self.invalid,
+            "header": self.header,
+            "text_column": self.text_column,
+            "field_presence": dict(self.fields.most_common()),
+            "duplicates": {"exact": self.duplicates, "unique": num_records - self.duplicates},
+            "char_length": length_summary(self.lengths),
+            "created_at": time.time(),
+        }
+        _write_json(os.path.join(folder, "index.json"), meta)
+        # token histogram lama tidak berlaku lagi untuk isi file baru
+        for f in os.listdir(folder):
+            if f.startswith("tokens_"):
+                os.remove(os.path.join(folder, f))
+        return meta
+
+
+class DatasetIndex:
+    def __init__(self, data_dir: str, name: str, meta: Dict[str, Any]):
+        self.data_dir = data_dir
+        self.name = name
+        self.meta = meta
+        self.path = os.path.join(data_dir, name)
+        self.folder = os.path.join(data_dir, INDEX_DIR, name)
+        self.offsets = np.load(os.path.join(self.folder, "offsets.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def lengths(self) -> np.ndarray:
+        return np.load(os.path.join(self.folder, "lengths.npy"), mmap_mode="r")
+
+    def read(self, indices: List[int]) -> List[Dict[str, Any]]:
+        """Baca record berdasarkan nomor urut (seek langsung ke offset-nya)."""
+        records = []
+        with open(self.path, "rb") as f:
+            for i in indices:
+                f.seek(int(self.offsets[i]))
+                raw = _read_record(f, self.meta["type"])
+                record = _parse(raw, self.meta["type"], self.meta.get("header"))
+                records.append(record if record is not None else {"raw": raw.decode("utf-8", "replace")})
+        return records
+
+    def page(self, offset: int = 0, limit: int = 5) -> List[Dict[str, Any]]:
+        return self.read(range(max(offset, 0), min(offset + limit, len(self))))
+
+    def sample(self, n: int = 5, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        indices = sorted(random.Random(seed).sample(range(len(self)), min(n, len(self))))
+        return self.read(indices)
+
+    def token_stats(self, tokenizer_name: str, dataset_cfg: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Histogram panjang token untuk satu tokenizer, di-cache per fingerprint tokenizer + kolom teks."""
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        cfg = {"path": self.path, "type": self.meta["type"],
+               "input_columns": {"text": self.meta.get("text_column")}, **(dataset_cfg or {})}
+        source = hashlib.sha256(source_spec(cfg).encode()).hexdigest()[:8]
+        cache_path = os.path.join(self.folder, f"tokens_{tokenizer_fingerprint(tokenizer)}_{source}.json")
+        cached = _read_json(cache_path)
+        if cached is not None:
+            return cached
+
+        lengths = array("q")
+        for batch in _batched(iter_texts(cfg), TOKENIZE_BATCH):
+            lengths.extend(len(ids) for ids in tokenizer(batch, add_special_tokens=True)["input_ids"])
+        stats = {"tokenizer": tokenizer_name, **length_summary(lengths),
+                 "total_tokens": int(sum(lengths))}
+        _write_json(cache_path, stats)
+        return stats
+
+
+def load_index(data_dir: str, name: str) -> Optional[DatasetIndex]:
+    """Index yang masih valid untuk isi file saat ini, tanpa membangun ulang."""
+    folder = os.path.join(data_dir, INDEX_DIR, name)
+    meta = _read_json(os.path.join(folder, "index.json"))
+    if meta is None:
+        return None
+    try:
+        st = os.stat(os.path.join(data_dir, name))
+    except OSError:
+        return None
+    if meta["size_bytes"] != st.st_size:
+        return None
+    if meta["mtime_ns"] != st.st_mtime_ns:
+        # file di-touch / ditulis ulang dengan isi sama: index tetap dipakai
+        if file_content_hash(os.path.join(data_dir, name)) != meta["sha256"]:
+            return None
+        meta["mtime_ns"] = st.st_mtime_ns
+        _write_json(os.path.join(folder, "index.json"), meta)
+    return DatasetIndex(data_dir, name, meta)
+
+
+def get_index(data_dir: str, name: str, input_columns: Optional[Dict] = None) -> DatasetIndex:
+    """Index dataset; dibangun dengan satu streaming pass kalau belum ada atau basi."""
+    index = load_index(data_dir, name)
+    if index is not None:
+        return index
+    with _build_locks_lock:
+        lock = _build_locks.setdefault(os.path.abspath(os.path.join(data_dir, name)), threading.Lock())
+    with lock:
+        index = load_index(data_dir, name)
+        if index is not None:
+            return index
+        builder = IndexBuilder("csv" if name.endswith(".csv") else "jsonl", input_columns)
+        with open(os.path.join(data_dir, name), "rb") as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                builder.feed(chunk)
+        meta = builder.save(data_dir, name)
+        return DatasetIndex(data_dir, name, meta)
+
+
+def _read_record(f, file_type: str) -> bytes:
+    """Satu record dari posisi file saat ini; record CSV berlanjut selama quote masih terbuka."""
+    raw = f.readline()
+    if file_type == "csv":
+        while raw.count(b'"') % 2:
+            more = f.readline()
+            if not more:
+                break
+            raw += more
+    return raw.strip()
+
+
+def _parse(raw: bytes, file_type: str, header: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    try:
+        if file_type == "csv":
+            row = next(csv.reader(io.StringIO(raw.decode("utf-8"))))
+            return dict(zip(header or [], row))
+        record = json.loads(raw)
+        return record if isinstance(record, dict) else None
+    except (ValueError, StopIteration):
+        return None
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict):
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
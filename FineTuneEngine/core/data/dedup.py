@@ -0,0 +1,385 @@
+"""Dedup stage: exact hash + MinHash/LSH untuk near-duplicate.
+
+Alur (streaming, tidak pernah memuat seluruh dataset ke memori):
+
+1. File dibagi jadi byte range (``split_ranges``); tiap worker process menghitung
+   per record: hash exact (teks ter-normalisasi), signature MinHash dari shingle
+   karakter, dan hash per band LSH. Hasilnya ditulis per batch ke file biner.
+2. Parent menggabungkan file per worker, lalu per band mencari record dengan
+   hash band yang sama (sort, O(N log N)). Kandidat diverifikasi dengan estimasi
+   Jaccard dari signature (memmap, >= ``threshold``) dan di-union; record dengan
+   index terkecil di tiap cluster yang dipertahankan.
+3. File sumber di-stream ulang dan record yang dipertahankan ditulis ke dataset
+   turunan ``<nama>.dedup.<ext>`` plus report ``<nama>.dedup.report.json``.
+
+Memori di RAM ~ beberapa puluh byte per record (hash exact, satu kolom band,
+parent array); signature (``num_perm`` x 4 byte per record) tetap di disk.
+"""
+import csv, datetime, hashlib, json, os, re, shutil, tempfile, threading, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.data.token_cache import _is_csv, file_content_hash, resolve_num_proc, split_ranges
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+SIGNATURE_BATCH = 256
+MAX_EXAMPLES = 20
+
+_WS = re.compile(r"\s+")
+_lock = threading.Lock()
+
+
+def derived_paths(path: str) -> Tuple[str, str]:
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.dedup{ext}", f"{stem}.dedup.report.json"
+
+
+def _permutations(num_perm: int, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """Permutasi 32-bit: h(x) = xorshift(a*x + b mod 2^32) dengan a ganjil (bijektif)."""
+    rng = np.random.RandomState(seed)
+    a = rng.randint(0, 1 << 32, size=num_perm, dtype=np.int64).astype(np.uint32) | np.uint32(1)
+    b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.int64).astype(np.uint32)
+    return a, b
+
+
+def normalize(text: str) -> str:
+    return _WS.sub(" ", text.lower()).strip()
+
+
+def _shingle_hashes(encoded: List[bytes], size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Hash 32-bit semua shingle ``size`` byte dari satu batch (vectorized) + index awal per record."""
+    # record pendek di-pad supaya tetap punya satu shingle
+    encoded = [e if len(e) >= size else e + b"\0" * (size - len(e)) for e in encoded]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    buf = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    windows = np.zeros(len(buf) - size + 1, dtype=np.uint64)
+    for j in range(size):
+        windows |= buf[j: len(buf) - size + 1 + j] << np.uint64(8 * j)
+    # buang window yang melewati batas record
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    valid = np.zeros(len(windows), dtype=bool)
+    counts = lengths - size + 1
+    positions = np.repeat(starts, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    valid[positions] = True
+    # campur 40-bit window jadi 32-bit
+    x = ((windows[valid] * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)).astype(np.uint32)
+    return x, np.cumsum(counts) - counts
+
+
+def minhash(texts: List[str], a: np.ndarray, b: np.ndarray,
+            shingle_size: int = SHINGLE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """(hash exact uint64 [n], signature MinHash uint32 [n, num_perm]) untuk satu batch teks."""
+    encoded = [normalize(text).encode("utf-8") for text in texts]
+    exact = np.fromiter((int.from_bytes(hashlib.blake2b(e, digest_size=8).digest(), "little") for e in encoded),
+                        dtype=np.uint64, count=len(encoded))
+    x, starts = _shingle_hashes(encoded, shingle_size)
+    # semua permutasi sekaligus (overflow uint32 disengaja), lalu min per segmen record
+    hashed = a[:, None] * x[None, :]
+    hashed += b[:, None]
+    hashed ^= hashed >> np.uint32(16)
+    signature = np.minimum.reduceat(hashed, starts, axis=1).T
+    return exact, np.ascontiguousarray(signature)
+
+
+def band_hashes(signature: np.ndarray, bands: int) -> np.ndarray:
+    """Satu hash uint64 per band LSH dari ``rows = num_perm / bands`` nilai signature."""
+    n, num_perm = signature.shape
+    rows = signature.reshape(n, bands, num_perm // bands).astype(np.uint64)
+    mult = np.asarray([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5],
+                      dtype=np.uint64)
+    out = np.zeros((n, bands), dtype=np.uint64)
+    for r in range(rows.shape[2]):
+        out ^= (rows[:, :, r] + np.uint64(r + 1)) * mult[r % len(mult)]
+        out = (out << np.uint64(13)) | (out >> np.uint64(51))
+    return out
+
+
+# --- membaca record ---
+
+def record_text(record: Any, column: str) -> str:
+    """Teks yang dibandingkan: kolom teks kalau ada, kalau tidak seluruh record (mis. ``messages``)."""
+    if isinstance(record, dict):
+        value = record.get(column)
+        if isinstance(value, str):
+            return value
+        return json.dumps(record, sort_keys=True, ensure_ascii=False)
+    return str(record)
+
+
+def iter_records(dataset_cfg: Dict[str, Any], start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[Any, str]]:
+    """(record mentah untuk ditulis ulang, teks untuk dedup). JSONL bisa dibatasi byte range."""
+    path = dataset_cfg["path"]
+    column = (dataset_cfg.get("input_columns") or {}).get("text") or "text"
+    if _is_csv(dataset_cfg):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                value = row.get(column)
+                yield row, value if value is not None else " ".join(v or "" for v in row.values())
+        return
+    with open(path, "rb") as f:
+        f.seek(start)
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            stripped = line.strip()
+            if not stripped:
+                continue
+            try:
+                text = record_text(json.loads(stripped), column)
+            except ValueError:
+                text = stripped.decode("utf-8", "replace")
+            yield stripped, text
+
+
+def _signature_range(dataset_cfg, start, end, out_prefix, num_perm, bands, shingle_size) -> int:
+    """Hitung hash exact, signature dan band untuk satu byte range. Jalan di worker process.
+
+    Hasil ditulis per batch ke file biner mentah (``.exact``, ``.sig``, satu file
+    ``.bandNN`` per band) sehingga memori worker tidak tumbuh dengan ukuran file.
+    """
+    a, b = _permutations(num_perm)
+    files = {"exact": open(f"{out_prefix}.exact", "wb"), "sig": open(f"{out_prefix}.sig", "wb")}
+    for band in range(bands):
+        files[f"band{band:02d}"] = open(f"{out_prefix}.band{band:02d}", "wb")
+    records, texts = 0, []
+
+    def flush():
+        exact, signature = minhash(texts, a, b, shingle_size)
+        files["exact"].write(exact.tobytes())
+        files["sig"].write(signature.tobytes())
+        hashes = band_hashes(signature, bands)
+        for band in range(bands):
+            files[f"band{band:02d}"].write(np.ascontiguousarray(hashes[:, band]).tobytes())
+        texts.clear()
+
+    try:
+        for _, text in iter_records(dataset_cfg, start, end):
+            texts.append(text)
+            records += 1
+            if len(texts) >= SIGNATURE_BATCH:
+                flush()
+        if texts:
+            flush()
+    finally:
+        for f in files.values():
+            f.close()
+    return records
+
+
+# --- clustering ---
+
+class _UnionFind:
+    """Root selalu index terkecil di cluster (record pertama yang dipertahankan)."""
+
+    def __init__(self, n: int):
+        self.parent = np.arange(n, dtype=np.int64)
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return int(root)
+
+    def union(self, i: int, j: int) -> bool:
+        ri, rj = self.find(i), self.find(j)
+        if ri == rj:
+            return False
+        lo, hi = min(ri, rj), max(ri, rj)
+        self.parent[hi] = lo
+        return True
+
+
+def _group_pairs(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Untuk key yang muncul lebih dari sekali: (member, record pertama grup, record sebelumnya di grup)."""
+    if not len(keys):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+    group_first = order[np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))]
+    previous = np.concatenate([[0], order[:-1]])
+    return order[~starts], group_first[~starts], previous[~starts]
+
+
+def find_duplicates(exact: np.ndarray, signatures: np.ndarray, band_columns: Iterable[np.ndarray],
+                    threshold: Optional[float]) -> Dict[str, Any]:
+    """Cluster duplikat. ``band_columns`` = hash satu band LSH untuk semua record, satu per band."""
+    n = len(exact)
+    uf = _UnionFind(n)
+    members, firsts, _ = _group_pairs(exact)
+    for m, r in zip(members.tolist(), firsts.tolist()):
+        uf.union(m, r)
+    exact_removed = set(members.tolist())
+
+    examples: List[Dict[str, Any]] = []
+    candidates = verified = 0
+    if threshold is not None:
+        for column in band_columns:
+            members, firsts, previous = _group_pairs(column)
+            if not len(members):
+                continue
+            candidates += len(members)
+            # bucket bisa berisi record yang tidak mirip; cek ke record pertama dan record sebelumnya
+            for reps in (firsts, previous):
+                similarity = (np.asarray(signatures[members]) == np.asarray(signatures[reps])).mean(axis=1)
+                keep = similarity >= threshold
+                for m, r, s in zip(members[keep].tolist(), reps[keep].tolist(), similarity[keep].tolist()):
+                    if uf.union(m, r):
+                        verified += 1
+                        if m not in exact_removed and len(examples) < MAX_EXAMPLES:
+                            examples.append({"record": m, "duplicate_of": r, "similarity": round(s, 3)})
+
+    removed = np.zeros(n, dtype=bool)
+    touched = np.flatnonzero(uf.parent != np.arange(n))
+    for i in touched.tolist():
+        removed[i] = uf.find(i) != i
+    return {
+        "removed": removed,
+        "exact_duplicates": len(exact_removed),
+        "near_duplicates": int(removed.sum()) - len(exact_removed),
+        "lsh_candidates": candidates,
+        "lsh_verified": verified,
+        "examples": examples,
+    }
+
+
+# --- stage ---
+
+def dedup_dataset(dataset_cfg: Dict[str, Any], threshold: Optional[float] = DEFAULT_THRESHOLD,
+                  num_proc: Optional[int] = None, output_path: Optional[str] = None,
+                  num_perm: int = NUM_PERM, bands: int = BANDS, shingle_size: int = SHINGLE_SIZE,
+                  log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Dedup satu file dataset; return report (juga ditulis di samping output).
+
+    ``threshold=None`` = hanya exact duplicate.
+    """
+    if num_perm % bands:
+        raise ValueError("num_perm must be divisible by bands")
+    path = dataset_cfg["path"]
+    output_path = output_path or derived_paths(path)[0]
+    report_path = os.path.splitext(output_path)[0] + ".report.json"
+    started = time.perf_counter()
+
+    # CSV dibaca utuh oleh csv.reader (field bisa multi-baris), jadi tidak di-split
+    num_proc = 1 if _is_csv(dataset_cfg) else resolve_num_proc(num_proc, path)
+    ranges = split_ranges(path, num_proc) if num_proc > 1 else [(0, None)]
+    workdir = tempfile.mkdtemp(prefix=".dedup-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        prefixes = [os.path.join(workdir, f"part_{i:03d}") for i in range(len(ranges))]
+        args = (num_perm, bands, shingle_size)
+        if len(ranges) == 1:
+            counts = [_signature_range(dataset_cfg, 0, None, prefixes[0], *args)]
+        else:
+            with ProcessPoolExecutor(len(ranges), mp_context=mp.get_context("spawn")) as pool:
+                futures = [pool.submit(_signature_range, dataset_cfg, start, end, prefix, *args)
+                           for (start, end), prefix in zip(ranges, prefixes)]
+                counts = [future.result() for future in futures]
+        total = sum(counts)
+        log(f"MinHash signatures for {total} records ({len(ranges)} worker(s))")
+
+        exact = np.fromfile(_concat_parts(workdir, "exact", prefixes), dtype=np.uint64)
+        signatures = np.memmap(_concat_parts(workdir, "sig", prefixes), dtype=np.uint32, mode="r",
+                               shape=(total, num_perm)) if total else np.zeros((0, num_perm), dtype=np.uint32)
+        # satu band di memori sekaligus (8 byte per record)
+        band_columns = (np.fromfile(_concat_parts(workdir, f"band{band:02d}", prefixes), dtype=np.uint64)
+                        for band in range(bands))
+        result = find_duplicates(exact, signatures, band_columns, threshold)
+        del signatures
+
+        removed = result.pop("removed")
+        kept = _write_output(dataset_cfg, output_path, removed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "source": os.path.abspath(path),
+        "source_sha256": file_content_hash(path),
+        "output": os.path.abspath(output_path),
+        "params": {"threshold": threshold, "num_perm": num_perm, "bands": bands, "shingle_size": shingle_size},
+        "total_records": total,
+        "kept_records": kept,
+        **result,
+        "num_proc": len(ranges),
+        "elapsed_sec": round(time.perf_counter() - started, 3),
+        "created_at": datetime.datetime.now().isoformat(),
+    }
+    with _lock:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    log(f"Dedup: kept {kept}/{total} records ({report['exact_duplicates']} exact, "
+        f"{report['near_duplicates']} near duplicates removed)")
+    return report
+
+
+def apply_dedup(dataset_cfg: Dict[str, Any], log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """DatasetConfig dengan ``dedup=True`` -> config yang menunjuk ke dataset turunan.
+
+    Dataset turunan dipakai ulang selama isi sumber dan parameter dedup sama.
+    """
+    if not dataset_cfg.get("dedup"):
+        return dataset_cfg
+    threshold = dataset_cfg.get("dedup_threshold", DEFAULT_THRESHOLD)
+    output_path, report_path = derived_paths(dataset_cfg["path"])
+    report = _read_json(report_path)
+    if (report is None or not os.path.exists(output_path)
+            or report.get("source_sha256") != file_content_hash(dataset_cfg["path"])
+            or report.get("params", {}).get("threshold") != threshold):
+        log(f"Deduplicating {dataset_cfg['path']}")
+        report = dedup_dataset(dataset_cfg, threshold, num_proc=dataset_cfg.get("num_proc"), log=log)
+    else:
+        log(f"Dedup cache hit: {output_path} ({report['kept_records']}/{report['total_records']} records)")
+    return {**dataset_cfg, "path": output_path}
+
+
+def _concat_parts(workdir: str, kind: str, prefixes: List[str]) -> str:
+    """Gabung file biner per worker (urut byte range) jadi satu file, tanpa memuat ke memori."""
+    merged = os.path.join(workdir, f"all.{kind}")
+    with open(merged, "wb") as out:
+        for prefix in prefixes:
+            with open(f"{prefix}.{kind}", "rb") as part:
+                shutil.copyfileobj(part, out, 1 << 20)
+            os.remove(f"{prefix}.{kind}")
+    return merged
+
+
+def _write_output(dataset_cfg: Dict[str, Any], output_path: str, removed: np.ndarray) -> int:
+    tmp = f"{output_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    kept = 0
+    if _is_csv(dataset_cfg):
+        with open(tmp, "w", newline="", encoding="utf-8") as out:
+            writer = None
+            for i, (row, _) in enumerate(iter_records(dataset_cfg)):
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(row.keys()))
+                    writer.writeheader()
+                if not removed[i]:
+                    writer.writerow(row)
+                    kept += 1
+    else:
+        with open(tmp, "wb") as out:
+            for i, (raw, _) in enumerate(iter_records(dataset_cfg)):
+                if not removed[i]:
+                    out.write(raw + b"\n")
+                    kept += 1
+    os.replace(tmp, output_path)
+    return kept
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
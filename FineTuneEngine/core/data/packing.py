@@ -0,0 +1,159 @@
+"""Batching stage: dynamic padding, length-grouped batching dan sequence packing.
+
+Dipilih dari ``TrainingConfig``:
+
+* ``padding="max_length"`` - perilaku lama, semua sequence di-pad ke max_seq_length.
+* ``padding="dynamic"`` (default) - pad ke sequence terpanjang di batch; dengan
+  ``group_by_length`` ``LengthGroupedSampler`` mengelompokkan sequence yang panjangnya
+  mirip, memakai panjang dari offset token cache (tanpa membaca ulang shard).
+* ``packing=True`` - record disambung jadi sequence tepat max_seq_length. Setiap
+  record tetap terisolasi: position_ids di-reset per record, label token pertama
+  record = -100, dan attention mask 4D block-diagonal (causal per record).
+  Mask 4D butuh model yang menerimanya (Llama/Mistral/Qwen2/... di transformers >= 4.38).
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+
+class PackedDataset:
+    """Greedy sequential packing record dari TokenizedDataset ke sequence ``seq_len``."""
+
+    def __init__(self, tokenized, seq_len: int):
+        self.tokenized = tokenized
+        self.seq_len = seq_len
+        # packs[i] = (record pertama, record terakhir + 1)
+        self.packs: List[tuple] = []
+        start, used = 0, 0
+        for idx, length in enumerate(tokenized.lengths()):
+            length = min(length, seq_len)
+            if used + length > seq_len and idx > start:
+                self.packs.append((start, idx))
+                start, used = idx, 0
+            used += length
+        if len(tokenized) > start:
+            self.packs.append((start, len(tokenized)))
+
+    def __len__(self):
+        return len(self.packs)
+
+    def __getitem__(self, idx: int) -> Dict[str, List[int]]:
+        if idx >= len(self.packs):
+            raise IndexError(idx)
+        first, last = self.packs[idx]
+        input_ids, seq_lens = [], []
+        for i in range(first, last):
+            ids = self.tokenized.token_ids(i)[: self.seq_len].tolist()
+            input_ids.extend(ids)
+            seq_lens.append(len(ids))
+        return {"input_ids": input_ids, "seq_lens": seq_lens}
+
+
+class PackedCollator:
+    """Collate PackedDataset: labels, position_ids reset per record, mask 4D block-diagonal."""
+
+    def __init__(self, pad_token_id: int, seq_len: int, dtype=None):
+        self.pad_token_id = pad_token_id
+        self.seq_len = seq_len
+        self.dtype = dtype
+
+    def __call__(self, features: List[Dict[str, Any]]) -> Dict[str, Any]:
+        import torch
+        dtype = self.dtype or torch.float32
+        batch, length = len(features), max(len(f["input_ids"]) for f in features)
+        input_ids = torch.full((batch, length), self.pad_token_id, dtype=torch.long)
+        labels = torch.full((batch, length), -100, dtype=torch.long)
+        position_ids = torch.zeros((batch, length), dtype=torch.long)
+        allowed = torch.zeros((batch, length, length), dtype=torch.bool)
+        causal = torch.ones((length, length), dtype=torch.bool).tril()
+
+        for b, feature in enumerate(features):
+            ids = torch.tensor(feature["input_ids"], dtype=torch.long)
+            input_ids[b, : len(ids)] = ids
+            labels[b, : len(ids)] = ids
+            pos = 0
+            for n in feature["seq_lens"]:
+                position_ids[b, pos: pos + n] = torch.arange(n)
+                labels[b, pos] = -100  # jangan prediksi lintas batas record
+                allowed[b, pos: pos + n, pos: pos + n] = causal[:n, :n]
+                pos += n
+
+        mask = torch.zeros((batch, 1, length, length), dtype=dtype)
+        mask.masked_fill_(~allowed.unsqueeze(1), torch.finfo(dtype).min)
+        return {"input_ids": input_ids, "labels": labels, "position_ids": position_ids, "attention_mask": mask}
+
+
+class MeasuredCollator:
+    """Bungkus collator lain dan hitung token asli vs slot (untuk padding ratio)."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.real_tokens = 0
+        self.total_slots = 0
+        self.batches = 0
+        self.started: Optional[float] = None
+
+    def __call__(self, features):
+        if self.started is None:
+            self.started = time.perf_counter()
+        batch = self.inner(features)
+        self.batches += 1
+        self.total_slots += batch["input_ids"].numel()
+        if "seq_lens" in features[0]:
+            self.real_tokens += sum(sum(f["seq_lens"]) for f in features)
+        else:
+            self.real_tokens += sum(len(f["input_ids"]) for f in features)
+        return batch
+
+    def report(self, runtime: Optional[float] = None) -> Dict[str, Any]:
+        elapsed = runtime or (time.perf_counter() - self.started if self.started else 0.0)
+        return {
+            "batches": self.batches,
+            "real_tokens": self.real_tokens,
+            "total_slots": self.total_slots,
+            "padding_ratio": round(1 - self.real_tokens / self.total_slots, 4) if self.total_slots else None,
+            "tokens_per_sec": round(self.real_tokens / elapsed, 1) if elapsed else None,
+            "slots_per_sec": round(self.total_slots / elapsed, 1) if elapsed else None,
+        }
+
+
+def build_data_pipeline(tokenized, tokenizer, training_cfg: Dict[str, Any], dtype=None):
+    """Return (train_dataset, collator, lengths) sesuai TrainingConfig.
+
+    ``lengths`` berisi panjang per record kalau batch dikelompokkan per panjang
+    (lihat ``trainer_class``), selain itu None.
+    """
+    from transformers import DataCollatorForLanguageModeling
+
+    max_length = training_cfg.get("max_seq_length", 512)
+    if training_cfg.get("packing", False):
+        dataset = PackedDataset(tokenized, max_length)
+        collator = PackedCollator(tokenizer.pad_token_id, max_length, dtype=dtype)
+        return dataset, MeasuredCollator(collator), None
+
+    if training_cfg.get("padding", "dynamic") == "max_length":
+        collator = DataCollatorForLanguageModeling(tokenizer, mlm=False, pad_to_multiple_of=max_length)
+        return tokenized, MeasuredCollator(collator), None
+
+    collator = DataCollatorForLanguageModeling(tokenizer, mlm=False, pad_to_multiple_of=8)
+    lengths = tokenized.lengths() if training_cfg.get("group_by_length", True) else None
+    return tokenized, MeasuredCollator(collator), lengths
+
+
+def trainer_class(lengths: Optional[List[int]] = None):
+    """``Trainer`` HF, atau subclass dengan ``LengthGroupedSampler`` dari ``lengths``.
+
+    ``group_by_length`` bawaan HF menghitung panjang dengan membaca semua record
+    (full pass atas shard mmap); di sini panjang sudah ada di token cache.
+    """
+    from transformers import Trainer
+
+    if lengths is None:
+        return Trainer
+    from transformers.trainer_pt_utils import LengthGroupedSampler
+
+    class LengthGroupedTrainer(Trainer):
+        def _get_train_sampler(self, *args, **kwargs):
+            return LengthGroupedSampler(self.args.train_batch_size * self.args.gradient_accumulation_steps,
+                                        lengths=lengths)
+
+    return LengthGroupedTrainer
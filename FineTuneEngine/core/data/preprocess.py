@@ -0,0 +1,94 @@
+"""Job preprocessing dataset di luar training run: tokenize ke TokenCache dan dedup.
+
+Job dijalankan di background thread; pekerjaan beratnya sendiri paralel di worker
+process (lihat TokenCache._build dan core/data/dedup.py). Status job disimpan
+in-memory, hasilnya (cache entry / dataset turunan) persisten di disk sehingga
+run berikutnya langsung cache hit.
+"""
+import datetime, threading, traceback, uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from core.data.token_cache import TokenCache
+
+_jobs: Dict[str, Dict[str, Any]] = {}
+_jobs_lock = threading.Lock()
+
+
+def start_preprocess(dataset_cfg: Dict[str, Any], tokenizer_name: str, max_length: int = 512,
+                     num_proc: Optional[int] = None) -> Dict[str, Any]:
+    job = _new_job("tokenize", dataset_cfg, tokenizer=tokenizer_name, max_length=max_length, num_proc=num_proc)
+
+    def work(log):
+        from transformers import AutoTokenizer
+        log(f"Loading tokenizer {tokenizer_name}")
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        dataset = TokenCache().get_or_build(dataset_cfg, tokenizer, max_length=max_length,
+                                            log=log, num_proc=num_proc)
+        return {k: dataset.meta[k] for k in ("key", "num_records", "num_tokens", "size_bytes", "num_proc")
+                if k in dataset.meta}
+
+    return _start(job, work)
+
+
+def start_dedup(dataset_cfg: Dict[str, Any], threshold: Optional[float] = 0.8,
+                num_proc: Optional[int] = None) -> Dict[str, Any]:
+    job = _new_job("dedup", dataset_cfg, threshold=threshold, num_proc=num_proc)
+
+    def work(log):
+        from core.data.dedup import dedup_dataset
+        report = dedup_dataset(dataset_cfg, threshold, num_proc=num_proc, log=log)
+        return {k: v for k, v in report.items() if k != "examples"}
+
+    return _start(job, work)
+
+
+def _new_job(kind: str, dataset_cfg: Dict[str, Any], **fields) -> Dict[str, Any]:
+    return {
+        "job_id": str(uuid.uuid4()),
+        "kind": kind,
+        "dataset": dataset_cfg["path"],
+        **fields,
+        "status": "queued",
+        "log": [],
+        "result": None,
+        "error": None,
+        "created_at": datetime.datetime.now().isoformat(),
+    }
+
+
+def _start(job: Dict[str, Any], work: Callable) -> Dict[str, Any]:
+    with _jobs_lock:
+        _jobs[job["job_id"]] = job
+    thread = threading.Thread(target=_run, args=(job, work), name=f"{job['kind']}-{job['job_id'][:8]}",
+                              daemon=True)
+    thread.start()
+    return get_job(job["job_id"])
+
+
+def _run(job: Dict[str, Any], work: Callable):
+    def log(message: str):
+        line = f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {message}"
+        with _jobs_lock:
+            job["log"].append(line)
+
+    job["status"] = "running"
+    try:
+        job["result"] = work(log)
+        job["status"] = "completed"
+    except Exception as ex:
+        traceback.print_exc()
+        job["error"] = str(ex)
+        job["status"] = "failed"
+    finally:
+        job["finished_at"] = datetime.datetime.now().isoformat()
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return {**job, "log": list(job["log"])} if job else None
+
+
+def list_jobs() -> List[Dict[str, Any]]:
+    with _jobs_lock:
+        return [{k: v for k, v in job.items() if k != "log"} for job in _jobs.values()]
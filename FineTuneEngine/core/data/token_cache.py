@@ -0,0 +1,428 @@
+"""Content-addressed cache untuk dataset yang sudah di-tokenize.
+
+Key = sha256(hash isi file dataset, identitas tokenizer, max_length, format, cara
+baca record: csv/jsonl + kolom teks, lihat ``source_spec``).
+Setiap entry adalah folder ``cache/tokenized/<key>/`` berisi shard NumPy
+(``shard_NNNNN.ids.npy`` = token id int32 disambung, ``shard_NNNNN.offsets.npy``
+= batas tiap record) yang dibuka dengan ``mmap_mode="r"``, plus ``meta.json``
+(jumlah record/token, ukuran, hits, last_used). Eviction LRU berdasarkan
+``last_used`` sampai total ukuran di bawah budget disk.
+
+Setiap ``TokenizedDataset`` yang terbuka menaruh file lease ``lease-<pid>-<n>``
+di folder entry (dihapus saat dataset di-GC); entry dengan lease dari proses
+yang masih hidup tidak di-evict, termasuk yang di-mmap trainer di child process.
+"""
+import bisect, csv, hashlib, itertools, json, os, shutil, threading, time, weakref
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+CACHE_DIR = os.path.join("cache", "tokenized")
+DEFAULT_BUDGET_GB = float(os.environ.get("FINETUNE_TOKEN_CACHE_GB", "20"))
+RECORDS_PER_SHARD = 100_000
+TOKENIZE_BATCH = 1000
+# num_proc auto: satu worker per sekian byte input (file kecil tetap single-process)
+AUTO_BYTES_PER_PROC = 32 * 1024 ** 2
+
+_HASH_INDEX = "file_hashes.json"
+_LEASE_PREFIX = "lease-"
+_lock = threading.Lock()
+_lease_ids = itertools.count(1)
+
+
+# --- hashing ---
+
+def file_content_hash(path: str, cache_dir: str = CACHE_DIR) -> str:
+    """sha256 isi file; di-memo per (path, size, mtime) supaya file besar tidak di-hash ulang."""
+    st = os.stat(path)
+    memo_key = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    index_path = os.path.join(cache_dir, _HASH_INDEX)
+    index = _read_json(index_path) or {}
+    if memo_key in index:
+        return index[memo_key]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return remember_content_hash(path, h.hexdigest(), cache_dir)
+
+
+def remember_content_hash(path: str, digest: str, cache_dir: str = CACHE_DIR) -> str:
+    """Simpan hash yang sudah dihitung di tempat lain (mis. saat upload streaming) ke memo."""
+    st = os.stat(path)
+    memo_key = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    index_path = os.path.join(cache_dir, _HASH_INDEX)
+    with _lock:
+        os.makedirs(cache_dir, exist_ok=True)
+        index = _read_json(index_path) or {}
+        index[memo_key] = digest
+        _write_json(index_path, index)
+    return digest
+
+
+def tokenizer_fingerprint(tokenizer) -> str:
+    """Identitas tokenizer: nama + ukuran vocab + hash definisi tokenizer (fast tokenizer)."""
+    h = hashlib.sha256()
+    h.update(type(tokenizer).__name__.encode())
+    h.update(str(getattr(tokenizer, "name_or_path", "")).encode())
+    h.update(str(len(tokenizer)).encode())
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        # truncation/padding ikut berubah setiap kali tokenizer dipanggil, bukan bagian identitasnya
+        definition = json.loads(backend.to_str())
+        definition.pop("truncation", None)
+        definition.pop("padding", None)
+        h.update(json.dumps(definition, sort_keys=True).encode())
+    else:
+        h.update(json.dumps(tokenizer.get_vocab(), sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+
+def cache_key(content_hash: str, tokenizer_id: str, max_length: int, fmt: str, source: str) -> str:
+    raw = json.dumps([content_hash, tokenizer_id, max_length, fmt, source])
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+# --- reading source records ---
+
+def _is_csv(dataset_cfg: Dict[str, Any]) -> bool:
+    return dataset_cfg.get("type", "jsonl") == "csv" or dataset_cfg["path"].endswith(".csv")
+
+
+def text_column(dataset_cfg: Dict[str, Any]) -> str:
+    return (dataset_cfg.get("input_columns") or {}).get("text") or "text"
+
+
+def source_spec(dataset_cfg: Dict[str, Any]) -> str:
+    """Semua yang menentukan teks dari ``iter_texts`` selain isi file: parser + kolom."""
+    return f"{'csv' if _is_csv(dataset_cfg) else 'jsonl'}:{text_column(dataset_cfg)}"
+
+
+def iter_texts(dataset_cfg: Dict[str, Any], start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """Teks per record dari file JSONL/CSV sesuai DatasetConfig (kolom ``text`` default).
+
+    Untuk JSONL bisa dibatasi ke byte range [start, end): baris yang *mulai* di
+    dalam range ikut dibaca (pasangan dengan split_ranges).
+    """
+    path = dataset_cfg["path"]
+    column = text_column(dataset_cfg)
+    if _is_csv(dataset_cfg):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield row.get(column) or ""
+        return
+    with open(path, "rb") as f:
+        f.seek(start)
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            yield json.loads(line).get(column) or ""
+
+
+def split_ranges(path: str, parts: int) -> List[tuple]:
+    """Bagi file jadi maksimal ``parts`` byte range yang selalu mulai di awal baris."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, bounds[-1]))
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def resolve_num_proc(requested: Optional[int], path: str) -> int:
+    """num_proc dari config, atau auto: jumlah CPU (get_hardware_info) dibatasi ukuran file."""
+    if requested:
+        return max(1, int(requested))
+    from core.hardware import get_hardware_info
+    cpus = get_hardware_info().get("cpu_count") or os.cpu_count() or 1
+    by_size = -(-os.path.getsize(path) // AUTO_BYTES_PER_PROC)
+    return max(1, min(cpus - 1, by_size))
+
+
+def _batched(items: Iterator[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- cache ---
+
+class TokenizedDataset:
+    """Dataset read-only di atas shard mmap; item = {"input_ids": [...]} tanpa padding."""
+
+    def __init__(self, entry_dir: str):
+        import numpy as np
+        self.entry_dir = entry_dir
+        lease = _acquire_lease(entry_dir)
+        weakref.finalize(self, _release_lease, lease)
+        self.meta = _read_json(os.path.join(entry_dir, "meta.json"))
+        self._ids, self._offsets, self._starts = [], [], [0]
+        for shard in self.meta["shards"]:
+            self._ids.append(np.load(os.path.join(entry_dir, f"{shard}.ids.npy"), mmap_mode="r"))
+            offsets = np.load(os.path.join(entry_dir, f"{shard}.offsets.npy"), mmap_mode="r")
+            self._offsets.append(offsets)
+            self._starts.append(self._starts[-1] + len(offsets) - 1)
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def lengths(self) -> List[int]:
+        import numpy as np
+        return np.concatenate([np.diff(o) for o in self._offsets]).tolist() if self._offsets else []
+
+    def token_ids(self, idx: int):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        shard = bisect.bisect_right(self._starts, idx) - 1
+        local = idx - self._starts[shard]
+        offsets = self._offsets[shard]
+        return self._ids[shard][offsets[local]:offsets[local + 1]]
+
+    def __getitem__(self, idx: int) -> Dict[str, List[int]]:
+        return {"input_ids": self.token_ids(idx).tolist()}
+
+
+class TokenCache:
+    def __init__(self, cache_dir: str = CACHE_DIR, budget_gb: float = DEFAULT_BUDGET_GB):
+        self.cache_dir = cache_dir
+        self.budget_bytes = int(budget_gb * (1024 ** 3))
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get_or_build(self, dataset_cfg: Dict[str, Any], tokenizer, max_length: int = 512,
+                     log: Callable[[str], None] = print, num_proc: Optional[int] = None) -> TokenizedDataset:
+        fmt = dataset_cfg.get("format_standard", "INSTRUCTION_CHAT")
+        content_hash = file_content_hash(dataset_cfg["path"], self.cache_dir)
+        key = cache_key(content_hash, tokenizer_fingerprint(tokenizer), max_length, fmt, source_spec(dataset_cfg))
+        entry = self._entry_dir(key)
+
+        if os.path.exists(os.path.join(entry, "meta.json")):
+            dataset = TokenizedDataset(entry)
+            self._touch(entry, hit=True)
+            log(f"Tokenized dataset cache hit ({key[:12]})")
+            return dataset
+
+        num_proc = 1 if _is_csv(dataset_cfg) else resolve_num_proc(num_proc, dataset_cfg["path"])
+        log(f"Tokenized dataset cache miss ({key[:12]}), tokenizing with {num_proc} process(es) ...")
+        started = time.time()
+        meta = self._build(entry, key, dataset_cfg, tokenizer, max_length, fmt, content_hash, num_proc, log)
+        elapsed = time.time() - started
+        log(f"Tokenized {meta['num_records']} records / {meta['num_tokens']} tokens in {elapsed:.1f}s "
+            f"({meta['num_records'] / max(elapsed, 1e-9):.0f} records/s)")
+        dataset = TokenizedDataset(entry)
+        self.evict(keep=(key,))
+        return dataset
+
+    def _build(self, entry: str, key: str, dataset_cfg, tokenizer, max_length, fmt, content_hash,
+               num_proc: int = 1, log: Callable[[str], None] = print) -> Dict[str, Any]:
+        tmp = f"{entry}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(tmp, exist_ok=True)
+        ranges = split_ranges(dataset_cfg["path"], num_proc) if num_proc > 1 else [(0, None)]
+
+        if len(ranges) == 1:
+            parts = [_tokenize_range(dataset_cfg, 0, None, tokenizer, max_length, tmp, "shard_000")]
+        else:
+            # spawn: aman untuk tokenizer Rust & CUDA di proses parent
+            parts = [None] * len(ranges)
+            with ProcessPoolExecutor(len(ranges), mp_context=mp.get_context("spawn"),
+                                     initializer=_init_tokenize_worker) as pool:
+                futures = {
+                    pool.submit(_tokenize_range, dataset_cfg, start, end, tokenizer, max_length,
+                                tmp, f"shard_{i:03d}"): i
+                    for i, (start, end) in enumerate(ranges)
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    i = futures[future]
+                    parts[i] = future.result()
+                    log(f"Tokenized part {done}/{len(ranges)}: {parts[i]['records']} records")
+
+        # urutan merge = urutan byte range di file, bukan urutan selesai
+        shards = [name for part in parts for name in part["shards"]]
+        num_records = sum(part["records"] for part in parts)
+        num_tokens = sum(part["tokens"] for part in parts)
+
+        now = time.time()
+        meta = {
+            "key": key,
+            "dataset_path": os.path.abspath(dataset_cfg["path"]),
+            "content_hash": content_hash,
+            "tokenizer": getattr(tokenizer, "name_or_path", None),
+            "max_length": max_length,
+            "format": fmt,
+            "source": source_spec(dataset_cfg),
+            "shards": shards,
+            "num_records": num_records,
+            "num_tokens": num_tokens,
+            "size_bytes": _dir_size(tmp),
+            "created_at": now,
+            "last_used": now,
+            "hits": 0,
+            "builds": 1,
+            "num_proc": len(ranges),
+        }
+        _write_json(os.path.join(tmp, "meta.json"), meta)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # run lain sudah selesai build key yang sama duluan
+            shutil.rmtree(tmp, ignore_errors=True)
+        return meta
+
+    def _touch(self, entry: str, hit: bool):
+        meta_path = os.path.join(entry, "meta.json")
+        with _lock:
+            meta = _read_json(meta_path)
+            if meta is None:
+                return
+            meta["last_used"] = time.time()
+            if hit:
+                meta["hits"] = meta.get("hits", 0) + 1
+            _write_json(meta_path, meta)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        result = []
+        for name in os.listdir(self.cache_dir):
+            meta = _read_json(os.path.join(self.cache_dir, name, "meta.json"))
+            if meta is not None:
+                result.append(meta)
+        return sorted(result, key=lambda m: m.get("last_used", 0), reverse=True)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.entries()
+        hits = sum(e.get("hits", 0) for e in entries)
+        misses = sum(e.get("builds", 1) for e in entries)
+        return {
+            "entries": len(entries),
+            "total_bytes": sum(e.get("size_bytes", 0) for e in entries),
+            "budget_bytes": self.budget_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+
+    def evict(self, budget_bytes: Optional[int] = None, keep=()) -> List[str]:
+        """Hapus entry paling lama tidak dipakai sampai total ukuran <= budget.
+        Key di ``keep`` dan entry yang sedang dipakai (ada lease hidup) dilewati."""
+        budget = self.budget_bytes if budget_bytes is None else budget_bytes
+        entries = sorted(self.entries(), key=lambda m: m.get("last_used", 0))
+        total = sum(e.get("size_bytes", 0) for e in entries)
+        removed = []
+        for meta in entries:
+            if total <= budget:
+                break
+            if meta["key"] in keep or in_use(self._entry_dir(meta["key"])):
+                continue
+            shutil.rmtree(self._entry_dir(meta["key"]), ignore_errors=True)
+            total -= meta.get("size_bytes", 0)
+            removed.append(meta["key"])
+        return removed
+
+    def remove(self, key: str) -> bool:
+        entry = self._entry_dir(key)
+        if not os.path.isdir(entry):
+            return False
+        shutil.rmtree(entry, ignore_errors=True)
+        return True
+
+
+def _acquire_lease(entry_dir: str) -> str:
+    path = os.path.join(entry_dir, f"{_LEASE_PREFIX}{os.getpid()}-{next(_lease_ids)}")
+    open(path, "w").close()
+    return path
+
+
+def _release_lease(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def in_use(entry_dir: str) -> bool:
+    """True kalau ada TokenizedDataset terbuka untuk entry ini; lease proses mati dibersihkan."""
+    try:
+        names = [n for n in os.listdir(entry_dir) if n.startswith(_LEASE_PREFIX)]
+    except OSError:
+        return False
+    import psutil
+    alive = False
+    for name in names:
+        pid = name[len(_LEASE_PREFIX):].split("-")[0]
+        if pid.isdigit() and psutil.pid_exists(int(pid)):
+            alive = True
+        else:
+            _release_lease(os.path.join(entry_dir, name))
+    return alive
+
+
+def _init_tokenize_worker():
+    # paralelisme sudah di level proses; cegah oversubscription thread Rust tokenizer
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+
+def _tokenize_range(dataset_cfg, start, end, tokenizer, max_length, out_dir, prefix) -> Dict[str, Any]:
+    """Tokenize satu byte range dan tulis shard ``<prefix>_NNNNN``. Jalan di worker process."""
+    import numpy as np
+    shards, records, tokens = [], 0, 0
+    ids_buf: List[int] = []
+    offsets = [0]
+
+    def write_shard():
+        name = f"{prefix}_{len(shards):05d}"
+        np.save(os.path.join(out_dir, f"{name}.ids.npy"), np.asarray(ids_buf, dtype=np.int32))
+        np.save(os.path.join(out_dir, f"{name}.offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        shards.append(name)
+
+    for texts in _batched(iter_texts(dataset_cfg, start, end), TOKENIZE_BATCH):
+        encoded = tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]
+        for ids in encoded:
+            ids_buf.extend(ids)
+            offsets.append(len(ids_buf))
+            records += 1
+            tokens += len(ids)
+            if len(offsets) - 1 >= RECORDS_PER_SHARD:
+                write_shard()
+                ids_buf, offsets = [], [0]
+    if len(offsets) > 1 or not shards:
+        write_shard()
+    return {"shards": shards, "records": records, "tokens": tokens}
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict):
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
@@ -0,0 +1,310 @@
+"""Upload dataset secara streaming + resumable, dengan validasi dan hashing incremental.
+
+Setiap upload adalah sesi: bytes ditulis ke ``<data>/.uploads/<upload_id>.part``
+per chunk, sha256 dan jumlah baris/record dihitung sambil jalan, dan setiap
+baris JSONL divalidasi terhadap ``format_standard`` begitu barisnya lengkap.
+State sesi (offset yang sudah diterima) disimpan di ``<upload_id>.json`` sehingga
+client bisa melanjutkan dari offset terakhir, juga setelah server restart.
+
+Saat selesai file dipindah ke folder data dan statistiknya disimpan sebagai
+metadata dataset di ``<data>/.meta/<nama>.json`` (di-invalidasi oleh size/mtime)
+bersama index sidecar-nya (core/data/dataset_index.py), jadi listing tidak perlu
+membaca ulang file.
+"""
+import datetime, hashlib, json, os, threading, time, uuid
+from typing import Any, Dict, List, Optional
+
+from core.data.dataset_index import IndexBuilder
+from core.data.token_cache import remember_content_hash
+
+CHUNK_SIZE = 1 << 20
+MAX_ERRORS = 20
+UPLOADS_DIR = ".uploads"
+META_DIR = ".meta"
+
+# format_standard -> alternatif field yang harus ada (salah satu set terpenuhi)
+FORMAT_FIELDS: Dict[str, List[List[str]]] = {
+    "TEXT": [["text"]],
+    "INSTRUCTION_CHAT": [["text"], ["messages"], ["instruction", "output"], ["prompt", "response"]],
+}
+
+
+class UploadRejected(Exception):
+    pass
+
+
+class RecordValidator:
+    """Validasi record per baris dari aliran bytes yang terpotong di sembarang posisi."""
+
+    def __init__(self, format_standard: str = "INSTRUCTION_CHAT", input_columns: Optional[Dict] = None,
+                 file_type: str = "jsonl", max_errors: int = MAX_ERRORS):
+        columns = [c for c in (input_columns or {}).values() if c]
+        self.required = [columns] if columns else FORMAT_FIELDS.get(format_standard, [[]])
+        self.file_type = file_type
+        self.max_errors = max_errors
+        self.lines = 0
+        self.records = 0
+        self.invalid = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._pending = b""
+        self._header: Optional[List[str]] = None
+
+    def feed(self, chunk: bytes):
+        data = self._pending + chunk
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            self._line(data[start:end])
+            start = end + 1
+        self._pending = data[start:]
+
+    def finish(self):
+        if self._pending:
+            self._line(self._pending)
+            self._pending = b""
+
+    def _line(self, raw: bytes):
+        self.lines += 1
+        raw = raw.strip()
+        if not raw:
+            return
+        if self.file_type == "csv":
+            # header dicek terhadap kolom wajib; baris selanjutnya dihitung sebagai record
+            if self._header is None:
+                self._header = [c.strip().strip('"') for c in raw.decode("utf-8", "replace").split(",")]
+                if not self._satisfies(set(self._header)):
+                    self._error(f"header missing columns {self._expected()}")
+                return
+            self.records += 1
+            return
+
+        self.records += 1
+        try:
+            record = json.loads(raw)
+        except ValueError as ex:
+            self.invalid += 1
+            self._error(f"invalid JSON: {ex}")
+            return
+        if not isinstance(record, dict):
+            self.invalid += 1
+            self._error("record is not a JSON object")
+            return
+        if not self._satisfies({k for k, v in record.items() if v not in (None, "")}):
+            self.invalid += 1
+            self._error(f"missing fields, expected one of {self._expected()}")
+
+    def _satisfies(self, present) -> bool:
+        return any(all(f in present for f in fields) for fields in self.required)
+
+    def _expected(self) -> str:
+        return " | ".join("+".join(fields) for fields in self.required if fields) or "-"
+
+    def _error(self, message: str):
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": self.lines, "error": message})
+
+    def stats(self) -> Dict[str, Any]:
+        return {"lines": self.lines, "records": self.records, "invalid_records": self.invalid,
+                "errors": list(self.errors)}
+
+
+class UploadSession:
+    """Satu upload resumable. ``write`` dipanggil dari threadpool, bukan event loop."""
+
+    def __init__(self, data_dir: str, state: Dict[str, Any]):
+        self.data_dir = data_dir
+        self.state = state
+        # dipegang selama satu request chunk; request paralel ke sesi yang sama ditolak
+        self.lock = threading.Lock()
+        self._fh = None
+        self._hasher = hashlib.sha256()
+        self._validator = self._new_validator()
+        self._index = IndexBuilder(self._validator.file_type, state.get("input_columns"))
+        # sesi lama (server restart): bangun ulang hash/validator dari bytes yang sudah diterima
+        if state["offset"]:
+            with open(self.part_path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    self._consume(chunk)
+
+    @property
+    def upload_id(self) -> str:
+        return self.state["upload_id"]
+
+    @property
+    def part_path(self) -> str:
+        return os.path.join(self.data_dir, UPLOADS_DIR, f"{self.upload_id}.part")
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.data_dir, UPLOADS_DIR, f"{self.upload_id}.json")
+
+    def _new_validator(self) -> RecordValidator:
+        return RecordValidator(self.state["format_standard"], self.state.get("input_columns"),
+                               file_type="csv" if self.state["filename"].endswith(".csv") else "jsonl")
+
+    def _consume(self, chunk: bytes):
+        self._hasher.update(chunk)
+        self._validator.feed(chunk)
+        self._index.feed(chunk)
+
+    def write(self, chunk: bytes):
+        if self._fh is None:
+            self._fh = open(self.part_path, "ab")
+        self._fh.write(chunk)
+        self._consume(chunk)
+        self.state["offset"] += len(chunk)
+        max_invalid = self.state.get("max_invalid")
+        if max_invalid is not None and self._validator.invalid > max_invalid:
+            raise UploadRejected(f"More than {max_invalid} invalid records "
+                                 f"(first errors: {self._validator.errors[:3]})")
+
+    def checkpoint(self):
+        """Flush bytes ke disk lalu simpan offset; dipanggil di akhir setiap request chunk."""
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        self.state["updated_at"] = time.time()
+        _write_json(self.state_path, self.state)
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def status(self) -> Dict[str, Any]:
+        return {**self.state, **self._validator.stats()}
+
+    def complete(self, expected_sha256: Optional[str] = None) -> Dict[str, Any]:
+        size = self.state.get("size")
+        if size is not None and size != self.state["offset"]:
+            raise UploadRejected(f"Incomplete upload: received {self.state['offset']} of {size} bytes")
+        digest = self._hasher.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != digest:
+            raise UploadRejected(f"Checksum mismatch: expected {expected_sha256}, got {digest}")
+        self.close()
+        self._validator.finish()
+        target = os.path.join(self.data_dir, self.state["filename"])
+        os.replace(self.part_path, target)
+        os.remove(self.state_path)
+
+        stats = {
+            "name": self.state["filename"],
+            "size_bytes": self.state["offset"],
+            "sha256": digest,
+            "format_standard": self.state["format_standard"],
+            **self._validator.stats(),
+            "valid": self._validator.invalid == 0,
+            "uploaded_at": datetime.datetime.now().isoformat(),
+        }
+        write_dataset_meta(self.data_dir, self.state["filename"], stats)
+        # index sidecar ikut dibangun dari pass yang sama, tidak perlu scan ulang
+        self._index.save(self.data_dir, self.state["filename"])
+        remember_content_hash(target, digest)
+        return stats
+
+    def discard(self):
+        self.close()
+        for path in (self.part_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+_sessions: Dict[str, UploadSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(data_dir: str, filename: str, format_standard: str = "INSTRUCTION_CHAT",
+                   input_columns: Optional[Dict] = None, size: Optional[int] = None,
+                   max_invalid: Optional[int] = None) -> UploadSession:
+    os.makedirs(os.path.join(data_dir, UPLOADS_DIR), exist_ok=True)
+    state = {
+        "upload_id": str(uuid.uuid4()),
+        "filename": filename,
+        "format_standard": format_standard,
+        "input_columns": input_columns or {},
+        "size": size,
+        "max_invalid": max_invalid,
+        "offset": 0,
+        "created_at": time.time(),
+        "updated_at": time.time(),
+    }
+    session = UploadSession(data_dir, state)
+    open(session.part_path, "wb").close()
+    session.checkpoint()
+    with _sessions_lock:
+        _sessions[session.upload_id] = session
+    return session
+
+
+def get_session(data_dir: str, upload_id: str) -> Optional[UploadSession]:
+    with _sessions_lock:
+        session = _sessions.get(upload_id)
+        if session is not None:
+            return session
+        state = _read_json(os.path.join(data_dir, UPLOADS_DIR, f"{os.path.basename(upload_id)}.json"))
+        if state is None:
+            return None
+        part = os.path.join(data_dir, UPLOADS_DIR, f"{state['upload_id']}.part")
+        # bytes di .part setelah offset terakhir yang di-checkpoint dianggap belum diterima
+        with open(part, "ab") as f:
+            f.truncate(state["offset"])
+        session = _sessions[upload_id] = UploadSession(data_dir, state)
+        return session
+
+
+def drop_session(upload_id: str):
+    with _sessions_lock:
+        _sessions.pop(upload_id, None)
+
+
+def list_sessions(data_dir: str) -> List[Dict[str, Any]]:
+    folder = os.path.join(data_dir, UPLOADS_DIR)
+    if not os.path.isdir(folder):
+        return []
+    result = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".json"):
+            state = _read_json(os.path.join(folder, name))
+            if state is not None:
+                result.append(state)
+    return result
+
+
+# --- metadata dataset ---
+
+def write_dataset_meta(data_dir: str, name: str, stats: Dict[str, Any]):
+    st = os.stat(os.path.join(data_dir, name))
+    os.makedirs(os.path.join(data_dir, META_DIR), exist_ok=True)
+    _write_json(os.path.join(data_dir, META_DIR, f"{name}.json"),
+                {**stats, "size_bytes": st.st_size, "mtime_ns": st.st_mtime_ns})
+
+
+def read_dataset_meta(data_dir: str, name: str) -> Optional[Dict[str, Any]]:
+    """Metadata dataset, atau None kalau belum ada / file sudah berubah sejak metadata ditulis."""
+    meta = _read_json(os.path.join(data_dir, META_DIR, f"{name}.json"))
+    if meta is None:
+        return None
+    try:
+        st = os.stat(os.path.join(data_dir, name))
+    except OSError:
+        return None
+    if meta.get("size_bytes") != st.st_size or meta.get("mtime_ns") != st.st_mtime_ns:
+        return None
+    return meta
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict):
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
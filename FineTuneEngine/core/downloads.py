@@ -0,0 +1,309 @@
+"""Job download model dari Hugging Face Hub (atau mirror/stand-in lokal lewat ``HF_ENDPOINT``).
+
+Setiap job berjalan di background thread; jumlah job aktif dibatasi semaphore,
+file dalam satu job di-fetch paralel. File ditulis ke
+``<model>/.partial/<path>.incomplete`` lalu di-resume dengan header ``Range``
+kalau job diulang / retry, diverifikasi sambil streaming (sha256 untuk file LFS,
+git blob sha1 untuk file biasa) dan baru dipindah ke tempatnya setelah cocok. Progress
+dipublish ke event bus dengan ``run_id`` = job_id (type ``progress`` / ``state``).
+
+Endpoint yang dipakai (sama dengan huggingface_hub):
+
+* ``GET {endpoint}/api/models/{repo}/tree/{revision}?recursive=true`` - daftar file
+* ``GET {endpoint}/{repo}/resolve/{revision}/{path}`` - isi file
+"""
+import datetime, fnmatch, hashlib, json, os, shutil, threading, time, traceback, urllib.error, urllib.parse, \
+    urllib.request, uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from core.events import bus
+
+DEFAULT_ENDPOINT = os.environ.get("HF_ENDPOINT", "https://huggingface.co")
+MAX_CONCURRENT_JOBS = int(os.environ.get("FINETUNE_MAX_DOWNLOADS", "2"))
+MAX_PARALLEL_FILES = 4
+MAX_RETRIES = 3
+CHUNK_SIZE = 1 << 20
+PROGRESS_INTERVAL = 0.5
+PARTIAL_DIR = ".partial"
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+class HubClient:
+    def __init__(self, endpoint: str = DEFAULT_ENDPOINT, token: Optional[str] = None, timeout: float = 60):
+        self.endpoint = endpoint.rstrip("/")
+        self.token = token or os.environ.get("HF_TOKEN")
+        self.timeout = timeout
+
+    def _request(self, url: str, headers: Optional[Dict[str, str]] = None):
+        headers = dict(headers or {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=self.timeout)
+
+    def list_files(self, repo_id: str, revision: str = "main") -> List[Dict[str, Any]]:
+        """[{path, size, sha256 | git_sha1}] untuk semua file di repo."""
+        url = f"{self.endpoint}/api/models/{repo_id}/tree/{urllib.parse.quote(revision, safe='')}?recursive=true"
+        with self._request(url) as resp:
+            entries = json.load(resp)
+        files = []
+        for e in entries:
+            if e.get("type") != "file":
+                continue
+            lfs = e.get("lfs") or {}
+            files.append({
+                "path": e["path"],
+                "size": lfs.get("size", e.get("size")),
+                "sha256": lfs.get("oid") or lfs.get("sha256"),
+                "git_sha1": None if lfs else e.get("oid"),
+            })
+        return files
+
+    def open_file(self, repo_id: str, revision: str, path: str, offset: int = 0):
+        url = (f"{self.endpoint}/{repo_id}/resolve/{urllib.parse.quote(revision, safe='')}/"
+               f"{urllib.parse.quote(path)}")
+        return self._request(url, {"Range": f"bytes={offset}-"} if offset else None)
+
+
+class DownloadJob:
+    def __init__(self, repo_id: str, dest: str, revision: str = "main", allow_patterns: Optional[List[str]] = None):
+        self.job_id = str(uuid.uuid4())
+        self.repo_id = repo_id
+        self.dest = dest
+        self.revision = revision
+        self.allow_patterns = allow_patterns or []
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.created_at = datetime.datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self._last_progress = 0.0
+
+    def to_dict(self, include_files: bool = True) -> Dict[str, Any]:
+        with self.lock:
+            files = [dict(f) for f in self.files.values()]
+        total = sum(f["size"] or 0 for f in files)
+        done = sum(f["downloaded"] for f in files)
+        elapsed = None
+        if self.started_at:
+            end = datetime.datetime.fromisoformat(self.finished_at) if self.finished_at else datetime.datetime.now()
+            elapsed = (end - datetime.datetime.fromisoformat(self.started_at)).total_seconds()
+        data = {
+            "job_id": self.job_id,
+            "repo_id": self.repo_id,
+            "revision": self.revision,
+            "dest": self.dest,
+            "status": self.status,
+            "error": self.error,
+            "total_bytes": total,
+            "downloaded_bytes": done,
+            "progress": round(done / total, 4) if total else None,
+            "bytes_per_sec": round(done / elapsed) if elapsed else None,
+            "files_done": sum(1 for f in files if f["status"] == "done"),
+            "files_total": len(files),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_files:
+            data["files"] = files
+        return data
+
+
+class DownloadManager:
+    def __init__(self, endpoint: Optional[str] = None, token: Optional[str] = None,
+                 max_concurrent: int = MAX_CONCURRENT_JOBS, max_parallel_files: int = MAX_PARALLEL_FILES):
+        self.client = HubClient(endpoint or DEFAULT_ENDPOINT, token)
+        self.max_parallel_files = max_parallel_files
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._jobs: Dict[str, DownloadJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, repo_id: str, dest: str, revision: str = "main",
+               allow_patterns: Optional[List[str]] = None) -> DownloadJob:
+        with self._lock:
+            # job aktif untuk tujuan yang sama dipakai ulang, bukan ditulis dua kali
+            for job in self._jobs.values():
+                if job.dest == dest and job.status in ("queued", "running"):
+                    return job
+            job = DownloadJob(repo_id, dest, revision, allow_patterns)
+            self._jobs[job.job_id] = job
+        threading.Thread(target=self._run, args=(job,), name=f"download-{job.job_id[:8]}", daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[DownloadJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        return True
+
+    # --- worker ---
+
+    def _set_state(self, job: DownloadJob, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        # huruf besar seperti state run, supaya is_terminal_state berlaku juga untuk stream download
+        bus.publish(job.job_id, "state", {"state": status.capitalize(), "error": error})
+
+    def _progress(self, job: DownloadJob, force: bool = False):
+        now = time.monotonic()
+        if not force and now - job._last_progress < PROGRESS_INTERVAL:
+            return
+        job._last_progress = now
+        bus.publish(job.job_id, "progress", job.to_dict(include_files=False))
+
+    def _run(self, job: DownloadJob):
+        with self._slots:
+            if job.cancel_event.is_set():
+                self._set_state(job, "cancelled")
+                return
+            job.started_at = datetime.datetime.now().isoformat()
+            self._set_state(job, "running")
+            try:
+                files = self.client.list_files(job.repo_id, job.revision)
+                if job.allow_patterns:
+                    files = [f for f in files if any(fnmatch.fnmatch(f["path"], p) for p in job.allow_patterns)]
+                with job.lock:
+                    job.files = {f["path"]: {**f, "downloaded": 0, "status": "pending", "attempts": 0} for f in files}
+                os.makedirs(job.dest, exist_ok=True)
+
+                # file besar duluan supaya shard paralel tidak menunggu di ekor
+                ordered = sorted(files, key=lambda f: f["size"] or 0, reverse=True)
+                with ThreadPoolExecutor(self.max_parallel_files, thread_name_prefix="download-file") as pool:
+                    futures = [pool.submit(self._fetch_with_retry, job, f) for f in ordered]
+                    try:
+                        for future in as_completed(futures):
+                            future.result()
+                    except BaseException:
+                        job.cancel_event.set()  # hentikan file lain sebelum pool menunggu semuanya
+                        raise
+                shutil.rmtree(os.path.join(job.dest, PARTIAL_DIR), ignore_errors=True)
+                job.finished_at = datetime.datetime.now().isoformat()
+                self._progress(job, force=True)
+                self._set_state(job, "completed")
+            except DownloadCancelled:
+                job.cancel_event.set()
+                job.finished_at = datetime.datetime.now().isoformat()
+                self._set_state(job, "cancelled")
+            except Exception as ex:
+                traceback.print_exc()
+                job.finished_at = datetime.datetime.now().isoformat()
+                self._set_state(job, "failed", str(ex))
+
+    def _fetch_with_retry(self, job: DownloadJob, info: Dict[str, Any]):
+        state = job.files[info["path"]]
+        for attempt in range(1, MAX_RETRIES + 1):
+            if job.cancel_event.is_set():
+                raise DownloadCancelled()
+            state["attempts"] = attempt
+            try:
+                self._fetch(job, info, state)
+                return
+            except (DownloadCancelled, ChecksumMismatch):
+                raise
+            except (OSError, urllib.error.URLError) as ex:
+                state["error"] = str(ex)
+                if attempt == MAX_RETRIES:
+                    state["status"] = "failed"
+                    raise
+                # partial file tetap ada; attempt berikutnya lanjut dari offset terakhir
+                time.sleep(min(2 ** attempt, 10))
+
+    def _fetch(self, job: DownloadJob, info: Dict[str, Any], state: Dict[str, Any]):
+        target = os.path.join(job.dest, info["path"])
+        if os.path.exists(target) and (info["size"] is None or os.path.getsize(target) == info["size"]):
+            hasher = _hasher(info)
+            if hasher is None or _hash_file(target, hasher[0]) == hasher[1]:
+                state["downloaded"] = os.path.getsize(target)
+                state["status"] = "done"
+                state["resumed"] = "complete"
+                return
+
+        partial = os.path.join(job.dest, PARTIAL_DIR, info["path"] + ".incomplete")
+        os.makedirs(os.path.dirname(partial), exist_ok=True)
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        if info["size"] is not None and offset > info["size"]:
+            offset = 0
+        state["status"] = "downloading"
+
+        with self.client.open_file(job.repo_id, job.revision, info["path"], offset) as resp:
+            if offset and resp.status != 206:
+                offset = 0  # server tidak mendukung Range: ulang dari awal
+            hasher = _hasher(info)
+            if offset:
+                state["resumed"] = offset
+                if hasher is not None:
+                    _hash_file(partial, hasher[0])
+            state["downloaded"] = offset
+            with open(partial, "ab" if offset else "wb") as f:
+                while True:
+                    if job.cancel_event.is_set():
+                        raise DownloadCancelled()
+                    chunk = resp.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    if hasher is not None:
+                        hasher[0].update(chunk)
+                    state["downloaded"] += len(chunk)
+                    self._progress(job)
+
+        if info["size"] is not None and os.path.getsize(partial) != info["size"]:
+            raise OSError(f"{info['path']}: incomplete ({os.path.getsize(partial)}/{info['size']} bytes)")
+        if hasher is not None and hasher[0].hexdigest() != hasher[1]:
+            os.remove(partial)
+            state["status"] = "failed"
+            raise ChecksumMismatch(f"{info['path']}: checksum mismatch")
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        os.replace(partial, target)
+        state["status"] = "done"
+        self._progress(job, force=True)
+
+
+def _hasher(info: Dict[str, Any]):
+    """(hash object, digest yang diharapkan): sha256 untuk file LFS, git blob sha1 untuk file biasa."""
+    if info.get("sha256"):
+        return hashlib.sha256(), info["sha256"]
+    if info.get("git_sha1") and info.get("size") is not None:
+        h = hashlib.sha1()
+        h.update(f"blob {info['size']}\0".encode())
+        return h, info["git_sha1"]
+    return None
+
+
+def _hash_file(path: str, h) -> str:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+_manager: Optional[DownloadManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_download_manager() -> DownloadManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DownloadManager()
+        return _manager
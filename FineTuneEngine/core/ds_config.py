@@ -0,0 +1,234 @@
+"""Config DeepSpeed yang diturunkan dari run: ZeRO stage, offload CPU, bucket dan precision.
+
+``plan_zero`` membandingkan estimasi memori core.planner (ukuran model dari
+config.json) dengan VRAM GPU target dan RAM host:
+
+- muat di GPU                  -> ZeRO-2 tanpa offload
+- state optimizer tidak muat   -> ZeRO-2 + offload optimizer (dan gradient fp32) ke CPU
+- bobot juga tidak muat        -> ZeRO-3 + offload optimizer & parameter ke CPU
+  (QLoRA: bobot 4-bit bitsandbytes tidak bisa dipartisi / di-offload, maksimal ZeRO-2)
+- RAM host tidak cukup untuk keduanya -> offload yang paling banyak menghemat GPU
+  dan masih muat di host
+
+Offload hanya dipilih kalau RAM host cukup menampung state yang dipindah.
+``fits`` false berarti estimasi peak tetap di atas budget GPU; DeepSpeedTrainer
+menolak run itu kecuali stage / offload diset eksplisit di ``cfg["deepspeed"]``.
+``build_ds_config`` lalu mengisi bucket dengan rumus "auto" integrasi HF
+(``hidden_size``^2 dst.), precision dari ``training.bf16`` / ``training.fp16`` dan
+batch dari BaseTrainer.batch_settings. ``cfg["deepspeed"]`` selalu menang:
+``zero_stage``, ``offload_optimizer``, ``offload_param`` dan ``config`` (dict yang
+di-merge ke hasil akhir).
+
+File config content-addressed (``configs/deepspeed/ds_<sha256[:16]>.json``): run
+dengan config identik memakai file yang sama. ``cleanup_configs`` menghapus file
+yang tidak dipakai job aktif dan sudah lama tidak disentuh, termasuk file lama
+per run ``configs/deepspeed_<run_id>.json``.
+"""
+import glob, hashlib, json, os, time
+from typing import Any, Callable, Dict, List, Optional
+
+from core.planner import FRAGMENTATION, device_budget, estimate, normalize_config
+
+CONFIG_ROOT = "configs"
+CONFIG_DIR = os.path.join(CONFIG_ROOT, "deepspeed")
+# file yang tidak dipakai job aktif baru dihapus setelah sekian detik tidak disentuh
+ORPHAN_AGE_SEC = float(os.environ.get("FINETUNE_DS_CONFIG_MAX_AGE_HOURS", "24")) * 3600
+RAM_FRACTION = 0.8  # sama dengan slot RAM scheduler
+_ACTIVE_JOB_STATES = ["queued", "running", "cancelling"]
+
+
+def precision(training: Dict[str, Any]) -> str:
+    """"fp16" | "bf16" | "fp32". bf16 default-nya aktif, jadi fp16=true (GPU tanpa bf16) yang menang."""
+    if training.get("fp16", False):
+        return "fp16"
+    if training.get("bf16", True):
+        return "bf16"
+    return "fp32"
+
+
+# precision() -> nama dtype torch untuk load model & mask collator
+TORCH_DTYPES = {"bf16": "bfloat16", "fp16": "float16", "fp32": "float32"}
+
+
+def plan_zero(model_config: Dict[str, Any], cfg: Dict[str, Any], hardware: Dict[str, Any],
+              gpu_index: Optional[int] = None) -> Dict[str, Any]:
+    """Pilih ZeRO stage + offload untuk run ``cfg``; nilai eksplisit di ``cfg["deepspeed"]`` dihormati."""
+    ds = cfg.get("deepspeed") or {}
+    training = cfg.get("training") or {}
+    strategy = (cfg.get("strategy") or "lora").lower()
+    shape = normalize_config(model_config)
+    device = device_budget(hardware, gpu_index)
+    mem = estimate(shape, strategy, int(training.get("max_seq_length", 512)), 1, cfg.get("lora"),
+                   bool(training.get("gradient_checkpointing", False)), device["device"])
+    host_gb = float(hardware.get("ram_gb", 0)) * RAM_FRACTION
+
+    # offload optimizer: state AdamW + gradient fp32 pindah ke CPU, GPU hanya memegang bucket
+    offload_opt_saves = (mem["optimizer_gb"] + mem["gradients_gb"]) * FRAGMENTATION
+    offload_opt_host = mem["optimizer_gb"] + 2 * mem["gradients_gb"]
+    # offload parameter (ZeRO-3): di GPU tersisa kira-kira dua layer yang sedang di-gather
+    layer_share = 2 / shape["num_hidden_layers"]
+    offload_param_saves = mem["weights_gb"] * (1 - layer_share) * FRAGMENTATION
+    peak = mem["peak_gb"]
+    budget = device["budget_gb"]
+
+    if device["device"] != "cuda":
+        stage, off_opt, off_param, reason = 2, False, False, "no GPU visible"
+    elif peak <= budget:
+        stage, off_opt, off_param, reason = 2, False, False, "model states fit in GPU memory"
+    elif peak - offload_opt_saves <= budget and offload_opt_host <= host_gb:
+        stage, off_opt, off_param, reason = 2, True, False, "optimizer state offloaded to fit GPU memory"
+    elif strategy != "qlora" and offload_opt_host + mem["weights_gb"] <= host_gb:
+        stage, off_opt, off_param, reason = 3, True, True, "parameters and optimizer offloaded"
+    else:
+        # RAM host tidak cukup untuk semua offload: pilih yang paling banyak menghemat GPU dan masih muat
+        options = [(offload_opt_saves, 2, True, False, offload_opt_host)]
+        if strategy != "qlora":
+            options.append((offload_param_saves, 3, False, True, mem["weights_gb"]))
+        options = [o for o in options if o[4] <= host_gb] or [(0.0, 2, False, False, 0.0)]
+        _, stage, off_opt, off_param, _ = max(options)
+        reason = ("not enough host RAM to offload both optimizer and parameters" if strategy != "qlora"
+                  else "QLoRA weights cannot be offloaded")
+
+    if "zero_stage" in ds:
+        stage = int(ds["zero_stage"])
+    off_opt = bool(ds.get("offload_optimizer", off_opt)) and stage >= 1
+    off_param = bool(ds.get("offload_param", off_param)) and stage == 3
+    if strategy == "qlora" and stage == 3:
+        reason += "; ZeRO-3 cannot partition 4-bit weights"
+    fits = None
+    if device["device"] == "cuda":
+        fits = peak - (offload_opt_saves if off_opt else 0.0) - (offload_param_saves if off_param else 0.0) <= budget
+        if not fits:
+            reason += "; estimated peak still exceeds GPU memory"
+    return {
+        "stage": stage,
+        "offload_optimizer": off_opt,
+        "offload_param": off_param,
+        "fits": fits,
+        "reason": reason,
+        "hidden_size": shape["hidden_size"],
+        "device": device,
+        "host_budget_gb": round(host_gb, 2),
+        "estimated_peak_gb": peak,
+    }
+
+
+def shares_process(cfg: Dict[str, Any], models_dir: Optional[str] = None) -> bool:
+    """Boleh jalan di ModelHost bersama run lain? Tidak untuk ZeRO-3: integrasi HF memasang
+    ``zero.Init`` secara global per proses saat load model. Config model tidak ada lokal = tidak."""
+    from core.hardware import get_hardware_info
+    from core.planner import find_model_config
+
+    if "zero_stage" in (cfg.get("deepspeed") or {}):
+        return int(cfg["deepspeed"]["zero_stage"]) < 3
+    model_config = find_model_config(cfg.get("base_model") or "", models_dir)
+    if model_config is None:
+        return False
+    return plan_zero(model_config, cfg, get_hardware_info(), (cfg.get("compute") or {}).get("gpu_index"))["stage"] < 3
+
+
+def _offload(enabled: bool) -> Dict[str, Any]:
+    return {"device": "cpu", "pin_memory": True} if enabled else {"device": "none"}
+
+
+def _merge(base: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(base)
+    for key, value in patch.items():
+        out[key] = _merge(out[key], value) if isinstance(value, dict) and isinstance(out.get(key), dict) else value
+    return out
+
+
+def build_ds_config(zero: Dict[str, Any], cfg: Dict[str, Any], batch: Dict[str, Any]) -> Dict[str, Any]:
+    """ds_config lengkap dari hasil ``plan_zero`` + batch final (per_device_train_batch_size,
+    gradient_accumulation_steps); harus sama dengan TrainingArguments trainer."""
+    training = cfg.get("training") or {}
+    h = zero["hidden_size"]
+    zero_opt: Dict[str, Any] = {
+        "stage": zero["stage"],
+        "offload_optimizer": _offload(zero["offload_optimizer"]),
+        "offload_param": _offload(zero["offload_param"]),
+        "overlap_comm": True,
+        "contiguous_gradients": True,
+        # rumus nilai "auto" integrasi HF DeepSpeed
+        "reduce_bucket_size": h * h,
+    }
+    if zero["stage"] == 3:
+        zero_opt.update({
+            "stage3_prefetch_bucket_size": int(0.9 * h * h),
+            "stage3_param_persistence_threshold": 10 * h,
+            # save_model menulis bobot utuh, bukan shard kosong per rank
+            "stage3_gather_16bit_weights_on_model_save": True,
+        })
+    else:
+        zero_opt["allgather_bucket_size"] = h * h
+
+    mode = precision(training)
+    fp16: Dict[str, Any] = {"enabled": mode == "fp16"}
+    if mode == "fp16":
+        fp16.update({"loss_scale": 0, "initial_scale_power": 16, "loss_scale_window": 1000, "hysteresis": 2,
+                     "min_loss_scale": 1})
+    ds_config = {
+        "zero_optimization": zero_opt,
+        "fp16": fp16,
+        "bf16": {"enabled": mode == "bf16"},
+        "train_micro_batch_size_per_gpu": batch["per_device_train_batch_size"],
+        "gradient_accumulation_steps": batch["gradient_accumulation_steps"],
+        "gradient_clipping": 1.0,  # = TrainingArguments.max_grad_norm default
+        "steps_per_print": 50,
+        "wall_clock_breakdown": bool((cfg.get("profile") or {}).get("wall_clock_breakdown", False)),
+    }
+    return _merge(ds_config, (cfg.get("deepspeed") or {}).get("config") or {})
+
+
+def config_hash(ds_config: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(ds_config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def write_config(ds_config: Dict[str, Any], config_dir: str = CONFIG_DIR) -> str:
+    """Path file untuk ``ds_config``; ditulis hanya kalau belum ada (kalau ada, mtime di-touch)."""
+    path = os.path.join(config_dir, f"ds_{config_hash(ds_config)}.json")
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    os.makedirs(config_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ds_config, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+    return path
+
+
+def cleanup_configs(db, config_root: str = CONFIG_ROOT, max_age_sec: float = ORPHAN_AGE_SEC,
+                    log: Callable[[str], None] = print) -> List[str]:
+    """Hapus config yang tidak dipakai job queued/running dan lebih lama dari ``max_age_sec``;
+    file lama ``deepspeed_<run_id>.json`` dihapus begitu run-nya tidak aktif."""
+    active_runs, active_paths = set(), set()
+    for job in db.list_jobs(_ACTIVE_JOB_STATES):
+        active_runs.add(job["run_id"])
+        run = db.get_run(job["run_id"])
+        path = (run or {}).get("config", {}).get("deepspeed_config")
+        if path:
+            active_paths.add(os.path.abspath(path))
+
+    removed = []
+    now = time.time()
+    for path in glob.glob(os.path.join(config_root, "deepspeed", "ds_*.json")):
+        if os.path.abspath(path) in active_paths:
+            continue
+        try:
+            if now - os.path.getmtime(path) > max_age_sec:
+                os.remove(path)
+                removed.append(path)
+        except OSError:
+            pass  # dihapus proses lain
+    for path in glob.glob(os.path.join(config_root, "deepspeed_*.json")):
+        run_id = os.path.basename(path)[len("deepspeed_"):-len(".json")]
+        if run_id not in active_runs:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError:
+                pass
+    if removed:
+        log(f"Removed {len(removed)} unused DeepSpeed config(s)")
+    return removed
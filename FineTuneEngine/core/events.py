@@ -0,0 +1,137 @@
+"""In-process pub/sub untuk event run (log, metric, checkpoint, state).
+
+Publisher (thread trainer, storage) memanggil ``bus.publish`` secara sync; subscriber
+async (SSE/WebSocket) menerima event lewat ``asyncio.Queue`` per client yang
+bounded. Kalau client terlalu lambat, event paling lama dibuang dan dihitung di
+``Subscription.dropped`` supaya trainer tidak pernah ikut ter-block.
+"""
+import asyncio, threading, time, itertools
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+TERMINAL_STATES = ("Completed", "Failed", "Cancelled")
+
+
+def is_terminal_state(state: Optional[str]) -> bool:
+    return bool(state) and (state in TERMINAL_STATES or state.startswith("Error"))
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", run_id: str, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.bus = bus
+        self.run_id = run_id
+        self.loop = loop
+        self.queue: "asyncio.Queue[Dict]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _offer(self, event: Dict):
+        # dijalankan di event loop subscriber
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, history_size: int = 2000, queue_size: int = 1000):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._subs: Dict[str, List[Subscription]] = {}
+        self._history: Dict[str, Deque[Dict]] = {}
+        self._last_step: Dict[str, int] = {}
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    def publish(self, run_id: str, type: str, data: Dict[str, Any], step: Optional[int] = None) -> Dict:
+        with self._lock:
+            if step is None:
+                step = self._last_step.get(run_id)
+            else:
+                self._last_step[run_id] = max(step, self._last_step.get(run_id, step))
+            event = {
+                "seq": next(self._seq),
+                "run_id": run_id,
+                "type": type,
+                "step": step,
+                "ts": time.time(),
+                "data": data,
+            }
+            history = self._history.setdefault(run_id, deque(maxlen=self.history_size))
+            history.append(event)
+            subs = list(self._subs.get(run_id, ()))
+            listeners = list(self._listeners)
+
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:
+                # loop subscriber sudah ditutup
+                self.unsubscribe(sub)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                pass
+        return event
+
+    def subscribe(self, run_id: str, maxsize: Optional[int] = None) -> Subscription:
+        """Harus dipanggil dari dalam event loop (coroutine endpoint)."""
+        sub = Subscription(self, run_id, asyncio.get_running_loop(), maxsize or self.queue_size)
+        with self._lock:
+            self._subs.setdefault(run_id, []).append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subs.get(sub.run_id, [])
+            if sub in subs:
+                subs.remove(sub)
+            if not subs:
+                self._subs.pop(sub.run_id, None)
+
+    def add_listener(self, fn: Callable[[Dict], None]):
+        """Callback sync untuk semua event (dipanggil di thread publisher)."""
+        with self._lock:
+            self._listeners.append(fn)
+
+    def remove_listener(self, fn: Callable[[Dict], None]):
+        with self._lock:
+            if fn in self._listeners:
+                self._listeners.remove(fn)
+
+    def history(self, run_id: str, from_step: Optional[int] = None, after_seq: Optional[int] = None) -> List[Dict]:
+        """Event yang masih ada di ring buffer, untuk replay saat client reconnect."""
+        with self._lock:
+            events = list(self._history.get(run_id, ()))
+        if after_seq is not None:
+            events = [e for e in events if e["seq"] > after_seq]
+        if from_step is not None:
+            events = [e for e in events if e["step"] is not None and e["step"] >= from_step]
+        return events
+
+    def subscriber_count(self, run_id: str) -> int:
+        with self._lock:
+            return len(self._subs.get(run_id, ()))
+
+    def last_step(self, run_id: str) -> Optional[int]:
+        """Step terbesar yang sudah dipublish untuk run ini (None kalau belum ada)."""
+        with self._lock:
+            return self._last_step.get(run_id)
+
+    def forget(self, run_id: str):
+        with self._lock:
+            self._history.pop(run_id, None)
+            self._last_step.pop(run_id, None)
+
+
+bus = EventBus()
@@ -1,21 +1,129 @@
-import torch, psutil, platform, shutil, subprocess
+"""Info hardware host tanpa meng-import torch.
 
-def get_hardware_info():
-    info = {
+GPU dideteksi lewat NVML (``nvidia-ml-py``), lalu ``nvidia-smi`` sebagai fallback;
+torch hanya dipakai kalau sudah ter-import di proses ini (mis. di worker
+training). Urutan GPU mengikuti ``CUDA_VISIBLE_DEVICES`` supaya ``index`` sama
+dengan device index CUDA yang dilihat trainer. ``cuda_version`` dari NVML /
+nvidia-smi adalah versi CUDA maksimal yang didukung driver.
+"""
+import os, sys, psutil, platform, shutil, subprocess
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+
+def _visible(gpus: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Filter + urutkan sesuai CUDA_VISIBLE_DEVICES (index atau UUID), lalu index ulang 0..n-1."""
+    spec = os.environ.get("CUDA_VISIBLE_DEVICES")
+    if spec is None:
+        return gpus
+    chosen = []
+    for item in (s.strip() for s in spec.split(",")):
+        match = next((g for g in gpus if item and (str(g["index"]) == item or g.get("uuid", "").startswith(item))), None)
+        if match is None:
+            break  # sama dengan CUDA: device tidak valid memotong sisa daftar
+        chosen.append(match)
+    return [{**g, "index": i} for i, g in enumerate(chosen)]
+
+
+def _from_torch() -> Optional[Dict[str, Any]]:
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return None
+    if not torch.cuda.is_available():
+        return {"cuda_version": None, "gpus": []}
+    return {"cuda_version": torch.version.cuda, "gpus": [{
+        "index": i,
+        "name": torch.cuda.get_device_name(i),
+        "vram_gb": round(torch.cuda.get_device_properties(i).total_memory / (1024**3), 2)
+    } for i in range(torch.cuda.device_count())]}
+
+
+def _from_nvml() -> Optional[Dict[str, Any]]:
+    try:
+        import pynvml
+        pynvml.nvmlInit()
+    except Exception:
+        return None
+    try:
+        gpus = []
+        for i in range(pynvml.nvmlDeviceGetCount()):
+            handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+            name = pynvml.nvmlDeviceGetName(handle)
+            uuid = pynvml.nvmlDeviceGetUUID(handle)
+            gpus.append({
+                "index": i,
+                "name": name.decode() if isinstance(name, bytes) else name,
+                "uuid": uuid.decode() if isinstance(uuid, bytes) else uuid,
+                "vram_gb": round(pynvml.nvmlDeviceGetMemoryInfo(handle).total / (1024**3), 2),
+            })
+        version = pynvml.nvmlSystemGetCudaDriverVersion()
+        return {"cuda_version": f"{version // 1000}.{version % 1000 // 10}", "gpus": gpus}
+    except Exception:
+        return None
+    finally:
+        pynvml.nvmlShutdown()
+
+
+def _from_nvidia_smi() -> Optional[Dict[str, Any]]:
+    if shutil.which("nvidia-smi") is None:
+        return None
+    try:
+        out = subprocess.run(
+            ["nvidia-smi", "--query-gpu=index,name,memory.total,uuid", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, timeout=10, check=True,
+        ).stdout
+        header = subprocess.run(["nvidia-smi"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    gpus = []
+    for line in out.strip().splitlines():
+        index, name, total_mb, uuid = [s.strip() for s in line.split(",")]
+        gpus.append({"index": int(index), "name": name, "uuid": uuid,
+                     "vram_gb": round(float(total_mb) / 1024, 2)})
+    version = header.split("CUDA Version:")[1].split()[0] if "CUDA Version:" in header else None
+    return {"cuda_version": version, "gpus": gpus}
+
+
+@lru_cache(maxsize=1)
+def _detect_gpus() -> Dict[str, Any]:
+    """GPU tidak berubah selama proses hidup; deteksi (NVML / subprocess) cukup sekali."""
+    for probe in (_from_nvml, _from_nvidia_smi):
+        found = probe()
+        if found is not None:
+            return {**found, "gpus": _visible(found["gpus"])}
+    return {"cuda_version": None, "gpus": []}
+
+
+@lru_cache(maxsize=1)
+def _host_info() -> Dict[str, Any]:
+    return {
         "system": platform.system(),
         "release": platform.release(),
         "python_version": platform.python_version(),
-        "cuda_available": torch.cuda.is_available(),
-        "cuda_version": torch.version.cuda if torch.cuda.is_available() else None,
-        "num_gpus": torch.cuda.device_count(),
         "cpu": platform.processor(),
+        "cpu_count": psutil.cpu_count(logical=True),
+        "cpu_physical_cores": psutil.cpu_count(logical=False),
         "ram_gb": round(psutil.virtual_memory().total / (1024 ** 3), 2),
+    }
+
+
+def get_hardware_info():
+    """Info statis host (di-cache) + disk free; pemakaian live ada di core.telemetry."""
+    gpu = _from_torch() or _detect_gpus()
+    host = _host_info()
+    info = {
+        "system": host["system"],
+        "release": host["release"],
+        "python_version": host["python_version"],
+        "cuda_available": bool(gpu["gpus"]),
+        "cuda_version": gpu["cuda_version"] if gpu["gpus"] else None,
+        "num_gpus": len(gpu["gpus"]),
+        "cpu": host["cpu"],
+        "cpu_count": host["cpu_count"],
+        "cpu_physical_cores": host["cpu_physical_cores"],
+        "ram_gb": host["ram_gb"],
         "disk_free_gb": round(shutil.disk_usage("/").free / (1024 ** 3), 2)
     }
     if info["cuda_available"]:
-        info["gpu_list"] = [{
-            "index": i,
-            "name": torch.cuda.get_device_name(i),
-            "vram_gb": round(torch.cuda.get_device_properties(i).total_memory / (1024**3), 2)
-        } for i in range(info["num_gpus"])]
+        info["gpu_list"] = [{k: g[k] for k in ("index", "name", "vram_gb")} for g in gpu["gpus"]]
     return info
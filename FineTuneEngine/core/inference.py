@@ -0,0 +1,391 @@
+"""Inference & evaluasi adapter LoRA di atas satu base model yang di-load sekali.
+
+``AdapterServer`` meminjam base model dari BaseModelCache dan me-load adapter
+LoRA on demand (``models/<run_id>_adapter`` hasil ``trainer.save_model``, atau
+path folder adapter), maksimal ``max_adapters`` sekaligus (LRU). Semua kerja
+model jalan di satu worker thread:
+
+- setiap prompt / teks jadi satu item di antrian; worker mengambil item pertama
+  lalu menunggu maksimal ``max_wait_ms`` (dihitung dari item itu masuk) untuk
+  item sejenis lain (generate dengan parameter sama, atau score) sampai
+  ``max_batch`` (dynamic micro-batching antar request yang bersamaan);
+- satu micro-batch boleh berisi adapter berbeda: PEFT ``adapter_names`` memilih
+  adapter per baris (``"__base__"`` = base model tanpa adapter), jadi tidak perlu
+  swap adapter di antara request.
+
+Generate memakai KV cache HF (``use_cache``): prompt di-prefill sekali per batch
+dan tiap token baru hanya menghitung posisi terakhir. Score = satu forward per
+batch; ``evaluate`` membaca dataset secara streaming (``iter_texts``) dan
+mengirim batch lewat antrian yang sama, jadi request online tetap dilayani di
+sela-selanya. Latency dan tokens/sec dicatat per batch (lihat ``stats()``).
+
+torch / transformers / peft baru di-import saat server pertama dipakai.
+"""
+import hashlib, json, os, threading, time, traceback
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+ADAPTER_DIR = "models"  # trainer menyimpan adapter ke models/<run_id>_adapter (relatif cwd)
+DEFAULT_MAX_BATCH = int(os.environ.get("FINETUNE_INFER_MAX_BATCH", "8"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("FINETUNE_INFER_MAX_WAIT_MS", "10"))
+DEFAULT_MAX_ADAPTERS = int(os.environ.get("FINETUNE_INFER_MAX_ADAPTERS", "8"))
+_BASE = "__base__"
+_LATENCY_WINDOW = 1000
+
+
+def resolve_adapter(adapter: str) -> str:
+    """Folder adapter dari path atau run_id (``models/<run_id>_adapter``); ValueError kalau tidak ada."""
+    for path in (adapter, os.path.join(ADAPTER_DIR, f"{adapter}_adapter")):
+        if os.path.isfile(os.path.join(path, "adapter_config.json")):
+            return os.path.abspath(path)
+    raise ValueError(f"Adapter '{adapter}' not found (expected adapter_config.json).")
+
+
+def adapter_base_model(adapter: str) -> Optional[str]:
+    """``base_model_name_or_path`` dari adapter_config.json."""
+    with open(os.path.join(resolve_adapter(adapter), "adapter_config.json"), encoding="utf-8") as f:
+        return json.load(f).get("base_model_name_or_path")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ranked = sorted(values)
+    return round(ranked[min(len(ranked) - 1, int(len(ranked) * pct / 100))], 2)
+
+
+class _Item:
+    __slots__ = ("kind", "key", "adapter", "payload", "future", "enqueued")
+
+    def __init__(self, kind: str, key: tuple, adapter: Optional[str], payload: Any):
+        self.kind = kind
+        self.key = key
+        self.adapter = adapter
+        self.payload = payload
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class AdapterServer:
+    def __init__(self, base_model: str, torch_dtype: Optional[str] = None, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, max_adapters: int = DEFAULT_MAX_ADAPTERS,
+                 max_length: int = 1024, log: Callable[[str], None] = print):
+        self.base_model = base_model
+        self.torch_dtype = torch_dtype
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.max_adapters = max_adapters
+        self.max_length = max_length
+        self.log = log
+        self._pending: "deque[_Item]" = deque()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        # dimiliki worker thread
+        self._lease = None
+        self._model = None
+        self._tokenizer = None
+        self._adapters: "OrderedDict[str, str]" = OrderedDict()  # path adapter -> nama adapter PEFT
+        self._stats = {"requests": 0, "batches": 0, "items": 0, "tokens": 0, "compute_sec": 0.0,
+                       "load_sec": None, "adapter_loads": 0, "adapter_evictions": 0}
+        self._latencies: "deque[float]" = deque(maxlen=_LATENCY_WINDOW)
+        self._batch_sizes: "deque[int]" = deque(maxlen=_LATENCY_WINDOW)
+
+    # --- lifecycle ---
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(target=self._loop, name=f"infer:{self.base_model}", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 30.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- public API (thread mana saja) ---
+
+    def submit(self, kind: str, payload: Any, adapter: Optional[str] = None, **params) -> Future:
+        """Antrikan satu item (prompt untuk ``generate``, teks untuk ``score``)."""
+        if kind not in ("generate", "score"):
+            raise ValueError(f"unknown inference kind '{kind}'")
+        path = resolve_adapter(adapter) if adapter else None
+        key = (kind, tuple(sorted(params.items())))
+        item = _Item(kind, key, path, payload)
+        self.start()
+        with self._cond:
+            if self._stop:
+                raise RuntimeError("inference server is closed")
+            self._pending.append(item)
+            self._cond.notify_all()
+        return item.future
+
+    def generate(self, prompts: List[str], adapter: Optional[str] = None, max_new_tokens: int = 64,
+                 temperature: float = 0.0, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        futures = [self.submit("generate", p, adapter, max_new_tokens=int(max_new_tokens),
+                               temperature=float(temperature)) for p in prompts]
+        self._count_request()
+        return [f.result(timeout) for f in futures]
+
+    def score(self, texts: List[str], adapter: Optional[str] = None,
+              timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        futures = [self.submit("score", t, adapter) for t in texts]
+        self._count_request()
+        return [f.result(timeout) for f in futures]
+
+    def evaluate(self, texts: Iterator[str], adapter: Optional[str] = None, max_records: Optional[int] = None,
+                 timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Loss / perplexity rata-rata per token atas ``texts``, dikirim per ``max_batch`` item
+        (memori konstan berapapun ukuran dataset)."""
+        started = time.perf_counter()
+        nll, tokens, records, chunk = 0.0, 0, 0, []
+
+        def flush():
+            nonlocal nll, tokens, records
+            for result in self.score(chunk, adapter, timeout):
+                nll += result["nll"]
+                tokens += result["tokens"]
+                records += 1
+            chunk.clear()
+
+        for text in texts:
+            if max_records is not None and records + len(chunk) >= max_records:
+                break
+            if text:
+                chunk.append(text)
+            if len(chunk) >= self.max_batch:
+                flush()
+        if chunk:
+            flush()
+        elapsed = time.perf_counter() - started
+        loss = nll / tokens if tokens else None
+        return {
+            "adapter": adapter,
+            "records": records,
+            "tokens": tokens,
+            "loss": round(loss, 6) if loss is not None else None,
+            "perplexity": round(_exp(loss), 4) if loss is not None else None,
+            "elapsed_sec": round(elapsed, 3),
+            "tokens_per_sec": round(tokens / elapsed, 1) if elapsed > 0 else None,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            latencies = list(self._latencies)
+            sizes = list(self._batch_sizes)
+            pending = len(self._pending)
+        return {
+            "base_model": self.base_model,
+            "loaded": self._model is not None,
+            "adapters": list(self._adapters),
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": pending,
+            **stats,
+            "compute_sec": round(stats["compute_sec"], 3),
+            "avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else None,
+            "tokens_per_sec": round(stats["tokens"] / stats["compute_sec"], 1) if stats["compute_sec"] else None,
+            "latency_p50_ms": _percentile(latencies, 50),
+            "latency_p95_ms": _percentile(latencies, 95),
+        }
+
+    def _count_request(self):
+        with self._cond:
+            self._stats["requests"] += 1
+
+    # --- worker ---
+
+    def _next_batch(self) -> Optional[List[_Item]]:
+        with self._cond:
+            while not self._pending and not self._stop:
+                self._cond.wait()
+            if self._stop:
+                return None
+            first = self._pending[0]
+            deadline = first.enqueued + self.max_wait
+            while True:
+                batch = [i for i in self._pending if i.key == first.key][:self.max_batch]
+                remaining = deadline - time.perf_counter()
+                if len(batch) >= self.max_batch or remaining <= 0 or self._stop:
+                    break
+                self._cond.wait(remaining)
+            for item in batch:
+                self._pending.remove(item)
+            return batch
+
+    def _loop(self):
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                try:
+                    self._ensure_model()
+                    started = time.perf_counter()
+                    results, tokens = self._run(batch)
+                    done = time.perf_counter()
+                except Exception as ex:
+                    traceback.print_exc()
+                    for item in batch:
+                        item.future.set_exception(ex)
+                    continue
+                with self._cond:
+                    self._stats["batches"] += 1
+                    self._stats["items"] += len(batch)
+                    self._stats["tokens"] += tokens
+                    self._stats["compute_sec"] += done - started
+                    self._batch_sizes.append(len(batch))
+                    for item in batch:
+                        self._latencies.append((done - item.enqueued) * 1000)
+                for item, result in zip(batch, results):
+                    item.future.set_result({**result, "batch_size": len(batch),
+                                            "latency_ms": round((done - item.enqueued) * 1000, 2)})
+        finally:
+            with self._cond:
+                leftover = list(self._pending)
+                self._pending.clear()
+            for item in leftover:
+                item.future.set_exception(RuntimeError("inference server closed"))
+            if self._lease is not None:
+                # adapter dilepas, base model kembali ke cache
+                self._lease.release(self._model)
+                self._lease = self._model = None
+                self._adapters.clear()
+
+    def _ensure_model(self):
+        if self._model is not None:
+            return
+        import torch
+        from transformers import AutoTokenizer
+        from core.model_loader import get_model_cache
+
+        started = time.perf_counter()
+        dtype = self.torch_dtype or ("bfloat16" if torch.cuda.is_available() else "float32")
+        self._lease = get_model_cache().acquire(self.base_model, torch_dtype=dtype, log=self.log)
+        self._model = self._lease.model
+        self._model.eval()
+        self._tokenizer = AutoTokenizer.from_pretrained(self.base_model)
+        if self._tokenizer.pad_token is None:
+            self._tokenizer.pad_token = self._tokenizer.eos_token
+        self._stats["load_sec"] = round(time.perf_counter() - started, 3)
+        self.log(f"Inference server for {self.base_model} ready in {self._stats['load_sec']}s")
+
+    def _activate(self, paths: List[str]):
+        """Pastikan adapter batch ini ter-load; buang adapter LRU lain di atas max_adapters."""
+        from peft import PeftModel
+
+        for path in paths:
+            if path in self._adapters:
+                self._adapters.move_to_end(path)
+                continue
+            name = "a" + hashlib.sha1(path.encode()).hexdigest()[:12]
+            if isinstance(self._model, PeftModel):
+                self._model.load_adapter(path, adapter_name=name)
+            else:
+                self._model = PeftModel.from_pretrained(self._model, path, adapter_name=name)
+            self._model.eval()
+            self._adapters[path] = name
+            self._stats["adapter_loads"] += 1
+            self.log(f"Adapter loaded: {path}")
+        while len(self._adapters) > self.max_adapters:
+            victim = next((p for p in self._adapters if p not in paths), None)
+            if victim is None:
+                break
+            self._model.delete_adapter(self._adapters.pop(victim))
+            self._stats["adapter_evictions"] += 1
+
+    def _run(self, batch: List[_Item]):
+        paths = sorted({i.adapter for i in batch if i.adapter})
+        if paths:
+            self._activate(paths)
+        kwargs = {}
+        if self._adapters:
+            kwargs["adapter_names"] = [self._adapters[i.adapter] if i.adapter else _BASE for i in batch]
+        if batch[0].kind == "generate":
+            return self._generate(batch, dict(batch[0].key[1]), kwargs)
+        return self._score(batch, kwargs)
+
+    def _generate(self, batch: List[_Item], params: Dict[str, Any], kwargs: Dict[str, Any]):
+        import torch
+
+        tok = self._tokenizer
+        tok.padding_side = "left"
+        enc = tok([i.payload for i in batch], return_tensors="pt", padding=True, truncation=True,
+                  max_length=self.max_length).to(self._model.device)
+        sample = params["temperature"] > 0
+        with torch.inference_mode():
+            out = self._model.generate(
+                **enc, max_new_tokens=params["max_new_tokens"], do_sample=sample,
+                temperature=params["temperature"] if sample else None, top_p=None, top_k=None,
+                pad_token_id=tok.pad_token_id, use_cache=True, **kwargs,
+            )
+        new = out[:, enc["input_ids"].shape[1]:]
+        results, total = [], int(enc["attention_mask"].sum())
+        for row in new:
+            ids = row.tolist()
+            if tok.eos_token_id in ids:
+                ids = ids[:ids.index(tok.eos_token_id) + 1]
+            total += len(ids)
+            results.append({"text": tok.decode(ids, skip_special_tokens=True), "new_tokens": len(ids)})
+        return results, total
+
+    def _score(self, batch: List[_Item], kwargs: Dict[str, Any]):
+        import torch
+        import torch.nn.functional as F
+
+        tok = self._tokenizer
+        tok.padding_side = "right"
+        enc = tok([i.payload for i in batch], return_tensors="pt", padding=True, truncation=True,
+                  max_length=self.max_length).to(self._model.device)
+        with torch.inference_mode():
+            logits = self._model(**enc, **kwargs).logits
+            labels = enc["input_ids"][:, 1:]
+            mask = enc["attention_mask"][:, 1:].float()
+            nll = F.cross_entropy(logits[:, :-1].float().transpose(1, 2), labels, reduction="none") * mask
+            sums, counts = nll.sum(dim=1).tolist(), mask.sum(dim=1).tolist()
+        results = []
+        for s, n in zip(sums, counts):
+            loss = s / n if n else None
+            results.append({"nll": s, "tokens": int(n), "loss": round(loss, 6) if loss is not None else None,
+                            "perplexity": round(_exp(loss), 4) if loss is not None else None})
+        return results, int(enc["attention_mask"].sum())
+
+
+def _exp(x: float) -> float:
+    import math
+    return math.exp(min(x, 700.0))
+
+
+_servers: Dict[str, AdapterServer] = {}
+_servers_lock = threading.Lock()
+
+
+def get_adapter_server(base_model: str, **options) -> AdapterServer:
+    """Server per base model (dibuat saat pertama dipakai; ``options`` hanya berlaku saat dibuat)."""
+    with _servers_lock:
+        server = _servers.get(base_model)
+        if server is None:
+            server = _servers[base_model] = AdapterServer(base_model, **options)
+        return server
+
+
+def list_adapter_servers() -> List[Dict[str, Any]]:
+    with _servers_lock:
+        servers = list(_servers.values())
+    return [s.stats() for s in servers]
+
+
+def close_adapter_server(base_model: str) -> bool:
+    with _servers_lock:
+        server = _servers.pop(base_model, None)
+    if server is None:
+        return False
+    server.close()
+    return True
@@ -0,0 +1,221 @@
+"""Cache bobot base model yang dipakai bersama antar run dalam satu proses.
+
+Model di-key dengan (model, dtype, quantization): run LoRA kedua pada base model
+yang sama memakai objek model yang sudah ada di memori, bukan ``from_pretrained``
+lagi. Strategy menentukan cara load (QLoRA langsung 4-bit, lihat
+``core.strategies``), jadi tidak ada load full precision yang dibuang.
+
+Satu entry hanya dipinjam satu run sekaligus (LoRA menyisipkan layer ke model);
+run lain yang butuh model yang sama pada saat itu mendapat salinan privat yang
+tidak di-cache. Saat lease dilepas, layer adapter di-``unload()`` sehingga base
+model kembali bersih. Entry yang tidak dipinjam dibuang LRU kalau total ukuran
+melebihi budget (``FINETUNE_MODEL_CACHE_GB``, default 50% RAM).
+
+Cache ini per proses. Run adapter default-nya ``isolation=host``: semua jalan
+sebagai thread di satu ModelHost berumur panjang (core.workers), jadi cache di
+proses itu dipakai run berurutan maupun bersamaan. Run ``isolation=process``
+punya proses (dan cache) sendiri yang hilang saat run selesai.
+"""
+import gc, json, os, threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_BUDGET_FRACTION = 0.5
+
+
+def _default_budget_bytes() -> int:
+    env = os.environ.get("FINETUNE_MODEL_CACHE_GB")
+    if env:
+        return int(float(env) * 1024**3)
+    import psutil
+    return int(psutil.virtual_memory().total * DEFAULT_BUDGET_FRACTION)
+
+
+def _source_version(model_id: str) -> Optional[int]:
+    """mtime folder model lokal, supaya bobot yang ditimpa tidak memakai entry lama."""
+    try:
+        return os.stat(model_id).st_mtime_ns if os.path.isdir(model_id) else None
+    except OSError:
+        return None
+
+
+def _footprint(model) -> int:
+    try:
+        return int(model.get_memory_footprint())
+    except Exception:
+        return sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+
+
+def _unwrap(model):
+    """Lepas layer adapter PEFT dari model; return base model (in-place)."""
+    if hasattr(model, "peft_config"):
+        return model.unload()
+    return model
+
+
+class ModelLease:
+    """Model yang sedang dipakai satu run; panggil ``release()`` (atau pakai ``with``) setelah selesai."""
+
+    def __init__(self, cache: "BaseModelCache", key: Optional[Tuple], model, cached: bool):
+        self._cache = cache
+        self.key = key
+        self.model = model
+        self.cached = cached
+
+    def release(self, model=None):
+        if self.model is None:
+            return
+        if self.cached:
+            # model dari cache harus kembali tanpa adapter supaya run berikutnya mendapat base bersih
+            _unwrap(model if model is not None else self.model)
+            self._cache._release(self.key)
+        self.model = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class BaseModelCache:
+    def __init__(self, budget_bytes: Optional[int] = None):
+        self.budget_bytes = budget_bytes if budget_bytes is not None else _default_budget_bytes()
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._stats = {"hits": 0, "misses": 0, "private_loads": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(model_id: str, torch_dtype: Optional[str], quantization: Optional[Dict[str, Any]]) -> Tuple:
+        quant = json.dumps(quantization, sort_keys=True) if quantization else None
+        return (model_id, _source_version(model_id), torch_dtype, quant)
+
+    def acquire(self, model_id: str, torch_dtype: Optional[str] = "bfloat16",
+                quantization: Optional[Dict[str, Any]] = None, device_map: Optional[str] = "auto",
+                shareable: bool = True, log: Optional[Callable[[str], None]] = None) -> ModelLease:
+        """Pinjam base model. ``shareable=False`` (mis. full fine-tune yang mengubah bobot) selalu load privat."""
+        log = log or (lambda m: None)
+        key = self.make_key(model_id, torch_dtype, quantization)
+        if not shareable:
+            return self._private(model_id, torch_dtype, quantization, device_map, log)
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # satu load per key sekaligus, supaya dua run tidak sama-sama mengisi entry yang sama
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and not entry["in_use"]:
+                    entry["in_use"] = True
+                    entry["hits"] += 1
+                    entry["last_used"] = time.time()
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    log(f"Base model {model_id} reused from cache ({entry['size_bytes'] / 1024**3:.2f} GB)")
+                    return ModelLease(self, key, entry["model"], cached=True)
+            if entry is not None:
+                # sedang dipinjam run lain
+                return self._private(model_id, torch_dtype, quantization, device_map, log)
+
+            with self._lock:
+                self._stats["misses"] += 1
+            model, elapsed = _load(model_id, torch_dtype, quantization, device_map)
+            size = _footprint(model)
+            log(f"Base model {model_id} loaded in {elapsed:.1f}s ({size / 1024**3:.2f} GB)")
+            with self._lock:
+                self._entries[key] = {"model": model, "size_bytes": size, "in_use": True, "hits": 0,
+                                      "load_sec": round(elapsed, 3), "last_used": time.time()}
+                evicted = self._evict_locked()
+        _free(evicted)
+        return ModelLease(self, key, model, cached=True)
+
+    def _private(self, model_id, torch_dtype, quantization, device_map, log) -> ModelLease:
+        with self._lock:
+            self._stats["private_loads"] += 1
+        model, elapsed = _load(model_id, torch_dtype, quantization, device_map)
+        log(f"Base model {model_id} loaded in {elapsed:.1f}s (not cached)")
+        return ModelLease(self, None, model, cached=False)
+
+    def _release(self, key: Tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["in_use"] = False
+                entry["last_used"] = time.time()
+            evicted = self._evict_locked()
+        _free(evicted)
+
+    def _evict_locked(self):
+        """Buang entry LRU yang tidak dipinjam sampai total <= budget. Return model yang dibuang."""
+        evicted = []
+        total = sum(e["size_bytes"] for e in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry["in_use"]:
+                continue
+            total -= entry["size_bytes"]
+            evicted.append(self._entries.pop(key)["model"])
+            self._stats["evictions"] += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            idle = [k for k, e in self._entries.items() if not e["in_use"]]
+            evicted = [self._entries.pop(k)["model"] for k in idle]
+        _free(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "size_bytes": sum(e["size_bytes"] for e in self._entries.values()),
+                **self._stats,
+                "entries": [{"model": k[0], "torch_dtype": k[2], "quantization": json.loads(k[3]) if k[3] else None,
+                             **{f: e[f] for f in ("size_bytes", "in_use", "hits", "load_sec", "last_used")}}
+                            for k, e in self._entries.items()],
+            }
+
+
+def _load(model_id: str, torch_dtype: Optional[str], quantization: Optional[Dict[str, Any]],
+          device_map: Optional[str]):
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    kwargs: Dict[str, Any] = {"device_map": device_map}
+    if torch_dtype:
+        kwargs["torch_dtype"] = getattr(torch, torch_dtype)
+    if quantization:
+        from transformers import BitsAndBytesConfig
+        kwargs["quantization_config"] = BitsAndBytesConfig(**quantization)
+    started = time.perf_counter()
+    # safetensors dibaca lewat mmap oleh transformers; tidak ada salinan file utuh di RAM
+    model = AutoModelForCausalLM.from_pretrained(model_id, **kwargs)
+    return model, time.perf_counter() - started
+
+
+def _free(models):
+    if not models:
+        return
+    del models[:]
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+_cache: Optional[BaseModelCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_model_cache() -> BaseModelCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = BaseModelCache()
+        return _cache
@@ -0,0 +1,194 @@
+"""Manifest cache untuk folder model lokal.
+
+Manifest per model (ukuran, daftar file, ringkasan config.json, jumlah parameter
+dan dtype dari header safetensors, info adapter LoRA) dihitung sekali, disimpan
+di memori dan di ``<models>/.manifests/<nama>.json`` supaya tetap ada setelah
+restart. Manifest di-invalidasi kalau mtime folder model atau salah satu
+subfoldernya berubah (file ditambah/dihapus/di-rename); file yang ditimpa di
+tempat tanpa mengubah folder perlu ``refresh=True``.
+"""
+import json, os, struct, threading, time
+from typing import Any, Dict, List, Optional
+
+MANIFEST_DIR = ".manifests"
+
+_CONFIG_KEYS = (
+    "model_type", "architectures", "hidden_size", "intermediate_size", "num_hidden_layers",
+    "num_attention_heads", "num_key_value_heads", "vocab_size", "max_position_embeddings", "torch_dtype",
+)
+_ADAPTER_KEYS = ("base_model_name_or_path", "peft_type", "r", "lora_alpha", "target_modules", "task_type")
+# nama dtype safetensors -> nama torch (sama dengan config.json torch_dtype)
+_DTYPE_NAMES = {"F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16", "I64": "int64",
+                "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+                "F8_E4M3": "float8_e4m3fn", "F8_E5M2": "float8_e5m2"}
+
+
+def _dir_signature(path: str, subdirs: List[str]) -> Dict[str, int]:
+    """mtime folder model + subfolder yang tercatat di manifest (tanpa stat setiap file)."""
+    signature = {}
+    for rel in [""] + subdirs:
+        try:
+            signature[rel] = os.stat(os.path.join(path, rel)).st_mtime_ns
+        except OSError:
+            signature[rel] = -1
+    return signature
+
+
+def _safetensors_header(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        (length,) = struct.unpack("<Q", f.read(8))
+        return json.loads(f.read(length))
+
+
+def _count_parameters(path: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Jumlah parameter + dtype dominan dari header safetensors (tanpa memuat tensor)."""
+    params, by_dtype = 0, {}
+    for f in files:
+        if not f["path"].endswith(".safetensors"):
+            continue
+        try:
+            header = _safetensors_header(os.path.join(path, f["path"]))
+        except (OSError, ValueError, struct.error):
+            continue
+        for name, info in header.items():
+            if name == "__metadata__":
+                continue
+            count = 1
+            for dim in info["shape"]:
+                count *= dim
+            params += count
+            dtype = _DTYPE_NAMES.get(info["dtype"], info["dtype"])
+            by_dtype[dtype] = by_dtype.get(dtype, 0) + count
+    if not params:
+        return {}
+    return {"parameters": params, "dtype": max(by_dtype, key=by_dtype.get), "dtypes": by_dtype}
+
+
+def _estimate_parameters(config: Dict[str, Any]) -> Optional[int]:
+    """Estimasi kasar decoder-only kalau tidak ada safetensors (mis. hanya .bin)."""
+    h, layers, vocab = config.get("hidden_size"), config.get("num_hidden_layers"), config.get("vocab_size")
+    if not (h and layers and vocab):
+        return None
+    inter = config.get("intermediate_size") or 4 * h
+    heads = config.get("num_attention_heads") or 1
+    kv = config.get("num_key_value_heads") or heads
+    attn = h * h * 2 + 2 * h * (h // heads) * kv
+    return int(layers * (attn + 3 * h * inter) + 2 * vocab * h)
+
+
+def scan_model(path: str) -> Dict[str, Any]:
+    """Bangun manifest satu folder model (satu os.walk)."""
+    started = time.perf_counter()
+    files, subdirs = [], []
+    for root, dirs, names in os.walk(path):
+        rel_root = os.path.relpath(root, path)
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        subdirs.extend(os.path.normpath(os.path.join(rel_root, d)) for d in dirs)
+        for name in names:
+            full = os.path.join(root, name)
+            try:
+                size = os.path.getsize(full)
+            except OSError:
+                continue
+            files.append({"path": os.path.normpath(os.path.join(rel_root, name)), "size": size})
+    files.sort(key=lambda f: f["path"])
+    size_bytes = sum(f["size"] for f in files)
+
+    config = _read_json(os.path.join(path, "config.json")) or {}
+    adapter = _read_json(os.path.join(path, "adapter_config.json"))
+    manifest = {
+        "name": os.path.basename(os.path.normpath(path)),
+        "path": path,
+        "size_bytes": size_bytes,
+        "size_gb": round(size_bytes / (1024**3), 2),
+        "num_files": len(files),
+        "files": files,
+        "config": {k: config[k] for k in _CONFIG_KEYS if k in config},
+        "quantization": (config.get("quantization_config") or {}).get("quant_method"),
+        "adapter": {k: adapter[k] for k in _ADAPTER_KEYS if k in adapter} if adapter else None,
+        **_count_parameters(path, files),
+    }
+    if "parameters" not in manifest:
+        manifest["parameters"] = _estimate_parameters(config)
+        manifest["dtype"] = config.get("torch_dtype")
+    manifest["subdirs"] = sorted(subdirs)
+    manifest["signature"] = _dir_signature(path, manifest["subdirs"])
+    manifest["scanned_at"] = time.time()
+    manifest["scan_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return manifest
+
+
+class ModelManifestCache:
+    def __init__(self, models_dir: str):
+        self.models_dir = models_dir
+        self.manifest_dir = os.path.join(models_dir, MANIFEST_DIR)
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        return sorted(d for d in os.listdir(self.models_dir)
+                      if not d.startswith(".") and os.path.isdir(os.path.join(self.models_dir, d)))
+
+    def get(self, name: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.models_dir, name)
+        if not os.path.isdir(path):
+            self.invalidate(name)
+            return None
+        with self._lock:
+            manifest = self._cache.get(name)
+        if manifest is None and not refresh:
+            manifest = _read_json(os.path.join(self.manifest_dir, f"{name}.json"))
+        if refresh or manifest is None or manifest.get("signature") != _dir_signature(path, manifest.get("subdirs", [])):
+            manifest = scan_model(path)
+            os.makedirs(self.manifest_dir, exist_ok=True)
+            _write_json(os.path.join(self.manifest_dir, f"{name}.json"), manifest)
+        manifest["path"] = path
+        with self._lock:
+            self._cache[name] = manifest
+        return manifest
+
+    def list(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        result = []
+        for name in self.names():
+            manifest = self.get(name, refresh=refresh)
+            if manifest is not None:
+                result.append(manifest)
+        return result
+
+    def invalidate(self, name: Optional[str] = None):
+        with self._lock:
+            names = [name] if name else list(self._cache)
+            for n in names:
+                self._cache.pop(n, None)
+        for n in names:
+            try:
+                os.remove(os.path.join(self.manifest_dir, f"{n}.json"))
+            except OSError:
+                pass
+
+
+_caches: Dict[str, ModelManifestCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_manifest_cache(models_dir: str) -> ModelManifestCache:
+    key = os.path.abspath(models_dir)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ModelManifestCache(models_dir)
+        return _caches[key]
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict):
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
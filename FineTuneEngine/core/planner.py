@@ -0,0 +1,364 @@
+"""Planner batch size: estimasi memori training dan micro-batch terbesar yang muat.
+
+Estimasi murni aritmetika dari ``config.json`` base model (tanpa torch), jadi
+bisa dipanggil dari API dan diuji di CPU. Komponen per device:
+
+- ``weights``      parameter base model (bf16 = 2 byte; QLoRA: linear layer
+                   4-bit NF4 + konstanta kuantisasi, embedding/norm tetap 16-bit)
+- ``adapter``      bobot LoRA (fp32) pada ``target_modules``
+- ``gradients`` / ``optimizer``  untuk parameter trainable (AdamW: m + v fp32;
+                   full fine-tune juga master weight fp32)
+- ``activations``  per sample, sebanding dengan panjang sequence: tensor yang
+                   disimpan untuk backward per layer decoder (attention SDPA,
+                   tanpa matriks skor s x s) + logits fp32 untuk loss
+- ``overhead``     CUDA context / workspace (tetap) + fragmentasi allocator
+
+``plan()`` memilih micro-batch terbesar yang muat di budget (kapasitas x
+``headroom``) dan gradient accumulation untuk mencapai global batch target.
+``probe()`` (butuh torch + model yang sudah di-load) memverifikasi dengan
+forward/backward sungguhan dan menurunkan micro-batch kalau OOM.
+"""
+import glob, json, math, os
+from typing import Any, Callable, Dict, List, Optional
+
+GB = 1024 ** 3
+DEFAULT_GLOBAL_BATCH = 16
+MAX_MICRO_BATCH = 64
+HEADROOM = 0.9  # sisakan 10% kapasitas untuk spike allocator
+CUDA_OVERHEAD_GB = 1.0
+FRAGMENTATION = 1.1
+# QLoRA NF4 + double quant: 4 bit + ~0.127 bit konstanta per parameter
+NF4_BYTES = 4.127 / 8
+# target_modules default PEFT untuk arsitektur yang umum
+DEFAULT_TARGETS = {
+    "llama": ["q_proj", "v_proj"], "mistral": ["q_proj", "v_proj"], "qwen2": ["q_proj", "v_proj"],
+    "gemma": ["q_proj", "v_proj"], "phi3": ["qkv_proj"], "gpt2": ["c_attn"], "gpt_neox": ["query_key_value"],
+}
+# nama field config non-Llama -> nama Llama
+_ALIASES = {"n_embd": "hidden_size", "n_layer": "num_hidden_layers", "n_head": "num_attention_heads",
+            "n_inner": "intermediate_size", "d_model": "hidden_size", "num_layers": "num_hidden_layers"}
+_GATED = ("llama", "mistral", "mixtral", "qwen2", "gemma", "gemma2", "phi3")
+
+
+def normalize_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Bentuk model decoder-only dari config.json (hidden, intermediate, layer, head, vocab)."""
+    cfg = dict(config)
+    for src, dst in _ALIASES.items():
+        if src in cfg and cfg.get(dst) is None:
+            cfg[dst] = cfg[src]
+    h = cfg.get("hidden_size")
+    layers = cfg.get("num_hidden_layers")
+    vocab = cfg.get("vocab_size")
+    if not (h and layers and vocab):
+        raise ValueError("model config needs hidden_size, num_hidden_layers and vocab_size")
+    heads = cfg.get("num_attention_heads") or 1
+    head_dim = cfg.get("head_dim") or h // heads
+    model_type = cfg.get("model_type") or ""
+    return {
+        "model_type": model_type,
+        "hidden_size": h,
+        "intermediate_size": cfg.get("intermediate_size") or 4 * h,
+        "num_hidden_layers": layers,
+        "num_attention_heads": heads,
+        "kv_dim": (cfg.get("num_key_value_heads") or heads) * head_dim,
+        "q_dim": heads * head_dim,
+        "vocab_size": vocab,
+        "gated_mlp": model_type in _GATED or cfg.get("hidden_act") in ("silu", "swiglu"),
+        "tie_word_embeddings": bool(cfg.get("tie_word_embeddings", False)),
+    }
+
+
+def _module_shapes(shape: Dict[str, Any]) -> Dict[str, tuple]:
+    """(in, out) tiap linear layer per decoder layer, dengan nama modul Llama."""
+    h, i, q, kv = shape["hidden_size"], shape["intermediate_size"], shape["q_dim"], shape["kv_dim"]
+    shapes = {"q_proj": (h, q), "k_proj": (h, kv), "v_proj": (h, kv), "o_proj": (q, h),
+              "up_proj": (h, i), "down_proj": (i, h)}
+    if shape["gated_mlp"]:
+        shapes["gate_proj"] = (h, i)
+    # nama modul fused (phi3, gpt2, neox) memakai total dimensi q/k/v
+    shapes["qkv_proj"] = shapes["c_attn"] = shapes["query_key_value"] = (h, q + 2 * kv)
+    return shapes
+
+
+def count_parameters(shape: Dict[str, Any]) -> Dict[str, int]:
+    """{"linear": parameter di linear layer decoder, "other": embedding, lm_head, norm}."""
+    shapes = _module_shapes(shape)
+    names = ["q_proj", "k_proj", "v_proj", "o_proj", "up_proj", "down_proj"] + (["gate_proj"] if shape["gated_mlp"] else [])
+    linear = shape["num_hidden_layers"] * sum(a * b for a, b in (shapes[n] for n in names))
+    embed = shape["vocab_size"] * shape["hidden_size"]
+    other = embed * (1 if shape["tie_word_embeddings"] else 2) + (2 * shape["num_hidden_layers"] + 1) * shape["hidden_size"]
+    return {"linear": linear, "other": other, "total": linear + other}
+
+
+def lora_parameters(shape: Dict[str, Any], lora_cfg: Optional[Dict[str, Any]] = None) -> int:
+    lora_cfg = lora_cfg or {}
+    r = lora_cfg.get("r", 8)
+    targets = lora_cfg.get("target_modules") or DEFAULT_TARGETS.get(shape["model_type"], ["q_proj", "v_proj"])
+    if isinstance(targets, str):
+        targets = [targets]
+    shapes = _module_shapes(shape)
+    per_layer = sum(r * (shapes[t][0] + shapes[t][1]) for t in targets if t in shapes)
+    return shape["num_hidden_layers"] * per_layer
+
+
+def activation_bytes(shape: Dict[str, Any], seq_len: int, gradient_checkpointing: bool = False,
+                     bytes_per_act: int = 2) -> int:
+    """Byte aktivasi yang disimpan untuk backward, per sample."""
+    h, i, kv = shape["hidden_size"], shape["intermediate_size"], shape["kv_dim"]
+    # per token per layer: input + 2 norm, q/k/v (+ q/k setelah rotary), output attention,
+    # dan intermediate MLP (gate, up, aktivasi, hasil kali)
+    mlp = (4 if shape["gated_mlp"] else 2) * i
+    per_layer = seq_len * (7 * h + 3 * kv + mlp) * bytes_per_act
+    layers = shape["num_hidden_layers"]
+    if gradient_checkpointing:
+        # hanya input tiap layer disimpan; satu layer di-recompute saat backward
+        decoder = layers * seq_len * h * bytes_per_act + per_layer
+    else:
+        decoder = layers * per_layer
+    # logits bf16 + upcast fp32 untuk cross entropy + gradiennya
+    logits = seq_len * shape["vocab_size"] * (bytes_per_act + 8)
+    return decoder + logits
+
+
+def estimate(shape: Dict[str, Any], strategy: str = "lora", seq_len: int = 512, micro_batch: int = 1,
+             lora_cfg: Optional[Dict[str, Any]] = None, gradient_checkpointing: bool = False,
+             device: str = "cuda") -> Dict[str, Any]:
+    """Breakdown memori (GB) satu device untuk micro-batch tertentu."""
+    strategy = (strategy or "lora").lower()
+    params = count_parameters(shape)
+    if strategy == "qlora":
+        weights = params["linear"] * NF4_BYTES + params["other"] * 2
+    else:
+        weights = params["total"] * 2
+    if strategy in ("lora", "qlora"):
+        trainable = lora_parameters(shape, lora_cfg)
+        adapter, gradients, optimizer = trainable * 4, trainable * 4, trainable * 8
+    else:
+        # full fine-tune bf16 mixed precision: grad bf16 + master fp32 + m + v
+        trainable = params["total"]
+        adapter, gradients, optimizer = 0, trainable * 2, trainable * 12
+    per_sample = activation_bytes(shape, seq_len, gradient_checkpointing)
+    fixed = weights + adapter + gradients + optimizer
+    overhead = CUDA_OVERHEAD_GB * GB if device == "cuda" else 0.0
+    peak = (fixed + per_sample * micro_batch) * FRAGMENTATION + overhead
+    return {
+        "parameters": params["total"],
+        "trainable_parameters": trainable,
+        "weights_gb": round(weights / GB, 3),
+        "adapter_gb": round(adapter / GB, 3),
+        "gradients_gb": round(gradients / GB, 3),
+        "optimizer_gb": round(optimizer / GB, 3),
+        "activations_per_sample_gb": round(per_sample / GB, 3),
+        "activations_gb": round(per_sample * micro_batch / GB, 3),
+        "overhead_gb": round(overhead / GB + (fixed + per_sample * micro_batch) * (FRAGMENTATION - 1) / GB, 3),
+        "peak_gb": round(peak / GB, 3),
+    }
+
+
+def device_budget(hardware: Dict[str, Any], gpu_index: Optional[int] = None,
+                  ram_fraction: float = 0.8) -> Dict[str, Any]:
+    """Device target dari ``get_hardware_info()``: GPU ``gpu_index`` (default terbesar) atau RAM host."""
+    gpus = hardware.get("gpu_list") or []
+    if gpus:
+        gpu = next((g for g in gpus if g["index"] == gpu_index), None) or max(gpus, key=lambda g: g["vram_gb"])
+        return {"device": "cuda", "name": f"gpu:{gpu['index']}", "gpu_index": gpu["index"],
+                "capacity_gb": float(gpu["vram_gb"]), "budget_gb": round(float(gpu["vram_gb"]) * HEADROOM, 2)}
+    ram = float(hardware.get("ram_gb", 0)) * ram_fraction
+    return {"device": "cpu", "name": "ram", "gpu_index": None, "capacity_gb": ram, "budget_gb": round(ram * HEADROOM, 2)}
+
+
+def _pick_micro(max_fit: int, target: int) -> int:
+    """Micro-batch terbesar yang muat; pembagi target global batch dipilih kalau tidak lebih
+    kecil dari setengah batas (accumulation pas tanpa membuang banyak throughput)."""
+    limit = max(1, min(max_fit, target, MAX_MICRO_BATCH))
+    divisor = max(d for d in range(1, limit + 1) if target % d == 0)
+    return divisor if divisor * 2 > limit else limit
+
+
+def plan(model_config: Dict[str, Any], training: Dict[str, Any], hardware: Dict[str, Any],
+         strategy: str = "lora", lora_cfg: Optional[Dict[str, Any]] = None,
+         gpu_index: Optional[int] = None) -> Dict[str, Any]:
+    """Rencana batch untuk ``training`` (TrainingConfig dict); nilai non-"auto" dihormati."""
+    shape = normalize_config(model_config)
+    seq_len = int(training.get("max_seq_length", 512))
+    checkpointing = bool(training.get("gradient_checkpointing", False))
+    device = device_budget(hardware, gpu_index)
+    fixed = estimate(shape, strategy, seq_len, 0, lora_cfg, checkpointing, device["device"])
+    per_sample = activation_bytes(shape, seq_len, checkpointing) * FRAGMENTATION / GB  # tanpa pembulatan
+    free = device["budget_gb"] - fixed["peak_gb"]
+    max_fit = int(free // per_sample) if per_sample > 0 and free > 0 else 0
+
+    micro_cfg = training.get("per_device_train_batch_size", 2)
+    accum_cfg = training.get("gradient_accumulation_steps", 8)
+    target = training.get("target_global_batch_size")
+    if not target:
+        target = micro_cfg * accum_cfg if micro_cfg != "auto" and accum_cfg != "auto" else DEFAULT_GLOBAL_BATCH
+
+    notes: List[str] = []
+    if micro_cfg == "auto":
+        micro = _pick_micro(max_fit, target) if max_fit > 0 else 1
+    else:
+        micro = int(micro_cfg)
+    if accum_cfg == "auto":
+        accum = max(1, math.ceil(target / micro))
+    else:
+        accum = int(accum_cfg)
+
+    result = estimate(shape, strategy, seq_len, micro, lora_cfg, checkpointing, device["device"])
+    fits = result["peak_gb"] <= device["budget_gb"]
+    if not fits:
+        notes.append(f"micro-batch {micro} needs {result['peak_gb']} GB, budget is {device['budget_gb']} GB")
+        if max_fit == 0:
+            if not checkpointing:
+                notes.append("enable training.gradient_checkpointing")
+            if (strategy or "lora").lower() != "qlora":
+                notes.append("use strategy qlora")
+            notes.append("reduce max_seq_length")
+    if micro * accum != target:
+        notes.append(f"global batch is {micro * accum}, target {target}")
+    return {
+        "device": device,
+        "strategy": (strategy or "lora").lower(),
+        "max_seq_length": seq_len,
+        "gradient_checkpointing": checkpointing,
+        "max_micro_batch": max_fit,
+        "per_device_train_batch_size": micro,
+        "gradient_accumulation_steps": accum,
+        "global_batch_size": micro * accum,
+        "target_global_batch_size": target,
+        "fits": fits,
+        "memory": result,
+        "notes": notes,
+    }
+
+
+def needs_plan(training: Dict[str, Any]) -> bool:
+    return "auto" in (training.get("per_device_train_batch_size"), training.get("gradient_accumulation_steps"))
+
+
+def find_model_config(model_id: str, models_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """config.json base model dari folder lokal, folder models/, atau cache Hugging Face (tanpa download)."""
+    candidates = [model_id]
+    if models_dir:
+        # /models/download menyimpan repo "org/name" sebagai folder "org_name"
+        candidates += [os.path.join(models_dir, model_id), os.path.join(models_dir, model_id.replace("/", "_"))]
+    hf_home = os.environ.get("HF_HOME") or os.path.join(os.path.expanduser("~"), ".cache", "huggingface")
+    hub = os.environ.get("HF_HUB_CACHE") or os.path.join(hf_home, "hub")
+    candidates += sorted(glob.glob(os.path.join(hub, f"models--{model_id.replace('/', '--')}", "snapshots", "*")),
+                         key=os.path.getmtime, reverse=True)
+    for path in candidates:
+        config_path = os.path.join(path, "config.json")
+        if os.path.isfile(config_path):
+            with open(config_path, encoding="utf-8") as f:
+                return json.load(f)
+    return None
+
+
+def _enable_checkpointing(model) -> bool:
+    """Gradient checkpointing seperti TrainingArguments (non-reentrant); True kalau baru diaktifkan di sini."""
+    if getattr(model, "is_gradient_checkpointing", False) or not hasattr(model, "gradient_checkpointing_enable"):
+        return False
+    model.gradient_checkpointing_enable(gradient_checkpointing_kwargs={"use_reentrant": False})
+    if hasattr(model, "peft_config"):
+        # input embedding base model beku: tanpa ini graph checkpoint PEFT tidak punya grad
+        model.enable_input_require_grads()
+    return True
+
+
+def _disable_checkpointing(model):
+    model.gradient_checkpointing_disable()
+    if hasattr(model, "peft_config"):
+        model.disable_input_require_grads()
+
+
+def probe(model, plan_result: Dict[str, Any], vocab_size: int, log: Callable[[str], None] = print,
+          min_micro: int = 1) -> Dict[str, Any]:
+    """Verifikasi rencana dengan satu forward+backward sungguhan; micro-batch dibagi dua sampai muat.
+
+    Gradient checkpointing diaktifkan selama probe kalau rencana memakainya (dan
+    dikembalikan setelahnya; TrainingArguments mengaktifkannya lagi saat training).
+    Optimizer belum dibuat, jadi estimasinya ditambahkan ke peak terukur; hasilnya
+    harus masuk budget device, kalau tidak micro-batch juga dibagi dua. Gradient
+    dibuang setelah probe. Di CPU hanya memastikan step bisa jalan.
+    """
+    import torch
+
+    device = next(model.parameters()).device
+    cuda = device.type == "cuda"
+    seq_len = plan_result["max_seq_length"]
+    target = plan_result["global_batch_size"]
+    micro = plan_result["per_device_train_batch_size"]
+    budget = plan_result["device"]["budget_gb"]
+    optimizer_gb = plan_result["memory"]["optimizer_gb"]
+    enabled = plan_result.get("gradient_checkpointing") and _enable_checkpointing(model)
+    attempts = []
+    try:
+        while micro >= min_micro:
+            if cuda:
+                torch.cuda.empty_cache()
+                torch.cuda.reset_peak_memory_stats(device)
+                base = torch.cuda.memory_allocated(device)
+            try:
+                ids = torch.randint(0, vocab_size, (micro, seq_len), device=device)
+                model(input_ids=ids, labels=ids).loss.backward()
+                peak = (torch.cuda.max_memory_allocated(device) if cuda else 0) / GB
+                total = round(peak + optimizer_gb, 3) if cuda else None
+                attempt = {"micro_batch": micro, "ok": True, "peak_gb": round(peak, 3) if cuda else None,
+                           "with_optimizer_gb": total}
+                if total is not None and total > budget and micro > min_micro:
+                    attempts.append({**attempt, "ok": False, "over_budget": True})
+                    log(f"Probe at micro-batch {micro} needs {total} GB with optimizer "
+                        f"(budget {budget} GB), halving")
+                    micro //= 2
+                    continue
+                attempts.append(attempt)
+                break
+            except (torch.cuda.OutOfMemoryError, RuntimeError) as ex:
+                if "out of memory" not in str(ex).lower():
+                    raise
+                attempts.append({"micro_batch": micro, "ok": False, "baseline_gb": round(base / GB, 3) if cuda else None})
+                log(f"Probe OOM at micro-batch {micro}, halving")
+                micro //= 2
+            finally:
+                model.zero_grad(set_to_none=True)
+                if cuda:
+                    torch.cuda.empty_cache()
+    finally:
+        if enabled:
+            _disable_checkpointing(model)
+    if not attempts or not attempts[-1]["ok"]:
+        return {**plan_result, "fits": False, "probe": attempts, "notes": plan_result["notes"] + ["probe OOM at micro-batch 1"]}
+    accum = max(1, math.ceil(target / micro))
+    peak = attempts[-1]["with_optimizer_gb"]
+    result = {**plan_result, "per_device_train_batch_size": micro, "gradient_accumulation_steps": accum,
+              "global_batch_size": micro * accum, "probe": attempts, "measured_peak_gb": peak}
+    if peak is not None:
+        result["fits"] = peak <= budget
+    if not result["fits"] and peak is not None:
+        result["notes"] = plan_result["notes"] + [
+            f"measured peak {peak} GB at micro-batch {micro} (with optimizer) exceeds budget {budget} GB"]
+    return result
+
+
+def probe_model(model_id: str, plan_result: Dict[str, Any], strategy: str = "lora",
+                lora_cfg: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Load base model + strategy lalu ``probe()``; dipanggil di child process oleh ``POST /runs/plan?probe=true``
+    supaya proses API tetap tanpa torch dan memori model dilepas begitu child selesai."""
+    from core.model_loader import BaseModelCache
+    from core.strategies.base import get_strategy
+
+    strategy_cls = get_strategy(strategy)
+    lease = BaseModelCache().acquire(
+        model_id,
+        torch_dtype=strategy_cls.torch_dtype if strategy_cls else "bfloat16",
+        quantization=strategy_cls.quantization if strategy_cls else None,
+        shareable=False,
+    )
+    model = lease.model
+    try:
+        if strategy_cls is not None:
+            model = strategy_cls(model, lora_cfg or {}).apply()
+        model.train()
+        return probe(model, plan_result, model.config.vocab_size, log=lambda m: None)
+    finally:
+        lease.release(model)
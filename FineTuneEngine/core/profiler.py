@@ -0,0 +1,289 @@
+"""Profiler hot path training: waktu per step dipecah data / forward / backward / optimizer.
+
+Trainer memanggil ``step_begin`` / ``step_end`` dan mengisi fase (lewat
+``phase()`` atau hook di ``ProfilerCallback`` untuk backend HF). Per step hanya
+beberapa ``perf_counter``; agregat per ``interval`` step (rata-rata ms per fase,
+tokens/sec, samples/sec, RSS, memori GPU) disimpan ke tabel ``profile`` dan
+di-publish sebagai event ``profile``.
+
+Pembagian fase untuk HF Trainer adalah pendekatan: ``data`` = jeda antara akhir
+step dan awal step berikutnya (dataloader + logging), ``forward`` = hook forward
+model, ``backward`` = akhir forward sampai forward/optimizer berikutnya,
+``optimizer`` = hook ``optimizer.step``. Di GPU kernel async tanpa sync bisa
+terhitung di fase berikutnya (total per step tetap benar); ``sync_cuda=True``
+men-``synchronize`` tiap batas fase supaya pembagiannya akurat, dengan biaya
+pipeline GPU yang terhenti beberapa kali per step, jadi default mati.
+
+Capture on-demand: API menulis ``logs/<run_id>/profile_request.json``; profiler
+memeriksa file itu tiap step, lalu menjalankan ``torch.profiler`` atau cProfile
+selama N step dan menyimpan hasilnya di folder log yang sama.
+"""
+import cProfile, io, json, os, pstats, sys, threading, time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+PHASES = ("data", "forward", "backward", "optimizer")
+CAPTURE_REQUEST = "profile_request.json"
+CAPTURES_FILE = "profile_captures.json"
+CAPTURE_KINDS = ("torch", "cprofile")
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _cuda():
+    """Modul torch kalau CUDA aktif; tidak meng-import torch untuk trainer yang tidak memakainya."""
+    torch = sys.modules.get("torch")
+    return torch if torch is not None and torch.cuda.is_available() else None
+
+
+class StepProfiler:
+    def __init__(self, run_id: str, db, log_dir: str, interval: int = 10, sync_cuda: bool = False,
+                 log: Callable[[str], None] = print):
+        import psutil
+        self.run_id = run_id
+        self.db = db
+        self.log_dir = log_dir
+        self.interval = max(1, interval)
+        self.log = log
+        self._process = psutil.Process()
+        self._torch = _cuda()
+        self._sync = sync_cuda and self._torch is not None
+        self._window: List[Dict[str, float]] = []
+        self._phase = dict.fromkeys(PHASES, 0.0)
+        self._tokens = self._samples = 0
+        self._step_started: Optional[float] = None
+        self._last_step_end: Optional[float] = None
+        self._last_forward_end: Optional[float] = None
+        self._forward_started = self._optimizer_started = self._gap = 0.0
+        self._capture: Optional[Dict[str, Any]] = None
+        self._last_step = 0
+        self._request_path = os.path.join(log_dir, CAPTURE_REQUEST)
+
+    # --- dipanggil dari loop training ---
+
+    def _now(self) -> float:
+        if self._sync:
+            self._torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def step_begin(self):
+        now = self._now()
+        # jeda sejak step sebelumnya (dataloader HF) dihitung sebagai data dan masuk wall time
+        self._gap = now - self._last_step_end if self._last_step_end is not None else 0.0
+        self._phase["data"] += self._gap
+        self._step_started = now
+
+    def add(self, phase: str, seconds: float):
+        self._phase[phase] += seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        started = self._now()
+        try:
+            yield
+        finally:
+            self._phase[name] += self._now() - started
+
+    def add_batch(self, tokens: int, samples: int):
+        self._tokens += tokens
+        self._samples += samples
+
+    def forward_begin(self):
+        now = self._now()
+        if self._last_forward_end is not None:
+            # micro-batch sebelumnya (gradient accumulation): backward sampai forward ini
+            self._phase["backward"] += now - self._last_forward_end
+            self._last_forward_end = None
+        self._forward_started = now
+
+    def forward_end(self):
+        now = self._now()
+        self._phase["forward"] += now - self._forward_started
+        self._last_forward_end = now
+
+    def optimizer_begin(self):
+        now = self._now()
+        if self._last_forward_end is not None:
+            self._phase["backward"] += now - self._last_forward_end
+            self._last_forward_end = None
+        self._optimizer_started = now
+
+    def optimizer_end(self):
+        self._phase["optimizer"] += self._now() - self._optimizer_started
+
+    def step_end(self, step: int):
+        if self._step_started is None:
+            return
+        now = self._now()
+        if self._last_forward_end is not None:
+            self._phase["backward"] += now - self._last_forward_end
+            self._last_forward_end = None
+        wall = now - self._step_started + self._gap
+        record = {f"{p}_sec": v for p, v in self._phase.items()}
+        record.update(wall_sec=wall, tokens=self._tokens, samples=self._samples)
+        self._window.append(record)
+        self._phase = dict.fromkeys(PHASES, 0.0)
+        self._tokens = self._samples = 0
+        self._step_started = None
+
+        self._last_step = step
+        self._capture_tick(step)
+        if len(self._window) >= self.interval:
+            self._flush(step)
+        # overhead profiler sendiri (write DB, export capture) tidak dihitung sebagai data step berikutnya
+        self._last_step_end = time.perf_counter()
+
+    def close(self, step: Optional[int] = None):
+        """Tulis sisa window (dan capture yang belum selesai); aman dipanggil berkali-kali."""
+        step = step if step is not None else self._last_step
+        if self._capture is not None:
+            self._finish_capture(step)
+        if self._window:
+            self._flush(step)
+
+    # --- agregasi ---
+
+    def _flush(self, step: int):
+        window, self._window = self._window, []
+        n = len(window)
+        total = {k: sum(r[k] for r in window) for k in window[0]}
+        wall = total["wall_sec"]
+        record = {
+            "step": step,
+            "steps": n,
+            "wall_ms": round(wall / n * 1000, 3),
+            **{f"{p}_ms": round(total[f"{p}_sec"] / n * 1000, 3) for p in PHASES},
+            "other_ms": round(max(0.0, wall - sum(total[f"{p}_sec"] for p in PHASES)) / n * 1000, 3),
+            "tokens_per_sec": round(total["tokens"] / wall, 1) if wall else None,
+            "samples_per_sec": round(total["samples"] / wall, 2) if wall else None,
+            "rss_mb": round(self._process.memory_info().rss / 1024**2, 1),
+            "peak_rss_mb": _peak_rss_mb(),
+            "ts": round(time.time(), 3),  # akhir window; dipasangkan dengan sample core.telemetry
+        }
+        if self._torch is not None:
+            cuda = self._torch.cuda
+            record["gpu_mem_mb"] = round(cuda.memory_allocated() / 1024**2, 1)
+            record["gpu_peak_mb"] = round(cuda.max_memory_allocated() / 1024**2, 1)
+            cuda.reset_peak_memory_stats()
+        try:
+            self.db.append_profile(self.run_id, step, record)
+        except Exception as ex:
+            # profiler tidak boleh menghentikan training
+            self.log(f"⚠️ Profiler write failed: {ex}")
+
+    # --- capture on-demand ---
+
+    def _capture_tick(self, step: int):
+        if self._capture is not None:
+            self._capture["steps_left"] -= 1
+            if self._capture["kind"] == "torch":
+                self._capture["profiler"].step()
+            if self._capture["steps_left"] <= 0:
+                self._finish_capture(step)
+            return
+        if not os.path.exists(self._request_path):
+            return
+        try:
+            with open(self._request_path, encoding="utf-8") as f:
+                request = json.load(f)
+            os.remove(self._request_path)
+        except (OSError, ValueError):
+            return
+        self._start_capture(request, step)
+
+    def _start_capture(self, request: Dict[str, Any], step: int):
+        kind = request.get("kind", "torch")
+        capture = {"kind": kind, "start_step": step + 1, "steps_left": int(request.get("steps", 5))}
+        if kind == "torch":
+            import torch
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if self._torch is not None:
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            capture["profiler"] = torch.profiler.profile(activities=activities, record_shapes=True,
+                                                         profile_memory=True)
+            capture["profiler"].start()
+        else:
+            # cProfile hanya melihat thread yang memanggil enable(): thread training
+            capture["profiler"] = cProfile.Profile()
+            capture["profiler"].enable()
+        self._capture = capture
+        self.log(f"Profiler capture ({kind}) started for {capture['steps_left']} steps")
+
+    def _finish_capture(self, step: int):
+        capture, self._capture = self._capture, None
+        prof = capture["profiler"]
+        base = os.path.join(self.log_dir, f"profile_{capture['kind']}_{capture['start_step']}")
+        if capture["kind"] == "torch":
+            prof.stop()
+            files = {"trace": base + ".trace.json", "summary": base + ".txt"}
+            prof.export_chrome_trace(files["trace"])
+            sort_by = "self_cuda_time_total" if self._torch is not None else "self_cpu_time_total"
+            table = prof.key_averages().table(sort_by=sort_by, row_limit=40)
+        else:
+            prof.disable()
+            files = {"stats": base + ".prof", "summary": base + ".txt"}
+            prof.dump_stats(files["stats"])
+            out = io.StringIO()
+            pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(40)
+            table = out.getvalue()
+        with open(files["summary"], "w", encoding="utf-8") as f:
+            f.write(table)
+        entry = {"kind": capture["kind"], "start_step": capture["start_step"], "end_step": step,
+                 "files": files, "created_at": time.time()}
+        captures = read_captures(self.log_dir) + [entry]
+        _write_json(os.path.join(self.log_dir, CAPTURES_FILE), captures)
+        self.log(f"Profiler capture ({capture['kind']}) saved: {files['summary']}")
+
+
+def request_capture(log_dir: str, kind: str = "torch", steps: int = 5):
+    """Minta trainer (thread atau worker process) men-capture ``steps`` step berikutnya."""
+    os.makedirs(log_dir, exist_ok=True)
+    _write_json(os.path.join(log_dir, CAPTURE_REQUEST), {"kind": kind, "steps": steps})
+
+
+def capture_pending(log_dir: str) -> bool:
+    return os.path.exists(os.path.join(log_dir, CAPTURE_REQUEST))
+
+
+def read_captures(log_dir: str) -> List[Dict[str, Any]]:
+    try:
+        with open(os.path.join(log_dir, CAPTURES_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Rata-rata tertimbang jumlah step dari row agregat profiler."""
+    steps = sum(r["steps"] for r in rows)
+    if not steps:
+        return {"steps": 0}
+
+    def mean(key):
+        values = [(r[key], r["steps"]) for r in rows if r.get(key) is not None]
+        weight = sum(n for _, n in values)
+        return round(sum(v * n for v, n in values) / weight, 3) if weight else None
+
+    wall = mean("wall_ms")
+    summary = {"steps": steps, "wall_ms": wall}
+    for phase in PHASES + ("other",):
+        summary[f"{phase}_ms"] = mean(f"{phase}_ms")
+        summary[f"{phase}_pct"] = round(summary[f"{phase}_ms"] / wall * 100, 1) if wall else None
+    summary["tokens_per_sec"] = mean("tokens_per_sec")
+    summary["samples_per_sec"] = mean("samples_per_sec")
+    summary["peak_rss_mb"] = max((r["peak_rss_mb"] for r in rows if r.get("peak_rss_mb")), default=None)
+    summary["gpu_peak_mb"] = max((r["gpu_peak_mb"] for r in rows if r.get("gpu_peak_mb")), default=None)
+    return summary
+
+
+def _write_json(path: str, data):
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
@@ -0,0 +1,69 @@
+"""Registry trainer backend & strategy yang di-resolve lazy berdasarkan nama.
+
+Entry disimpan sebagai string ``"modul:Attr"``; modulnya (yang meng-import
+torch / transformers / peft) baru di-import saat ``resolve()`` dipanggil,
+jadi proses API bisa boot dan melayani listing / run mock tanpa menyentuh
+library berat. Backend atau strategy tambahan cukup ``register()`` tanpa
+mengubah scheduler / trainer.
+"""
+import importlib, threading
+from typing import Any, Dict, List, Optional
+
+
+class LazyRegistry:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, target, **meta):
+        """``target`` = ``"paket.modul:Attr"`` (lazy) atau objeknya langsung; ``meta`` bebas."""
+        with self._lock:
+            self._entries[name.lower()] = {"target": target, "meta": meta}
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and name.lower() in self._entries
+
+    def names(self) -> List[str]:
+        return sorted(self._entries)
+
+    def meta(self, name: str) -> Dict[str, Any]:
+        return dict(self._entry(name)["meta"])
+
+    def is_loaded(self, name: str) -> bool:
+        return not isinstance(self._entry(name)["target"], str)
+
+    def resolve(self, name: str):
+        entry = self._entry(name)
+        target = entry["target"]
+        if isinstance(target, str):
+            module, _, attr = target.partition(":")
+            obj = getattr(importlib.import_module(module), attr)
+            with self._lock:
+                entry["target"] = obj
+            return obj
+        return target
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        entry = self._entries.get((name or "").lower())
+        if entry is None:
+            raise KeyError(f"Unknown {self.kind} '{name}'. Available: {', '.join(self.names())}")
+        return entry
+
+
+# loads_model: backend HF (load base model, butuh torch) -> default isolation host/process + estimasi
+# memori dari model. host_check: "modul:fungsi(cfg, models_dir) -> bool", False = run butuh proses sendiri
+TRAINERS = LazyRegistry("backend")
+TRAINERS.register("mock", "core.trainers.mock_trainer:MockTrainer", loads_model=False)
+TRAINERS.register("accelerate", "core.trainers.accelerate_trainer:AccelerateTrainer", loads_model=True)
+TRAINERS.register("deepspeed", "core.trainers.deepspeed_trainer:DeepSpeedTrainer", loads_model=True,
+                  host_check="core.ds_config:shares_process")
+
+# strategy yang tidak terdaftar (mis. "full") = full fine-tune tanpa adapter
+STRATEGIES = LazyRegistry("strategy")
+STRATEGIES.register("lora", "core.strategies.lora:LoRAStrategy")
+STRATEGIES.register("qlora", "core.strategies.qlora:QLoRAStrategy")
+
+
+def loads_model(backend: Optional[str]) -> bool:
+    return backend in TRAINERS and TRAINERS.meta(backend).get("loads_model", False)
@@ -0,0 +1,311 @@
+"""Log per run: JSON lines ter-buffer, rotasi per ukuran, segmen lama di-gzip.
+
+``RunLogWriter`` memegang satu file ``logs/<run_id>/train.log`` yang terbuka
+selama run (bukan open/close per pesan). Record ditampung di memori dan ditulis
+dengan satu ``write()`` saat buffer mencapai ``FINETUNE_LOG_BUFFER_KB`` atau oleh
+thread flusher setiap ``FINETUNE_LOG_FLUSH_SEC``; ``close()`` selalu flush.
+Satu record = satu baris JSON: ``{"ts", "level", "step", "message"}``.
+
+Kalau file aktif melewati ``FINETUNE_LOG_MAX_MB``, file di-rename jadi
+``train.log.<seq>`` lalu di-gzip di background (``train.log.<seq>.gz``); hanya
+``FINETUNE_LOG_BACKUPS`` segmen terakhir yang disimpan. Offset log bersifat
+logis (byte sejak awal run, lintas segmen) dan dicatat di
+``train.log.index.json``, jadi offset dari ``read_log`` tetap valid setelah
+rotasi. Hanya satu writer per run (di proses API): child ProcessTrainer
+meneruskan record lewat channel.
+"""
+import atexit, datetime, gzip, json, os, re, shutil, threading, time, weakref
+from typing import Any, Dict, List, Optional
+
+LOG_FILE = "train.log"
+INDEX_FILE = LOG_FILE + ".index.json"
+MAX_BYTES = int(float(os.environ.get("FINETUNE_LOG_MAX_MB", "10")) * 1024 ** 2)
+BACKUPS = int(os.environ.get("FINETUNE_LOG_BACKUPS", "5"))
+BUFFER_BYTES = int(float(os.environ.get("FINETUNE_LOG_BUFFER_KB", "64")) * 1024)
+FLUSH_INTERVAL = float(os.environ.get("FINETUNE_LOG_FLUSH_SEC", "1.0"))
+# echo ke stdout (print) seperti sebelumnya; 0 untuk mematikan di deployment yang ramai
+ECHO = os.environ.get("FINETUNE_LOG_ECHO", "1") != "0"
+DEFAULT_READ_BYTES = 256 * 1024
+_TAIL_BLOCK = 64 * 1024
+_LEGACY_LINE = re.compile(r"^\[(\d\d:\d\d:\d\d)\] (.*)$", re.S)
+
+
+def make_record(message: str, level: Optional[str] = None, step: Optional[int] = None) -> Dict[str, Any]:
+    """Record log; level default diturunkan dari prefix pesan (❌ error, ⚠️ warning)."""
+    if level is None:
+        level = "error" if message.startswith("❌") else "warning" if message.startswith("⚠") else "info"
+    return {"ts": datetime.datetime.now().isoformat(timespec="milliseconds"), "level": level, "step": step,
+            "message": message}
+
+
+def _read_index(log_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(log_dir, INDEX_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"segments": [], "active_start": 0, "next_seq": 1}
+
+
+def _write_index(log_dir: str, index: Dict[str, Any]):
+    path = os.path.join(log_dir, INDEX_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, path)
+
+
+def _segment_path(log_dir: str, seq: int) -> Optional[str]:
+    """File segmen ``seq``: versi .gz kalau kompresi sudah selesai."""
+    plain = os.path.join(log_dir, f"{LOG_FILE}.{seq}")
+    for path in (plain + ".gz", plain):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _compress(path: str):
+    tmp = f"{path}.gz.tmp"
+    try:
+        with open(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp, path + ".gz")
+        os.remove(path)
+    except OSError:
+        pass  # segmen plain tetap bisa dibaca
+
+
+class RunLogWriter:
+    def __init__(self, log_dir: str, max_bytes: int = MAX_BYTES, backups: int = BACKUPS,
+                 buffer_bytes: int = BUFFER_BYTES, compress: bool = True):
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, LOG_FILE)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_bytes = buffer_bytes
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._buf: List[bytes] = []
+        self._buf_size = 0
+        self._file = None
+        self._size = 0
+        self._index = _read_index(log_dir)
+        self._compressors: List[threading.Thread] = []
+        self.stats = {"records": 0, "flushes": 0, "rotations": 0}
+        _flusher.register(self)
+
+    def write(self, record: Dict[str, Any]):
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self._buf.append(data)
+            self._buf_size += len(data)
+            self.stats["records"] += 1
+            if self._buf_size >= self.buffer_bytes:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        for thread in self._compressors:
+            thread.join()
+        self._compressors.clear()
+        _flusher.unregister(self)
+
+    def _open_locked(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        # tanpa buffer Python: buffer sendiri, satu write() per flush
+        self._file = open(self.path, "ab", buffering=0)
+        self._size = self._file.seek(0, os.SEEK_END)
+
+    def _flush_locked(self):
+        if not self._buf:
+            return
+        if self._file is None:
+            self._open_locked()
+        data = b"".join(self._buf)
+        self._buf.clear()
+        self._buf_size = 0
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate_locked()
+        self._file.write(data)
+        self._size += len(data)
+        self.stats["flushes"] += 1
+
+    def _rotate_locked(self):
+        self._file.close()
+        index = self._index
+        seq = index["next_seq"]
+        os.replace(self.path, f"{self.path}.{seq}")
+        index["segments"].append({"seq": seq, "start": index["active_start"],
+                                  "end": index["active_start"] + self._size})
+        index["active_start"] += self._size
+        index["next_seq"] = seq + 1
+        while len(index["segments"]) > self.backups:
+            old = index["segments"].pop(0)
+            path = _segment_path(self.log_dir, old["seq"])
+            if path is not None:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        _write_index(self.log_dir, index)
+        self.stats["rotations"] += 1
+        if self.compress:
+            self._compressors = [t for t in self._compressors if t.is_alive()]
+            thread = threading.Thread(target=_compress, args=(f"{self.path}.{seq}",), daemon=True,
+                                      name=f"log-gzip:{seq}")
+            thread.start()
+            self._compressors.append(thread)
+        self._open_locked()
+
+
+class _Flusher:
+    """Satu thread untuk flush berkala semua writer yang terbuka di proses ini."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._writers: "weakref.WeakSet[RunLogWriter]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, writer: RunLogWriter):
+        with self._lock:
+            self._writers.add(writer)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="log-flusher", daemon=True)
+                self._thread.start()
+
+    def unregister(self, writer: RunLogWriter):
+        with self._lock:
+            self._writers.discard(writer)
+
+    def writers(self) -> List[RunLogWriter]:
+        with self._lock:
+            return list(self._writers)
+
+    def flush_all(self, log_dir: Optional[str] = None):
+        for writer in self.writers():
+            if log_dir is None or os.path.abspath(writer.log_dir) == os.path.abspath(log_dir):
+                writer.flush()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush_all()
+
+
+_flusher = _Flusher(FLUSH_INTERVAL)
+atexit.register(_flusher.flush_all)
+
+
+# --- baca ---
+
+def _parse(line: bytes) -> Dict[str, Any]:
+    text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+    try:
+        record = json.loads(text)
+        if isinstance(record, dict):
+            return record
+    except ValueError:
+        pass
+    # log format lama: "[HH:MM:SS] pesan"
+    match = _LEGACY_LINE.match(text)
+    record = make_record(match.group(2) if match else text)
+    record["ts"] = match.group(1) if match else None
+    return record
+
+
+def _segments(log_dir: str) -> List[Dict[str, Any]]:
+    """Segmen yang masih ada (urut offset) + file aktif: {path, start, end}."""
+    index = _read_index(log_dir)
+    out = []
+    for seg in index["segments"]:
+        path = _segment_path(log_dir, seg["seq"])
+        if path is not None:
+            out.append({"path": path, "start": seg["start"], "end": seg["end"]})
+    active = os.path.join(log_dir, LOG_FILE)
+    size = os.path.getsize(active) if os.path.exists(active) else 0
+    out.append({"path": active, "start": index["active_start"], "end": index["active_start"] + size})
+    return out
+
+
+def _open_segment(path: str):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _tail_plain(path: str, end: int, lines: int) -> List[bytes]:
+    """``lines`` baris terakhir file plain sampai byte ``end``, dibaca mundur per blok."""
+    chunks, newlines, pos = [], 0, end
+    with open(path, "rb") as f:
+        while pos > 0 and newlines <= lines:
+            size = min(_TAIL_BLOCK, pos)
+            pos -= size
+            f.seek(pos)
+            block = f.read(size)
+            chunks.append(block)
+            newlines += block.count(b"\n")
+    data = b"".join(reversed(chunks))
+    out = data.splitlines(keepends=True)
+    if pos > 0:
+        out = out[1:]  # baris pertama kemungkinan terpotong
+    return out[-lines:] if lines else []
+
+
+def read_log(log_dir: str, offset: Optional[int] = None, limit_bytes: int = DEFAULT_READ_BYTES,
+             tail: int = 200) -> Dict[str, Any]:
+    """Baca log run.
+
+    ``offset=None``: ``tail`` baris terakhir (dibaca dari ujung file). ``offset``:
+    baris lengkap mulai offset logis itu sampai sekitar ``limit_bytes``; lanjutkan
+    dengan ``next_offset``. ``truncated`` = offset sudah terhapus rotasi."""
+    _flusher.flush_all(log_dir)
+    segments = _segments(log_dir)
+    first, size = segments[0]["start"], segments[-1]["end"]
+    truncated = False
+
+    if offset is None:
+        lines: List[bytes] = []
+        start = size
+        for seg in reversed(segments):
+            need = tail - len(lines)
+            if need <= 0:
+                break
+            if seg["path"].endswith(".gz"):
+                with gzip.open(seg["path"], "rb") as f:
+                    part = f.read().splitlines(keepends=True)[-need:]
+            elif os.path.exists(seg["path"]):
+                part = _tail_plain(seg["path"], seg["end"] - seg["start"], need)
+            else:
+                part = []
+            lines = part + lines
+            start = seg["end"] - sum(len(line) for line in part)
+        return {"offset": start, "next_offset": size, "size": size, "truncated": False,
+                "lines": [_parse(line) for line in lines]}
+
+    if offset < first:
+        offset, truncated = first, True
+    offset = min(offset, size)
+    data = b""
+    for seg in segments:
+        if seg["end"] <= offset + len(data) or not os.path.exists(seg["path"]):
+            continue
+        with _open_segment(seg["path"]) as f:
+            f.seek(offset + len(data) - seg["start"])
+            while len(data) < limit_bytes or b"\n" not in data:
+                block = f.read(min(_TAIL_BLOCK, seg["end"] - seg["start"] - f.tell()))
+                if not block:
+                    break
+                data += block
+        if len(data) >= limit_bytes and b"\n" in data:
+            break
+    # hanya baris lengkap; sisa baris (masih di buffer writer / terpotong limit) dibaca berikutnya
+    cut = data.rfind(b"\n") + 1
+    data = data[:cut]
+    return {"offset": offset, "next_offset": offset + len(data), "size": size, "truncated": truncated,
+            "lines": [_parse(line) for line in data.splitlines()]}
@@ -0,0 +1,391 @@
+"""Persistent job queue + GPU-aware scheduler untuk training run.
+
+Job disimpan di tabel ``jobs`` (SQLiteStorage) supaya antrian selamat dari
+restart server. Slot worker diturunkan dari ``get_hardware_info()``: satu slot
+per GPU (kapasitas = VRAM) plus budget RAM host. Job baru hanya dijalankan kalau
+estimasi memorinya muat (admission control); sisanya menunggu di antrian
+berdasarkan prioritas lalu FIFO.
+"""
+import datetime, importlib, os, re, sys, threading, traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.storage.sqlite_storage import get_storage
+from core.events import bus, is_terminal_state
+from core.checkpointing import latest_checkpoint
+from core.registry import STRATEGIES, TRAINERS, loads_model
+
+# job yang terputus karena restart dijalankan maksimal sekian kali (requeue maksimal MAX_ATTEMPTS - 1 kali)
+MAX_ATTEMPTS = 3
+
+# ring buffer event run terminal dilepas setelah sekian detik (client sempat replay state akhir)
+EVENT_HISTORY_GRACE_SEC = float(os.environ.get("FINETUNE_EVENT_HISTORY_GRACE_SEC", "300"))
+
+# ukuran model yang diasumsikan kalau tidak ada config/manifest/nama (estimasi soft)
+SOFT_PARAMS_BILLION = 1.0
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+# byte per parameter base model (+ overhead adapter/optimizer kecil untuk LoRA)
+_BYTES_PER_PARAM = {"qlora": 0.7, "lora": 2.4, "full": 16.0}
+
+
+def build_trainer(run_id: str, cfg: Dict[str, Any]):
+    """Pilih trainer berdasarkan cfg["backend"] lewat ``core.registry.TRAINERS``;
+    modul backend (torch/transformers) baru di-import di sini, bukan saat server boot.
+
+    ``cfg["compute"]["isolation"]``: ``process`` menjalankan trainer di child process
+    sendiri, ``host`` sebagai thread di ModelHost bersama (base model dipakai ulang antar
+    run, lihat core.workers), ``thread`` di proses API. ``auto`` (default) lihat
+    ``auto_isolation``. Backend tidak dikenal = mock.
+    """
+    mode = cfg.get("backend", "mock")
+    isolation = (cfg.get("compute") or {}).get("isolation", "auto")
+    if isolation == "auto":
+        isolation = auto_isolation(mode, cfg)
+    if isolation == "process":
+        from core.workers import ProcessTrainer
+        return ProcessTrainer(run_id, cfg)
+    if isolation == "host":
+        from core.workers import HostedTrainer
+        return HostedTrainer(run_id, cfg)
+    trainer_cls = TRAINERS.resolve(mode if mode in TRAINERS else "mock")
+    return trainer_cls(run_id, cfg)
+
+
+def auto_isolation(mode: str, cfg: Dict[str, Any], models_dir: str = MODELS_DIR) -> str:
+    """``thread`` untuk backend tanpa model (mock); ``host`` untuk run adapter (LoRA/QLoRA)
+    supaya base model di BaseModelCache ModelHost dipakai ulang; ``process`` untuk full
+    fine-tune (bobotnya diubah, tidak bisa di-share) dan run yang ditolak ``host_check``
+    backend (mis. DeepSpeed ZeRO-3)."""
+    if not loads_model(mode):
+        return "thread"
+    if (cfg.get("strategy") or "lora").lower() not in STRATEGIES:
+        return "process"
+    check = TRAINERS.meta(mode).get("host_check")
+    if check:
+        module, _, attr = check.partition(":")
+        if not getattr(importlib.import_module(module), attr)(cfg, models_dir):
+            return "process"
+    return "host"
+
+
+def estimate_job_memory(cfg: Dict[str, Any], models_dir: str = MODELS_DIR) -> Dict[str, Any]:
+    """Estimasi kasar kebutuhan memori job: {"vram_gb", "ram_gb", "params_source"}.
+
+    ``cfg["resources"]`` selalu menang kalau diisi. Tanpa itu, jumlah parameter
+    diambil dari manifest model lokal, lalu config.json (core.planner), lalu
+    nama model (mis. ``Llama-2-7b``). Kalau ukuran tidak diketahui sama sekali,
+    estimasi ditandai ``soft``: job tetap diterima (tidak pernah ditolak saat submit).
+    """
+    override = cfg.get("resources") or {}
+    backend = cfg.get("backend", "mock")
+    if not loads_model(backend):
+        est: Dict[str, Any] = {"vram_gb": 0.0, "ram_gb": 0.5}
+    else:
+        params_b, source = _model_params_billion(cfg.get("base_model") or "", models_dir)
+        strategy = (cfg.get("strategy") or "lora").lower()
+        weights = params_b * _BYTES_PER_PARAM.get(strategy, _BYTES_PER_PARAM["lora"])
+        # activations + CUDA context
+        est = {"vram_gb": round(weights * 1.2 + 1.5, 2), "ram_gb": round(params_b * 2 + 2, 2),
+               "params_source": source}
+        if source == "unknown":
+            est["soft"] = True
+    overrides = {k: float(v) for k, v in override.items() if k in ("vram_gb", "ram_gb")}
+    if overrides:
+        est.update(overrides)
+        est.pop("soft", None)
+    return est
+
+
+def _model_params_billion(model_id: str, models_dir: str) -> Tuple[float, str]:
+    """(parameter dalam miliar, sumber): manifest | config | name | unknown."""
+    from core import planner
+    from core.model_manifest import get_manifest_cache
+
+    name = model_id.replace("/", "_")
+    if model_id and os.path.isdir(os.path.join(models_dir, name)):
+        manifest = get_manifest_cache(models_dir).get(name)
+        if manifest and manifest.get("parameters"):
+            return manifest["parameters"] / 1e9, "manifest"
+    config = planner.find_model_config(model_id, models_dir) if model_id else None
+    if config:
+        try:
+            return planner.count_parameters(planner.normalize_config(config))["total"] / 1e9, "config"
+        except ValueError:
+            pass
+    match = re.search(r"(\d+(?:\.\d+)?)\s*([bm])\b", model_id.lower().replace("_", "-").replace("-", " "))
+    if match:
+        value = float(match.group(1))
+        return (value / 1000 if match.group(2) == "m" else value), "name"
+    return SOFT_PARAMS_BILLION, "unknown"
+
+
+class Slot:
+    def __init__(self, name: str, capacity_gb: float, gpu_index: Optional[int] = None):
+        self.name = name
+        self.capacity_gb = capacity_gb
+        self.gpu_index = gpu_index
+        self.used_gb = 0.0
+        self.jobs: List[str] = []
+
+    @property
+    def free_gb(self) -> float:
+        return self.capacity_gb - self.used_gb
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "gpu_index": self.gpu_index, "capacity_gb": self.capacity_gb,
+                "used_gb": round(self.used_gb, 2), "jobs": list(self.jobs)}
+
+
+class Scheduler:
+    def __init__(self, storage=None, hardware: Optional[Dict] = None,
+                 trainer_factory: Callable = build_trainer,
+                 ram_fraction: float = 0.8, max_cpu_jobs: Optional[int] = None,
+                 poll_interval: float = 2.0):
+        self.db = storage or get_storage()
+        self.trainer_factory = trainer_factory
+        self.poll_interval = poll_interval
+        if hardware is None:
+            from core.hardware import get_hardware_info
+            hardware = get_hardware_info()
+        self.hardware = hardware
+
+        self.gpu_slots = [
+            Slot(f"gpu:{g['index']}", float(g["vram_gb"]), g["index"])
+            for g in hardware.get("gpu_list") or []
+        ]
+        self.ram_slot = Slot("ram", float(hardware.get("ram_gb", 0)) * ram_fraction)
+        self.max_cpu_jobs = max_cpu_jobs or os.cpu_count() or 1
+
+        self._lock = threading.Condition()
+        self._running: Dict[str, Dict] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # --- public API ---
+
+    def start(self):
+        """Resume antrian dari DB lalu jalankan loop scheduler."""
+        for job in self.db.list_jobs(["cancelling"]):
+            self._finish(job["run_id"], "cancelled")
+            self.db.update_run_state(job["run_id"], "Cancelled")
+        for job in self.db.list_jobs(["running"]):
+            # server mati saat job jalan -> antrikan ulang; attempts = jumlah requeue sebelumnya
+            if job["attempts"] + 1 >= MAX_ATTEMPTS:
+                self._finish(job["run_id"], "failed", "Interrupted too many times")
+                self.db.update_run_state(job["run_id"], "Failed", {"error": "Interrupted too many times"})
+                continue
+            self.db.update_job(job["run_id"], state="queued", attempts=job["attempts"] + 1, slot=None)
+            ckpt = latest_checkpoint(self.db, job["run_id"])
+            if ckpt is not None:
+                self.db.patch_config(job["run_id"], {"resume_from_checkpoint": ckpt["path"]})
+            self.db.update_run_state(job["run_id"], "Queued", {"reason": "requeued after restart",
+                                                               "checkpoint": ckpt["path"] if ckpt else None})
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._stopping = True
+            running = [r["trainer"] for r in self._running.values() if r["trainer"] is not None]
+            self._lock.notify_all()
+        for trainer in running:
+            # worker process dimatikan; job tetap "running" supaya di-requeue saat start()
+            if hasattr(trainer, "shutdown"):
+                trainer.shutdown()
+        workers = sys.modules.get("core.workers")
+        if workers is not None:
+            workers.close_model_host()
+
+    def submit(self, run_id: str, cfg: Dict[str, Any], priority: int = 0) -> Dict:
+        resources = estimate_job_memory(cfg)
+        if resources.get("soft"):
+            # ukuran model tidak diketahui: jangan tolak, batasi estimasi ke kapasitas terbesar
+            resources = self._clamp(resources)
+        self.db.enqueue_job(run_id, priority=priority, resources=resources)
+        reason = None if resources.get("soft") else self._never_fits(resources)
+        if reason:
+            self._finish(run_id, "failed", reason)
+            self.db.update_run_state(run_id, "Failed", {"error": reason})
+            return self.db.get_job(run_id)
+        self.db.update_run_state(run_id, "Queued", {"priority": priority})
+        self.wake()
+        return self.db.get_job(run_id)
+
+    def cancel(self, run_id: str, force: bool = False) -> Optional[Dict]:
+        job = self.db.get_job(run_id)
+        if job is None:
+            return None
+        with self._lock:
+            running = self._running.get(run_id)
+        if running is not None and running["trainer"] is not None:
+            running["trainer"].cancel(force=force)
+            self.db.update_job(run_id, state="cancelling")
+        elif job["state"] == "queued":
+            self._finish(run_id, "cancelled")
+            self.db.update_run_state(run_id, "Cancelled")
+        return self.db.get_job(run_id)
+
+    def _clamp(self, resources: Dict) -> Dict:
+        out = {**resources, "ram_gb": min(resources.get("ram_gb", 0.0), self.ram_slot.capacity_gb)}
+        if self.gpu_slots:
+            out["vram_gb"] = min(resources.get("vram_gb", 0.0), max(s.capacity_gb for s in self.gpu_slots))
+        return out
+
+    def _never_fits(self, resources: Dict) -> Optional[str]:
+        if resources.get("ram_gb", 0.0) > self.ram_slot.capacity_gb:
+            return f"Job needs {resources['ram_gb']} GB RAM, budget is {self.ram_slot.capacity_gb:.1f} GB"
+        if self.gpu_slots and resources.get("vram_gb", 0.0) > max(s.capacity_gb for s in self.gpu_slots):
+            return f"Job needs {resources['vram_gb']} GB VRAM, largest GPU has {max(s.capacity_gb for s in self.gpu_slots)} GB"
+        return None
+
+    def wake(self):
+        with self._lock:
+            self._lock.notify_all()
+
+    def status(self) -> Dict:
+        with self._lock:
+            slots = [s.to_dict() for s in self.gpu_slots + [self.ram_slot]]
+        return {
+            "slots": slots,
+            "max_cpu_jobs": self.max_cpu_jobs,
+            "running": self.db.list_jobs(["running", "cancelling"]),
+            "queued": self.db.list_jobs(["queued"]),
+        }
+
+    # --- internals ---
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+            try:
+                self._schedule()
+            except Exception:
+                traceback.print_exc()
+            with self._lock:
+                if self._stopping:
+                    return
+                self._lock.wait(self.poll_interval)
+
+    def _schedule(self):
+        # antrian urut prioritas: begitu job tertahan karena resource, job berprioritas lebih rendah
+        # tidak di-admit (slot yang dilepas disimpan untuk job itu, tidak habis dipakai job kecil)
+        blocked_priority = None
+        for job in self.db.list_jobs(["queued"]):
+            if job["run_id"] in self._running:
+                continue
+            if blocked_priority is not None and job["priority"] < blocked_priority:
+                break
+            placed, gpu = self._admit(job)
+            if placed:
+                self._launch(job, gpu)
+            elif blocked_priority is None:
+                blocked_priority = job["priority"]
+
+    def _admit(self, job: Dict):
+        """Reservasi slot untuk job -> (placed, gpu_slot). placed=False berarti harus menunggu."""
+        need_vram = job["resources"].get("vram_gb", 0.0)
+        need_ram = job["resources"].get("ram_gb", 0.0)
+        with self._lock:
+            if need_ram > self.ram_slot.free_gb:
+                return False, None
+            if need_vram > 0 and self.gpu_slots:
+                # best fit: GPU dengan sisa VRAM paling kecil yang masih muat
+                fits = [s for s in self.gpu_slots if s.free_gb >= need_vram]
+                if not fits:
+                    return False, None
+                gpu = min(fits, key=lambda s: s.free_gb)
+            else:
+                # host tanpa GPU (atau job CPU-only): dibatasi RAM + jumlah job CPU
+                cpu_jobs = sum(1 for r in self._running.values() if r["gpu"] is None)
+                if cpu_jobs >= self.max_cpu_jobs:
+                    return False, None
+                gpu = None
+            self.ram_slot.used_gb += need_ram
+            self.ram_slot.jobs.append(job["run_id"])
+            if gpu is not None:
+                gpu.used_gb += need_vram
+                gpu.jobs.append(job["run_id"])
+            self._running[job["run_id"]] = {"trainer": None, "resources": job["resources"], "gpu": gpu}
+            return True, gpu
+
+    def _release(self, run_id: str):
+        with self._lock:
+            entry = self._running.pop(run_id, None)
+            if entry is None:
+                return
+            res = entry["resources"]
+            self.ram_slot.used_gb -= res.get("ram_gb", 0.0)
+            if run_id in self.ram_slot.jobs:
+                self.ram_slot.jobs.remove(run_id)
+            gpu = entry["gpu"]
+            if gpu is not None:
+                gpu.used_gb -= res.get("vram_gb", 0.0)
+                gpu.jobs.remove(run_id)
+            self._lock.notify_all()
+
+    def _launch(self, job: Dict, gpu: Optional[Slot]):
+        run_id = job["run_id"]
+        run = self.db.get_run(run_id)
+        cfg = dict(run["config"]) if run else {}
+        if gpu is not None:
+            cfg.setdefault("compute", {})
+            cfg["compute"] = {**cfg["compute"], "gpu_index": gpu.gpu_index}
+        try:
+            trainer = self.trainer_factory(run_id, cfg)
+        except Exception as ex:
+            self._release(run_id)
+            self._finish(run_id, "failed", str(ex))
+            self.db.update_run_state(run_id, "Failed", {"error": str(ex)})
+            return
+
+        with self._lock:
+            self._running[run_id]["trainer"] = trainer
+        self.db.update_job(run_id, state="running", slot=gpu.name if gpu else "cpu",
+                           started_at=datetime.datetime.now().isoformat())
+        thread = threading.Thread(target=self._run_job, args=(run_id, trainer, gpu), daemon=True)
+        thread.start()
+
+    def _run_job(self, run_id: str, trainer, gpu: Optional[Slot]):
+        if gpu is not None:
+            trainer.log(f"Scheduled on {gpu.name}")
+        try:
+            trainer.train()
+            if getattr(trainer, "_shutdown", False):
+                return
+            state = "cancelled" if trainer.cancelled else "done"
+            self._finish(run_id, state)
+        except Exception as ex:
+            trainer.log(f"❌ Training failed: {ex}")
+            self._finish(run_id, "failed", str(ex))
+            self.db.update_run_state(run_id, "Failed", {"error": str(ex)})
+        finally:
+            trainer.close_log()
+            self._release(run_id)
+            timer = threading.Timer(EVENT_HISTORY_GRACE_SEC, self._forget_events, args=(run_id,))
+            timer.daemon = True
+            timer.start()
+
+    def _forget_events(self, run_id: str):
+        # run yang di-resume lagi dalam grace period tetap punya history
+        run = self.db.get_run(run_id)
+        if run is None or is_terminal_state(run["state"]):
+            bus.forget(run_id)
+
+    def _finish(self, run_id: str, state: str, error: Optional[str] = None):
+        self.db.update_job(run_id, state=state, error=error,
+                           finished_at=datetime.datetime.now().isoformat())
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
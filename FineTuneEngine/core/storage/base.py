@@ -5,6 +5,16 @@ class IStorageProvider(Protocol):
     def update_run_state(self, run_id: str, state: str, extra: Optional[Dict] = None): ...
     def append_metric(self, run_id: str, step: int, metrics: Dict): ...
     def register_checkpoint(self, run_id: str, step: int, path: str, meta: Optional[Dict] = None): ...
-    def get_run(self, run_id: str) -> Dict: ...
-    def list_runs(self, filters: Optional[Dict] = None) -> List[Dict]: ...
+    def delete_checkpoint(self, run_id: str, path: str): ...
+    def append_profile(self, run_id: str, step: int, record: Dict): ...
+    def append_telemetry(self, sample: Dict): ...
+    def prune_telemetry(self, before_ts: float) -> int: ...
+    def get_run(self, run_id: str) -> Optional[Dict]: ...
+    def list_runs(self, filters: Optional[Dict] = None, limit: int = 50, offset: int = 0) -> List[Dict]: ...
+    def get_metrics(self, run_id: str, start_step: Optional[int] = None, end_step: Optional[int] = None,
+                    max_points: Optional[int] = None, method: str = "bucket") -> Dict: ...
+    def get_checkpoints(self, run_id: str) -> List[Dict]: ...
+    def get_profile(self, run_id: str, start_step: Optional[int] = None,
+                    end_step: Optional[int] = None) -> List[Dict]: ...
+    def get_telemetry(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> List[Dict]: ...
     def patch_config(self, run_id: str, patch: Dict): ...
@@ -0,0 +1,39 @@
+from typing import List, Sequence
+
+
+def lttb(rows: Sequence[tuple], threshold: int) -> List[tuple]:
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    ``rows`` adalah tuple ``(step, value, ...)`` yang sudah urut per step; bentuk
+    kurva dipertahankan berdasarkan kolom value (index 1). Row dengan value None
+    dilewati. Titik pertama dan terakhir selalu ikut.
+    """
+    rows = [r for r in rows if r[1] is not None]
+    n = len(rows)
+    if threshold >= n or threshold < 3:
+        return list(rows)
+
+    sampled = [rows[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # rata-rata bucket berikutnya jadi titik C
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(rows[j][0] for j in range(next_start, next_end)) / span
+        avg_y = sum(rows[j][1] for j in range(next_start, next_end)) / span
+
+        # pilih titik di bucket sekarang dengan luas segitiga (A, B, C) terbesar
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = rows[a][0], rows[a][1]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (rows[j][1] - ay) - (ax - rows[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(rows[best])
+        a = best
+    sampled.append(rows[-1])
+    return sampled
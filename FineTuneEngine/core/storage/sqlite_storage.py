@@ -1,86 +1,617 @@
-import sqlite3, json, uuid, datetime
+import sqlite3, json, uuid, datetime, os, threading, queue, time, atexit, traceback
+from contextlib import contextmanager
 from typing import Dict, List, Optional
+from core.storage.downsample import lttb
+from core.events import bus
+
+DEFAULT_DB_PATH = "storage/ai_tuner.db"
+
+# PRAGMA user_version; naikkan setiap ada perubahan schema + tambahkan langkah di _migrate()
+SCHEMA_VERSION = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    run_name TEXT,
+    base_model TEXT,
+    state TEXT,
+    config_json TEXT,
+    device_used TEXT,
+    hardware_json TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    step INTEGER,
+    loss REAL,
+    lr REAL,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    step INTEGER,
+    path TEXT,
+    metrics_json TEXT,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS profile (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    step INTEGER,
+    record_json TEXT,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS telemetry (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    sample_json TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id TEXT PRIMARY KEY,
+    state TEXT,
+    priority INTEGER DEFAULT 0,
+    resources_json TEXT,
+    slot TEXT,
+    attempts INTEGER DEFAULT 0,
+    error TEXT,
+    created_at TEXT,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sweeps (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    state TEXT,
+    config_json TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sweep_trials (
+    sweep_id TEXT NOT NULL,
+    trial INTEGER NOT NULL,
+    run_id TEXT,
+    state TEXT,
+    params_json TEXT,
+    rungs_json TEXT,
+    best_value REAL,
+    last_value REAL,
+    last_step INTEGER,
+    updated_at TEXT,
+    PRIMARY KEY (sweep_id, trial)
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_metrics_run_step ON metrics (run_id, step);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_run_step ON checkpoints (run_id, step);
+CREATE INDEX IF NOT EXISTS idx_profile_run_step ON profile (run_id, step);
+CREATE INDEX IF NOT EXISTS idx_telemetry_ts ON telemetry (ts);
+CREATE INDEX IF NOT EXISTS idx_runs_state ON runs (state);
+CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, priority);
+CREATE INDEX IF NOT EXISTS idx_sweep_trials_run ON sweep_trials (run_id);
+"""
+
+METRIC_COLUMNS = "run_id, step, loss, lr, created_at"
+CHECKPOINT_COLUMNS = "run_id, step, path, metrics_json, created_at"
+
+
+class ConnectionPool:
+    """Small thread-safe pool of WAL-mode sqlite connections."""
+
+    def __init__(self, path: str, size: int = 4, timeout: float = 30.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return con
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                con = self._connect()
+                self._all.append(con)
+                return con
+        return self._idle.get(timeout=self.timeout)
+
+    @contextmanager
+    def connection(self):
+        """Pinjam satu koneksi; commit kalau sukses, rollback kalau error."""
+        con = self._acquire()
+        try:
+            yield con
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            self._idle.put(con)
+
+    def close(self):
+        with self._lock:
+            for con in self._all:
+                con.close()
+            self._all.clear()
+            self._idle = queue.LifoQueue()
+
 
 class SQLiteStorage:
-    def __init__(self, path="storage/ai_tuner.db"):
+    def __init__(self, path=DEFAULT_DB_PATH, pool_size: int = 4,
+                 batch_size: int = 256, flush_interval: float = 0.5):
         self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.pool = ConnectionPool(path, size=pool_size)
+
+        # append_metric hanya masuk queue, ditulis per batch oleh background writer
+        self._metric_queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
         self._init_db()
 
     def _init_db(self):
-        con = sqlite3.connect(self.path)
-        cur = con.cursor()
-        cur.executescript("""
-        CREATE TABLE IF NOT EXISTS runs (
-            id TEXT PRIMARY KEY,
-            run_name TEXT,
-            base_model TEXT,
-            state TEXT,
-            config_json TEXT,
-            device_used TEXT,
-            hardware_json TEXT,
-            created_at TEXT,
-            updated_at TEXT
-        );
-        """)
-        con.commit()
-        con.close()
+        with self.pool.connection() as con:
+            con.executescript(SCHEMA)
+            self._migrate(con)
+            con.executescript(INDEXES)
+
+    def _migrate(self, con: sqlite3.Connection):
+        """Upgrade file ai_tuner.db lama ke SCHEMA_VERSION."""
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+        if version < 2:
+            # v1: metrics/checkpoints tanpa primary key -> rebuild dengan kolom id
+            for table, columns in (("metrics", METRIC_COLUMNS), ("checkpoints", CHECKPOINT_COLUMNS)):
+                existing = [row[1] for row in con.execute(f"PRAGMA table_info({table})")]
+                if "id" in existing:
+                    continue
+                con.execute(f"ALTER TABLE {table} RENAME TO {table}_v1")
+                con.executescript(SCHEMA)
+                con.execute(
+                    f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_v1 ORDER BY rowid"
+                )
+                con.execute(f"DROP TABLE {table}_v1")
+        # v3: tabel jobs (scheduler) cukup dibuat oleh SCHEMA
+        # v4: tabel profile (core.profiler) cukup dibuat oleh SCHEMA
+        # v5: tabel telemetry (core.telemetry) cukup dibuat oleh SCHEMA
+        # v6: tabel sweeps + sweep_trials (core.sweeps) cukup dibuat oleh SCHEMA
+        con.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
 
     def create_run(self, cfg: Dict) -> str:
         run_id = str(uuid.uuid4())
         now = datetime.datetime.now().isoformat()
-        con = sqlite3.connect(self.path)
-        con.execute(
-            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (run_id, cfg.get("run_name"), cfg.get("base_model"), "Created",
-             json.dumps(cfg), None, None, now, now)
-        )
-        con.commit()
-        con.close()
+        with self.pool.connection() as con:
+            con.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, cfg.get("run_name"), cfg.get("base_model"), "Created",
+                 json.dumps(cfg), None, None, now, now)
+            )
         return run_id
-# Tambahkan di bawah fungsi create_run
 
     def update_run_state(self, run_id: str, state: str, extra=None):
-        con = sqlite3.connect(self.path)
-        cur = con.cursor()
-        cur.execute(
-            "UPDATE runs SET state=?, updated_at=? WHERE id=?",
-            (state, datetime.datetime.now().isoformat(), run_id)
-        )
-        con.commit()
-        con.close()
+        with self.pool.connection() as con:
+            con.execute(
+                "UPDATE runs SET state=?, updated_at=? WHERE id=?",
+                (state, datetime.datetime.now().isoformat(), run_id)
+            )
+        bus.publish(run_id, "state", {"state": state, **(extra or {})})
 
     def append_metric(self, run_id: str, step: int, metrics: Dict):
-        con = sqlite3.connect(self.path)
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS metrics (
-            run_id TEXT,
-            step INTEGER,
-            loss REAL,
-            lr REAL,
-            created_at TEXT
-        );
-        """)
-        con.execute(
-            "INSERT INTO metrics VALUES (?, ?, ?, ?, ?)",
+        self._ensure_writer()
+        self._metric_queue.put(
             (run_id, step, metrics.get("loss"), metrics.get("lr"), datetime.datetime.now().isoformat())
         )
-        con.commit()
-        con.close()
+        bus.publish(run_id, "metric", metrics, step=step)
 
     def register_checkpoint(self, run_id: str, step: int, path: str, meta=None):
-        con = sqlite3.connect(self.path)
-        con.execute("""
-        CREATE TABLE IF NOT EXISTS checkpoints (
-            run_id TEXT,
-            step INTEGER,
-            path TEXT,
-            metrics_json TEXT,
-            created_at TEXT
-        );
-        """)
-        con.execute(
-            "INSERT INTO checkpoints VALUES (?, ?, ?, ?, ?)",
-            (run_id, step, path, json.dumps(meta or {}), datetime.datetime.now().isoformat())
-        )
-        con.commit()
-        con.close()
+        with self.pool.connection() as con:
+            con.execute(
+                f"INSERT INTO checkpoints ({CHECKPOINT_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                (run_id, step, path, json.dumps(meta or {}), datetime.datetime.now().isoformat())
+            )
+        bus.publish(run_id, "checkpoint", {"path": path, "metrics": meta or {}}, step=step)
+
+    def append_profile(self, run_id: str, step: int, record: Dict):
+        """Satu row agregat profiler (per interval step, bukan per step)."""
+        with self.pool.connection() as con:
+            con.execute(
+                "INSERT INTO profile (run_id, step, record_json, created_at) VALUES (?, ?, ?, ?)",
+                (run_id, step, json.dumps(record), datetime.datetime.now().isoformat())
+            )
+        bus.publish(run_id, "profile", record, step=step)
+
+    def append_telemetry(self, sample: Dict):
+        """Satu sample hardware (core.telemetry); run terkait dicari lewat rentang waktu job."""
+        with self.pool.connection() as con:
+            con.execute("INSERT INTO telemetry (ts, sample_json) VALUES (?, ?)", (sample["ts"], json.dumps(sample)))
+
+    def prune_telemetry(self, before_ts: float) -> int:
+        with self.pool.connection() as con:
+            return con.execute("DELETE FROM telemetry WHERE ts < ?", (before_ts,)).rowcount
+
+    def delete_checkpoint(self, run_id: str, path: str):
+        """Hapus baris checkpoint (dipanggil retention setelah folder-nya dihapus)."""
+        with self.pool.connection() as con:
+            con.execute("DELETE FROM checkpoints WHERE run_id=? AND path=?", (run_id, path))
+
+    def patch_config(self, run_id: str, patch: Dict):
+        """Merge ``patch`` (level atas) ke config run."""
+        with self.pool.connection() as con:
+            row = con.execute("SELECT config_json FROM runs WHERE id=?", (run_id,)).fetchone()
+            if row is None:
+                return
+            cfg = {**json.loads(row[0] or "{}"), **patch}
+            con.execute("UPDATE runs SET config_json=?, updated_at=? WHERE id=?",
+                        (json.dumps(cfg), datetime.datetime.now().isoformat(), run_id))
+
+    # --- read side ---
+
+    def get_run(self, run_id: str) -> Optional[Dict]:
+        with self.pool.connection() as con:
+            con.row_factory = sqlite3.Row
+            try:
+                row = con.execute("SELECT * FROM runs WHERE id=?", (run_id,)).fetchone()
+                if row is None:
+                    return None
+                run = _run_to_dict(row)
+                last = con.execute(
+                    "SELECT MAX(step) AS last_step, COUNT(*) AS num_metrics FROM metrics WHERE run_id=?",
+                    (run_id,)
+                ).fetchone()
+                run.update(dict(last))
+            finally:
+                con.row_factory = None
+        return run
+
+    def list_runs(self, filters: Optional[Dict] = None, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """List run terbaru dulu. filters: state, base_model, run_name (substring),
+        created_after / created_before (ISO timestamp)."""
+        where, params = _run_filters(filters or {})
+        sql = f"SELECT * FROM runs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        with self.pool.connection() as con:
+            con.row_factory = sqlite3.Row
+            try:
+                rows = con.execute(sql, (*params, limit, offset)).fetchall()
+            finally:
+                con.row_factory = None
+        return [_run_to_dict(r) for r in rows]
+
+    def count_runs(self, filters: Optional[Dict] = None) -> int:
+        where, params = _run_filters(filters or {})
+        with self.pool.connection() as con:
+            return con.execute(f"SELECT COUNT(*) FROM runs {where}", params).fetchone()[0]
+
+    def get_metrics(self, run_id: str, start_step: Optional[int] = None, end_step: Optional[int] = None,
+                    max_points: Optional[int] = None, method: str = "bucket") -> Dict:
+        """Metric history satu run dalam range step [start_step, end_step].
+
+        Kalau jumlah row melebihi max_points, hasil di-downsample di server:
+        ``bucket`` = agregasi min/mean/max per bucket step (di SQL, lewat index),
+        ``lttb`` = Largest-Triangle-Three-Buckets atas kurva loss.
+        Row yang masih di buffer writer (< flush_interval) belum ikut terbaca.
+        """
+        lo = start_step if start_step is not None else -2 ** 63
+        hi = end_step if end_step is not None else 2 ** 63 - 1
+        rng = "WHERE run_id=? AND step BETWEEN ? AND ?"
+        with self.pool.connection() as con:
+            count, min_step, max_step = con.execute(
+                f"SELECT COUNT(*), MIN(step), MAX(step) FROM metrics {rng}", (run_id, lo, hi)
+            ).fetchone()
+            result = {"run_id": run_id, "total": count, "downsampled": None}
+            if not max_points or count <= max_points:
+                rows = con.execute(
+                    f"SELECT step, loss, lr FROM metrics {rng} ORDER BY step", (run_id, lo, hi)
+                ).fetchall()
+                result["points"] = [{"step": s, "loss": l, "lr": r} for s, l, r in rows]
+                return result
+
+            if method == "lttb":
+                rows = con.execute(
+                    f"SELECT step, loss, lr FROM metrics {rng} ORDER BY step", (run_id, lo, hi)
+                ).fetchall()
+                result["downsampled"] = "lttb"
+                result["points"] = [{"step": s, "loss": l, "lr": r} for s, l, r in lttb(rows, max_points)]
+                return result
+
+            width = max(1, -(-(max_step - min_step + 1) // max_points))
+            rows = con.execute(
+                f"""SELECT MIN(step), MAX(step), COUNT(*), MIN(loss), AVG(loss), MAX(loss), AVG(lr)
+                FROM metrics {rng} GROUP BY (step - ?) / ? ORDER BY 1""",
+                (run_id, lo, hi, min_step, width)
+            ).fetchall()
+        result["downsampled"] = "bucket"
+        result["bucket_width"] = width
+        result["points"] = [
+            {"step": first, "step_end": last, "count": n,
+             "loss_min": lmin, "loss": lmean, "loss_max": lmax, "lr": lr}
+            for first, last, n, lmin, lmean, lmax, lr in rows
+        ]
+        return result
+
+    def get_checkpoints(self, run_id: str) -> List[Dict]:
+        with self.pool.connection() as con:
+            rows = con.execute(
+                "SELECT step, path, metrics_json, created_at FROM checkpoints WHERE run_id=? ORDER BY step",
+                (run_id,)
+            ).fetchall()
+        return [{"step": s, "path": p, "metrics": json.loads(m or "{}"), "created_at": c}
+                for s, p, m, c in rows]
+
+    def get_profile(self, run_id: str, start_step: Optional[int] = None,
+                    end_step: Optional[int] = None) -> List[Dict]:
+        lo = start_step if start_step is not None else -2 ** 63
+        hi = end_step if end_step is not None else 2 ** 63 - 1
+        with self.pool.connection() as con:
+            rows = con.execute(
+                "SELECT record_json FROM profile WHERE run_id=? AND step BETWEEN ? AND ? ORDER BY step",
+                (run_id, lo, hi)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def get_telemetry(self, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> List[Dict]:
+        lo = start_ts if start_ts is not None else 0.0
+        hi = end_ts if end_ts is not None else float("inf")
+        with self.pool.connection() as con:
+            rows = con.execute(
+                "SELECT sample_json FROM telemetry WHERE ts BETWEEN ? AND ? ORDER BY ts", (lo, hi)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    # --- job queue (dipakai core.scheduler) ---
+
+    def enqueue_job(self, run_id: str, priority: int = 0, resources: Optional[Dict] = None):
+        with self.pool.connection() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO jobs (run_id, state, priority, resources_json, attempts, created_at) "
+                "VALUES (?, 'queued', ?, ?, 0, ?)",
+                (run_id, priority, json.dumps(resources or {}), datetime.datetime.now().isoformat())
+            )
+
+    def update_job(self, run_id: str, **fields):
+        if "resources" in fields:
+            fields["resources_json"] = json.dumps(fields.pop("resources"))
+        cols = ", ".join(f"{k}=?" for k in fields)
+        with self.pool.connection() as con:
+            con.execute(f"UPDATE jobs SET {cols} WHERE run_id=?", (*fields.values(), run_id))
+
+    def get_job(self, run_id: str) -> Optional[Dict]:
+        jobs = self._select_jobs("WHERE run_id=?", (run_id,))
+        return jobs[0] if jobs else None
+
+    def list_jobs(self, states: Optional[List[str]] = None) -> List[Dict]:
+        """Job urut prioritas tertinggi lalu FIFO."""
+        if states:
+            where = f"WHERE state IN ({', '.join('?' for _ in states)})"
+            return self._select_jobs(where, tuple(states))
+        return self._select_jobs("", ())
+
+    def _select_jobs(self, where: str, params: tuple) -> List[Dict]:
+        with self.pool.connection() as con:
+            con.row_factory = sqlite3.Row
+            try:
+                rows = con.execute(
+                    f"SELECT * FROM jobs {where} ORDER BY priority DESC, created_at ASC", params
+                ).fetchall()
+            finally:
+                con.row_factory = None
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["resources"] = json.loads(job.pop("resources_json") or "{}")
+            jobs.append(job)
+        return jobs
+
+    # --- sweep (dipakai core.sweeps) ---
+
+    def create_sweep(self, name: Optional[str], cfg: Dict, trials: List[Dict]) -> str:
+        sweep_id = str(uuid.uuid4())
+        now = datetime.datetime.now().isoformat()
+        with self.pool.connection() as con:
+            con.execute("INSERT INTO sweeps VALUES (?, ?, ?, ?, ?, ?)",
+                        (sweep_id, name, "running", json.dumps(cfg), now, now))
+            con.executemany(
+                "INSERT INTO sweep_trials (sweep_id, trial, state, params_json, rungs_json, updated_at) "
+                "VALUES (?, ?, 'pending', ?, '{}', ?)",
+                [(sweep_id, i, json.dumps(params), now) for i, params in enumerate(trials)]
+            )
+        return sweep_id
+
+    def update_sweep(self, sweep_id: str, state: str):
+        with self.pool.connection() as con:
+            con.execute("UPDATE sweeps SET state=?, updated_at=? WHERE id=?",
+                        (state, datetime.datetime.now().isoformat(), sweep_id))
+
+    def get_sweep(self, sweep_id: str) -> Optional[Dict]:
+        sweeps = self._select_sweeps("WHERE id=?", (sweep_id,))
+        return sweeps[0] if sweeps else None
+
+    def list_sweeps(self, states: Optional[List[str]] = None) -> List[Dict]:
+        if states:
+            return self._select_sweeps(f"WHERE state IN ({', '.join('?' for _ in states)})", tuple(states))
+        return self._select_sweeps("", ())
+
+    def _select_sweeps(self, where: str, params: tuple) -> List[Dict]:
+        with self.pool.connection() as con:
+            rows = con.execute(
+                f"SELECT id, name, state, config_json, created_at, updated_at FROM sweeps {where} "
+                "ORDER BY created_at DESC", params
+            ).fetchall()
+        return [{"id": r[0], "name": r[1], "state": r[2], "config": json.loads(r[3] or "{}"),
+                 "created_at": r[4], "updated_at": r[5]} for r in rows]
+
+    def update_trial(self, sweep_id: str, trial: int, **fields):
+        for key in ("params", "rungs"):
+            if key in fields:
+                fields[f"{key}_json"] = json.dumps(fields.pop(key))
+        fields["updated_at"] = datetime.datetime.now().isoformat()
+        cols = ", ".join(f"{k}=?" for k in fields)
+        with self.pool.connection() as con:
+            con.execute(f"UPDATE sweep_trials SET {cols} WHERE sweep_id=? AND trial=?",
+                        (*fields.values(), sweep_id, trial))
+
+    def list_trials(self, sweep_id: str) -> List[Dict]:
+        with self.pool.connection() as con:
+            con.row_factory = sqlite3.Row
+            try:
+                rows = con.execute("SELECT * FROM sweep_trials WHERE sweep_id=? ORDER BY trial",
+                                   (sweep_id,)).fetchall()
+            finally:
+                con.row_factory = None
+        trials = []
+        for row in rows:
+            trial = dict(row)
+            trial["params"] = json.loads(trial.pop("params_json") or "{}")
+            # key JSON selalu string; rung disimpan per milestone step
+            trial["rungs"] = {int(k): v for k, v in json.loads(trial.pop("rungs_json") or "{}").items()}
+            trials.append(trial)
+        return trials
+
+    # --- background metric writer ---
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="sqlite-metric-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _writer_loop(self):
+        while True:
+            marker, stop = None, False
+            try:
+                rows, marker, stop = self._drain(block=True)
+                self._write_metrics(rows)
+            except Exception:
+                # writer tidak boleh mati: row batch ini hilang, sisanya tetap ditulis
+                traceback.print_exc()
+            finally:
+                if marker is not None:
+                    marker.set()
+            if stop:
+                return
+
+    def _drain(self, block: bool):
+        """Ambil row dari queue sampai batch_size penuh atau flush_interval habis.
+
+        Item ``threading.Event`` adalah marker dari flush(): batch berhenti di situ,
+        caller menulis row-nya lalu men-set marker. Item ``None`` menghentikan writer.
+        Return ``(rows, marker, stop)``.
+        """
+        rows: List[tuple] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    item = self._metric_queue.get(timeout=timeout)
+                else:
+                    item = self._metric_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return rows, None, True
+            if isinstance(item, threading.Event):
+                return rows, item, False
+            rows.append(item)
+        return rows, None, False
+
+    def _write_metrics(self, rows: List[tuple]):
+        if not rows:
+            return
+        with self.pool.connection() as con:
+            con.executemany(f"INSERT INTO metrics ({METRIC_COLUMNS}) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Block sampai semua metric yang sudah di-append tertulis ke DB.
+        False (dan warning) kalau writer tidak selesai dalam ``timeout``."""
+        if self._writer is None or not self._writer.is_alive():
+            # tanpa writer: tulis langsung sampai queue kosong
+            while True:
+                rows, marker, stop = self._drain(block=False)
+                try:
+                    self._write_metrics(rows)
+                finally:
+                    if marker is not None:
+                        marker.set()
+                if stop or (not rows and marker is None):
+                    return True
+        done = threading.Event()
+        self._metric_queue.put(done)
+        if not done.wait(timeout):
+            print(f"⚠️ Metric flush timed out after {timeout}s ({self._metric_queue.qsize()} items still queued)")
+            return False
+        return True
+
+    def close(self):
+        self.flush()
+        if self._writer is not None and self._writer.is_alive():
+            self._metric_queue.put(None)
+            self._writer.join(timeout=5.0)
+        self.pool.close()
+
+
+def _run_to_dict(row: sqlite3.Row) -> Dict:
+    run = dict(row)
+    run["config"] = json.loads(run.pop("config_json") or "{}")
+    run["hardware"] = json.loads(run.pop("hardware_json") or "null")
+    return run
+
+
+def _run_filters(filters: Dict):
+    clauses, params = [], []
+    for key in ("state", "base_model"):
+        if filters.get(key):
+            clauses.append(f"{key} = ?")
+            params.append(filters[key])
+    if filters.get("run_name"):
+        clauses.append("run_name LIKE ?")
+        params.append(f"%{filters['run_name']}%")
+    if filters.get("created_after"):
+        clauses.append("created_at >= ?")
+        params.append(filters["created_after"])
+    if filters.get("created_before"):
+        clauses.append("created_at < ?")
+        params.append(filters["created_before"])
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+
+_instances: Dict[str, SQLiteStorage] = {}
+_instances_lock = threading.Lock()
+
+
+def get_storage(path: str = DEFAULT_DB_PATH) -> SQLiteStorage:
+    """Satu SQLiteStorage per file DB per proses, supaya pool & writer dipakai bersama."""
+    key = os.path.abspath(path)
+    with _instances_lock:
+        if key not in _instances:
+            _instances[key] = SQLiteStorage(path)
+        return _instances[key]
+
+
+@atexit.register
+def _flush_all():
+    for storage in list(_instances.values()):
+        try:
+            storage.flush(timeout=5.0)
+        except Exception:
+            pass
@@ -1,6 +1,11 @@
-from peft import LoraConfig, get_peft_model
+from typing import Any, Dict, Optional
+
 
 class BaseStrategy:
+    # cara base model di-load (dipakai core.model_loader sebelum apply)
+    torch_dtype: Optional[str] = "bfloat16"
+    quantization: Optional[Dict[str, Any]] = None  # kwargs BitsAndBytesConfig
+
     def __init__(self, model, config):
         self.model = model
         self.config = config
@@ -8,3 +13,20 @@ class BaseStrategy:
     def apply(self):
         """Override di subclass"""
         raise NotImplementedError("apply() must be implemented by subclass")
+
+    def lora_config(self):
+        from peft import LoraConfig
+        return LoraConfig(
+            r=self.config.get("r", 8),
+            lora_alpha=self.config.get("lora_alpha", 32),
+            lora_dropout=self.config.get("lora_dropout", 0.05),
+            bias="none",
+            task_type="CAUSAL_LM"
+        )
+
+
+def get_strategy(name: Optional[str]):
+    """Class strategy untuk ``cfg["strategy"]``; None = full fine-tune (bobot base ikut berubah)."""
+    from core.registry import STRATEGIES
+    name = (name or "lora").lower()
+    return STRATEGIES.resolve(name) if name in STRATEGIES else None
@@ -0,0 +1,375 @@
+"""Hyperparameter sweep: satu config run + search space -> banyak trial dengan pruning ASHA.
+
+Trial adalah run biasa (``db.create_run`` + ``Scheduler.submit``) dengan nilai
+parameter ditimpa lewat path bertitik (``training.learning_rate``, ``lora.r``).
+Maksimal ``max_concurrent`` trial aktif sekaligus; sisanya ``pending`` sampai ada
+trial yang selesai.
+
+Pruning ASHA (asynchronous successive halving) digerakkan event ``metric`` di
+core.events.bus (setiap ``append_metric``): saat trial melewati milestone rung
+(``min_steps`` x ``reduction_factor``^k) nilai metric-nya dicatat di rung itu, dan
+trial hanya lanjut kalau termasuk 1/``reduction_factor`` terbaik dari semua trial
+yang sudah mencapai rung yang sama. Sisanya di-cancel dengan state ``pruned``.
+
+Berbagi antar trial: dataset ter-tokenize diambil dari TokenCache (key = isi file, kolom teks
++ tokenizer, trial kedua dst cache hit). Dengan ``share_model`` trial adapter jalan di
+ModelHost (``isolation=auto`` -> ``host``, tetap terpisah dari proses API) sehingga
+BaseModelCache memakai ulang base model; satu entry hanya dipinjam satu run, jadi
+default ``max_concurrent`` backend HF = 1. ``share_model=False`` memberi tiap trial
+proses sendiri (``isolation=process``).
+"""
+import copy, itertools, math, random, threading
+from typing import Any, Callable, Dict, List, Optional
+
+from core.events import bus, is_terminal_state
+from core.registry import loads_model
+
+DEFAULTS = {"method": "random", "num_trials": 8, "seed": None, "metric": "loss", "mode": "min",
+            "max_concurrent": None, "share_model": True, "priority": 0}
+PRUNING_DEFAULTS = {"type": "asha", "min_steps": 10, "reduction_factor": 3, "max_steps": None}
+# state trial: pending -> running -> completed | failed | cancelled | pruned
+
+
+def normalize_sweep(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Isi default + validasi config sweep (lihat SweepConfig); ValueError kalau tidak valid."""
+    sweep = {**DEFAULTS, **cfg, "pruning": {**PRUNING_DEFAULTS, **(cfg.get("pruning") or {})}}
+    if not isinstance(sweep.get("base"), dict):
+        raise ValueError("sweep needs a base run config in 'base'")
+    if not sweep.get("space"):
+        raise ValueError("sweep needs a non-empty search 'space'")
+    if sweep["method"] not in ("random", "grid"):
+        raise ValueError(f"unknown sweep method '{sweep['method']}' (random | grid)")
+    if sweep["mode"] not in ("min", "max"):
+        raise ValueError("mode must be 'min' or 'max'")
+    if sweep["pruning"]["type"] not in ("asha", "none"):
+        raise ValueError(f"unknown pruning type '{sweep['pruning']['type']}' (asha | none)")
+    if sweep["pruning"]["reduction_factor"] < 2 or sweep["pruning"]["min_steps"] < 1:
+        raise ValueError("pruning needs reduction_factor >= 2 and min_steps >= 1")
+    if sweep["max_concurrent"] is None:
+        sweep["max_concurrent"] = 1 if loads_model(sweep["base"].get("backend", "mock")) else 4
+    return sweep
+
+
+def _choices(name: str, spec: Any) -> Optional[List[Any]]:
+    if isinstance(spec, list):
+        return spec
+    if isinstance(spec, dict) and "values" in spec:
+        return list(spec["values"])
+    if isinstance(spec, dict) and "min" in spec and "max" in spec:
+        return None
+    raise ValueError(f"invalid space for '{name}': use a list, {{'values': [...]}} or {{'min', 'max'}}")
+
+
+def _sample(spec: Dict[str, Any], rng: random.Random) -> Any:
+    lo, hi = spec["min"], spec["max"]
+    if spec.get("log"):
+        value = math.exp(rng.uniform(math.log(lo), math.log(hi)))
+    else:
+        value = rng.uniform(lo, hi)
+    return int(round(value)) if spec.get("type") == "int" else value
+
+
+def expand_space(space: Dict[str, Any], method: str = "random", num_trials: int = 8,
+                 seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Parameter tiap trial. ``grid``: semua kombinasi (maks ``num_trials``, hanya list nilai);
+    ``random``: ``num_trials`` sampel, list = pilihan acak, {"min", "max", "log"} = kontinu."""
+    choices = {name: _choices(name, spec) for name, spec in space.items()}
+    if method == "grid":
+        ranges = [name for name, values in choices.items() if values is None]
+        if ranges:
+            raise ValueError(f"grid sweep needs value lists, got ranges for {ranges}")
+        names = list(choices)
+        combos = itertools.islice(itertools.product(*(choices[n] for n in names)), num_trials)
+        return [dict(zip(names, combo)) for combo in combos]
+    rng = random.Random(seed)
+    return [{name: rng.choice(values) if values is not None else _sample(space[name], rng)
+             for name, values in choices.items()} for _ in range(num_trials)]
+
+
+def apply_params(cfg: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Salinan ``cfg`` dengan tiap ``"a.b.c": value`` ditimpa di path bertitik."""
+    out = copy.deepcopy(cfg)
+    for path, value in params.items():
+        node = out
+        *parents, leaf = path.split(".")
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = value
+    return out
+
+
+def milestones(pruning: Dict[str, Any], up_to: int) -> List[int]:
+    """Step rung ASHA sampai ``up_to``: min_steps, min_steps*eta, ... (di bawah max_steps)."""
+    out, step = [], pruning["min_steps"]
+    while step <= up_to and (pruning["max_steps"] is None or step < pruning["max_steps"]):
+        out.append(step)
+        step *= pruning["reduction_factor"]
+    return out
+
+
+def promote(value: float, recorded: List[float], reduction_factor: int, mode: str = "min") -> bool:
+    """ASHA: lanjut kalau ``value`` termasuk top 1/reduction_factor (minimal 1) dari ``recorded``."""
+    keep = max(1, len(recorded) // reduction_factor)
+    ranked = sorted(recorded, reverse=(mode == "max"))
+    cutoff = ranked[keep - 1]
+    return value <= cutoff if mode == "min" else value >= cutoff
+
+
+def _better(a: Optional[float], b: Optional[float], mode: str) -> bool:
+    if b is None:
+        return a is not None
+    if a is None:
+        return False
+    return a < b if mode == "min" else a > b
+
+
+class SweepManager:
+    def __init__(self, db=None, scheduler=None, log: Callable[[str], None] = print):
+        if db is None:
+            from core.storage.sqlite_storage import get_storage
+            db = get_storage()
+        self.db = db
+        self._scheduler = scheduler
+        self.log = log
+        self._lock = threading.RLock()
+        self._sweeps: Dict[str, Dict[str, Any]] = {}
+        self._trials: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_run: Dict[str, Dict[str, Any]] = {}
+        self._filling = False
+        self._started = False
+
+    @property
+    def scheduler(self):
+        if self._scheduler is None:
+            from core.scheduler import get_scheduler
+            self._scheduler = get_scheduler()
+        return self._scheduler
+
+    # --- lifecycle ---
+
+    def start(self):
+        """Muat sweep yang masih running dari DB lalu dengarkan event metric/state."""
+        if self._started:
+            return
+        self._started = True
+        bus.add_listener(self._on_event)
+        for sweep in self.db.list_sweeps(["running"]):
+            self._load(sweep)
+            # trial yang selesai saat server mati tidak sempat menerima event state
+            for trial in list(self._trials[sweep["id"]]):
+                if trial["active"]:
+                    run = self.db.get_run(trial["run_id"])
+                    if run is None or is_terminal_state(run["state"]):
+                        self._finished(trial, run["state"] if run else "Failed")
+            self._fill(sweep["id"])
+
+    def stop(self):
+        bus.remove_listener(self._on_event)
+        self._started = False
+
+    def _load(self, sweep: Dict[str, Any]):
+        trials = self.db.list_trials(sweep["id"])
+        with self._lock:
+            self._sweeps[sweep["id"]] = sweep
+            self._trials[sweep["id"]] = trials
+            for trial in trials:
+                trial["sweep_id"] = sweep["id"]
+                trial["active"] = trial["state"] in ("running", "pruned") and trial["run_id"] is not None
+                if trial["run_id"]:
+                    self._by_run[trial["run_id"]] = trial
+
+    # --- public API ---
+
+    def create(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
+        sweep_cfg = normalize_sweep(cfg)
+        self.start()  # listener metric harus aktif sebelum trial pertama jalan
+        params = expand_space(sweep_cfg["space"], sweep_cfg["method"], sweep_cfg["num_trials"], sweep_cfg["seed"])
+        if not params:
+            raise ValueError("search space produced no trials")
+        sweep_id = self.db.create_sweep(sweep_cfg.get("name"), sweep_cfg, params)
+        self._load(self.db.get_sweep(sweep_id))
+        self.log(f"Sweep {sweep_id}: {len(params)} trials, {sweep_cfg['method']} search, "
+                 f"pruning={sweep_cfg['pruning']['type']}")
+        self._fill(sweep_id)
+        return self.get(sweep_id)
+
+    def cancel(self, sweep_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if sweep_id not in self._sweeps:
+                return None
+            sweep = self._sweeps[sweep_id]
+            if sweep["state"] != "running":
+                return self.get(sweep_id)
+            sweep["state"] = "cancelled"
+            self.db.update_sweep(sweep_id, "cancelled")
+            for trial in self._trials[sweep_id]:
+                if trial["state"] == "pending":
+                    self._set_state(trial, "cancelled")
+            running = [t["run_id"] for t in self._trials[sweep_id] if t["active"]]
+        for run_id in running:
+            self.scheduler.cancel(run_id)
+        return self.get(sweep_id)
+
+    def get(self, sweep_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            sweep = self._sweeps.get(sweep_id)
+            trials = [self._public(t) for t in self._trials.get(sweep_id, [])]
+        if sweep is None:
+            sweep = self.db.get_sweep(sweep_id)
+            if sweep is None:
+                return None
+            trials = [self._public(t) for t in self.db.list_trials(sweep_id)]
+        counts: Dict[str, int] = {}
+        for trial in trials:
+            counts[trial["state"]] = counts.get(trial["state"], 0) + 1
+        board = self._rank(trials, sweep["config"]["mode"])
+        return {**sweep, "counts": counts, "best": board[0] if board else None, "trials": trials}
+
+    def list(self) -> List[Dict[str, Any]]:
+        return self.db.list_sweeps()
+
+    def leaderboard(self, sweep_id: str, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        sweep = self.get(sweep_id)
+        if sweep is None:
+            return None
+        board = self._rank(sweep["trials"], sweep["config"]["mode"])
+        return {"sweep_id": sweep_id, "state": sweep["state"], "metric": sweep["config"]["metric"],
+                "mode": sweep["config"]["mode"], "leaderboard": board[:limit] if limit else board}
+
+    # --- scheduling ---
+
+    def _fill(self, sweep_id: str):
+        """Launch trial pending sampai max_concurrent; re-entrant call (event dari submit) diabaikan."""
+        with self._lock:
+            if self._filling:
+                return
+            self._filling = True
+            try:
+                sweep = self._sweeps[sweep_id]
+                while sweep["state"] == "running":
+                    trials = self._trials[sweep_id]
+                    pending = [t for t in trials if t["state"] == "pending"]
+                    if not pending or sum(t["active"] for t in trials) >= sweep["config"]["max_concurrent"]:
+                        break
+                    self._launch(sweep, pending[0])
+                self._maybe_finish(sweep_id)
+            finally:
+                self._filling = False
+
+    def _launch(self, sweep: Dict[str, Any], trial: Dict[str, Any]):
+        cfg = sweep["config"]
+        run_cfg = apply_params(cfg["base"], trial["params"])
+        run_cfg["run_name"] = f"{cfg.get('name') or 'sweep'}-t{trial['trial']}"
+        run_cfg["sweep"] = {"id": sweep["id"], "trial": trial["trial"], "params": trial["params"]}
+        run_cfg["tags"] = list(run_cfg.get("tags") or []) + ["sweep"]
+        isolation = (run_cfg.get("compute") or {}).get("isolation", "auto")
+        if not cfg["share_model"] and isolation == "auto":
+            run_cfg["compute"] = {**(run_cfg.get("compute") or {}), "isolation": "process"}
+        elif cfg["share_model"] and isolation == "process" and trial["trial"] == 0:
+            self.log(f"Sweep {sweep['id']}: compute.isolation=process, trials load the base model separately")
+        run_id = self.db.create_run(run_cfg)
+        trial.update(run_id=run_id, state="running", active=True)
+        self._by_run[run_id] = trial
+        self.db.update_trial(sweep["id"], trial["trial"], run_id=run_id, state="running")
+        self.scheduler.submit(run_id, run_cfg, priority=int(cfg["priority"]))
+
+    def _maybe_finish(self, sweep_id: str):
+        sweep = self._sweeps[sweep_id]
+        trials = self._trials[sweep_id]
+        if sweep["state"] == "running" and not any(t["state"] == "pending" or t["active"] for t in trials):
+            sweep["state"] = "completed"
+            self.db.update_sweep(sweep_id, "completed")
+            best = self._rank([self._public(t) for t in trials], sweep["config"]["mode"])
+            self.log(f"Sweep {sweep_id} completed; best trial: "
+                     f"{best[0]['trial'] if best else None} ({best[0]['best_value'] if best else None})")
+
+    # --- events ---
+
+    def _on_event(self, event: Dict[str, Any]):
+        if event["type"] == "metric":
+            self._on_metric(event)
+        elif event["type"] == "state" and is_terminal_state(event["data"].get("state")):
+            with self._lock:
+                trial = self._by_run.get(event["run_id"])
+            if trial is not None and trial["active"]:
+                self._finished(trial, event["data"]["state"])
+
+    def _on_metric(self, event: Dict[str, Any]):
+        with self._lock:
+            trial = self._by_run.get(event["run_id"])
+            if trial is None or trial["state"] != "running":
+                return
+            cfg = self._sweeps[trial["sweep_id"]]["config"]
+            value = event["data"].get(cfg["metric"])
+            step = event["step"] if event["step"] is not None else event["data"].get("step")
+            if value is None or step is None:
+                return
+            trial["last_value"], trial["last_step"] = value, step
+            if _better(value, trial["best_value"], cfg["mode"]):
+                trial["best_value"] = value
+            pruning = cfg["pruning"]
+            if pruning["type"] != "asha":
+                return
+            for milestone in milestones(pruning, step):
+                if milestone in trial["rungs"]:
+                    continue
+                trial["rungs"][milestone] = value
+                recorded = [t["rungs"][milestone] for t in self._trials[trial["sweep_id"]] if milestone in t["rungs"]]
+                keep = promote(value, recorded, pruning["reduction_factor"], cfg["mode"])
+                self._persist(trial)
+                if not keep:
+                    self._prune(trial, milestone, len(recorded))
+                    return
+
+    def _prune(self, trial: Dict[str, Any], milestone: int, compared: int):
+        self._set_state(trial, "pruned")
+        self.log(f"Sweep {trial['sweep_id']}: pruning trial {trial['trial']} at step {milestone} "
+                 f"({trial['rungs'][milestone]} not in top of {compared})")
+        # cancel -> trainer berhenti di step berikutnya -> event state Cancelled -> _finished
+        self.scheduler.cancel(trial["run_id"])
+
+    def _finished(self, trial: Dict[str, Any], run_state: str):
+        with self._lock:
+            trial["active"] = False
+            if trial["state"] == "running":
+                state = {"Completed": "completed", "Cancelled": "cancelled"}.get(run_state, "failed")
+                self._set_state(trial, state)
+            else:
+                self._persist(trial)
+        self._fill(trial["sweep_id"])
+
+    def _set_state(self, trial: Dict[str, Any], state: str):
+        trial["state"] = state
+        self._persist(trial)
+
+    def _persist(self, trial: Dict[str, Any]):
+        self.db.update_trial(trial["sweep_id"], trial["trial"], state=trial["state"], rungs=trial["rungs"],
+                             best_value=trial["best_value"], last_value=trial["last_value"],
+                             last_step=trial["last_step"])
+
+    # --- read helpers ---
+
+    @staticmethod
+    def _public(trial: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: trial.get(k) for k in ("trial", "run_id", "state", "params", "best_value", "last_value",
+                                          "last_step", "rungs")}
+
+    @staticmethod
+    def _rank(trials: List[Dict[str, Any]], mode: str) -> List[Dict[str, Any]]:
+        """Trial yang punya nilai metric, terbaik dulu; seri -> yang sampai step lebih jauh."""
+        scored = [t for t in trials if t["best_value"] is not None]
+        sign = 1 if mode == "min" else -1
+        scored.sort(key=lambda t: (sign * t["best_value"], -(t["last_step"] or 0)))
+        return [{"rank": i + 1, **t, "rungs_reached": len(t["rungs"] or {})} for i, t in enumerate(scored)]
+
+
+_manager: Optional[SweepManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_sweeps() -> SweepManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SweepManager()
+        return _manager
@@ -0,0 +1,243 @@
+"""Sampler telemetry hardware di background: CPU, RAM, disk dan per-GPU.
+
+Setiap ``interval`` detik satu sample masuk ring buffer (``deque`` dengan
+``capacity``); ``GET /system/hardware`` dan ``/system/telemetry`` hanya membaca
+buffer itu, tanpa query hardware di request path. Selama ada job ``running``,
+sample juga disimpan ke tabel ``telemetry``; sample milik sebuah run dicari
+lewat rentang waktu job-nya (``started_at`` .. ``finished_at``) dan bisa
+dipasangkan dengan row profiler untuk melihat step lambat vs tekanan resource.
+
+GPU dibaca lewat NVML (``nvidia-ml-py``) dengan urutan ``CUDA_VISIBLE_DEVICES``
+yang sama dengan core.hardware; tanpa GPU / NVML field ``gpus`` kosong.
+"""
+import os, shutil, threading, time, traceback
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+from core.hardware import _detect_gpus
+
+DEFAULT_INTERVAL = float(os.environ.get("FINETUNE_TELEMETRY_INTERVAL", "2"))
+DEFAULT_CAPACITY = int(os.environ.get("FINETUNE_TELEMETRY_HISTORY", "1800"))
+RETENTION_DAYS = float(os.environ.get("FINETUNE_TELEMETRY_RETENTION_DAYS", "30"))
+_PRUNE_EVERY = 3600.0
+
+
+class _Nvml:
+    """Handle NVML yang dibuka sekali selama sampler hidup."""
+
+    def __init__(self):
+        self.handles: List[tuple] = []
+        self._nvml = None
+        gpus = _detect_gpus()["gpus"]
+        if not gpus:
+            return
+        try:
+            import pynvml
+            pynvml.nvmlInit()
+            self._nvml = pynvml
+            self.handles = [(g["index"], pynvml.nvmlDeviceGetHandleByUUID(g["uuid"])) for g in gpus if g.get("uuid")]
+        except Exception:
+            self.close()
+
+    def sample(self) -> List[Dict[str, Any]]:
+        nvml, out = self._nvml, []
+        for index, handle in self.handles:
+            try:
+                mem = nvml.nvmlDeviceGetMemoryInfo(handle)
+                util = nvml.nvmlDeviceGetUtilizationRates(handle)
+                gpu = {
+                    "index": index,
+                    "util_pct": float(util.gpu),
+                    "mem_used_gb": round(mem.used / 1024 ** 3, 2),
+                    "mem_total_gb": round(mem.total / 1024 ** 3, 2),
+                    "mem_pct": round(mem.used / mem.total * 100, 1) if mem.total else None,
+                }
+                try:
+                    gpu["temp_c"] = nvml.nvmlDeviceGetTemperature(handle, nvml.NVML_TEMPERATURE_GPU)
+                    gpu["power_w"] = round(nvml.nvmlDeviceGetPowerUsage(handle) / 1000, 1)
+                except Exception:
+                    pass  # tidak semua GPU expose sensor
+                out.append(gpu)
+            except Exception:
+                out.append({"index": index, "error": "unavailable"})
+        return out
+
+    def close(self):
+        if self._nvml is not None:
+            try:
+                self._nvml.nvmlShutdown()
+            except Exception:
+                pass
+        self._nvml, self.handles = None, []
+
+
+class TelemetrySampler:
+    def __init__(self, db=None, interval: float = DEFAULT_INTERVAL, capacity: int = DEFAULT_CAPACITY,
+                 disk_path: str = "/", log: Callable[[str], None] = print):
+        self.db = db
+        self.interval = interval
+        self.disk_path = disk_path
+        self.log = log
+        self._buffer: "deque[Dict[str, Any]]" = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._nvml: Optional[_Nvml] = None
+        self._last_io = None
+        self._last_pruned = 0.0
+        psutil.cpu_percent(None)  # panggilan pertama selalu 0.0; baseline untuk sample berikutnya
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        if self._nvml is not None:
+            self._nvml.close()
+            self._nvml = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.sample_now()
+            except Exception:
+                traceback.print_exc()
+            self._stop.wait(self.interval)
+
+    def sample_now(self) -> Dict[str, Any]:
+        """Ambil satu sample, masukkan ke buffer (dan DB kalau ada job running)."""
+        sample = self.collect()
+        with self._lock:
+            self._buffer.append(sample)
+        if self.db is not None:
+            self._persist(sample)
+        return sample
+
+    def collect(self) -> Dict[str, Any]:
+        if self._nvml is None:
+            self._nvml = _Nvml()
+        now = time.time()
+        vm = psutil.virtual_memory()
+        disk = shutil.disk_usage(self.disk_path)
+        sample = {
+            "ts": round(now, 3),
+            "cpu_pct": psutil.cpu_percent(None),
+            "load_avg_1m": round(os.getloadavg()[0], 2) if hasattr(os, "getloadavg") else None,
+            "ram_used_gb": round((vm.total - vm.available) / 1024 ** 3, 2),
+            "ram_pct": vm.percent,
+            "swap_pct": psutil.swap_memory().percent,
+            "disk_free_gb": round(disk.free / 1024 ** 3, 2),
+            "disk_pct": round(disk.used / disk.total * 100, 1) if disk.total else None,
+            "disk_read_mb_s": None,
+            "disk_write_mb_s": None,
+            "gpus": self._nvml.sample(),
+        }
+        io = psutil.disk_io_counters()
+        if io is not None:
+            if self._last_io is not None and now > self._last_io[0]:
+                elapsed = now - self._last_io[0]
+                sample["disk_read_mb_s"] = round((io.read_bytes - self._last_io[1].read_bytes) / elapsed / 1024 ** 2, 2)
+                sample["disk_write_mb_s"] = round((io.write_bytes - self._last_io[1].write_bytes) / elapsed / 1024 ** 2, 2)
+            self._last_io = (now, io)
+        return sample
+
+    def _persist(self, sample: Dict[str, Any]):
+        try:
+            if self.db.list_jobs(["running"]):
+                self.db.append_telemetry(sample)
+            if sample["ts"] - self._last_pruned > _PRUNE_EVERY:
+                self._last_pruned = sample["ts"]
+                self.db.prune_telemetry(sample["ts"] - RETENTION_DAYS * 86400)
+        except Exception as ex:
+            self.log(f"⚠️ Telemetry write failed: {ex}")
+
+    # --- read side ---
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._buffer[-1] if self._buffer else None
+
+    def series(self, since: Optional[float] = None, last_sec: Optional[float] = None,
+               max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            samples = list(self._buffer)
+        if last_sec is not None and samples:
+            since = max(since or 0.0, samples[-1]["ts"] - last_sec)
+        if since is not None:
+            samples = [s for s in samples if s["ts"] > since]
+        return thin(samples, max_points)
+
+
+def thin(samples: List[Dict[str, Any]], max_points: Optional[int]) -> List[Dict[str, Any]]:
+    """Ambil sample dengan jarak rata sampai maksimal ``max_points`` (titik terakhir selalu ikut)."""
+    if not max_points or len(samples) <= max_points:
+        return samples
+    if max_points == 1:
+        return samples[-1:]
+    step = (len(samples) - 1) / (max_points - 1)
+    return [samples[round(i * step)] for i in range(max_points)]
+
+
+def pressure(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Ringkasan sample dalam satu jendela waktu: rata-rata CPU/RAM, GPU util rata-rata & memori puncak."""
+    if not samples:
+        return {}
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return round(sum(values) / len(values), 1) if values else None
+
+    gpus = [g for s in samples for g in s.get("gpus") or [] if "util_pct" in g]
+    return {
+        "samples": len(samples),
+        "cpu_pct": mean(s["cpu_pct"] for s in samples),
+        "ram_pct": mean(s["ram_pct"] for s in samples),
+        "swap_pct": mean(s.get("swap_pct") for s in samples),
+        "disk_read_mb_s": mean(s.get("disk_read_mb_s") for s in samples),
+        "disk_write_mb_s": mean(s.get("disk_write_mb_s") for s in samples),
+        "gpu_util_pct": mean(g["util_pct"] for g in gpus),
+        "gpu_mem_pct": max((g["mem_pct"] for g in gpus if g.get("mem_pct") is not None), default=None),
+    }
+
+
+def align_steps(profile_rows: List[Dict[str, Any]], samples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Pasangkan tiap row profiler (window ``steps`` x ``wall_ms`` yang berakhir di ``ts``) dengan
+    ringkasan sample di jendela yang sama; kalau tidak ada, sample terdekat."""
+    out = []
+    for row in profile_rows:
+        end = row.get("ts")
+        if end is None:
+            continue
+        start = end - row["steps"] * row["wall_ms"] / 1000
+        window = [s for s in samples if start <= s["ts"] <= end]
+        if not window and samples:
+            window = [min(samples, key=lambda s: abs(s["ts"] - end))]
+        out.append({"step": row["step"], "wall_ms": row["wall_ms"], "tokens_per_sec": row.get("tokens_per_sec"),
+                    **pressure(window)})
+    return out
+
+
+_sampler: Optional[TelemetrySampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_telemetry() -> TelemetrySampler:
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            from core.storage.sqlite_storage import get_storage
+            _sampler = TelemetrySampler(get_storage())
+        return _sampler
@@ -1,12 +1,15 @@
 import torch, os
 from transformers import (
-    AutoTokenizer, AutoModelForCausalLM,
-    TrainingArguments, Trainer, DataCollatorForLanguageModeling
+    AutoTokenizer,
+    TrainingArguments
 )
-from datasets import load_dataset
+from core.data.dedup import apply_dedup
+from core.data.token_cache import TokenCache
+from core.data.packing import build_data_pipeline, trainer_class
 from core.trainers.base import BaseTrainer
-from core.strategies.lora import LoRAStrategy
-from core.strategies.qlora import QLoRAStrategy
+from core.trainers.hf_callbacks import AsyncCheckpointCallback, CancelCallback, MetricsCallback, ProfilerCallback
+from core.strategies.base import get_strategy
+from core.model_loader import get_model_cache
 
 
 class AccelerateTrainer(BaseTrainer):
@@ -16,40 +19,66 @@ class AccelerateTrainer(BaseTrainer):
 
         model_id = cfg.get("base_model")
         strategy = cfg.get("strategy", "lora")
-        dataset_path = cfg["dataset"]["path"]
 
         self.log(f"Loading base model: {model_id}")
         tokenizer = AutoTokenizer.from_pretrained(model_id)
         tokenizer.pad_token = tokenizer.eos_token
 
-        dataset = load_dataset("json", data_files=dataset_path, split="train")
-
-        def tokenize_fn(examples):
-            return tokenizer(examples["text"], truncation=True, padding="max_length", max_length=512)
-        dataset = dataset.map(tokenize_fn, batched=True)
+        dataset_cfg = apply_dedup(cfg["dataset"], log=self.log)
+        max_length = cfg["training"].get("max_seq_length", 512)
+        dataset = TokenCache().get_or_build(dataset_cfg, tokenizer, max_length=max_length, log=self.log,
+                                            num_proc=cfg["dataset"].get("num_proc"))
 
         self.log(f"Applying strategy: {strategy}")
-        model = AutoModelForCausalLM.from_pretrained(model_id, torch_dtype=torch.bfloat16, device_map="auto")
-
-        if strategy.lower() == "lora":
-            model = LoRAStrategy(model, cfg.get("lora", {})).apply()
-        elif strategy.lower() == "qlora":
-            model = QLoRAStrategy(model, {"base_model": model_id, **cfg.get("lora", {})}).apply()
-
-        args = TrainingArguments(
-            output_dir=os.path.join("checkpoints", self.run_id),
-            per_device_train_batch_size=cfg["training"].get("per_device_train_batch_size", 2),
-            learning_rate=cfg["training"].get("learning_rate", 2e-4),
-            num_train_epochs=cfg["training"].get("epochs", 1),
-            save_steps=50,
-            logging_steps=10,
-            bf16=True,
-            report_to="none"
+        strategy_cls = get_strategy(strategy)
+        lease = get_model_cache().acquire(
+            model_id,
+            torch_dtype=strategy_cls.torch_dtype if strategy_cls else "bfloat16",
+            quantization=strategy_cls.quantization if strategy_cls else None,
+            shareable=strategy_cls is not None,
+            log=self.log,
         )
+        model = lease.model
+        try:
+            if strategy_cls is not None:
+                model = strategy_cls(model, cfg.get("lora", {})).apply()
+
+            dataset, data_collator, lengths = build_data_pipeline(
+                dataset, tokenizer, cfg["training"], dtype=torch.bfloat16
+            )
+
+            batch = self.batch_settings(model, default_micro=2)
+            args = TrainingArguments(
+                output_dir=os.path.join("checkpoints", self.run_id),
+                **batch,
+                learning_rate=cfg["training"].get("learning_rate", 2e-4),
+                num_train_epochs=cfg["training"].get("epochs", 1),
+                save_strategy="no",  # checkpoint lewat AsyncCheckpointCallback
+                logging_steps=10,
+                **self.checkpointing_args(),
+                bf16=True,
+                report_to="none",
+            )
 
-        data_collator = DataCollatorForLanguageModeling(tokenizer, mlm=False)
-        trainer = Trainer(model=model, args=args, train_dataset=dataset, data_collator=data_collator)
-        self.log("🚀 Starting training ...")
-        trainer.train()
-        trainer.save_model(os.path.join("models", f"{self.run_id}_adapter"))
+            ck = self.checkpoint_config()
+            callbacks = [CancelCallback(self), MetricsCallback(self), AsyncCheckpointCallback(
+                self.checkpoint_writer(), ck["every_steps"], ck["save_optimizer"])]
+            if self.profiler() is not None:
+                callbacks.append(ProfilerCallback(self.profiler()))
+            trainer = trainer_class(lengths)(model=model, args=args, train_dataset=dataset, data_collator=data_collator,
+                              callbacks=callbacks)
+            resume = cfg.get("resume_from_checkpoint")
+            if resume:
+                self.log(f"Resuming from {resume}")
+            self.log("🚀 Starting training ...")
+            # adapter, optimizer, scheduler, RNG & global_step dipulihkan oleh HF Trainer
+            train_output = trainer.train(resume_from_checkpoint=resume)
+            self.log_data_report(data_collator.report(train_output.metrics.get("train_runtime")))
+            if self.cancelled:
+                self.mark_cancelled()
+                return
+            trainer.save_model(os.path.join("models", f"{self.run_id}_adapter"))
+        finally:
+            # base model kembali ke cache (adapter dilepas) untuk run berikutnya
+            lease.release(model)
         self.finalize()
@@ -1,36 +1,156 @@
-import os, time, json, datetime
-from typing import Dict, Any
-from core.storage.sqlite_storage import SQLiteStorage
+import os, json, threading
+from typing import Any, Dict, Optional
+from core.storage.sqlite_storage import get_storage
+from core.events import bus
+from core import run_log
+from core.checkpointing import CheckpointWriter
+from core.profiler import StepProfiler
 
 
 class BaseTrainer:
+    # False di child ProcessTrainer: record log diteruskan ke parent, yang menulis file
+    write_log_file = True
+
     def __init__(self, run_id: str, config: Dict[str, Any]):
         self.run_id = run_id
         self.config = config
-        self.db = SQLiteStorage()
+        self.db = get_storage()
         self.log_dir = os.path.join("logs", run_id)
         os.makedirs(self.log_dir, exist_ok=True)
+        self._cancel_event = threading.Event()
+        self._checkpoints = None
+        self._profiler = None
+        self._log_writer = None
+        self._log_lock = threading.Lock()
+
+    def log(self, message: str, level: Optional[str] = None, step: Optional[int] = None):
+        record = run_log.make_record(message, level, step)
+        line = f"[{record['ts'][11:19]}] {message}"
+        if run_log.ECHO:
+            print(line)
+        if self.write_log_file:
+            self.write_log_record(record)
+        bus.publish(self.run_id, "log", {**record, "line": line})
+
+    def write_log_record(self, record: Dict[str, Any]):
+        """Tulis record ke logs/<run_id>/train.log lewat writer ter-buffer run ini."""
+        with self._log_lock:
+            if self._log_writer is None:
+                self._log_writer = run_log.RunLogWriter(self.log_dir)
+            writer = self._log_writer
+        writer.write(record)
+
+    def close_log(self):
+        """Flush & tutup file log; pesan setelahnya membuka writer baru (append)."""
+        with self._log_lock:
+            writer, self._log_writer = self._log_writer, None
+        if writer is not None:
+            writer.close()
+
+    def checkpoint_config(self, every_steps: int = 50) -> Dict[str, Any]:
+        defaults = {"every_steps": every_steps, "keep_last": 2, "keep_best": 1, "save_optimizer": True}
+        return {**defaults, **(self.config.get("checkpoint") or {})}
 
-    def log(self, message: str):
-        ts = datetime.datetime.now().strftime("%H:%M:%S")
-        line = f"[{ts}] {message}"
-        print(line)
-        with open(os.path.join(self.log_dir, "train.log"), "a") as f:
-            f.write(line + "\n")
+    def checkpoint_writer(self) -> CheckpointWriter:
+        """Writer checkpoint async run ini (dibuat saat pertama dipakai, setelah self.db final)."""
+        if self._checkpoints is None:
+            ck = self.checkpoint_config()
+            self._checkpoints = CheckpointWriter(self.run_id, self.db, keep_last=ck["keep_last"],
+                                                 keep_best=ck["keep_best"], log=self.log)
+        return self._checkpoints
+
+    def profiler(self) -> Optional[StepProfiler]:
+        """StepProfiler run ini; None kalau ``profile.enabled`` dimatikan."""
+        cfg = {"enabled": True, "interval": 10, "sync_cuda": False, **(self.config.get("profile") or {})}
+        if not cfg["enabled"]:
+            return None
+        if self._profiler is None:
+            self._profiler = StepProfiler(self.run_id, self.db, self.log_dir, interval=cfg["interval"],
+                                          sync_cuda=cfg["sync_cuda"], log=self.log)
+        return self._profiler
 
     def save_checkpoint(self, step: int, metrics: Dict[str, Any]):
-        ckpt_dir = os.path.join("checkpoints", self.run_id)
-        os.makedirs(ckpt_dir, exist_ok=True)
-        ckpt_file = os.path.join(ckpt_dir, f"step_{step}.json")
-        with open(ckpt_file, "w") as f:
-            json.dump(metrics, f, indent=2)
-        self.db.register_checkpoint(self.run_id, step, ckpt_file, metrics)
-        self.log(f"Checkpoint saved at step {step}")
+        """Checkpoint ringan (tanpa tensor) untuk trainer non-HF; ditulis di background."""
+        self.checkpoint_writer().save(step, metrics, {"trainer_state.json": {"global_step": step, "metrics": metrics}})
+
+    def log_data_report(self, report: Dict[str, Any]):
+        """Simpan laporan throughput / padding ratio batching ke logs/<run_id>/data_report.json."""
+        with open(os.path.join(self.log_dir, "data_report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+        self.log(f"Data report: padding_ratio={report.get('padding_ratio')} "
+                 f"tokens/sec={report.get('tokens_per_sec')}")
+
+    def batch_settings(self, model=None, default_micro: int = 2) -> Dict[str, Any]:
+        """per_device_train_batch_size + gradient_accumulation_steps final untuk run ini.
+
+        Nilai "auto" dipilih core.planner dari ``model.config`` dan memori device
+        (diverifikasi ``probe`` kalau ``training.auto_probe``); rencananya disimpan
+        ke logs/<run_id>/batch_plan.json. Tanpa model, "auto" jatuh ke default."""
+        from core import planner
+        training = self.config.get("training", {})
+        settings = {"per_device_train_batch_size": training.get("per_device_train_batch_size", default_micro),
+                    "gradient_accumulation_steps": training.get("gradient_accumulation_steps", 8)}
+        if not planner.needs_plan(training):
+            return settings
+        if model is None:
+            self.log("⚠️ Batch size 'auto' needs a loaded model; using defaults")
+            return {"per_device_train_batch_size": default_micro if settings["per_device_train_batch_size"] == "auto"
+                    else settings["per_device_train_batch_size"],
+                    "gradient_accumulation_steps": 8 if settings["gradient_accumulation_steps"] == "auto"
+                    else settings["gradient_accumulation_steps"]}
+
+        from core.hardware import get_hardware_info
+        model_config = model.config.to_dict()
+        result = planner.plan(model_config, training, get_hardware_info(), self.config.get("strategy", "lora"),
+                              self.config.get("lora"), (self.config.get("compute") or {}).get("gpu_index"))
+        if training.get("auto_probe"):
+            result = planner.probe(model, result, model_config["vocab_size"], log=self.log)
+        with open(os.path.join(self.log_dir, "batch_plan.json"), "w") as f:
+            json.dump(result, f, indent=2)
+        self.log(f"Batch plan ({result['device']['name']}): micro-batch={result['per_device_train_batch_size']} "
+                 f"x accumulation={result['gradient_accumulation_steps']} "
+                 f"(est. peak {result['memory']['peak_gb']} GB / budget {result['device']['budget_gb']} GB)")
+        for note in result["notes"]:
+            self.log(f"⚠️ {note}")
+        return {"per_device_train_batch_size": result["per_device_train_batch_size"],
+                "gradient_accumulation_steps": result["gradient_accumulation_steps"]}
+
+    def checkpointing_args(self) -> Dict[str, Any]:
+        """Argumen TrainingArguments untuk ``training.gradient_checkpointing``.
+
+        Non-reentrant supaya tetap jalan di model PEFT (input embedding tanpa requires_grad)."""
+        if not self.config.get("training", {}).get("gradient_checkpointing"):
+            return {}
+        return {"gradient_checkpointing": True, "gradient_checkpointing_kwargs": {"use_reentrant": False}}
 
     def train(self):
         """Override in subclass"""
         raise NotImplementedError("train() must be implemented by subclass")
 
+    def cancel(self, force: bool = False):
+        """Minta training berhenti; dicek trainer di setiap step.
+
+        ``force`` hanya berlaku untuk ProcessTrainer (thread tidak bisa di-kill)."""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def _close_writers(self):
+        if self._profiler is not None:
+            self._profiler.close()
+        if self._checkpoints is not None:
+            self._checkpoints.close()
+
+    def mark_cancelled(self):
+        self._close_writers()
+        self.db.flush()
+        self.db.update_run_state(self.run_id, "Cancelled")
+        self.log("Training cancelled.")
+
     def finalize(self):
+        self._close_writers()
+        self.db.flush()
         self.db.update_run_state(self.run_id, "Completed")
         self.log("Training finished successfully.")
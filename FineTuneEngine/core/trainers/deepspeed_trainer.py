@@ -1,12 +1,20 @@
-import os, torch, json
+import os, torch
 from transformers import (
-    AutoTokenizer, AutoModelForCausalLM,
-    Trainer, TrainingArguments, DataCollatorForLanguageModeling
+    AutoConfig, AutoTokenizer,
+    TrainingArguments
 )
-from datasets import load_dataset
+from core.data.dedup import apply_dedup
+from core.data.token_cache import TokenCache
+from core.data.packing import build_data_pipeline, trainer_class
 from core.trainers.base import BaseTrainer
-from core.strategies.lora import LoRAStrategy
-from core.strategies.qlora import QLoRAStrategy
+from core.trainers.hf_callbacks import (AsyncCheckpointCallback, CancelCallback, MetricsCallback, ProfilerCallback,
+                                       ResumeStateCallback)
+from core.checkpointing import has_engine_state, read_state
+from core.strategies.base import get_strategy
+from core.model_loader import get_model_cache
+from core.ds_config import TORCH_DTYPES, build_ds_config, cleanup_configs, plan_zero, precision, write_config
+from core.hardware import get_hardware_info
+from core.planner import find_model_config
 
 
 class DeepSpeedTrainer(BaseTrainer):
@@ -16,7 +24,6 @@ class DeepSpeedTrainer(BaseTrainer):
         model_id = cfg.get("base_model")
         dataset_path = cfg["dataset"]["path"]
         strategy = cfg.get("strategy", "lora")
-        zero_stage = cfg.get("deepspeed", {}).get("zero_stage", 2)
 
         self.log(f"Loading tokenizer for {model_id}")
         tokenizer = AutoTokenizer.from_pretrained(model_id)
@@ -28,66 +35,109 @@ class DeepSpeedTrainer(BaseTrainer):
             self.db.update_run_state(self.run_id, "Error: Missing dataset")
             return
 
-        dataset = load_dataset("json", data_files=dataset_path, split="train")
+        dataset_cfg = apply_dedup(cfg["dataset"], log=self.log)
+        max_length = cfg["training"].get("max_seq_length", 512)
+        dataset = TokenCache().get_or_build(dataset_cfg, tokenizer, max_length=max_length, log=self.log,
+                                            num_proc=cfg["dataset"].get("num_proc"))
 
-        def tokenize_fn(examples):
-            return tokenizer(examples["text"], truncation=True, padding="max_length", max_length=512)
-        dataset = dataset.map(tokenize_fn, batched=True)
+        # ZeRO stage / offload dipilih sebelum load: ZeRO-3 menentukan model boleh di-share atau tidak
+        model_config = find_model_config(model_id) or AutoConfig.from_pretrained(model_id).to_dict()
+        zero = plan_zero(model_config, cfg, get_hardware_info(), (cfg.get("compute") or {}).get("gpu_index"))
+        zero_stage = zero["stage"]
+        self.log(f"DeepSpeed plan: ZeRO-{zero_stage}, offload optimizer={zero['offload_optimizer']}, "
+                 f"params={zero['offload_param']} ({zero['reason']})")
+        explicit = {"zero_stage", "offload_optimizer", "offload_param"} & set(cfg.get("deepspeed") or {})
+        if zero["fits"] is False and not explicit:
+            self.log(f"❌ Model does not fit GPU memory even with ZeRO offload (est. peak "
+                     f"{zero['estimated_peak_gb']} GB, budget {zero['device']['budget_gb']} GB). "
+                     f"Set deepspeed.zero_stage / offload_* to run anyway.")
+            self.db.update_run_state(self.run_id, "Error: Does not fit GPU memory")
+            return
 
         # model + LoRA strategy
         self.log(f"Loading model with DeepSpeed (ZeRO-{zero_stage}) ...")
-        model = AutoModelForCausalLM.from_pretrained(
+        strategy_cls = get_strategy(strategy)
+        # load langsung di dtype ds_config supaya engine tidak meng-cast model cache in-place;
+        # model terkuantisasi (torch_dtype None) tetap di-cast engine kalau bf16/fp16
+        mode = precision(cfg["training"])
+        quantized = strategy_cls is not None and strategy_cls.torch_dtype is None
+        lease = get_model_cache().acquire(
             model_id,
-            torch_dtype=torch.bfloat16,
-            device_map="auto"
+            torch_dtype=None if quantized else TORCH_DTYPES[mode],
+            quantization=strategy_cls.quantization if strategy_cls else None,
+            # ZeRO-3 mempartisi parameter ke engine; model itu tidak bisa dipakai ulang
+            shareable=strategy_cls is not None and zero_stage < 3 and not (quantized and mode != "fp32"),
+            log=self.log,
         )
+        model = lease.model
+        try:
+            if strategy_cls is not None:
+                model = strategy_cls(model, cfg.get("lora", {})).apply()
+            resume = cfg.get("resume_from_checkpoint")
+            full_resume = bool(resume) and has_engine_state(resume)
+            resume_state = None
+            if full_resume:
+                # optimizer ZeRO, scheduler, step dan posisi data dipulihkan HF lewat deepspeed_load_checkpoint
+                self.log(f"Resuming from {resume} (DeepSpeed engine state)")
+            elif resume:
+                from peft import set_peft_model_state_dict
+                from safetensors.torch import load_file
+                set_peft_model_state_dict(model, load_file(os.path.join(resume, "adapter_model.safetensors")))
+                resume_state = ResumeStateCallback(read_state(resume))
+                self.log(f"⚠️ Resuming from {resume} (step {resume_state.step}) without DeepSpeed engine state: "
+                         f"optimizer state is re-initialized and data restarts from the beginning of the epoch")
 
-        if strategy.lower() == "lora":
-            model = LoRAStrategy(model, cfg.get("lora", {})).apply()
-        elif strategy.lower() == "qlora":
-            model = QLoRAStrategy(model, {"base_model": model_id, **cfg.get("lora", {})}).apply()
-
-        # deepspeed config
-        ds_config = {
-            "zero_optimization": {
-                "stage": zero_stage,
-                "offload_param": {"device": "none"},
-                "offload_optimizer": {"device": "none"},
-                "overlap_comm": True,
-                "contiguous_gradients": True,
-                "reduce_bucket_size": 2e8,
-                "stage3_prefetch_bucket_size": 5e7,
-                "stage3_param_persistence_threshold": 1e6
-            },
-            "fp16": {"enabled": False},
-            "bf16": {"enabled": True},
-            "train_micro_batch_size_per_gpu": cfg["training"].get("per_device_train_batch_size", 1),
-            "gradient_accumulation_steps": 1,
-            "steps_per_print": 50,
-            "wall_clock_breakdown": False
-        }
+            batch = self.batch_settings(model, default_micro=1)
+            # deepspeed config: content-addressed, run dengan config identik memakai file yang sama
+            ds_path = write_config(build_ds_config(zero, cfg, batch))
+            self.db.patch_config(self.run_id, {"deepspeed_config": ds_path})
+            self.log(f"DeepSpeed config: {ds_path}")
+            try:
+                cleanup_configs(self.db, log=self.log)
+            except Exception as ex:
+                self.log(f"⚠️ DeepSpeed config cleanup failed: {ex}")
 
-        os.makedirs("configs", exist_ok=True)
-        ds_path = os.path.join("configs", f"deepspeed_{self.run_id}.json")
-        with open(ds_path, "w") as f:
-            json.dump(ds_config, f, indent=2)
+            dataset, data_collator, lengths = build_data_pipeline(
+                dataset, tokenizer, cfg["training"], dtype=getattr(torch, TORCH_DTYPES[mode])
+            )
 
-        # training args
-        args = TrainingArguments(
-            output_dir=os.path.join("checkpoints", self.run_id),
-            per_device_train_batch_size=cfg["training"].get("per_device_train_batch_size", 1),
-            learning_rate=cfg["training"].get("learning_rate", 2e-4),
-            num_train_epochs=cfg["training"].get("epochs", 1),
-            logging_steps=10,
-            save_steps=100,
-            deepspeed=ds_path,
-            bf16=True,
-            report_to="none"
-        )
+            # training args
+            args = TrainingArguments(
+                output_dir=os.path.join("checkpoints", self.run_id),
+                **batch,
+                learning_rate=cfg["training"].get("learning_rate", 2e-4),
+                num_train_epochs=cfg["training"].get("epochs", 1),
+                logging_steps=10,
+                save_strategy="no",  # checkpoint lewat AsyncCheckpointCallback
+                deepspeed=ds_path,
+                **self.checkpointing_args(),
+                # harus sama dengan precision di ds_config
+                bf16=mode == "bf16",
+                fp16=mode == "fp16",
+                report_to="none",
+            )
 
-        data_collator = DataCollatorForLanguageModeling(tokenizer, mlm=False)
-        trainer = Trainer(model=model, args=args, train_dataset=dataset, data_collator=data_collator)
-        self.log(f"🚀 Starting DeepSpeed training (ZeRO-{zero_stage}) ...")
-        trainer.train()
-        trainer.save_model(os.path.join("models", f"{self.run_id}_adapter"))
+            ck = self.checkpoint_config(every_steps=100)
+            # state optimizer ZeRO terpartisi per rank: ditulis engine.save_checkpoint di folder checkpoint
+            checkpoint_cb = AsyncCheckpointCallback(self.checkpoint_writer(), ck["every_steps"], ck["save_optimizer"],
+                                                    engine=True)
+            callbacks = [CancelCallback(self), MetricsCallback(self), checkpoint_cb]
+            if resume_state is not None:
+                callbacks.insert(0, resume_state)
+            if self.profiler() is not None:
+                callbacks.append(ProfilerCallback(self.profiler()))
+            trainer = trainer_class(lengths)(model=model, args=args, train_dataset=dataset, data_collator=data_collator,
+                              callbacks=callbacks)
+            checkpoint_cb.trainer = trainer
+            if resume_state is not None:
+                resume_state.trainer = trainer
+            self.log(f"🚀 Starting DeepSpeed training (ZeRO-{zero_stage}) ...")
+            train_output = trainer.train(resume_from_checkpoint=resume if full_resume else None)
+            self.log_data_report(data_collator.report(train_output.metrics.get("train_runtime")))
+            if self.cancelled:
+                self.mark_cancelled()
+                return
+            trainer.save_model(os.path.join("models", f"{self.run_id}_adapter"))
+        finally:
+            lease.release(model)
         self.finalize()
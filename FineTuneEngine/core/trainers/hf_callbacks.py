@@ -0,0 +1,151 @@
+from transformers import TrainerCallback
+
+
+class CancelCallback(TrainerCallback):
+    """Hentikan HF Trainer dengan rapi saat BaseTrainer.cancel() dipanggil."""
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    def on_step_end(self, args, state, control, **kwargs):
+        if self.owner.cancelled:
+            control.should_training_stop = True
+        return control
+
+
+class AsyncCheckpointCallback(TrainerCallback):
+    """Checkpoint adapter-only tiap ``every_steps`` lewat CheckpointWriter (pengganti save_steps HF).
+
+    Step training hanya menunggu snapshot ke CPU; penulisan file di background thread.
+    ``engine=True`` (DeepSpeed): state optimizer disimpan lewat ``engine.save_checkpoint``
+    milik ``trainer.model_wrapped``, bukan ``optimizer.pt``.
+    """
+
+    def __init__(self, writer, every_steps: int = 50, save_optimizer: bool = True, engine: bool = False):
+        self.writer = writer
+        self.every_steps = every_steps
+        self.save_optimizer = save_optimizer
+        self.engine = engine
+        self.trainer = None  # diisi setelah Trainer dibuat (engine=True)
+        self._last_saved = None
+
+    def _save(self, state, model, optimizer, lr_scheduler):
+        import os, time
+        from core.checkpointing import snapshot_deepspeed, snapshot_hf
+
+        started = time.perf_counter()
+        engine = self.engine and self.save_optimizer and self.trainer is not None
+        payload = snapshot_hf(model, optimizer if self.save_optimizer and not engine else None,
+                              lr_scheduler if self.save_optimizer else None, state)
+        if engine:
+            staging = os.path.join(self.writer.dir, f".engine-{state.global_step}")
+            payload.update(snapshot_deepspeed(self.trainer.model_wrapped, model, state.global_step, staging))
+        losses = [h["loss"] for h in state.log_history if "loss" in h]
+        metrics = {"step": state.global_step, "epoch": state.epoch, "loss": losses[-1] if losses else None}
+        self.writer.save(state.global_step, metrics, payload, snapshot_sec=time.perf_counter() - started)
+        self._last_saved = state.global_step
+
+    def on_step_end(self, args, state, control, model=None, optimizer=None, lr_scheduler=None, **kwargs):
+        if self.every_steps and state.global_step % self.every_steps == 0:
+            self._save(state, model, optimizer, lr_scheduler)
+        return control
+
+    def on_train_end(self, args, state, control, model=None, optimizer=None, lr_scheduler=None, **kwargs):
+        # step terakhir (juga saat cancel) selalu disimpan supaya run bisa di-resume dari situ
+        if state.global_step and self._last_saved != state.global_step:
+            self._save(state, model, optimizer, lr_scheduler)
+        self.writer.close()
+        return control
+
+
+class ResumeStateCallback(TrainerCallback):
+    """Lanjutkan hitungan step dari checkpoint adapter-only tanpa ``resume_from_checkpoint`` HF.
+
+    Dipakai DeepSpeed kalau state engine tidak ada di checkpoint (checkpoint lama /
+    ``save_optimizer`` false), jadi HF tidak bisa resume penuh. ``global_step``, ``log_history`` dan lr scheduler dimajukan ke step
+    checkpoint, sehingga metric / checkpoint berikutnya bernomor lanjut (tidak menimpa)
+    dan training berhenti di ``max_steps`` yang sama. Data mulai lagi dari awal epoch.
+    """
+
+    def __init__(self, checkpoint_state: dict):
+        self.step = int(checkpoint_state.get("global_step") or 0)
+        self.log_history = list(checkpoint_state.get("log_history") or [])
+        self.trainer = None  # diisi setelah Trainer dibuat
+
+    def on_train_begin(self, args, state, control, lr_scheduler=None, **kwargs):
+        if not self.step:
+            return control
+        state.global_step = self.step
+        state.log_history = self.log_history + state.log_history
+        if self.trainer is not None:
+            # loss log pertama dirata-rata sejak step resume, bukan sejak 0
+            self.trainer._globalstep_last_logged = self.step
+        if lr_scheduler is not None:
+            import warnings
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # "lr_scheduler.step() before optimizer.step()"
+                for _ in range(self.step):
+                    lr_scheduler.step()
+        return control
+
+
+class MetricsCallback(TrainerCallback):
+    """Teruskan loss/lr dari log HF Trainer ke tabel metrics (dan event bus)."""
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        if logs and "loss" in logs:
+            self.owner.db.append_metric(self.owner.run_id, state.global_step, {
+                "step": state.global_step, "loss": logs["loss"], "lr": logs.get("learning_rate"),
+            })
+        return control
+
+
+class ProfilerCallback(TrainerCallback):
+    """Isi StepProfiler dari HF Trainer: hook forward model + hook step optimizer."""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._handles = []
+
+    def on_train_begin(self, args, state, control, model=None, optimizer=None, **kwargs):
+        prof = self.profiler
+
+        def before_forward(module, args, kwargs):
+            if not module.training:
+                return
+            prof.forward_begin()
+            input_ids = kwargs.get("input_ids", args[0] if args else None)
+            if input_ids is not None:
+                # slot token yang diproses (termasuk padding); token asli ada di data_report
+                prof.add_batch(input_ids.numel(), input_ids.shape[0])
+
+        def after_forward(module, args, output):
+            if module.training:
+                prof.forward_end()
+
+        self._handles = [model.register_forward_pre_hook(before_forward, with_kwargs=True),
+                         model.register_forward_hook(after_forward)]
+        # AcceleratedOptimizer membungkus optimizer torch; DeepSpeed punya optimizer sendiri (tanpa hook)
+        inner = getattr(optimizer, "optimizer", optimizer)
+        if hasattr(inner, "register_step_pre_hook"):
+            self._handles += [inner.register_step_pre_hook(lambda *a: prof.optimizer_begin()),
+                              inner.register_step_post_hook(lambda *a: prof.optimizer_end())]
+        return control
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self.profiler.step_begin()
+        return control
+
+    def on_step_end(self, args, state, control, **kwargs):
+        self.profiler.step_end(state.global_step)
+        return control
+
+    def on_train_end(self, args, state, control, **kwargs):
+        self.profiler.close(state.global_step)
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+        return control
@@ -1,22 +1,65 @@
-import time, random
+import math, random
+from contextlib import nullcontext
+from core.checkpointing import read_state
 from core.trainers.base import BaseTrainer
 
+# learning rate dengan kurva loss terbaik di simulasi
+_BEST_LR = 3e-4
+
+
+def synthetic_loss(step: int, learning_rate: float, lora_r: int, rng: random.Random) -> float:
+    """Kurva loss sintetis: turun eksponensial ke floor yang bergantung pada learning rate
+    (makin jauh dari _BEST_LR makin lambat & makin tinggi) dan rank LoRA, plus noise kecil."""
+    quality = math.exp(-(math.log10(learning_rate) - math.log10(_BEST_LR)) ** 2 / 0.5)
+    floor = 0.5 + (1 - quality) + 0.4 / math.sqrt(max(lora_r, 1))
+    rate = 0.05 + 0.25 * quality
+    return max(0.01, floor + (2.5 - floor) * math.exp(-rate * step) + rng.gauss(0, 0.02))
+
 
 class MockTrainer(BaseTrainer):
     def train(self):
-        total_steps = 10
+        # cfg["mock"]: jumlah step, detik per step, seed noise (default run_id)
+        mock = {"steps": 10, "step_sec": 1.0, "seed": None, **(self.config.get("mock") or {})}
+        total_steps = int(mock["steps"])
         self.db.update_run_state(self.run_id, "Running")
 
+        first_step = 1
+        resume = self.config.get("resume_from_checkpoint")
+        if resume:
+            first_step = read_state(resume)["global_step"] + 1
+            self.log(f"Resuming from {resume} (step {first_step})")
+
         self.log(f"Starting mock training loop for run {self.run_id}")
-        for step in range(1, total_steps + 1):
-            loss = round(random.uniform(0.5, 2.0), 4)
-            lr = round(random.uniform(1e-5, 5e-4), 6)
+        prof = self.profiler()
+        training = self.config.get("training", {})
+        batch = self.batch_settings()["per_device_train_batch_size"]
+        seq_len = training.get("max_seq_length", 512)
+        base_lr = float(training.get("learning_rate", 2e-4))
+        lora_r = int((self.config.get("lora") or {}).get("r", 8))
+        # default sama dengan backend lain; step terakhir selalu di-checkpoint
+        every_steps = max(1, int(self.checkpoint_config()["every_steps"]))
+        rng = random.Random(f"{mock['seed'] if mock['seed'] is not None else self.run_id}:{first_step}")
+        for step in range(first_step, total_steps + 1):
+            if self.cancelled:
+                self.mark_cancelled()
+                return
+            if prof is not None:
+                prof.step_begin()
+            # simulasi waktu training (default ~1 detik per step), dipecah per fase
+            for phase, share in (("data", 0.1), ("forward", 0.3), ("backward", 0.5), ("optimizer", 0.1)):
+                with prof.phase(phase) if prof is not None else nullcontext():
+                    self._cancel_event.wait(share * mock["step_sec"])
+            loss = round(synthetic_loss(step, base_lr, lora_r, rng), 4)
+            # cosine decay, sama dengan lr_scheduler_type default
+            lr = round(base_lr * 0.5 * (1 + math.cos(math.pi * step / total_steps)), 8)
             metrics = {"step": step, "loss": loss, "lr": lr}
 
             self.db.append_metric(self.run_id, step, metrics)
-            self.save_checkpoint(step, metrics)
-            self.log(f"Step {step}/{total_steps} | loss={loss} | lr={lr}")
-
-            time.sleep(1)  # simulasi waktu training
+            if step % every_steps == 0 or step == total_steps:
+                self.save_checkpoint(step, metrics)
+            self.log(f"Step {step}/{total_steps} | loss={loss} | lr={lr}", step=step)
+            if prof is not None:
+                prof.add_batch(batch * seq_len, batch)
+                prof.step_end(step)
 
         self.finalize()
@@ -0,0 +1,363 @@
+"""Eksekusi trainer di proses terpisah.
+
+``ProcessTrainer`` tampil seperti trainer biasa bagi scheduler, tapi ``train()``
+menjalankan trainer sebenarnya (Accelerate/DeepSpeed/...) di child process
+(multiprocessing ``spawn``). Child tidak menulis state/metric/checkpoint ke DB
+sendiri; semua write dikirim lewat queue ke proses API, yang menyimpannya ke
+storage dan mem-publish event. Dengan begitu tokenisasi & loop training tidak
+berebut GIL dengan request handler, dan crash CUDA/segfault hanya mematikan
+child: run ditandai Failed dengan exit code-nya.
+
+``HostedTrainer`` (``isolation=host``) menjalankan trainer sebagai thread di satu
+``ModelHost``: child process berumur panjang yang dipakai bergantian / bersamaan
+oleh banyak run. BaseModelCache (core.model_loader) hidup di proses itu, jadi run
+berikutnya pada base model yang sama memakai bobot yang sudah di-load, sementara
+proses API tetap terisolasi dari crash. Konsekuensinya crash host menggagalkan
+semua run yang sedang berjalan di host tersebut; host baru di-spawn saat run
+berikutnya mulai.
+"""
+import multiprocessing as mp
+import atexit, queue, threading
+from typing import Any, Callable, Dict, Optional
+
+from core.trainers.base import BaseTrainer
+from core.events import bus, is_terminal_state
+
+# detik menunggu child berhenti sendiri setelah cancel sebelum di-terminate
+CANCEL_GRACE_SECONDS = 30.0
+
+
+class RelayStorage:
+    """Storage di child: write diteruskan ke parent, read langsung ke SQLite (WAL)."""
+
+    WRITES = ("update_run_state", "append_metric", "register_checkpoint", "delete_checkpoint",
+              "append_profile", "patch_config")
+
+    def __init__(self, channel, local):
+        self._channel = channel
+        self._local = local
+
+    def __getattr__(self, name):
+        if name in self.WRITES:
+            return lambda *args, **kwargs: self._channel.put(("call", name, args, kwargs))
+        return getattr(self._local, name)
+
+    def flush(self, timeout: float = 30.0):
+        self._channel.put(("flush",))
+
+
+def _worker_main(run_id: str, cfg: Dict[str, Any], channel, cancel_event):
+    """Entry point child process."""
+    from core.scheduler import build_trainer
+    from core.storage.sqlite_storage import get_storage
+
+    def forward_log(event):
+        # event log di bus milik child diteruskan ke parent
+        if event["type"] == "log":
+            channel.put(("log", event["data"]))
+    bus.add_listener(forward_log)
+
+    cfg = {**cfg, "compute": {**(cfg.get("compute") or {}), "isolation": "thread"}}
+    try:
+        trainer = build_trainer(run_id, cfg)
+        trainer.db = RelayStorage(channel, get_storage())
+        trainer.write_log_file = False
+        trainer._cancel_event = cancel_event
+        trainer.train()
+        channel.put(("done",))
+    except BaseException as ex:
+        channel.put(("error", f"{type(ex).__name__}: {ex}"))
+        raise SystemExit(1)
+
+
+class _TaggedChannel:
+    """Channel RelayStorage untuk satu run di ModelHost: pesan diberi prefix run_id."""
+
+    def __init__(self, outbox, run_id: str):
+        self._outbox = outbox
+        self._run_id = run_id
+
+    def put(self, msg):
+        self._outbox.put((self._run_id, *msg))
+
+
+def _host_main(inbox, outbox):
+    """Entry point ModelHost: satu thread per run, BaseModelCache proses ini dipakai bersama."""
+    from core.scheduler import build_trainer
+    from core.storage.sqlite_storage import get_storage
+
+    local = get_storage()
+    cancels: Dict[str, threading.Event] = {}
+
+    def forward_log(event):
+        if event["type"] == "log":
+            outbox.put((event["run_id"], "log", event["data"]))
+    bus.add_listener(forward_log)
+
+    def run(run_id: str, cfg: Dict[str, Any]):
+        channel = _TaggedChannel(outbox, run_id)
+        try:
+            trainer = build_trainer(run_id, {**cfg, "compute": {**(cfg.get("compute") or {}), "isolation": "thread"}})
+            trainer.db = RelayStorage(channel, local)
+            trainer.write_log_file = False
+            trainer._cancel_event = cancels[run_id]
+            trainer.train()
+            channel.put(("done",))
+        except BaseException as ex:
+            channel.put(("error", f"{type(ex).__name__}: {ex}"))
+        finally:
+            cancels.pop(run_id, None)
+
+    while True:
+        msg = inbox.get()
+        if msg is None:
+            return
+        kind, run_id = msg[0], msg[1]
+        if kind == "start":
+            cancels[run_id] = threading.Event()
+            threading.Thread(target=run, args=(run_id, msg[2]), name=f"trainer-{run_id[:8]}", daemon=True).start()
+        elif kind == "cancel" and run_id in cancels:
+            cancels[run_id].set()
+
+
+class ModelHost:
+    """Child process trainer berumur panjang; pesan dari child di-route per run ke queue lokal."""
+
+    def __init__(self):
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._process = None
+        self._inbox = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._runs: Dict[str, queue.Queue] = {}
+
+    def start_run(self, run_id: str, cfg: Dict[str, Any]):
+        """Mulai run di host (spawn host kalau belum ada / sudah mati). Return (channel, alive)."""
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._spawn_locked()
+            channel: queue.Queue = queue.Queue()
+            self._runs[run_id] = channel
+            self._inbox.put(("start", run_id, cfg))
+            process, dispatcher = self._process, self._dispatcher
+        # run dianggap hidup sampai dispatcher selesai meneruskan sisa pesan host yang mati
+        return channel, lambda: process.is_alive() or dispatcher.is_alive()
+
+    def cancel_run(self, run_id: str):
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                self._inbox.put(("cancel", run_id))
+
+    def end_run(self, run_id: str):
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def run_count(self) -> int:
+        with self._lock:
+            return len(self._runs)
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    def close(self, timeout: float = 5.0):
+        """Hentikan host idle dengan rapi (server berhenti); run yang masih jalan ikut mati."""
+        with self._lock:
+            proc, inbox = self._process, self._inbox
+        if proc is not None and proc.is_alive():
+            inbox.put(None)
+            proc.join(timeout if not self.run_count() else 0)
+        self.terminate()
+
+    def terminate(self):
+        with self._lock:
+            proc = self._process
+        if proc is not None and proc.is_alive():
+            proc.terminate()
+            proc.join(5)
+            if proc.is_alive():
+                proc.kill()
+
+    def _spawn_locked(self):
+        self._inbox, outbox = self._ctx.Queue(), self._ctx.Queue()
+        self._process = self._ctx.Process(target=_host_main, args=(self._inbox, outbox), name="model-host",
+                                          daemon=False)
+        self._process.start()
+        self._dispatcher = threading.Thread(target=self._dispatch, args=(outbox, self._process),
+                                            name="model-host-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def _dispatch(self, outbox, process):
+        while True:
+            try:
+                msg = outbox.get(timeout=0.5)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                try:
+                    msg = outbox.get(timeout=0.5)
+                except queue.Empty:
+                    return
+            with self._lock:
+                channel = self._runs.get(msg[0])
+            if channel is not None:
+                channel.put(msg[1:])
+
+
+_host: Optional[ModelHost] = None
+_host_lock = threading.Lock()
+
+
+def get_model_host() -> ModelHost:
+    global _host
+    with _host_lock:
+        if _host is None:
+            _host = ModelHost()
+            # host bukan daemon: tanpa ini interpreter menunggunya selamanya saat exit
+            atexit.register(_host.close)
+        return _host
+
+
+def close_model_host():
+    with _host_lock:
+        host = _host
+    if host is not None:
+        host.close()
+
+
+class _RelayTrainer(BaseTrainer):
+    """Bagian parent dari trainer yang jalan di proses lain: terapkan pesan child ke storage."""
+
+    def _relay(self, channel, alive: Callable[[], bool]):
+        """Proses pesan sampai child melapor selesai / error atau mati; return ``(reported, error)``.
+        ``reported`` False = child hilang tanpa pesan done/error (crash)."""
+        error = None
+        while True:
+            try:
+                msg = channel.get(timeout=0.5)
+            except queue.Empty:
+                if alive():
+                    continue
+                # child sudah exit: ambil sisa pesan yang masih di pipe
+                try:
+                    msg = channel.get(timeout=0.5)
+                except queue.Empty:
+                    return False, error
+            kind = msg[0]
+            if kind == "call":
+                _, name, args, kwargs = msg
+                getattr(self.db, name)(*args, **kwargs)
+            elif kind == "log":
+                # child tidak menulis file log; satu writer per run di proses ini
+                record = {k: v for k, v in msg[1].items() if k != "line"}
+                self.write_log_record(record)
+                bus.publish(self.run_id, "log", msg[1])
+            elif kind == "flush":
+                self.db.flush()
+            elif kind == "error":
+                return True, msg[1]
+            elif kind == "done":
+                return True, error
+
+    def _conclude(self, error: Optional[str], crashed: Optional[str]):
+        """State akhir di parent setelah relay selesai (shutdown / cancel / gagal)."""
+        self.db.flush()
+        if self._shutdown:
+            return
+        if self.cancelled:
+            run = self.db.get_run(self.run_id)
+            if run is None or not is_terminal_state(run["state"]):
+                self.mark_cancelled()
+            return
+        if error or crashed:
+            raise RuntimeError(error or crashed)
+
+
+class HostedTrainer(_RelayTrainer):
+    def __init__(self, run_id: str, config: Dict[str, Any], host: Optional[ModelHost] = None):
+        super().__init__(run_id, config)
+        self._host = host or get_model_host()
+        self._shutdown = False
+        self._done = threading.Event()
+
+    def cancel(self, force: bool = False):
+        super().cancel()
+        self._host.cancel_run(self.run_id)
+        if force:
+            self._terminate()
+        else:
+            timer = threading.Timer(CANCEL_GRACE_SECONDS, self._terminate)
+            timer.daemon = True
+            timer.start()
+
+    def shutdown(self):
+        self._shutdown = True
+        self._host.terminate()
+
+    def _terminate(self):
+        if self._done.is_set():
+            return
+        if self._host.run_count() > 1:
+            # thread tidak bisa di-kill; mematikan host juga menggagalkan run lain
+            self.log("⚠️ Run did not stop after cancel; other runs share the model host, leaving it running")
+            return
+        self.log("Terminating model host ...")
+        self._host.terminate()
+
+    def train(self):
+        channel, alive = self._host.start_run(self.run_id, self.config)
+        self.log(f"Run started in model host (pid={self._host.pid})")
+        try:
+            reported, error = self._relay(channel, alive)
+        finally:
+            self._done.set()
+            self._host.end_run(self.run_id)
+        self._conclude(error, None if reported else "Model host crashed")
+
+
+class ProcessTrainer(_RelayTrainer):
+    def __init__(self, run_id: str, config: Dict[str, Any]):
+        super().__init__(run_id, config)
+        self._ctx = mp.get_context("spawn")
+        self._process = None
+        self._remote_cancel = self._ctx.Event()
+        self._shutdown = False
+
+    def cancel(self, force: bool = False):
+        super().cancel()
+        self._remote_cancel.set()
+        if force:
+            self._terminate()
+        else:
+            timer = threading.Timer(CANCEL_GRACE_SECONDS, self._terminate)
+            timer.daemon = True
+            timer.start()
+
+    def shutdown(self):
+        """Server berhenti: matikan child tanpa menandai run (job di-requeue saat start)."""
+        self._shutdown = True
+        self._terminate()
+
+    def _terminate(self):
+        proc = self._process
+        if proc is not None and proc.is_alive():
+            self.log("Terminating worker process ...")
+            proc.terminate()
+            proc.join(5)
+            if proc.is_alive():
+                proc.kill()
+
+    def train(self):
+        channel = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=_worker_main, args=(self.run_id, self.config, channel, self._remote_cancel),
+            # bukan daemon: trainer boleh punya child sendiri (dataloader, datasets.map num_proc)
+            name=f"trainer-{self.run_id[:8]}", daemon=False,
+        )
+        self._process.start()
+        self.log(f"Worker process started (pid={self._process.pid})")
+
+        _, error = self._relay(channel, self._process.is_alive)
+        self._process.join()
+        exitcode = self._process.exitcode
+        self._conclude(error, f"Worker crashed (exit code {exitcode})" if exitcode != 0 else None)
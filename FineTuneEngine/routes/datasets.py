@@ -1,6 +1,12 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, Query, Request
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from pydantic import BaseModel
 import os, json
+from core.data.token_cache import TokenCache
+from core.data import preprocess, upload
+from core.data.dataset_index import get_index, load_index
+from core.data.dedup import derived_paths
 
 router = APIRouter()
 
@@ -15,48 +21,259 @@ def list_datasets():
         if f.endswith(".jsonl") or f.endswith(".csv"):
             path = os.path.join(DATASET_DIR, f)
             size_mb = round(os.path.getsize(path) / (1024**2), 2)
-            datasets.append({
+            item = {
                 "name": f,
                 "size_mb": size_mb,
                 "path": path
-            })
+            }
+            # statistik dari metadata upload (tanpa membaca ulang file)
+            meta = upload.read_dataset_meta(DATASET_DIR, f)
+            if meta is not None:
+                item.update({k: meta.get(k) for k in ("records", "invalid_records", "sha256", "format_standard")})
+            index = load_index(DATASET_DIR, f)
+            if index is not None:
+                length = index.meta["char_length"]
+                item.update({
+                    "records": index.meta["num_records"],
+                    "duplicates": index.meta["duplicates"]["exact"],
+                    "char_length": {k: length.get(k) for k in ("min", "max", "mean", "p50", "p95")},
+                })
+            datasets.append(item)
     return {"datasets": datasets}
 
 
 @router.post("/upload")
-async def upload_dataset(file: UploadFile = File(...)):
-    """Upload dataset baru ke folder data"""
-    filename = file.filename
+async def upload_dataset(file: UploadFile = File(...), format_standard: str = Form("INSTRUCTION_CHAT"),
+                         max_invalid: Optional[int] = Form(None)):
+    """Upload dataset baru ke folder data (streaming per chunk, divalidasi sambil jalan)"""
+    filename = os.path.basename(file.filename)
+    session = await run_in_threadpool(upload.create_session, DATASET_DIR, filename, format_standard,
+                                      None, None, max_invalid)
+    try:
+        while True:
+            chunk = await file.read(upload.CHUNK_SIZE)
+            if not chunk:
+                break
+            await run_in_threadpool(session.write, chunk)
+        stats = await run_in_threadpool(session.complete)
+    except upload.UploadRejected as ex:
+        await run_in_threadpool(session.discard)
+        return {"error": str(ex)}
+    except BaseException:
+        # disconnect / disk penuh: upload ini tidak punya upload_id di response, jadi tidak bisa di-resume.
+        # Sync: setelah cancel, await berikutnya di scope ini langsung dibatalkan lagi
+        session.discard()
+        raise
+    finally:
+        upload.drop_session(session.upload_id)
+
     file_path = os.path.join(DATASET_DIR, filename)
+    return {"message": f"Dataset '{filename}' uploaded successfully.", "path": file_path, "stats": stats}
+
+
+class UploadInitRequest(BaseModel):
+    filename: str
+    size: Optional[int] = None
+    format_standard: str = "INSTRUCTION_CHAT"
+    input_columns: dict = {}
+    max_invalid: Optional[int] = None
+
+
+@router.post("/uploads")
+def init_upload(req: UploadInitRequest):
+    """Mulai upload resumable; kirim bytes lewat PUT /uploads/{upload_id}?offset=N"""
+    filename = os.path.basename(req.filename)
+    if not (filename.endswith(".jsonl") or filename.endswith(".csv")):
+        return {"error": "Unsupported file format."}
+    session = upload.create_session(DATASET_DIR, filename, req.format_standard, req.input_columns,
+                                    req.size, req.max_invalid)
+    return {**session.status(), "chunk_size": upload.CHUNK_SIZE}
+
+
+@router.get("/uploads")
+def list_uploads():
+    """List upload yang belum selesai"""
+    return {"uploads": upload.list_sessions(DATASET_DIR)}
+
+
+@router.get("/uploads/{upload_id}")
+def upload_status(upload_id: str):
+    session = upload.get_session(DATASET_DIR, upload_id)
+    if session is None:
+        return {"error": f"Upload {upload_id} not found."}
+    return session.status()
 
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
 
-    return {"message": f"Dataset '{filename}' uploaded successfully.", "path": file_path}
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """Tulis body request mulai di ``offset``; offset harus sama dengan jumlah byte yang sudah diterima"""
+    session = await run_in_threadpool(upload.get_session, DATASET_DIR, upload_id)
+    if session is None:
+        return {"error": f"Upload {upload_id} not found."}
+    if not session.lock.acquire(blocking=False):
+        return {"error": f"Upload {upload_id} is receiving another chunk."}
+    try:
+        if offset != session.state["offset"]:
+            return {"error": "Offset mismatch, resume from the returned offset.", "offset": session.state["offset"]}
+        buffer = bytearray()
+        try:
+            async for part in request.stream():
+                buffer += part
+                if len(buffer) >= upload.CHUNK_SIZE:
+                    await run_in_threadpool(session.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await run_in_threadpool(session.write, bytes(buffer))
+        except upload.UploadRejected as ex:
+            await run_in_threadpool(session.discard)
+            upload.drop_session(upload_id)
+            return {"error": str(ex)}
+        finally:
+            # simpan offset yang sudah diterima, juga kalau client putus di tengah chunk
+            if os.path.exists(session.state_path):
+                await run_in_threadpool(session.checkpoint)
+        return session.status()
+    finally:
+        session.lock.release()
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str, sha256: Optional[str] = None):
+    """Selesaikan upload: cek ukuran/checksum, pindahkan ke folder data, simpan metadata"""
+    session = await run_in_threadpool(upload.get_session, DATASET_DIR, upload_id)
+    if session is None:
+        return {"error": f"Upload {upload_id} not found."}
+    if not session.lock.acquire(blocking=False):
+        return {"error": f"Upload {upload_id} is receiving another chunk."}
+    try:
+        stats = await run_in_threadpool(session.complete, sha256)
+    except upload.UploadRejected as ex:
+        return {"error": str(ex), "offset": session.state["offset"]}
+    finally:
+        session.lock.release()
+    upload.drop_session(upload_id)
+    filename = session.state["filename"]
+    return {"message": f"Dataset '{filename}' uploaded successfully.",
+            "path": os.path.join(DATASET_DIR, filename), "stats": stats}
+
+
+@router.delete("/uploads/{upload_id}")
+def abort_upload(upload_id: str):
+    session = upload.get_session(DATASET_DIR, upload_id)
+    if session is None:
+        return {"error": f"Upload {upload_id} not found."}
+    session.discard()
+    upload.drop_session(upload_id)
+    return {"message": f"Upload {upload_id} aborted."}
 
 
 @router.get("/inspect")
-def inspect_dataset(filename: str):
-    """Cek isi 5 baris pertama dataset"""
+def inspect_dataset(filename: str, offset: int = Query(0, ge=0), limit: int = Query(5, ge=1, le=100),
+                    random: bool = False, seed: Optional[int] = None):
+    """Cek isi dataset: halaman mulai ``offset`` atau sampel acak (seek lewat index)"""
+    filename = os.path.basename(filename)
     file_path = os.path.join(DATASET_DIR, filename)
     if not os.path.exists(file_path):
         return {"error": f"File {filename} not found."}
+    if not (filename.endswith(".jsonl") or filename.endswith(".csv")):
+        return {"error": "Unsupported file format."}
+
+    index = get_index(DATASET_DIR, filename)
+    sample = index.sample(limit, seed) if random else index.page(offset, limit)
+    return {"sample": sample, "type": index.meta["type"], "total": len(index),
+            "offset": None if random else offset}
+
+
+@router.get("/{name}/stats")
+def dataset_stats(name: str, tokenizer: Optional[str] = None):
+    """Statistik dataset dari index sidecar (+ histogram panjang token kalau ``tokenizer`` diisi)"""
+    name = os.path.basename(name)
+    if not os.path.exists(os.path.join(DATASET_DIR, name)):
+        return {"error": f"File {name} not found."}
+    index = get_index(DATASET_DIR, name)
+    stats = dict(index.meta)
+    if tokenizer:
+        stats["token_length"] = index.token_stats(tokenizer)
+    return stats
+
+
+@router.get("/cache")
+def list_token_cache():
+    """List cache dataset ter-tokenize + statistik hit/miss"""
+    cache = TokenCache()
+    return {"entries": cache.entries(), "stats": cache.stats()}
+
+
+@router.delete("/cache/{key}")
+def delete_token_cache(key: str):
+    if not TokenCache().remove(key):
+        return {"error": f"Cache entry {key} not found."}
+    return {"message": f"Cache entry {key} removed."}
+
+
+class PreprocessRequest(BaseModel):
+    tokenizer: str
+    max_length: int = 512
+    num_proc: Optional[int] = None
+    format_standard: str = "INSTRUCTION_CHAT"
+    input_columns: dict = {}
+
+
+@router.post("/{name}/preprocess")
+def preprocess_dataset(name: str, req: PreprocessRequest):
+    """Tokenize dataset ke cache secara paralel (background job)"""
+    name = os.path.basename(name)
+    file_path = os.path.join(DATASET_DIR, name)
+    if not os.path.exists(file_path):
+        return {"error": f"File {name} not found."}
+    dataset_cfg = {
+        "path": file_path,
+        "type": "csv" if name.endswith(".csv") else "jsonl",
+        "format_standard": req.format_standard,
+        "input_columns": req.input_columns,
+    }
+    return preprocess.start_preprocess(dataset_cfg, req.tokenizer, req.max_length, req.num_proc)
+
+
+class DedupRequest(BaseModel):
+    threshold: Optional[float] = 0.8  # None = exact duplicate saja
+    num_proc: Optional[int] = None
+    input_columns: dict = {}
+
+
+@router.post("/{name}/dedup")
+def dedup_dataset(name: str, req: DedupRequest):
+    """Buang duplikat (exact + near-duplicate) ke dataset turunan ``<nama>.dedup.<ext>`` (background job)"""
+    name = os.path.basename(name)
+    file_path = os.path.join(DATASET_DIR, name)
+    if not os.path.exists(file_path):
+        return {"error": f"File {name} not found."}
+    dataset_cfg = {
+        "path": file_path,
+        "type": "csv" if name.endswith(".csv") else "jsonl",
+        "input_columns": req.input_columns,
+    }
+    return preprocess.start_dedup(dataset_cfg, req.threshold, req.num_proc)
+
+
+@router.get("/{name}/dedup")
+def dedup_report(name: str):
+    """Report dedup terakhir untuk dataset ini"""
+    report_path = derived_paths(os.path.join(DATASET_DIR, os.path.basename(name)))[1]
+    if not os.path.exists(report_path):
+        return {"error": f"No dedup report for {name}."}
+    with open(report_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@router.get("/preprocess")
+def list_preprocess_jobs():
+    return {"jobs": preprocess.list_jobs()}
+
 
-    if filename.endswith(".jsonl"):
-        lines = []
-        with open(file_path, "r", encoding="utf-8") as f:
-            for i, line in enumerate(f):
-                if i >= 5:
-                    break
-                try:
-                    lines.append(json.loads(line))
-                except:
-                    lines.append({"raw": line.strip()})
-        return {"sample": lines, "type": "jsonl"}
-
-    elif filename.endswith(".csv"):
-        import pandas as pd
-        df = pd.read_csv(file_path, nrows=5)
-        return {"sample": df.to_dict(orient="records"), "type": "csv"}
-
-    return {"error": "Unsupported file format."}
+@router.get("/preprocess/{job_id}")
+def preprocess_status(job_id: str):
+    job = preprocess.get_job(job_id)
+    if job is None:
+        return {"error": f"Job {job_id} not found."}
+    return job
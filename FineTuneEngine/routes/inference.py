@@ -0,0 +1,92 @@
+from fastapi import APIRouter
+import os
+from core import inference
+from core.data.token_cache import iter_texts
+from routes.datasets import DATASET_DIR
+
+router = APIRouter()
+
+DEFAULT_TIMEOUT_SEC = 600
+
+
+def _server(cfg: dict):
+    """Server untuk ``base_model`` (atau base model yang tercatat di adapter_config.json)."""
+    base_model = cfg.get("base_model")
+    if not base_model and cfg.get("adapter"):
+        base_model = inference.adapter_base_model(cfg["adapter"])
+    if not base_model:
+        raise ValueError("base_model is required (or an adapter whose config records it).")
+    options = {k: cfg[k] for k in ("max_batch", "max_wait_ms", "max_adapters", "max_length", "torch_dtype")
+               if cfg.get(k) is not None}
+    return inference.get_adapter_server(base_model, **options)
+
+
+def _dataset(cfg: dict) -> dict:
+    dataset = dict(cfg.get("dataset") or {})
+    path = dataset.get("path")
+    if not path:
+        raise ValueError("dataset.path is required.")
+    if not os.path.isfile(path) and os.path.isfile(os.path.join(DATASET_DIR, path)):
+        dataset["path"] = os.path.join(DATASET_DIR, path)
+    elif not os.path.isfile(path):
+        raise ValueError(f"Dataset {path} not found.")
+    return dataset
+
+
+@router.post("/generate")
+def generate(cfg: dict):
+    """Generate dari ``prompt``/``prompts`` dengan ``adapter`` (run_id atau path; kosong = base model).
+    Request yang bersamaan digabung jadi satu micro-batch."""
+    prompts = cfg.get("prompts") or ([cfg["prompt"]] if cfg.get("prompt") else [])
+    if not prompts:
+        return {"error": "prompt or prompts is required."}
+    try:
+        server = _server(cfg)
+        results = server.generate(prompts, cfg.get("adapter"), int(cfg.get("max_new_tokens", 64)),
+                                  float(cfg.get("temperature", 0.0)), cfg.get("timeout", DEFAULT_TIMEOUT_SEC))
+    except (ValueError, RuntimeError, TimeoutError) as ex:
+        return {"error": str(ex)}
+    return {"base_model": server.base_model, "adapter": cfg.get("adapter"), "results": results}
+
+
+@router.post("/score")
+def score(cfg: dict):
+    """Loss / perplexity per teks di ``texts``"""
+    texts = cfg.get("texts") or []
+    if not texts:
+        return {"error": "texts is required."}
+    try:
+        server = _server(cfg)
+        results = server.score(texts, cfg.get("adapter"), cfg.get("timeout", DEFAULT_TIMEOUT_SEC))
+    except (ValueError, RuntimeError, TimeoutError) as ex:
+        return {"error": str(ex)}
+    return {"base_model": server.base_model, "adapter": cfg.get("adapter"), "results": results}
+
+
+@router.post("/evaluate")
+def evaluate(cfg: dict):
+    """Held-out loss / perplexity atas ``dataset`` (DatasetConfig; path relatif ke folder data boleh),
+    dibaca streaming per batch. ``adapters`` = beberapa adapter dievaluasi berurutan di base yang sama."""
+    adapters = cfg.get("adapters") or [cfg.get("adapter")]
+    try:
+        dataset = _dataset(cfg)
+        server = _server({**cfg, "adapter": cfg.get("adapter") or next((a for a in adapters if a), None)})
+        results = [server.evaluate(iter_texts(dataset), adapter, cfg.get("max_records"),
+                                   cfg.get("timeout", DEFAULT_TIMEOUT_SEC)) for adapter in adapters]
+    except (ValueError, RuntimeError, TimeoutError) as ex:
+        return {"error": str(ex)}
+    return {"base_model": server.base_model, "dataset": dataset["path"], "results": results}
+
+
+@router.get("/")
+def list_servers():
+    """Base model yang sedang di-load + adapter, batch dan latency/tokens per detik"""
+    return {"servers": inference.list_adapter_servers()}
+
+
+@router.post("/unload")
+def unload(cfg: dict):
+    """Lepas base model dan semua adapter-nya (model kembali ke BaseModelCache)"""
+    if not inference.close_adapter_server(cfg.get("base_model") or ""):
+        return {"error": f"No inference server for {cfg.get('base_model')}."}
+    return {"message": "Unloaded", "base_model": cfg["base_model"]}
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Query
-from typing import Optional
-import os, subprocess
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import os, json
+from core.downloads import get_download_manager
+from core.events import bus, is_terminal_state
+from core.model_manifest import get_manifest_cache
 
 router = APIRouter()
 
@@ -8,43 +12,94 @@ MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "models")
 os.makedirs(MODELS_DIR, exist_ok=True)
 
 @router.get("/")
-def list_models():
-    """List semua model lokal yang ada di folder models"""
+def list_models(refresh: bool = False):
+    """List semua model lokal yang ada di folder models (dari manifest cache)"""
     models = []
-    for d in os.listdir(MODELS_DIR):
-        path = os.path.join(MODELS_DIR, d)
-        if os.path.isdir(path):
-            size_gb = 0
-            for root, _, files in os.walk(path):
-                for f in files:
-                    size_gb += os.path.getsize(os.path.join(root, f))
-            size_gb = round(size_gb / (1024**3), 2)
-            models.append({"name": d, "size_gb": size_gb, "path": path})
+    for m in get_manifest_cache(MODELS_DIR).list(refresh=refresh):
+        models.append({
+            "name": m["name"],
+            "size_gb": m["size_gb"],
+            "path": m["path"],
+            "num_files": m["num_files"],
+            "architecture": (m["config"].get("architectures") or [m["config"].get("model_type")])[0],
+            "parameters": m.get("parameters"),
+            "dtype": m.get("dtype"),
+            "adapter": m.get("adapter") is not None,
+        })
     return {"models": models}
 
 
 @router.post("/download")
-def download_model(repo_id: str = Query(..., description="HuggingFace repo_id, e.g. 'meta-llama/Llama-2-7b-hf'")):
-    """Download base model dari Hugging Face pakai `huggingface-cli`"""
-    try:
-        cmd = [
-            "huggingface-cli",
-            "download",
-            repo_id,
-            "--local-dir",
-            os.path.join(MODELS_DIR, repo_id.replace("/", "_"))
-        ]
-        subprocess.run(cmd, check=True)
-        return {"message": f"Model {repo_id} downloaded successfully."}
-    except Exception as ex:
-        return {"error": str(ex)}
+def download_model(repo_id: str = Query(..., description="HuggingFace repo_id, e.g. 'meta-llama/Llama-2-7b-hf'"),
+                   revision: str = "main",
+                   allow_patterns: Optional[List[str]] = Query(None, description="glob file, e.g. '*.safetensors'")):
+    """Download base model dari Hugging Face sebagai background job (paralel, resumable)"""
+    dest = os.path.join(MODELS_DIR, repo_id.replace("/", "_"))
+    job = get_download_manager().submit(repo_id, dest, revision, allow_patterns)
+    return {"message": f"Download {repo_id} queued.", **job.to_dict(include_files=False)}
+
+
+@router.get("/downloads")
+def list_downloads():
+    """List job download"""
+    return {"jobs": [job.to_dict(include_files=False) for job in get_download_manager().list()]}
+
+
+@router.get("/downloads/{job_id}")
+def download_status(job_id: str):
+    job = get_download_manager().get(job_id)
+    if job is None:
+        return {"error": f"Download job {job_id} not found."}
+    return job.to_dict()
+
+
+@router.delete("/downloads/{job_id}")
+def cancel_download(job_id: str):
+    """Batalkan download; file parsial disimpan supaya download berikutnya bisa resume"""
+    if not get_download_manager().cancel(job_id):
+        return {"error": f"Download job {job_id} not found."}
+    return {"message": f"Download job {job_id} cancelling."}
+
+
+@router.get("/downloads/{job_id}/stream")
+async def stream_download(job_id: str, request: Request):
+    """Server-Sent Events: progress & state job download"""
+    job = get_download_manager().get(job_id)
+    if job is None:
+        return {"error": f"Download job {job_id} not found."}
+
+    async def sse():
+        sub = bus.subscribe(job_id)
+        try:
+            # snapshot dulu, lalu event live sampai state terminal
+            yield f"event: progress\ndata: {json.dumps(job.to_dict(include_files=False))}\n\n"
+            if is_terminal_state(job.status.capitalize()):
+                return
+            while not await request.is_disconnected():
+                event = await sub.get(timeout=15.0)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                if event["type"] == "state" and is_terminal_state(event["data"].get("state")):
+                    return
+        finally:
+            sub.close()
+
+    return StreamingResponse(sse(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @router.get("/inspect")
-def inspect_model(model_name: str):
+def inspect_model(model_name: str, refresh: bool = False):
     """Cek isi folder model tertentu"""
-    path = os.path.join(MODELS_DIR, model_name)
-    if not os.path.exists(path):
+    manifest = get_manifest_cache(MODELS_DIR).get(os.path.basename(model_name), refresh=refresh)
+    if manifest is None:
         return {"error": "Model not found."}
-    contents = os.listdir(path)
-    return {"model": model_name, "files": contents}
+    return {
+        "model": model_name,
+        "files": [f["path"] for f in manifest["files"]],
+        "file_sizes": {f["path"]: f["size"] for f in manifest["files"]},
+        **{k: manifest.get(k) for k in ("size_bytes", "size_gb", "config", "parameters", "dtype", "dtypes",
+                                        "quantization", "adapter", "scanned_at")},
+    }
@@ -1,33 +1,290 @@
-from fastapi import APIRouter
-from core.storage.sqlite_storage import SQLiteStorage
-from core.trainers.mock_trainer import MockTrainer
-from core.trainers.accelerate_trainer import AccelerateTrainer
-import threading
-from core.trainers.deepspeed_trainer import DeepSpeedTrainer
+from fastapi import APIRouter, Query, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import datetime, json, os, time
+from core.storage.sqlite_storage import get_storage
+from core.events import bus, is_terminal_state
+from core.scheduler import get_scheduler
+from core.checkpointing import latest_checkpoint, resume_coverage
+from core.profiler import CAPTURE_KINDS, capture_pending, read_captures, request_capture, summarize
+from core.telemetry import align_steps, pressure, thin
+from core import planner, run_log
+from core.hardware import get_hardware_info
+from routes.models import MODELS_DIR
 
 router = APIRouter()
-db = SQLiteStorage()
+db = get_storage()
+
+# metric lama yang di-replay ke client stream (lebih dari ini di-downsample per bucket step)
+BACKFILL_MAX_POINTS = 2000
 
 
 @router.post("/start")
 def start_run(cfg: dict):
     run_id = db.create_run(cfg)
     mode = cfg.get("backend", "mock")
+    job = get_scheduler().submit(run_id, cfg, priority=int(cfg.get("priority", 0)))
+    return {"run_id": run_id, "backend": mode, "job": job, "message": "Training queued"}
+
+
+@router.post("/plan")
+def plan_run(cfg: dict, probe: bool = False):
+    """Rencana micro-batch / gradient accumulation + estimasi memori untuk config run (tanpa mulai training).
+
+    Config model dari ``cfg.model_config`` atau config.json lokal ``base_model``;
+    probe=true memverifikasi dengan forward/backward di child process (load model penuh)."""
+    model_id = cfg.get("base_model") or ""
+    model_config = cfg.get("model_config") or planner.find_model_config(model_id, MODELS_DIR)
+    if model_config is None:
+        return {"error": f"config.json for model '{model_id}' not found locally; pass model_config."}
+    training = cfg.get("training") or {}
+    strategy = cfg.get("strategy", "lora")
+    try:
+        result = planner.plan(model_config, training, get_hardware_info(), strategy, cfg.get("lora"),
+                              (cfg.get("compute") or {}).get("gpu_index"))
+    except ValueError as ex:
+        return {"error": str(ex)}
+    if probe:
+        import multiprocessing as mp
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            with ProcessPoolExecutor(1, mp_context=mp.get_context("spawn")) as pool:
+                result = pool.submit(planner.probe_model, model_id, result, strategy, cfg.get("lora")).result()
+        except Exception as ex:
+            return {"error": f"Probe failed: {ex}", "plan": result}
+    return {"base_model": model_id, "plan": result}
+
+
+@router.post("/{run_id}/cancel")
+def cancel_run(run_id: str, force: bool = False):
+    """Cancel run; force=true langsung kill worker process"""
+    job = get_scheduler().cancel(run_id, force=force)
+    if job is None:
+        return {"error": f"Run {run_id} has no job."}
+    return {"run_id": run_id, "job": job}
+
+
+@router.post("/{run_id}/resume")
+def resume_run(run_id: str, priority: Optional[int] = None):
+    """Lanjutkan run yang gagal/dibatalkan dari checkpoint terakhir; ``resume`` melaporkan state yang dipulihkan"""
+    run = db.get_run(run_id)
+    if run is None:
+        return {"error": f"Run {run_id} not found."}
+    job = db.get_job(run_id)
+    if job is not None and job["state"] in ("queued", "running", "cancelling"):
+        return {"error": f"Run {run_id} is still {job['state']}."}
+    if run["state"] == "Completed":
+        return {"error": f"Run {run_id} already completed."}
+    ckpt = latest_checkpoint(db, run_id)
+    if ckpt is None:
+        return {"error": f"Run {run_id} has no checkpoint to resume from."}
+    db.patch_config(run_id, {"resume_from_checkpoint": ckpt["path"]})
+    cfg = {**run["config"], "resume_from_checkpoint": ckpt["path"]}
+    if priority is None:
+        priority = int(cfg.get("priority", 0))
+    job = get_scheduler().submit(run_id, cfg, priority=priority)
+    coverage = resume_coverage(ckpt["path"], cfg.get("backend", "mock"))
+    response = {"run_id": run_id, "checkpoint": ckpt, "job": job, "resume": coverage, "message": "Resume queued"}
+    lost = [text for key, text in (("optimizer_state", "optimizer state is re-initialized"),
+                                   ("data_position", "data restarts from the beginning of the epoch"))
+            if not coverage[key]]
+    if lost:
+        response["warning"] = f"Partial resume from step {ckpt['step']}: {'; '.join(lost)}."
+    return response
+
 
-    if mode == "accelerate":
-        trainer = AccelerateTrainer(run_id, cfg)
-    elif mode == "deepspeed":
-        trainer = DeepSpeedTrainer(run_id, cfg)       
-    else:
-        trainer = MockTrainer(run_id, cfg)
+@router.get("/queue")
+def queue_status():
+    """Status slot scheduler + job yang sedang jalan / antri"""
+    return get_scheduler().status()
 
-    thread = threading.Thread(target=trainer.train, daemon=True)
-    thread.start()
-    return {"run_id": run_id, "backend": mode, "message": "Training started"}
 
 @router.get("/")
-def list_runs():
-    """List semua run yang tersimpan"""
-    if hasattr(db, "list_runs"):
-        return db.list_runs()
-    return []
+def list_runs(
+    state: Optional[str] = None,
+    base_model: Optional[str] = None,
+    run_name: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """List semua run yang tersimpan (terbaru dulu, dengan filter & pagination)"""
+    filters = {
+        "state": state, "base_model": base_model, "run_name": run_name,
+        "created_after": created_after, "created_before": created_before,
+    }
+    return {
+        "runs": db.list_runs(filters, limit=limit, offset=offset),
+        "total": db.count_runs(filters),
+        "limit": limit,
+        "offset": offset,
+    }
+
+
+@router.get("/{run_id}")
+def get_run(run_id: str):
+    run = db.get_run(run_id)
+    if run is None:
+        return {"error": f"Run {run_id} not found."}
+    return run
+
+
+@router.get("/{run_id}/metrics")
+def get_metrics(
+    run_id: str,
+    start_step: Optional[int] = None,
+    end_step: Optional[int] = None,
+    max_points: Optional[int] = Query(2000, ge=3, le=100000),
+    method: str = Query("bucket", pattern="^(bucket|lttb)$"),
+):
+    """Metric history per step range, di-downsample kalau lebih dari max_points"""
+    return db.get_metrics(run_id, start_step, end_step, max_points=max_points, method=method)
+
+
+@router.get("/{run_id}/logs")
+def get_logs(run_id: str, offset: Optional[int] = Query(None, ge=0),
+             limit_bytes: int = Query(run_log.DEFAULT_READ_BYTES, ge=1, le=16 * 1024 ** 2),
+             tail: int = Query(200, ge=0, le=10000)):
+    """Log train.log (JSON per baris). Tanpa ``offset``: ``tail`` baris terakhir; dengan ``offset``:
+    baris mulai offset itu, lanjutkan polling dengan ``next_offset``"""
+    log_dir = os.path.join("logs", run_id)
+    if not os.path.isdir(log_dir) and db.get_run(run_id) is None:
+        return {"error": f"Run {run_id} not found."}
+    return {"run_id": run_id, **run_log.read_log(log_dir, offset, limit_bytes, tail)}
+
+
+@router.get("/{run_id}/checkpoints")
+def get_checkpoints(run_id: str):
+    return {"run_id": run_id, "checkpoints": db.get_checkpoints(run_id)}
+
+
+@router.get("/{run_id}/profile")
+def get_profile(run_id: str, start_step: Optional[int] = None, end_step: Optional[int] = None):
+    """Profil step training: rata-rata waktu per fase, throughput, memori + hasil capture"""
+    rows = db.get_profile(run_id, start_step, end_step)
+    log_dir = os.path.join("logs", run_id)
+    return {
+        "run_id": run_id,
+        "summary": summarize(rows),
+        "points": rows,
+        "captures": read_captures(log_dir),
+        "capture_pending": capture_pending(log_dir),
+    }
+
+
+@router.post("/{run_id}/profile/capture")
+def capture_profile(run_id: str, kind: str = Query("torch", pattern=f"^({'|'.join(CAPTURE_KINDS)})$"),
+                    steps: int = Query(5, ge=1, le=200)):
+    """Capture torch.profiler / cProfile selama N step berikutnya dari run yang sedang jalan"""
+    job = db.get_job(run_id)
+    if job is None or job["state"] != "running":
+        return {"error": f"Run {run_id} is not running."}
+    request_capture(os.path.join("logs", run_id), kind, steps)
+    return {"run_id": run_id, "kind": kind, "steps": steps, "message": "Capture requested"}
+
+
+@router.get("/{run_id}/telemetry")
+def get_run_telemetry(run_id: str, max_points: Optional[int] = Query(2000, ge=1, le=100000)):
+    """Sample hardware selama job run berjalan + tekanan resource per row profiler (step lambat vs CPU/RAM/GPU)"""
+    job = db.get_job(run_id)
+    if job is None or not job.get("started_at"):
+        return {"error": f"Run {run_id} has not started."}
+    start = datetime.datetime.fromisoformat(job["started_at"]).timestamp()
+    end = datetime.datetime.fromisoformat(job["finished_at"]).timestamp() if job.get("finished_at") else time.time()
+    samples = db.get_telemetry(start, end)
+    return {
+        "run_id": run_id,
+        "window": {"start": start, "end": end},
+        "summary": pressure(samples),
+        "steps": align_steps(db.get_profile(run_id), samples),
+        "samples": thin(samples, max_points),
+    }
+
+
+async def _event_stream(run_id: str, from_step: Optional[int] = None, after_seq: Optional[int] = None,
+                        heartbeat: float = 15.0, max_points: int = BACKFILL_MAX_POINTS):
+    """Replay event lama (ring buffer + backfill metric dari DB) lalu ikuti event live.
+
+    Backfill dibatasi sampai step sebelum event live pertama dan di-downsample ke
+    ``max_points``. Yield ``None`` sebagai heartbeat. Berhenti setelah run masuk
+    state terminal.
+    """
+    sub = bus.subscribe(run_id)
+    try:
+        live_step = bus.last_step(run_id)
+        replay = bus.history(run_id, from_step=from_step, after_seq=after_seq)
+        if from_step is not None and after_seq is None:
+            covered = min((e["step"] for e in replay if e["type"] == "metric"), default=None)
+            # tanpa metric di ring: step > live_step datang lewat subscription
+            end = covered - 1 if covered is not None else live_step
+            if end is None or end >= from_step:
+                old = db.get_metrics(run_id, start_step=from_step, end_step=end, max_points=max_points)["points"]
+                replay = [{"seq": 0, "run_id": run_id, "type": "metric", "step": p["step"],
+                           "ts": None, "data": p} for p in old] + replay
+
+        last_seq = after_seq or 0
+        for event in replay:
+            last_seq = max(last_seq, event["seq"])
+            yield event
+            if event["type"] == "state" and is_terminal_state(event["data"].get("state")):
+                return
+
+        run = db.get_run(run_id)
+        if run is None or is_terminal_state(run["state"]):
+            return
+
+        while True:
+            event = await sub.get(timeout=heartbeat)
+            if event is None:
+                yield None
+                continue
+            if event["seq"] <= last_seq:
+                continue
+            last_seq = event["seq"]
+            if sub.dropped:
+                yield {"seq": last_seq, "run_id": run_id, "type": "lagged", "step": event["step"],
+                       "ts": event["ts"], "data": {"dropped": sub.dropped}}
+                sub.dropped = 0
+            yield event
+            if event["type"] == "state" and is_terminal_state(event["data"].get("state")):
+                return
+    finally:
+        sub.close()
+
+
+@router.get("/{run_id}/stream")
+async def stream_run(
+    run_id: str,
+    request: Request,
+    from_step: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+    max_points: int = Query(BACKFILL_MAX_POINTS, ge=3, le=100000),
+):
+    """Server-Sent Events: log, metric, checkpoint & state run secara live"""
+    after_seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    async def sse():
+        async for event in _event_stream(run_id, from_step, after_seq, max_points=max_points):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(sse(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/{run_id}/ws")
+async def stream_run_ws(websocket: WebSocket, run_id: str, from_step: Optional[int] = None,
+                        after_seq: Optional[int] = None, max_points: int = BACKFILL_MAX_POINTS):
+    """Sama dengan /stream tapi lewat WebSocket (satu JSON per event)"""
+    await websocket.accept()
+    try:
+        async for event in _event_stream(run_id, from_step, after_seq, max_points=max(3, max_points)):
+            await websocket.send_json(event or {"type": "heartbeat"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+from core.sweeps import get_sweeps
+
+router = APIRouter()
+
+
+@router.post("/start")
+def start_sweep(cfg: dict):
+    """Buat sweep dari ``base`` (config run) + ``space``; trial dijadwalkan lewat scheduler (lihat SweepConfig)"""
+    try:
+        sweep = get_sweeps().create(cfg)
+    except ValueError as ex:
+        return {"error": str(ex)}
+    return {"sweep_id": sweep["id"], "sweep": sweep, "message": "Sweep started"}
+
+
+@router.get("/")
+def list_sweeps():
+    return {"sweeps": get_sweeps().list()}
+
+
+@router.get("/{sweep_id}")
+def get_sweep(sweep_id: str):
+    sweep = get_sweeps().get(sweep_id)
+    if sweep is None:
+        return {"error": f"Sweep {sweep_id} not found."}
+    return sweep
+
+
+@router.get("/{sweep_id}/leaderboard")
+def sweep_leaderboard(sweep_id: str, limit: Optional[int] = Query(None, ge=1, le=1000)):
+    """Trial urut metric terbaik (``best_value``), termasuk trial yang di-prune"""
+    board = get_sweeps().leaderboard(sweep_id, limit)
+    if board is None:
+        return {"error": f"Sweep {sweep_id} not found."}
+    return board
+
+
+@router.post("/{sweep_id}/cancel")
+def cancel_sweep(sweep_id: str):
+    """Batalkan trial pending dan cancel trial yang sedang jalan"""
+    sweep = get_sweeps().cancel(sweep_id)
+    if sweep is None:
+        return {"error": f"Sweep {sweep_id} not found or already finished."}
+    return sweep
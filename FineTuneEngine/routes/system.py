@@ -1,5 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from typing import Optional
 from core.hardware import get_hardware_info
+from core.registry import STRATEGIES, TRAINERS
+from core.telemetry import get_telemetry
 
 router = APIRouter()
 
@@ -9,4 +12,26 @@ def health():
 
 @router.get("/hardware")
 def hardware():
-    return get_hardware_info()
+    """Info hardware statis + sample telemetry terakhir (dari cache sampler, tanpa query hardware)"""
+    sampler = get_telemetry()
+    latest = sampler.latest() or sampler.sample_now()
+    return {**get_hardware_info(), "disk_free_gb": latest["disk_free_gb"], "telemetry": latest}
+
+@router.get("/telemetry")
+def telemetry(since: Optional[float] = None, last_sec: Optional[float] = Query(None, gt=0),
+              max_points: Optional[int] = Query(None, ge=1, le=100000)):
+    """Time series CPU / RAM / disk / GPU dari ring buffer sampler (``since`` = epoch detik)"""
+    sampler = get_telemetry()
+    return {
+        "interval": sampler.interval,
+        "running": sampler.running,
+        "samples": sampler.series(since=since, last_sec=last_sec, max_points=max_points),
+    }
+
+@router.get("/backends")
+def backends():
+    """Trainer backend & strategy yang terdaftar; loaded=false berarti modulnya belum di-import"""
+    return {
+        "backends": [{"name": n, "loaded": TRAINERS.is_loaded(n), **TRAINERS.meta(n)} for n in TRAINERS.names()],
+        "strategies": [{"name": n, "loaded": STRATEGIES.is_loaded(n)} for n in STRATEGIES.names()],
+    }